@@ -1,27 +1,91 @@
 """
 AI System Advisor - Context Manager
 Manages conversation history and context
+
+Storage: one append-only JSONL file per session (data/conversations/<id>.jsonl)
+- {"type": "header", ...}   session id, created_at, context at last compaction
+- {"type": "message", ...}  one line per message, appended as it is saved
+- {"type": "context", ...}  merged system context after each update
+
+Saving a message appends a single line instead of rewriting the whole
+conversation, and file I/O runs in a worker thread so the event loop is not
+blocked. Superseded context records are dropped by compaction (atomic
+rewrite) once CONVERSATION_COMPACT_THRESHOLD of them accumulate. History
+reads seek from the end of the file and only parse the last N messages.
+Legacy <id>.json files are migrated on first load.
 """
 
+import asyncio
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Literal
+from typing import Callable, Dict, List, Optional, Any, Literal, Tuple
 from datetime import datetime, timedelta
 from dataclasses import asdict
 
 from app.ai_system_advisor.types import Message, Conversation
 
+# Configuration
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "256"))  # Sessions kept in memory
+CONVERSATION_CACHE_TTL = int(os.getenv("CONVERSATION_CACHE_TTL", "3600"))  # Seconds since last access
+CONVERSATION_COMPACT_THRESHOLD = int(os.getenv("CONVERSATION_COMPACT_THRESHOLD", "50"))  # Superseded records
+TAIL_READ_BLOCK_SIZE = 8192
+
+
+def _message_to_record(message: Message) -> Dict[str, Any]:
+    return {
+        'type': 'message',
+        'role': message.role,
+        'content': message.content,
+        'timestamp': message.timestamp.isoformat(),
+        'metadata': message.metadata
+    }
+
+
+def _record_to_message(record: Dict[str, Any]) -> Message:
+    return Message(
+        role=record['role'],
+        content=record['content'],
+        timestamp=datetime.fromisoformat(record['timestamp']),
+        metadata=record.get('metadata')
+    )
+
+
+def _encode_record(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, default=str, separators=(',', ':')) + "\n").encode('utf-8')
+
+
+def _decode_line(line: bytes) -> Optional[Dict[str, Any]]:
+    """Parse one JSONL line (None for blank or torn lines)"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
 
 class ContextManager:
     """Manages conversation history and context"""
-    
-    def __init__(self, storage_path: Optional[str] = None):
+
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        cache_size: int = CONVERSATION_CACHE_SIZE,
+        compact_threshold: int = CONVERSATION_COMPACT_THRESHOLD
+    ):
         """
         Initialize context manager
-        
+
         Args:
             storage_path: Path to storage directory (default: data/conversations)
+            cache_size: Maximum number of conversations kept in memory (LRU)
+            compact_threshold: Superseded records in a file before it is rewritten
         """
         if storage_path:
             self.storage_path = Path(storage_path)
@@ -29,20 +93,33 @@ class ContextManager:
             # Default: data/conversations in project root
             root_dir = Path(__file__).resolve().parent.parent.parent
             self.storage_path = root_dir / "data" / "conversations"
-        
+
         # Ensure directory exists
         self.storage_path.mkdir(parents=True, exist_ok=True)
-        
-        # In-memory cache for active sessions
-        self._cache: Dict[str, Conversation] = {}
-        self._cache_ttl = timedelta(hours=1)
-    
+
+        # Bounded LRU cache for active sessions: session_id -> (conversation, last access)
+        self._cache: "OrderedDict[str, Tuple[Conversation, float]]" = OrderedDict()
+        self._cache_size = max(1, cache_size)
+        self._cache_ttl = timedelta(seconds=CONVERSATION_CACHE_TTL)
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        # Compaction bookkeeping: superseded records per session file
+        self._compact_threshold = max(1, compact_threshold)
+        self._stale_records: Dict[str, int] = {}
+
+        # Serializes file writes (appends run in worker threads)
+        self._io_lock = threading.Lock()
+
     def _get_file_path(self, session_id: str) -> Path:
         """Get file path for session"""
         # Sanitize session_id for filename
         safe_id = session_id.replace('/', '_').replace('\\', '_')
-        return self.storage_path / f"{safe_id}.json"
-    
+        return self.storage_path / f"{safe_id}.jsonl"
+
+    def _get_legacy_file_path(self, session_id: str) -> Path:
+        """Get path of a pre-JSONL conversation file"""
+        return self._get_file_path(session_id).with_suffix(".json")
+
     async def get_conversation_history(
         self,
         session_id: str,
@@ -50,22 +127,27 @@ class ContextManager:
     ) -> List[Dict[str, Any]]:
         """
         Get conversation history for session
-        
+
         Args:
             session_id: Session identifier
             limit: Maximum number of messages to return
-            
+
         Returns:
             List of messages (formatted for LLM)
         """
-        conversation = await self._load_conversation(session_id)
-        
-        if not conversation:
-            return []
-        
-        # Get last N messages
-        messages = conversation.messages[-limit:]
-        
+        conversation = self._cache_get(session_id)
+
+        if conversation is not None:
+            messages = conversation.messages[-limit:]
+        elif limit > 0 and self._get_file_path(session_id).exists():
+            # Only parse the tail of the file
+            messages = await asyncio.to_thread(self._read_tail_messages, self._get_file_path(session_id), limit)
+        else:
+            conversation = await self._load_conversation(session_id)
+            if not conversation:
+                return []
+            messages = conversation.messages[-limit:]
+
         # Format for LLM (Claude format)
         formatted = []
         for msg in messages:
@@ -73,9 +155,9 @@ class ContextManager:
                 "role": msg.role,
                 "content": msg.content
             })
-        
+
         return formatted
-    
+
     async def save_message(
         self,
         session_id: str,
@@ -85,25 +167,19 @@ class ContextManager:
     ):
         """
         Save message to conversation history
-        
+
+        Appends one line to the session file; the conversation is not
+        re-serialized.
+
         Args:
             session_id: Session identifier
             role: Message role
             content: Message content
             metadata: Optional metadata
         """
-        conversation = await self._load_conversation(session_id)
-        
-        # Create new conversation if doesn't exist
-        if not conversation:
-            conversation = Conversation(
-                session_id=session_id,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
-                messages=[],
-                context={}
-            )
-        
+        if self._get_legacy_file_path(session_id).exists():
+            await self._load_conversation(session_id)  # Migrates to JSONL
+
         # Add message
         message = Message(
             role=role,
@@ -111,36 +187,42 @@ class ContextManager:
             timestamp=datetime.utcnow(),
             metadata=metadata or {}
         )
-        
-        conversation.messages.append(message)
-        conversation.updated_at = datetime.utcnow()
-        
-        # Save to file
-        await self._save_conversation(conversation)
-        
-        # Update cache
-        self._cache[session_id] = conversation
-    
+
+        # Update cache (only if the full conversation is already in memory)
+        # under the same lock as the file append, so a concurrent compaction
+        # sees the message either in both places or in neither
+        conversation = self._cache_get(session_id, count=False)
+
+        def _update_cache():
+            if conversation is not None:
+                conversation.messages.append(message)
+                conversation.updated_at = message.timestamp
+
+        # Append to file
+        await self._append_records(
+            session_id, [_message_to_record(message)], created_at=message.timestamp, on_written=_update_cache
+        )
+
     async def get_system_context(
         self,
         session_id: str
     ) -> Dict[str, Any]:
         """
         Get system context for session
-        
+
         Args:
             session_id: Session identifier
-            
+
         Returns:
             System context dictionary
         """
         conversation = await self._load_conversation(session_id)
-        
+
         if not conversation:
             return {}
-        
+
         return conversation.context or {}
-    
+
     async def update_system_context(
         self,
         session_id: str,
@@ -148,31 +230,42 @@ class ContextManager:
     ):
         """
         Update system context for session
-        
+
         Args:
             session_id: Session identifier
             context: Context dictionary
         """
         conversation = await self._load_conversation(session_id)
-        
+        now = datetime.utcnow()
+
         if not conversation:
             conversation = Conversation(
                 session_id=session_id,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow(),
+                created_at=now,
+                updated_at=now,
                 messages=[],
                 context=context
             )
+            self._stale_records[session_id] = 0
         else:
             # Merge with existing context
             existing = conversation.context or {}
             existing.update(context)
             conversation.context = existing
-            conversation.updated_at = datetime.utcnow()
-        
-        await self._save_conversation(conversation)
-        self._cache[session_id] = conversation
-    
+            conversation.updated_at = now
+            # The new context record supersedes the previous one
+            self._stale_records[session_id] = self._stale_records.get(session_id, 0) + 1
+
+        self._cache_put(session_id, conversation)
+        await self._append_records(
+            session_id,
+            [{'type': 'context', 'context': conversation.context, 'updated_at': now.isoformat()}],
+            created_at=conversation.created_at
+        )
+
+        if self._stale_records.get(session_id, 0) >= self._compact_threshold:
+            await self.compact(session_id)
+
     async def summarize_context(
         self,
         session_id: str,
@@ -180,26 +273,26 @@ class ContextManager:
     ) -> str:
         """
         Summarize conversation context for long conversations
-        
+
         Args:
             session_id: Session identifier
             max_messages: Maximum messages before summarization
-            
+
         Returns:
             Summary string
         """
         conversation = await self._load_conversation(session_id)
-        
+
         if not conversation or len(conversation.messages) <= max_messages:
             return ""
-        
+
         # Simple summarization: count messages, extract key topics
         total_messages = len(conversation.messages)
         user_messages = [m for m in conversation.messages if m.role == 'user']
-        
+
         summary = f"Previous conversation had {total_messages} messages. "
         summary += f"User asked {len(user_messages)} questions. "
-        
+
         # Extract key topics from recent messages
         recent = conversation.messages[-10:]
         topics = set()
@@ -215,91 +308,264 @@ class ContextManager:
                     topics.add('comparison')
                 if 'recommend' in content_lower:
                     topics.add('recommendations')
-        
+
         if topics:
             summary += f"Recent topics: {', '.join(topics)}."
-        
+
         return summary
-    
+
     async def clear_conversation(self, session_id: str):
         """
         Clear conversation history for session
-        
+
         Args:
             session_id: Session identifier
         """
-        file_path = self._get_file_path(session_id)
-        if file_path.exists():
-            file_path.unlink()
-        
+        def _unlink():
+            with self._io_lock:
+                for file_path in (self._get_file_path(session_id), self._get_legacy_file_path(session_id)):
+                    if file_path.exists():
+                        file_path.unlink()
+
+        await asyncio.to_thread(_unlink)
+
         # Remove from cache
-        if session_id in self._cache:
+        self._cache.pop(session_id, None)
+        self._stale_records.pop(session_id, None)
+
+    async def compact(self, session_id: str):
+        """
+        Rewrite a session file without superseded records
+
+        The file is replaced atomically (write to temp file + rename).
+
+        Args:
+            session_id: Session identifier
+        """
+        conversation = await self._load_conversation(session_id)
+        if not conversation:
+            return
+
+        try:
+            await asyncio.to_thread(self._write_compacted, conversation)
+            self._stale_records[session_id] = 0
+        except Exception as e:
+            print(f"[ContextManager] Error compacting conversation {session_id}: {e}")
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """In-memory conversation cache statistics"""
+        return {
+            "sessions": len(self._cache),
+            "max_sessions": self._cache_size,
+            **self._cache_stats
+        }
+
+    # ============================
+    # IN-MEMORY CACHE
+    # ============================
+
+    def _cache_get(self, session_id: str, count: bool = True) -> Optional[Conversation]:
+        """Return a cached conversation (refreshing its LRU position) or None"""
+        entry = self._cache.get(session_id)
+        now = time.monotonic()
+        if entry is not None and now - entry[1] > self._cache_ttl.total_seconds():
             del self._cache[session_id]
-    
+            entry = None
+        if entry is None:
+            if count:
+                self._cache_stats["misses"] += 1
+            return None
+
+        self._cache[session_id] = (entry[0], now)
+        self._cache.move_to_end(session_id)
+        if count:
+            self._cache_stats["hits"] += 1
+        return entry[0]
+
+    def _cache_put(self, session_id: str, conversation: Conversation):
+        self._cache[session_id] = (conversation, time.monotonic())
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+            self._cache_stats["evictions"] += 1
+
+    # ============================
+    # FILE STORAGE
+    # ============================
+
     async def _load_conversation(self, session_id: str) -> Optional[Conversation]:
         """Load conversation from storage"""
         # Check cache first
-        if session_id in self._cache:
-            return self._cache[session_id]
-        
-        # Load from file
-        file_path = self._get_file_path(session_id)
-        if not file_path.exists():
-            return None
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convert to Conversation object
-            messages = []
-            for msg_data in data.get('messages', []):
-                messages.append(Message(
-                    role=msg_data['role'],
-                    content=msg_data['content'],
-                    timestamp=datetime.fromisoformat(msg_data['timestamp']),
-                    metadata=msg_data.get('metadata')
-                ))
-            
-            conversation = Conversation(
-                session_id=data['session_id'],
-                created_at=datetime.fromisoformat(data['created_at']),
-                updated_at=datetime.fromisoformat(data['updated_at']),
-                messages=messages,
-                context=data.get('context')
-            )
-            
-            # Cache it
-            self._cache[session_id] = conversation
-            
+        conversation = self._cache_get(session_id)
+        if conversation is not None:
             return conversation
+
+        try:
+            loaded = await asyncio.to_thread(self._read_conversation, session_id)
         except Exception as e:
             print(f"[ContextManager] Error loading conversation {session_id}: {e}")
             return None
-    
-    async def _save_conversation(self, conversation: Conversation):
-        """Save conversation to storage"""
+
+        if loaded is None:
+            return None
+
+        conversation, stale = loaded
+        self._stale_records[session_id] = stale
+
+        # Cache it
+        self._cache_put(session_id, conversation)
+
+        return conversation
+
+    def _read_conversation(self, session_id: str) -> Optional[Tuple[Conversation, int]]:
+        """Parse a full session file (worker thread); migrates legacy JSON files"""
+        file_path = self._get_file_path(session_id)
+        legacy_path = self._get_legacy_file_path(session_id)
+
+        if not file_path.exists():
+            if not legacy_path.exists():
+                return None
+            return self._migrate_legacy(session_id, legacy_path), 0
+
+        header: Dict[str, Any] = {}
+        messages: List[Message] = []
+        context = None
+        updated_at = None
+        stale = 0
+
+        with open(file_path, 'rb') as f:
+            for line in f:
+                record = _decode_line(line)
+                if record is None:
+                    if line.strip():
+                        stale += 1  # Torn write
+                    continue
+                kind = record.get('type')
+                if kind == 'message':
+                    message = _record_to_message(record)
+                    messages.append(message)
+                    updated_at = message.timestamp
+                elif kind == 'context':
+                    if context is not None or header.get('context') is not None:
+                        stale += 1
+                    context = record.get('context')
+                    updated_at = datetime.fromisoformat(record['updated_at'])
+                elif kind == 'header':
+                    header = record
+
+        created_at = datetime.fromisoformat(header['created_at']) if header.get('created_at') else (
+            messages[0].timestamp if messages else datetime.utcnow()
+        )
+        conversation = Conversation(
+            session_id=header.get('session_id', session_id),
+            created_at=created_at,
+            updated_at=updated_at or created_at,
+            messages=messages,
+            context=context if context is not None else header.get('context')
+        )
+        return conversation, stale
+
+    def _read_tail_messages(self, file_path: Path, limit: int) -> List[Message]:
+        """Read the last `limit` messages by scanning the file backwards (worker thread)"""
+        found: List[Message] = []
+        with open(file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            partial = b""
+            while len(found) < limit:
+                if position == 0:
+                    lines, partial = [partial], b""
+                else:
+                    read_size = min(TAIL_READ_BLOCK_SIZE, position)
+                    position -= read_size
+                    f.seek(position)
+                    lines = (f.read(read_size) + partial).split(b"\n")
+                    # First piece may start mid-line; keep it for the next block
+                    partial = lines.pop(0)
+                for line in reversed(lines):
+                    record = _decode_line(line)
+                    if record is not None and record.get('type') == 'message':
+                        found.append(_record_to_message(record))
+                        if len(found) >= limit:
+                            break
+                if position == 0 and not partial:
+                    break
+        found.reverse()
+        return found
+
+    async def _append_records(
+        self,
+        session_id: str,
+        records: List[Dict[str, Any]],
+        created_at: datetime,
+        on_written: Optional[Callable[[], None]] = None
+    ):
+        """
+        Append records to the session file, writing a header first for new files
+
+        Args:
+            on_written: Called after the write while the I/O lock is still held
+        """
+        file_path = self._get_file_path(session_id)
+
+        def _append():
+            with self._io_lock:
+                with open(file_path, 'a+b') as f:
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() == 0:
+                        f.write(_encode_record({
+                            'type': 'header',
+                            'session_id': session_id,
+                            'created_at': created_at.isoformat(),
+                            'context': None
+                        }))
+                    else:
+                        # Terminate a torn last line so the new record stays parseable
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            f.write(b"\n")
+                    f.write(b"".join(_encode_record(r) for r in records))
+                if on_written is not None:
+                    on_written()
+
+        try:
+            await asyncio.to_thread(_append)
+        except Exception as e:
+            print(f"[ContextManager] Error saving conversation {session_id}: {e}")
+
+    def _write_compacted(self, conversation: Conversation):
+        """Atomically rewrite a session file as header + messages (worker thread)"""
         file_path = self._get_file_path(conversation.session_id)
-        
-        # Convert to dict
-        data = {
+        tmp_path = file_path.with_suffix(".jsonl.tmp")
+        header = {
+            'type': 'header',
             'session_id': conversation.session_id,
             'created_at': conversation.created_at.isoformat(),
-            'updated_at': conversation.updated_at.isoformat(),
-            'messages': [
-                {
-                    'role': msg.role,
-                    'content': msg.content,
-                    'timestamp': msg.timestamp.isoformat(),
-                    'metadata': msg.metadata
-                }
-                for msg in conversation.messages
-            ],
             'context': conversation.context
         }
-        
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"[ContextManager] Error saving conversation {conversation.session_id}: {e}")
+
+        with self._io_lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(_encode_record(header))
+                for message in conversation.messages:
+                    f.write(_encode_record(_message_to_record(message)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, file_path)
+
+    def _migrate_legacy(self, session_id: str, legacy_path: Path) -> Conversation:
+        """Convert a pre-JSONL conversation file (worker thread)"""
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        conversation = Conversation(
+            session_id=data['session_id'],
+            created_at=datetime.fromisoformat(data['created_at']),
+            updated_at=datetime.fromisoformat(data['updated_at']),
+            messages=[_record_to_message(m) for m in data.get('messages', [])],
+            context=data.get('context')
+        )
+
+        self._write_compacted(conversation)
+        legacy_path.unlink()
+        return conversation
@@ -8,11 +8,13 @@ Provides professional Excel exports with:
 - Formatted recommendations table
 - Priority color coding
 - Charts (optional)
+- Multi-sheet workbooks for batches of assessments
 """
 
+import re
 from io import BytesIO
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 # Try to import openpyxl
 try:
@@ -94,6 +96,98 @@ class RecommendationExporter:
         ws = wb.active
         ws.title = "AI Recommendations"
         
+        self._fill_sheet(ws, recommendations, risk_data, include_charts, company_name)
+        
+        # Save to BytesIO
+        excel_file = BytesIO()
+        wb.save(excel_file)
+        excel_file.seek(0)
+        
+        return excel_file
+    
+    def export_assessment_workbook(
+        self,
+        assessments: List[Tuple[str, Dict[str, Any]]],
+        company_name: str = "RISKCAST",
+        on_sheet: Optional[Callable[[str, Optional[Exception]], None]] = None
+    ) -> BytesIO:
+        """
+        Create one workbook covering many assessments.
+        
+        The first sheet lists every assessment; each assessment then gets
+        its own sheet with the risk summary and recommendations. Header
+        styles are shared across all sheets.
+        
+        Args:
+            assessments: (assessment_id, report_data) pairs; report_data uses
+                         the PDF report layout (risk_score, risk_level,
+                         confidence, recommendations as strings, route)
+            company_name: Company name for branding
+            on_sheet: Called with (assessment_id, error) after each sheet
+        
+        Returns:
+            BytesIO containing Excel file
+        """
+        wb = Workbook()
+        summary = wb.active
+        summary.title = "Summary"
+        
+        headers = ['Assessment', 'Route', 'Risk Score', 'Risk Level', 'Recommendations']
+        header_fill = PatternFill(start_color=self.COLORS['header'], fill_type="solid")
+        header_font = Font(bold=True, color=self.COLORS['header_text'])
+        for col, header in enumerate(headers, 1):
+            cell = summary.cell(row=1, column=col, value=header)
+            cell.fill = header_fill
+            cell.font = header_font
+        for col, width in zip('ABCDE', (24, 30, 12, 12, 16)):
+            summary.column_dimensions[col].width = width
+        
+        used_titles = {summary.title.lower()}
+        for assessment_id, report in assessments:
+            ws = None
+            try:
+                ws = wb.create_sheet(_sheet_title(assessment_id, used_titles))
+                recommendations = [
+                    {'text': text, 'priority': _infer_priority(text), 'category': _infer_category(text)}
+                    for text in report.get('recommendations', [])
+                ]
+                confidence = report.get('confidence', 0) or 0
+                risk_data = {
+                    'risk_score': round(report.get('risk_score', 0), 1),
+                    'risk_level': report.get('risk_level', 'N/A'),
+                    'confidence': round(confidence * 100 if confidence <= 1 else confidence, 1),
+                    'var_95': report.get('var_95', 0),
+                    'expected_loss': report.get('expected_loss', 0),
+                }
+                self._fill_sheet(ws, recommendations, risk_data, False, company_name)
+                summary.append([
+                    assessment_id, report.get('route', ''), risk_data['risk_score'],
+                    str(risk_data['risk_level']).upper(), len(recommendations)
+                ])
+            except Exception as e:
+                if ws is not None:
+                    wb.remove(ws)
+                if on_sheet:
+                    on_sheet(assessment_id, e)
+                continue
+            if on_sheet:
+                on_sheet(assessment_id, None)
+        
+        excel_file = BytesIO()
+        wb.save(excel_file)
+        excel_file.seek(0)
+        
+        return excel_file
+    
+    def _fill_sheet(
+        self,
+        ws,
+        recommendations: List[Dict[str, Any]],
+        risk_data: Dict[str, Any],
+        include_charts: bool,
+        company_name: str
+    ) -> None:
+        """Write the full recommendations layout into one worksheet."""
         # Set column widths
         column_widths = {
             'A': 12,  # Priority
@@ -124,13 +218,6 @@ class RecommendationExporter:
         # === CHARTS (optional) ===
         if include_charts:
             self._add_priority_chart(ws, recommendations)
-        
-        # Save to BytesIO
-        excel_file = BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)
-        
-        return excel_file
     
     def _add_header(self, ws, start_row: int, company_name: str) -> int:
         """Add header section with branding."""
@@ -380,6 +467,17 @@ def extract_recommendations_from_conversation(conversation: List[Dict]) -> List[
     return recommendations
 
 
+def _sheet_title(name: str, used: set) -> str:
+    """Unique Excel sheet title (max 31 chars, no []:*?/\\)."""
+    base = re.sub(r'[\[\]:*?/\\]', '_', name)[:31] or 'Sheet'
+    title, suffix = base, 1
+    while title.lower() in used:
+        suffix += 1
+        title = f"{base[:31 - len(str(suffix)) - 1]}~{suffix}"
+    used.add(title.lower())
+    return title
+
+
 def _infer_priority(text: str) -> str:
     """Infer priority from recommendation text."""
     text_lower = text.lower()
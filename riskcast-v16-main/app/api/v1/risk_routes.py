@@ -7,16 +7,19 @@ from fastapi import APIRouter, HTTPException, Request, Request
 from pydantic import BaseModel, Field, field_validator, model_validator, ValidationError
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+import asyncio
 import os
 
 from app.core.services.risk_service import run_risk_engine_v14
+from app.core.compute_executor import run_in_compute
+from app.utils.custom_exceptions import ComputeCapacityError, ComputeTimeoutError
 from app.core.engine_v2.risk_pipeline import RiskPipeline
 from app.core.scenario_engine.simulation_engine import SimulationEngine
 from app.core.scenario_engine.delta_engine import DeltaEngine
 from app.core.scenario_engine.scenario_store import ScenarioStore
 from app.core.scenario_engine.presets import ScenarioPresets
 from app.core.engine_v2.llm_reasoner import LLMReasoner
-from fastapi.responses import Response, StreamingResponse  # type: ignore
+from fastapi.responses import FileResponse, Response, StreamingResponse  # type: ignore
 
 router = APIRouter()
 
@@ -225,9 +228,12 @@ async def analyze_risk(shipment: ShipmentModel, request: Request):
     
     try:
         shipment_dict = shipment.model_dump()
-        result = run_risk_engine_v14(shipment_dict)
+        # CPU-bound engine call runs on the compute executor, not the event loop
+        result = await run_in_compute(run_risk_engine_v14, shipment_dict)
         # Use standard response envelope
         return ok(data={"result": result}, request=request)
+    except (ComputeCapacityError, ComputeTimeoutError):
+        raise
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -561,8 +567,20 @@ async def analyze_risk_v2(request: Request):
         # Initialize pipeline
         pipeline = RiskPipeline()
         
-        # Run analysis with language support
-        result = await pipeline.run(shipment_dict, language=language)
+        # Run analysis with language support. Identical concurrent requests
+        # (e.g. dashboard + results page) share one pipeline run. The key
+        # hashes the full payload: the pipeline also reads pol/pod/etd/carrier,
+        # which the v16 result-cache key does not include.
+        import hashlib
+        import json
+        from app.core.utils.cache import single_flight_async
+        payload_hash = hashlib.md5(
+            json.dumps(shipment_dict, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+        flight_key = f"riskcast:v2:{payload_hash}:{language}"
+        result = await single_flight_async(
+            flight_key, lambda: pipeline.run(shipment_dict, language=language)
+        )
         
         # ============================================================
         # ENGINE-FIRST ARCHITECTURE: Store result in shared backend state
@@ -573,7 +591,7 @@ async def analyze_risk_v2(request: Request):
         # ============================================================
         try:
             # Import the setter function from engine_state module
-            from app.core.engine_state import set_last_result_v2
+            from app.core.engine_state import set_last_result_v2_async
             
             # Build complete result payload for ResultsOS
             # Include shipment data for UI mapping
@@ -934,8 +952,9 @@ async def analyze_risk_v2(request: Request):
                 ]
             }
             
-            # Store in shared backend state (authoritative source)
-            set_last_result_v2(complete_result)
+            # Store in shared backend state (authoritative source).
+            # Async path: pooled async MySQL session, never blocks the loop.
+            await set_last_result_v2_async(complete_result)
             
         except ImportError:
             # Fallback: If main.py import fails, log warning but continue
@@ -965,6 +984,8 @@ async def analyze_risk_v2(request: Request):
             status_code=422,
             request=request
         )
+    except (ComputeCapacityError, ComputeTimeoutError):
+        raise
     except Exception as e:
         from app.utils.standard_responses import fail
         import logging
@@ -2089,13 +2110,12 @@ async def generate_pdf_report(request: PDFReportRequest):
     """
     try:
         try:
-            from app.core.report.pdf_builder import PDFReportBuilder  # type: ignore
+            from app.core.report.pdf_builder import (  # type: ignore
+                cache_report, get_cached_report, iter_pdf_chunks, render_pdf_report, report_cache_key
+            )
         except ImportError as ie:
             raise HTTPException(status_code=500, detail="PDF generation unavailable: missing reportlab dependency") from ie
 
-        # Initialize PDF builder
-        pdf_builder = PDFReportBuilder()
-        
         # Prepare report data
         report_data = {
             "risk_score": request.risk_score,
@@ -2113,19 +2133,109 @@ async def generate_pdf_report(request: PDFReportRequest):
             "route": request.route or "Unknown Route",
         }
         
-        # Generate PDF
-        pdf_buffer = pdf_builder.generate_report(report_data)
+        # Reuse an identical report; otherwise render on the compute executor
+        cache_key = report_cache_key(report_data)
+        pdf_bytes = get_cached_report(cache_key)
+        if pdf_bytes is None:
+            pdf_bytes = await run_in_compute(render_pdf_report, report_data)
+            cache_report(cache_key, pdf_bytes)
         
-        # Create response
+        # Stream the PDF in chunks
         return StreamingResponse(
-            pdf_buffer,
+            iter_pdf_chunks(pdf_bytes),
             media_type="application/pdf",
             headers={
                 "Content-Disposition": "attachment; filename=riskcast_report.pdf",
-                "Content-Type": "application/pdf"
+                "Content-Type": "application/pdf",
+                "Content-Length": str(len(pdf_bytes)),
+                "ETag": f'"{cache_key}"',
             }
         )
         
+    except (ComputeCapacityError, ComputeTimeoutError):
+        raise
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
 
+
+class ReportBatchRequest(BaseModel):
+    """Request model for batch report rendering"""
+    assessment_ids: List[str] = Field(..., min_length=1)
+    format: str = "pdf"  # pdf (zip archive) | xlsx (multi-sheet workbook)
+
+
+def _get_report_batch_service():
+    try:
+        from app.core.report.batch import get_report_batch_service  # type: ignore
+    except ImportError as ie:
+        raise HTTPException(status_code=500, detail="Batch reports unavailable: missing reportlab dependency") from ie
+    return get_report_batch_service()
+
+
+@router.post("/risk/v2/report/batch", status_code=202)
+async def create_report_batch(request: ReportBatchRequest):
+    """
+    Start a batch rendering job for many assessments
+    
+    Input:
+    - assessment_ids: Audit trail IDs of the assessments
+    - format: "pdf" (zip of PDFs) or "xlsx" (one workbook, sheet per assessment)
+    
+    Returns:
+    - Job status; poll GET /risk/v2/report/batch/{job_id} for progress
+    """
+    try:
+        from app.core.report.batch import REPORT_FORMATS, load_assessment_reports  # type: ignore
+        
+        service = _get_report_batch_service()
+        if request.format not in REPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {list(REPORT_FORMATS)}")
+        
+        # One audit-store lookup per ID; keep it off the event loop
+        reports = await asyncio.to_thread(load_assessment_reports, list(dict.fromkeys(request.assessment_ids)))
+        missing = [assessment_id for assessment_id, data in reports.items() if data is None]
+        if missing:
+            raise HTTPException(status_code=404, detail={"message": "Assessments not found", "assessment_ids": missing})
+        
+        job = service.submit(reports, fmt=request.format)
+        return {
+            "status": "accepted",
+            "job": job.to_dict()
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start batch report job: {str(e)}")
+
+
+@router.get("/risk/v2/report/batch/{job_id}")
+async def get_report_batch(job_id: str):
+    """Poll a batch rendering job's progress"""
+    job = _get_report_batch_service().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch job '{job_id}' not found")
+    
+    return {
+        "status": "success",
+        "job": job.to_dict()
+    }
+
+
+@router.get("/risk/v2/report/batch/{job_id}/download")
+async def download_report_batch(job_id: str):
+    """Download a finished batch (zip archive or workbook)"""
+    job = _get_report_batch_service().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch job '{job_id}' not found")
+    if not job.done or not job.output_path:
+        raise HTTPException(status_code=409, detail=f"Batch job '{job_id}' is {job.status}")
+    
+    media_type = (
+        "application/zip" if job.format == "pdf"
+        else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    return FileResponse(job.output_path, media_type=media_type, filename=f"riskcast_reports_{job_id}{os.path.splitext(job.output_path)[1]}")
@@ -7,7 +7,7 @@ Enables backend-first state management with localStorage as cache.
 ARCHITECTURE:
 - GET /api/v1/state/{shipment_id} - Get state from backend
 - PUT /api/v1/state/{shipment_id} - Save state to backend
-- GET /api/v1/state - List recent shipments
+- GET /api/v1/state - List recent shipments (paginated via limit/offset)
 """
 import os
 from fastapi import APIRouter, HTTPException, Request
@@ -19,6 +19,7 @@ from app.core.state_storage import (
     save_state,
     load_state,
     list_shipments,
+    count_shipments,
     generate_shipment_id
 )
 from app.utils.standard_responses import ok, fail
@@ -195,21 +196,27 @@ async def create_state(state_request: StateRequest, request: Request):
 
 
 @router.get("/state")
-async def list_shipments_endpoint(request: Request, limit: int = 100):
+async def list_shipments_endpoint(request: Request, limit: int = 100, offset: int = 0):
     """
     List recent shipments
     
     Args:
         limit: Maximum number of shipments to return (default: 100)
+        offset: Number of shipments to skip (default: 0)
         
     Returns:
         List of shipment metadata
     """
     try:
-        shipments = list_shipments(limit=limit)
+        shipments = list_shipments(limit=limit, offset=offset)
         
         return ok(
-            data={"shipments": shipments, "count": len(shipments)},
+            data={
+                "shipments": shipments,
+                "count": len(shipments),
+                "total": count_shipments(),
+                "offset": offset
+            },
             request=request
         )
         
@@ -8,6 +8,7 @@ Routes included:
 - /api/v2/api-keys - API Key management
 - /api/v2/enterprise - Enterprise features
 - /api/v2/market - Market data
+- /api/v2/insurance/parametric/pricing-sweep - Parametric trigger pricing
 """
 
 from fastapi import APIRouter
@@ -38,9 +39,11 @@ except ImportError as e:
 
 try:
     from app.api.v2.insurance_routes import router as insurance_router
+    from app.api.v2.insurance_routes import pricing_router as insurance_pricing_router
 except ImportError as e:
     print(f"[API v2] Warning: Could not import insurance router: {e}")
     insurance_router = None
+    insurance_pricing_router = None
 
 try:
     from app.api.v2.webhooks.insurance_webhooks import router as insurance_webhooks_router
@@ -68,8 +71,9 @@ def get_v2_router() -> APIRouter:
     if market_router:
         combined.include_router(market_router)
     
-    if insurance_router:
-        combined.include_router(insurance_router)
+    # Only the stateless pricing endpoints; insurance_router has no auth yet
+    if insurance_pricing_router:
+        combined.include_router(insurance_pricing_router)
     
     if insurance_webhooks_router:
         combined.include_router(insurance_webhooks_router)
@@ -78,4 +82,5 @@ def get_v2_router() -> APIRouter:
 
 
 # Export routers
-__all__ = ['router', 'get_v2_router', 'api_keys_router', 'enterprise_router', 'market_router', 'insurance_router']
+__all__ = ['router', 'get_v2_router', 'api_keys_router', 'enterprise_router', 'market_router', 'insurance_router',
+           'insurance_pricing_router']
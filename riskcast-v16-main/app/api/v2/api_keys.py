@@ -10,6 +10,8 @@ from typing import List, Optional
 from datetime import datetime, timedelta
 import json
 
+from app.core.security import get_usage_aggregator, invalidate_api_key
+
 router = APIRouter(prefix="/api/v2", tags=["API Keys"])
 
 
@@ -273,6 +275,7 @@ async def revoke_api_key(key_id: int, request: RevokeAPIKeyRequest = None):
             reason = request.reason if request else None
             api_key.revoke(reason)
             db.commit()
+            invalidate_api_key(api_key.key_hash)
             
             return {
                 "status": "revoked",
@@ -324,6 +327,7 @@ async def regenerate_api_key(key_id: int):
             
             db.add(new_api_key)
             db.commit()
+            invalidate_api_key(old_key.key_hash)
             db.refresh(new_api_key)
             
             return APIKeyResponse(
@@ -368,20 +372,25 @@ async def get_api_key_usage(
             if not api_key:
                 raise HTTPException(status_code=404, detail="API key not found")
             
+            # Include usage aggregated in memory but not yet flushed
+            pending_count, pending_last_used = get_usage_aggregator().get_pending(key_id)
+            total_requests = (api_key.request_count or 0) + pending_count
+            last_used_at = max(filter(None, [api_key.last_used_at, pending_last_used]), default=None)
+            
             # Calculate stats
             age_days = (datetime.utcnow() - api_key.created_at).days if api_key.created_at else 0
-            requests_per_day = api_key.request_count / max(1, age_days) if age_days > 0 else 0
+            requests_per_day = total_requests / max(1, age_days) if age_days > 0 else 0
             
             return {
                 "key_id": key_id,
                 "key_prefix": api_key.key_prefix,
                 "name": api_key.name,
                 "statistics": {
-                    "total_requests": api_key.request_count,
-                    "last_used": api_key.last_used_at.isoformat() if api_key.last_used_at else None,
+                    "total_requests": total_requests,
+                    "last_used": last_used_at.isoformat() if last_used_at else None,
                     "age_days": age_days,
                     "requests_per_day": round(requests_per_day, 2),
-                    "is_active": api_key.last_used_at is not None and (datetime.utcnow() - api_key.last_used_at).days < 7
+                    "is_active": last_used_at is not None and (datetime.utcnow() - last_used_at).days < 7
                 }
             }
         else:
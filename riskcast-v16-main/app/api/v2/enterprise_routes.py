@@ -22,9 +22,9 @@ import logging
 # Import services
 from app.services.persona_adapter import PersonaAdapter, UserPersona, adapt_for_persona
 from app.services.scenario_engine import ScenarioEngine, compare_shipment_scenarios, get_available_presets
-from app.services.fraud_detection import FraudDetector, analyze_request_for_fraud
+from app.services.fraud_detection import FraudDetector, analyze_request_for_fraud, record_assessment
 from app.services.missing_data_handler import calculate_missing_data_penalty
-from app.models.audit_trail import AuditService, log_risk_calculation
+from app.models.audit_trail import AuditEventType, AuditService, log_risk_calculation
 from app.models.provenance import track_request_provenance
 from app.models.uncertainty import UncertaintyQuantifier, add_uncertainty_to_result
 from app.core.model_versioning import (
@@ -40,6 +40,7 @@ from app.services.data_privacy import (
     get_processing_register,
     record_consent
 )
+from app.utils.custom_exceptions import ComputeCapacityError, ComputeTimeoutError
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v2", tags=["Enterprise"])
@@ -107,7 +108,11 @@ class AuditQueryRequest(BaseModel):
     end_date: Optional[datetime] = None
     user_id: Optional[str] = None
     organization_id: Optional[str] = None
+    event_type: Optional[str] = None
+    min_risk_score: Optional[float] = None
+    max_risk_score: Optional[float] = None
     limit: int = Field(default=100, le=1000)
+    cursor: Optional[str] = None
 
 
 # ========================
@@ -125,7 +130,7 @@ async def analyze_for_executive(request: PersonaRiskRequest, req: Request):
     start_time = time.time()
     
     try:
-        risk_data = await _calculate_full_risk(request.shipment.model_dump())
+        risk_data = await _calculate_full_risk(request.shipment.model_dump(), user_id=await _behavior_principal(req))
         result = PersonaAdapter.format_for_executive(risk_data)
         
         # Log to audit trail
@@ -133,6 +138,8 @@ async def analyze_for_executive(request: PersonaRiskRequest, req: Request):
         
         return result
         
+    except (ComputeCapacityError, ComputeTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Executive analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -149,13 +156,15 @@ async def analyze_for_analyst(request: PersonaRiskRequest, req: Request):
     start_time = time.time()
     
     try:
-        risk_data = await _calculate_full_risk(request.shipment.model_dump())
+        risk_data = await _calculate_full_risk(request.shipment.model_dump(), user_id=await _behavior_principal(req))
         result = PersonaAdapter.format_for_analyst(risk_data)
         
         _log_calculation(req, request.shipment.model_dump(), result, start_time)
         
         return result
         
+    except (ComputeCapacityError, ComputeTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Analyst analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -172,13 +181,15 @@ async def analyze_for_operations(request: PersonaRiskRequest, req: Request):
     start_time = time.time()
     
     try:
-        risk_data = await _calculate_full_risk(request.shipment.model_dump())
+        risk_data = await _calculate_full_risk(request.shipment.model_dump(), user_id=await _behavior_principal(req))
         result = PersonaAdapter.format_for_operations(risk_data)
         
         _log_calculation(req, request.shipment.model_dump(), result, start_time)
         
         return result
         
+    except (ComputeCapacityError, ComputeTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Operations analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -195,13 +206,15 @@ async def analyze_for_insurance(request: PersonaRiskRequest, req: Request):
     start_time = time.time()
     
     try:
-        risk_data = await _calculate_full_risk(request.shipment.model_dump())
+        risk_data = await _calculate_full_risk(request.shipment.model_dump(), user_id=await _behavior_principal(req))
         result = PersonaAdapter.format_for_insurance(risk_data)
         
         _log_calculation(req, request.shipment.model_dump(), result, start_time)
         
         return result
         
+    except (ComputeCapacityError, ComputeTimeoutError):
+        raise
     except Exception as e:
         logger.error(f"Insurance analysis failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -266,7 +279,8 @@ async def check_fraud_signals(
         result = analyze_request_for_fraud(
             shipment.model_dump(),
             user_history=user_history,
-            ip_address=req.client.host if req.client else None
+            ip_address=req.client.host if req.client else None,
+            user_id=await _behavior_principal(req)
         )
         
         return result
@@ -303,14 +317,16 @@ async def check_data_quality(shipment: ShipmentData):
 # ========================
 
 @router.get("/audit/verify")
-async def verify_audit_integrity():
+async def verify_audit_integrity(full: bool = Query(default=False)):
     """
     Verify audit trail integrity.
     
     Checks blockchain-style chain integrity to detect any tampering.
+    Incremental by default (only entries added since the last verified
+    checkpoint are rehashed); full=true rehashes the whole chain.
     """
     try:
-        result = AuditService.verify_integrity()
+        result = AuditService.verify_integrity(full=full)
         return result
         
     except Exception as e:
@@ -326,17 +342,32 @@ async def query_audit_trail(request: AuditQueryRequest):
     Returns filtered audit entries for compliance reporting.
     """
     try:
-        entries = AuditService.query_entries(
+        event_type = AuditEventType(request.event_type) if request.event_type else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unknown event_type: {request.event_type}")
+    
+    try:
+        page = AuditService.query_page(
             start_date=request.start_date,
             end_date=request.end_date,
             user_id=request.user_id,
             organization_id=request.organization_id,
-            limit=request.limit
+            event_type=event_type,
+            min_risk_score=request.min_risk_score,
+            max_risk_score=request.max_risk_score,
+            limit=request.limit,
+            cursor=request.cursor
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        entries = page["entries"]
         
         return {
             "count": len(entries),
-            "entries": [e.to_dict() for e in entries]
+            "entries": [e.to_dict() for e in entries],
+            "next_cursor": page["next_cursor"]
         }
         
     except Exception as e:
@@ -524,20 +555,60 @@ async def health_check():
 # Helper Functions
 # ========================
 
-async def _calculate_full_risk(shipment_data: Dict) -> Dict:
+async def _behavior_principal(req: Request) -> Optional[str]:
+    """
+    Authenticated identity that keys the fraud behavior index.
+    
+    Uses the JWT user (set by the auth decorators or a valid Bearer token)
+    or a valid X-API-Key. The client-supplied X-User-ID header is never
+    trusted here, so callers cannot inflate another user's fraud penalty.
+    
+    Returns:
+        Principal key, or None for unauthenticated requests (no behavioral
+        history or penalty)
+    """
+    user_id = getattr(req.state, 'user_id', None)
+    
+    if not user_id and req.headers.get('Authorization'):
+        try:
+            from app.core.utils.auth import get_token_from_header, verify_jwt
+            token = get_token_from_header(req)
+            user_id = verify_jwt(token).get('user_id') if token else None
+        except (ImportError, ValueError, HTTPException):
+            user_id = None
+    if user_id:
+        return f"user:{user_id}"
+    
+    if req.headers.get('X-API-Key'):
+        from app.core.security import verify_api_key
+        try:
+            api_key = await verify_api_key(req.headers['X-API-Key'], req)
+        except HTTPException:
+            return None
+        key_id = getattr(api_key, 'id', None)
+        if key_id is not None:
+            return f"api_key:{key_id}"
+    
+    return None
+
+
+async def _calculate_full_risk(shipment_data: Dict, user_id: Optional[str] = None) -> Dict:
     """
     Calculate full risk with all enterprise features.
+    
+    When a user_id (authenticated principal) is given, its rolling behavior
+    index feeds the fraud history checks and is updated with this assessment.
     """
-    from app.core.engine.risk_engine_v16 import calculate_enterprise_risk
+    from app.core.engine.risk_engine_v16 import calculate_enterprise_risk_async
     
-    # Base risk calculation
-    result = calculate_enterprise_risk(shipment_data)
+    # Base risk calculation (Monte Carlo runs on the compute executor)
+    result = await calculate_enterprise_risk_async(shipment_data)
     
     # Extract risk score
     risk_score = result.get('overall_risk', 5) * 10  # Convert to 0-100
     
     # Add fraud analysis
-    fraud_result = analyze_request_for_fraud(shipment_data)
+    fraud_result = analyze_request_for_fraud(shipment_data, user_id=user_id)
     
     # Add missing data penalty
     penalty_result = calculate_missing_data_penalty(shipment_data)
@@ -547,6 +618,8 @@ async def _calculate_full_risk(shipment_data: Dict) -> Dict:
     if fraud_result['fraud_score'] > 20:
         adjusted_score = min(100, adjusted_score + fraud_result['risk_penalty'])
     
+    record_assessment(user_id, adjusted_score)
+    
     # Add provenance
     provenance = track_request_provenance(shipment_data)
     
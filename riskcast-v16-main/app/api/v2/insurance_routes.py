@@ -5,11 +5,15 @@ API endpoints for insurance quote generation, transactions, and claims.
 """
 
 from fastapi import APIRouter, HTTPException, Depends, Body
+from fastapi.responses import JSONResponse
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import logging
+import math
 
-from app.services.insurance_quote_service import InsuranceQuoteService
+from app.services.insurance_quote_service import (
+    InsuranceQuoteService, SAMPLE_DWELL_DAYS, SAMPLE_RAINFALL_MM, historical_curve
+)
 from app.services.insurance_ai_advisor import InsuranceAIAdvisor
 from app.services.insurance_transaction_service import InsuranceTransactionService
 from app.services.insurance_claims_service import InsuranceClaimsService
@@ -17,18 +21,24 @@ from app.services.payment_processor import PaymentProcessor
 from app.services.kyc_aml_service import KYCAMLService
 from app.services.carriers.allianz_adapter import AllianzAdapter
 from app.services.carriers.swiss_re_adapter import SwissREAdapter
+from app.services.parametric_engine import ParametricPricingEngine
 from app.services.parametric_monitoring import get_parametric_monitor
 from app.models.insurance import (
     InsuranceQuote, Transaction, TransactionState, 
     InsuredParty, CoverageConfig, Claim, PremiumBreakdown,
     Policy, ParametricTrigger, PayoutStructure, PaymentMethod
 )
-from app.utils.response import StandardResponse
+from app.utils.standard_responses import StandardResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/insurance", tags=["Insurance V2"])
 
+# Stateless pricing endpoints that are safe to mount without auth; the full
+# router above (transactions, KYC, claims, carriers) stays unmounted until
+# its routes are behind authentication
+pricing_router = APIRouter(prefix="/insurance", tags=["Insurance V2"])
+
 # Initialize services
 payment_processor = PaymentProcessor()
 kyc_service = KYCAMLService()
@@ -41,7 +51,7 @@ kyc_service = KYCAMLService()
 @router.post("/quotes/generate")
 async def generate_insurance_quotes(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Generate insurance quotes based on risk assessment.
     
@@ -86,7 +96,7 @@ async def generate_insurance_quotes(
 @router.post("/quotes/compare")
 async def compare_insurance_quotes(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Compare multiple insurance quotes.
     
@@ -145,7 +155,7 @@ async def compare_insurance_quotes(
 @router.post("/transactions/create")
 async def create_transaction(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Create a new insurance transaction.
     
@@ -241,7 +251,7 @@ async def create_transaction(
 
 
 @router.get("/transactions/{transaction_id}")
-async def get_transaction(transaction_id: str) -> StandardResponse:
+async def get_transaction(transaction_id: str) -> JSONResponse:
     """
     Get transaction details by ID.
     """
@@ -266,7 +276,7 @@ async def get_transaction(transaction_id: str) -> StandardResponse:
 async def update_transaction_state(
     transaction_id: str,
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Update transaction state (e.g., move to payment, binding, etc.).
     
@@ -386,7 +396,7 @@ async def update_transaction_state(
 async def process_payment(
     transaction_id: str,
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Process payment for a transaction.
     
@@ -469,7 +479,7 @@ async def process_payment(
 @router.post("/kyc/verify")
 async def verify_kyc(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Perform KYC/AML verification.
     
@@ -514,7 +524,7 @@ async def verify_kyc(
 @router.post("/claims/submit")
 async def submit_claim(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Submit an insurance claim.
     
@@ -578,7 +588,7 @@ async def submit_claim(
 
 
 @router.get("/claims/{claim_number}")
-async def get_claim(claim_number: str) -> StandardResponse:
+async def get_claim(claim_number: str) -> JSONResponse:
     """
     Get claim details by claim number.
     """
@@ -610,7 +620,7 @@ async def get_claim(claim_number: str) -> StandardResponse:
 # ============================================================================
 
 @router.get("/products")
-async def list_products() -> StandardResponse:
+async def list_products() -> JSONResponse:
     """
     List available insurance products.
     """
@@ -628,7 +638,7 @@ async def list_products() -> StandardResponse:
 
 
 @router.get("/products/{product_id}")
-async def get_product(product_id: str) -> StandardResponse:
+async def get_product(product_id: str) -> JSONResponse:
     """
     Get product details by ID.
     """
@@ -655,7 +665,7 @@ async def get_product(product_id: str) -> StandardResponse:
 @router.post("/carriers/allianz/quote")
 async def get_allianz_quote(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Get quote directly from Allianz AGCS.
     
@@ -692,7 +702,7 @@ async def get_allianz_quote(
 @router.post("/carriers/swiss-re/quote")
 async def get_swiss_re_quote(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Get parametric quote from Swiss RE.
     """
@@ -724,7 +734,7 @@ async def get_swiss_re_quote(
 @router.post("/advisor/why-buy")
 async def advisor_why_buy_insurance(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     AI Advisor: Answer "Why should I buy insurance?"
     
@@ -759,7 +769,7 @@ async def advisor_why_buy_insurance(
 @router.post("/advisor/explain-product")
 async def advisor_explain_product(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     AI Advisor: Explain why a product is recommended.
     
@@ -829,7 +839,7 @@ async def advisor_explain_product(
 @router.post("/advisor/explain-pricing")
 async def advisor_explain_pricing(
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     AI Advisor: Explain how premium was calculated.
     
@@ -891,7 +901,7 @@ async def advisor_explain_pricing(
 
 
 @router.get("/advisor/educate-parametric")
-async def advisor_educate_parametric() -> StandardResponse:
+async def advisor_educate_parametric() -> JSONResponse:
     """
     AI Advisor: Educate about parametric insurance.
     """
@@ -908,6 +918,79 @@ async def advisor_educate_parametric() -> StandardResponse:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# PARAMETRIC PRICING
+# ============================================================================
+
+def _is_finite_number(value: Any) -> bool:
+    """True for real int/float values (bools, NaN and infinities excluded)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+@pricing_router.post("/parametric/pricing-sweep")
+async def parametric_pricing_sweep(
+    payload: Dict[str, Any] = Body(...)
+) -> JSONResponse:
+    """
+    Price a parametric trigger across many thresholds (trigger design).
+    
+    Request body:
+    {
+        "trigger_type": "weather" | "port_congestion",
+        "location": "CNSHA",           // Port code
+        "thresholds": [100, 125, 150], // mm or days
+        "payout_per_unit": 50.0,       // Optional
+        "maximum_days": 30             // Optional, port congestion only
+    }
+    """
+    try:
+        trigger_type = payload.get("trigger_type")
+        location = payload.get("location", "")
+        thresholds = payload.get("thresholds") or []
+        default_payout = 50.0 if trigger_type == "weather" else 1000.0
+        payout_per_unit = payload.get("payout_per_unit", default_payout)
+        maximum_days = payload.get("maximum_days", 30)
+        
+        if trigger_type not in ("weather", "port_congestion") or not thresholds:
+            raise HTTPException(
+                status_code=400,
+                detail="trigger_type (weather | port_congestion) and thresholds are required"
+            )
+        if not isinstance(thresholds, list) or not all(_is_finite_number(t) for t in thresholds):
+            raise HTTPException(status_code=400, detail="thresholds must be a list of numbers")
+        if not _is_finite_number(payout_per_unit) or not _is_finite_number(maximum_days) or maximum_days < 0:
+            raise HTTPException(
+                status_code=400,
+                detail="payout_per_unit and maximum_days must be numbers (maximum_days >= 0)"
+            )
+        
+        if trigger_type == "weather":
+            curve = historical_curve(location, "rainfall_mm", SAMPLE_RAINFALL_MM)
+            pricing = ParametricPricingEngine.rainfall_pricing_curve(curve, thresholds, payout_per_unit)
+        else:
+            curve = historical_curve(location, "dwell_days", SAMPLE_DWELL_DAYS)
+            pricing = ParametricPricingEngine.port_congestion_pricing_curve(
+                curve, thresholds, payout_per_unit, maximum_days
+            )
+        
+        return StandardResponse.success(
+            data={
+                "trigger_type": trigger_type,
+                "location": location,
+                "observations": len(curve),
+                "thresholds": thresholds,
+                **{name: values.tolist() for name, values in pricing.items()}
+            },
+            message=f"Priced {len(thresholds)} threshold(s)"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error running parametric pricing sweep: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================================================
 # PARAMETRIC MONITORING
 # ============================================================================
@@ -916,7 +999,7 @@ async def advisor_educate_parametric() -> StandardResponse:
 async def register_policy_monitoring(
     policy_number: str,
     payload: Dict[str, Any] = Body(...)
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Register a policy for parametric monitoring.
     
@@ -996,7 +1079,7 @@ async def register_policy_monitoring(
 @router.post("/policies/{policy_number}/check-trigger")
 async def check_policy_trigger(
     policy_number: str
-) -> StandardResponse:
+) -> JSONResponse:
     """
     Manually check if a policy's trigger has been met.
     """
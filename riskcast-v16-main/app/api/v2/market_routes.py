@@ -353,7 +353,12 @@ async def calculate_premium_endpoint(request: PremiumRequest):
 
 
 @router.post("/insurance/premium/portfolio", response_model=Dict[str, Any])
-async def calculate_portfolio_premium_endpoint(request: PortfolioPremiumRequest):
+async def calculate_portfolio_premium_endpoint(
+    request: PortfolioPremiumRequest,
+    include_shipments: bool = Query(True, description="Include individual shipment results"),
+    offset: int = Query(0, ge=0, description="First individual shipment to return"),
+    limit: int = Query(100, ge=1, le=1000, description="Individual shipments per page")
+):
     """
     Calculate total premium for a portfolio of shipments.
     
@@ -362,11 +367,19 @@ async def calculate_portfolio_premium_endpoint(request: PortfolioPremiumRequest)
     - Diversification benefits
     - Risk distribution analysis
     - Portfolio-level recommendations
+    
+    The whole book is priced in vectorized form; individual shipment
+    results are paginated (individual_shipments_page.next_offset).
     """
     try:
         shipments = [s.model_dump() for s in request.shipments]
         
-        result = InsurancePremiumCalculator.calculate_portfolio_premium(shipments)
+        result = InsurancePremiumCalculator.calculate_portfolio_premium(
+            shipments,
+            include_shipments=include_shipments,
+            offset=offset,
+            limit=limit
+        )
         
         logger.info(
             f"Portfolio premium calculated: ${result.total_premium_after_discount:,.2f} "
@@ -150,18 +150,26 @@ async def handle_catastrophe_alert_webhook(
         # Get parametric monitor
         monitor = get_parametric_monitor()
         
-        # Check all active policies that might be affected
-        triggered_policies = []
-        
-        for policy_number, policy in monitor.active_policies.items():
-            if policy.trigger and policy.trigger.trigger_type == "natcat":
-                # Check if location matches
-                evaluation = await monitor.check_policy(policy_number)
-                if evaluation and evaluation.triggered:
-                    triggered_policies.append({
-                        "policy_number": policy_number,
-                        "payout_amount": evaluation.payout_amount
-                    })
+        if payload.get("forecast_track"):
+            # Match the storm track against every policy via the spatial index
+            evaluations = await monitor.evaluate_cyclone_track(payload)
+        else:
+            # Check all active policies that might be affected (one fetch per source).
+            # The alert is fresh news: fetch backed-off sources too, and keep
+            # the scheduler's cycle stats untouched
+            natcat_policies = [
+                policy_number for policy_number, policy in monitor.active_policies.items()
+                if policy.trigger and policy.trigger.trigger_type == "natcat"
+            ]
+            evaluations = await monitor.check_policies(natcat_policies, ad_hoc=True)
+        
+        triggered_policies = [
+            {
+                "policy_number": policy_number,
+                "payout_amount": evaluation.payout_amount
+            }
+            for policy_number, evaluation in evaluations.items() if evaluation.triggered
+        ]
         
         return {
             "status": "processed",
@@ -713,8 +713,9 @@ async def analyze(payload: dict):
     # Get AI response
     ai_response = await _call_claude(prompt)
     
-    # Save to memory
-    shipment_id = memory_system.save_shipment(
+    # Save to memory (MySQL: batched by the write-behind queue, off the request path)
+    save_shipment = getattr(memory_system, "save_shipment_deferred", memory_system.save_shipment)
+    shipment_id = save_shipment(
         shipment_data,
         risk_result,
         generate_summary(shipment_data, risk_result)
@@ -0,0 +1,3 @@
+"""
+RISKCAST configuration package (database engines and sessions)
+"""
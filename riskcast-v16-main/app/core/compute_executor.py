@@ -0,0 +1,436 @@
+"""
+RISKCAST Compute Executor
+
+Runs CPU-bound engine calls (Monte Carlo, v16 risk engine, scoring
+pipelines) off the asyncio event loop so one long simulation does not stall
+every other request on the worker (including /health).
+
+ARCHITECTURE:
+- Process pool (default) with warm workers: engine modules are imported once
+  per worker process at start-up, not per task
+- Thread pool fallback when the process pool cannot start, or for callables
+  that cannot be pickled (bound methods of request-scoped objects)
+- Bounded in-flight work: tasks beyond workers + COMPUTE_MAX_QUEUE are
+  rejected with ComputeCapacityError (503) instead of queueing forever
+- Per-task timeouts, clamped to the request deadline published by
+  TimeoutMiddleware; queued tasks are cancelled on timeout (ComputeTimeoutError, 504),
+  running ones keep their slot until the worker finishes them
+- Metrics: queue wait time vs compute time, exposed via get_compute_stats()
+  and Prometheus (if prometheus_client is installed)
+"""
+import asyncio
+import contextvars
+import importlib
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from app.utils.custom_exceptions import ComputeCapacityError, ComputeTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+COMPUTE_BACKEND = os.getenv("COMPUTE_BACKEND", "process").lower()  # process | thread
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+COMPUTE_MAX_QUEUE = int(os.getenv("COMPUTE_MAX_QUEUE", "32"))
+COMPUTE_TASK_TIMEOUT = float(os.getenv("COMPUTE_TASK_TIMEOUT", "120"))
+COMPUTE_MP_START_METHOD = os.getenv("COMPUTE_MP_START_METHOD", "spawn")
+COMPUTE_WARM_MODULES = [
+    m.strip() for m in os.getenv(
+        "COMPUTE_WARM_MODULES",
+        "app.core.engine.risk_engine_v16,app.core.services.risk_service,app.core.engine_v2.risk_pipeline"
+    ).split(",") if m.strip()
+]
+
+# Absolute loop-time deadline of the current request (set by TimeoutMiddleware)
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "compute_request_deadline", default=None
+)
+
+# Try to import prometheus_client, but don't fail if not available
+try:
+    from prometheus_client import Counter, Histogram, Gauge
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+if PROMETHEUS_AVAILABLE:
+    compute_queue_wait = Histogram(
+        'riskcast_compute_queue_wait_seconds',
+        'Time a compute task waited for a free worker',
+        ['backend'],
+        buckets=[0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+    )
+    compute_duration = Histogram(
+        'riskcast_compute_duration_seconds',
+        'Time a compute task spent running on a worker',
+        ['backend'],
+        buckets=[0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
+    )
+    compute_in_flight = Gauge(
+        'riskcast_compute_in_flight',
+        'Compute tasks queued or running',
+        ['backend']
+    )
+    compute_outcomes = Counter(
+        'riskcast_compute_tasks_total',
+        'Compute tasks by outcome',
+        ['backend', 'outcome']
+    )
+else:
+    compute_queue_wait = None
+    compute_duration = None
+    compute_in_flight = None
+    compute_outcomes = None
+
+
+# ============================
+# WORKER-SIDE HELPERS (must be module level to be picklable)
+# ============================
+
+def _warm_worker(modules: Tuple[str, ...]) -> None:
+    """Process pool initializer: pre-import engine modules once per worker"""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:  # pragma: no cover - best effort
+            logger.warning(f"[Compute] Failed to pre-import {module} in worker: {e}")
+
+
+def _noop() -> bool:
+    return True
+
+
+def _is_picklable(func: Callable) -> bool:
+    """True if func can be sent to a worker process (closures, lambdas and
+    bound methods of unpicklable objects cannot)"""
+    try:
+        pickle.dumps(func)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float, float]:
+    """Run func and report (result, wall-clock start, compute seconds)"""
+    started_at = time.time()
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, started_at, time.perf_counter() - t0
+
+
+# ============================
+# REQUEST DEADLINE (TimeoutMiddleware integration)
+# ============================
+
+def set_request_deadline(timeout: float) -> contextvars.Token:
+    """
+    Publish the current request's timeout to compute tasks it dispatches
+
+    Returns a token for reset_request_deadline().
+    """
+    loop = asyncio.get_running_loop()
+    return _request_deadline.set(loop.time() + timeout)
+
+
+def reset_request_deadline(token: contextvars.Token) -> None:
+    """Restore the deadline that was active before set_request_deadline()"""
+    _request_deadline.reset(token)
+
+
+def _remaining_request_time() -> Optional[float]:
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+# ============================
+# EXECUTOR
+# ============================
+
+class ComputeExecutor:
+    """
+    Bounded executor for CPU-bound engine calls
+
+    Usage:
+        result = await executor.run(calculate_something, payload, timeout=30)
+    """
+
+    def __init__(
+        self,
+        backend: str = COMPUTE_BACKEND,
+        max_workers: int = COMPUTE_WORKERS,
+        max_queue_depth: int = COMPUTE_MAX_QUEUE,
+        task_timeout: float = COMPUTE_TASK_TIMEOUT,
+        warm_modules: Optional[list] = None
+    ):
+        self.backend = backend if backend in ("process", "thread") else "process"
+        self.max_workers = max(1, max_workers)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.task_timeout = task_timeout
+        self.warm_modules = tuple(COMPUTE_WARM_MODULES if warm_modules is None else warm_modules)
+
+        self._lock = threading.Lock()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool_failed = False
+        self._in_flight = 0
+
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "process_fallbacks": 0,
+            "unpicklable_thread_calls": 0,
+        }
+        self._wait_samples: Deque[float] = deque(maxlen=1000)
+        self._compute_samples: Deque[float] = deque(maxlen=1000)
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of queued + running tasks"""
+        return self.max_workers + self.max_queue_depth
+
+    def _get_pool(self, backend: str) -> Tuple[Executor, str]:
+        with self._lock:
+            if backend == "process" and not self._process_pool_failed:
+                if self._process_pool is None:
+                    try:
+                        self._process_pool = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context(COMPUTE_MP_START_METHOD),
+                            initializer=_warm_worker,
+                            initargs=(self.warm_modules,)
+                        )
+                    except (OSError, ValueError, NotImplementedError) as e:
+                        logger.warning(f"[Compute] Process pool unavailable ({e}), falling back to threads")
+                        self._process_pool_failed = True
+                        self._stats["process_fallbacks"] += 1
+                if self._process_pool is not None:
+                    return self._process_pool, "process"
+
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="riskcast-compute"
+                )
+            return self._thread_pool, "thread"
+
+    def _select_backend(self, func: Callable, backend: Optional[str]) -> str:
+        """Requested backend, or threads for callables a process cannot receive"""
+        requested = backend or self.backend
+        if requested == "process" and not _is_picklable(func):
+            with self._lock:
+                self._stats["unpicklable_thread_calls"] += 1
+            logger.debug(f"[Compute] {getattr(func, '__qualname__', func)} is not picklable, running on a thread")
+            return "thread"
+        return requested
+
+    def _reset_broken_process_pool(self) -> None:
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+            self._stats["process_fallbacks"] += 1
+
+    def _acquire_slot(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                if compute_outcomes is not None:
+                    compute_outcomes.labels(backend=self.backend, outcome="rejected").inc()
+                raise ComputeCapacityError(in_flight=self._in_flight, capacity=self.capacity)
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+    def _release_slot(self, backend: Optional[str]) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        if compute_in_flight is not None and backend is not None:
+            compute_in_flight.labels(backend=backend).dec()
+
+    async def run(
+        self,
+        func: Callable,
+        *args: Any,
+        timeout: Optional[float] = None,
+        backend: Optional[str] = None,
+        **kwargs: Any
+    ) -> Any:
+        """
+        Run func(*args, **kwargs) on a worker and await its result
+
+        Args:
+            func: Callable; unpicklable callables (closures, bound methods of
+                request-scoped objects) run on the thread pool instead of the
+                process pool. Arguments must be picklable for the process backend
+            timeout: Per-task timeout in seconds (defaults to COMPUTE_TASK_TIMEOUT,
+                never longer than the remaining request deadline)
+            backend: Override the configured backend ("process" or "thread")
+
+        Raises:
+            ComputeCapacityError: Too many tasks queued or running
+            ComputeTimeoutError: Task did not finish within the timeout
+        """
+        effective_timeout = timeout if timeout is not None else self.task_timeout
+        remaining = _remaining_request_time()
+        if remaining is not None:
+            effective_timeout = min(effective_timeout, max(remaining, 0.0))
+
+        requested_backend = self._select_backend(func, backend)
+        self._acquire_slot()
+        used_backend = None  # Set once the slot is counted in the in-flight gauge
+        future = None
+        try:
+            pool, used_backend = self._get_pool(requested_backend)
+            if compute_in_flight is not None:
+                compute_in_flight.labels(backend=used_backend).inc()
+
+            submitted_at = time.time()
+            try:
+                future = pool.submit(_timed_call, func, args, kwargs)
+            except BrokenExecutor:
+                # A worker died; rebuild the pool once and retry
+                self._reset_broken_process_pool()
+                pool, _ = self._get_pool(requested_backend)
+                future = pool.submit(_timed_call, func, args, kwargs)
+
+            result, started_at, compute_seconds = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=effective_timeout
+            )
+        except asyncio.TimeoutError:
+            if future is not None:
+                future.cancel()  # Drops the task if it has not started yet
+            with self._lock:
+                self._stats["timed_out"] += 1
+            if compute_outcomes is not None:
+                compute_outcomes.labels(backend=used_backend or requested_backend, outcome="timeout").inc()
+            logger.warning(
+                f"[Compute] {getattr(func, '__name__', func)} exceeded {effective_timeout:.2f}s"
+            )
+            raise ComputeTimeoutError(timeout=effective_timeout)
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            if compute_outcomes is not None:
+                compute_outcomes.labels(backend=used_backend or requested_backend, outcome="error").inc()
+            raise
+        finally:
+            if future is None or future.done():
+                self._release_slot(used_backend)
+            else:
+                # Timed out while running: a worker cannot be interrupted, so
+                # the slot stays taken until the call actually finishes
+                future.add_done_callback(lambda _: self._release_slot(used_backend))
+
+        queue_wait = max(0.0, started_at - submitted_at)
+        with self._lock:
+            self._stats["completed"] += 1
+            self._wait_samples.append(queue_wait)
+            self._compute_samples.append(compute_seconds)
+        if compute_queue_wait is not None:
+            compute_queue_wait.labels(backend=used_backend).observe(queue_wait)
+            compute_duration.labels(backend=used_backend).observe(compute_seconds)
+            compute_outcomes.labels(backend=used_backend, outcome="completed").inc()
+
+        return result
+
+    def warm_up(self) -> None:
+        """Start all process workers now so the first requests don't pay for imports"""
+        pool, used_backend = self._get_pool(self.backend)
+        if used_backend != "process":
+            return
+        futures = [pool.submit(_noop) for _ in range(self.max_workers)]
+        for future in futures:
+            try:
+                future.result(timeout=60)
+            except Exception as e:
+                logger.warning(f"[Compute] Worker warm-up failed: {e}")
+                break
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop worker pools"""
+        with self._lock:
+            pools = (self._process_pool, self._thread_pool)
+            self._process_pool = None
+            self._thread_pool = None
+        # Outside the lock: finishing tasks release their slots via callbacks
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, outcomes and queue-wait vs compute-time summary"""
+        with self._lock:
+            waits = sorted(self._wait_samples)
+            computes = sorted(self._compute_samples)
+            stats = dict(self._stats)
+            in_flight = self._in_flight
+
+        def _summary(samples: list) -> Dict[str, float]:
+            if not samples:
+                return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+            return {
+                "mean": round(sum(samples) / len(samples), 4),
+                "p50": round(samples[len(samples) // 2], 4),
+                "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+                "max": round(samples[-1], 4),
+            }
+
+        return {
+            "backend": "thread" if self._process_pool_failed else self.backend,
+            "max_workers": self.max_workers,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.max_workers),
+            **stats,
+            "queue_wait_seconds": _summary(waits),
+            "compute_seconds": _summary(computes),
+        }
+
+
+# ============================
+# MODULE-LEVEL SINGLETON
+# ============================
+
+_executor: Optional[ComputeExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_compute_executor() -> ComputeExecutor:
+    """Get (or lazily create) the shared compute executor"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ComputeExecutor()
+    return _executor
+
+
+async def run_in_compute(func: Callable, *args: Any, timeout: Optional[float] = None,
+                         backend: Optional[str] = None, **kwargs: Any) -> Any:
+    """Shortcut for get_compute_executor().run(...)"""
+    return await get_compute_executor().run(func, *args, timeout=timeout, backend=backend, **kwargs)
+
+
+def get_compute_stats() -> Dict[str, Any]:
+    """Compute executor statistics (empty executor stats if never used)"""
+    return get_compute_executor().get_stats()
+
+
+def shutdown_compute_executor(wait: bool = True) -> None:
+    """Shut down the shared executor (application shutdown hook)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -3,12 +3,21 @@ RiskCast V22 - API Response Generator
 ======================================
 Complete risk assessment API with V22 modular architecture
 
+The pipeline is a dependency graph of stages over shared engine
+singletons: stages whose inputs are ready run concurrently on a worker
+pool, and stages whose output the caller did not request are skipped.
+
 Author: RiskCast AI Team
 Version: 22.0
 License: Proprietary
 """
 
-from typing import Dict
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 
 # V22 Modular imports
@@ -38,33 +47,372 @@ except ImportError:
     from ai_explanation_ultra_v22 import AIExplanationUltraV22
 
 
-def generate_risk_assessment_v22(input_data: Dict) -> Dict:
+# Worker threads shared by all V22 requests (0/1 = run stages inline)
+V22_PIPELINE_MAX_WORKERS = int(os.getenv("V22_PIPELINE_MAX_WORKERS", str(min(8, os.cpu_count() or 2))))
+
+
+# ============================================================================
+# ENGINE SINGLETONS
+# ============================================================================
+
+class _Engines:
+    """
+    Engines shared across requests.
+
+    None of them keep per-request state (Monte Carlo derives its seed from
+    the input on every call), so one instance of each is reused instead of
+    re-instantiating ten engines per request.
+    """
+
+    def __init__(self):
+        self.validator = RiskCastV21Validator()
+        self.scorer = RiskScoringEngineV21()
+        self.enhancer = EnhancedAlgorithmicFeaturesV21()
+        self.explainer = AIExplanationEngineV22()
+        self.driver_tree = RiskDriverTreeEngineV22()
+        self.esg = ESGEngineV22()
+        self.gfi = GlobalFreightIndexV22()
+        self.monte_carlo = MonteCarloEngineV22(n_runs=10000)
+        self.shock = ShockScenarioEngineV22()
+        self.ultra = AIExplanationUltraV22()
+
+
+_engines: Optional[_Engines] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_init_lock = threading.Lock()
+
+
+def get_engines() -> _Engines:
+    """Get the shared V22 engine instances"""
+    global _engines
+    if _engines is None:
+        with _init_lock:
+            if _engines is None:
+                _engines = _Engines()
+    return _engines
+
+
+def _get_executor() -> Optional[ThreadPoolExecutor]:
+    """Get the shared stage worker pool (None when stages run inline)"""
+    global _executor
+    if V22_PIPELINE_MAX_WORKERS <= 1:
+        return None
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=V22_PIPELINE_MAX_WORKERS,
+                    thread_name_prefix="v22-stage",
+                )
+    return _executor
+
+
+# ============================================================================
+# STAGE GRAPH
+# ============================================================================
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of the pipeline.
+
+    `func(context, results)` returns the stage output; `results` holds the
+    outputs of completed stages. Dependencies that were not selected for
+    this request count as satisfied and read as None.
+    """
+    name: str
+    func: Callable[[Dict[str, Any], Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+def resolve_stages(stages: Dict[str, Stage], targets: Iterable[str]) -> List[str]:
+    """
+    Select the target stages plus everything they transitively depend on
+
+    Args:
+        stages: Stage graph keyed by name
+        targets: Stage names whose output is needed
+
+    Returns:
+        Selected stage names in graph declaration order
+    """
+    selected = set()
+    pending = [t for t in targets if t in stages]
+    while pending:
+        name = pending.pop()
+        if name in selected:
+            continue
+        selected.add(name)
+        pending.extend(d for d in stages[name].depends_on if d in stages)
+    return [name for name in stages if name in selected]
+
+
+def run_stage_graph(
+    stages: Dict[str, Stage],
+    selected: List[str],
+    context: Dict[str, Any],
+    executor: Optional[ThreadPoolExecutor] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, float]]]:
+    """
+    Execute the selected stages, running independent ones concurrently
+
+    Args:
+        stages: Stage graph keyed by name
+        selected: Stage names to run (see resolve_stages)
+        context: Request inputs passed to every stage
+        executor: Worker pool; None runs the stages inline in dependency order
+
+    Returns:
+        Tuple of (results by stage name, timings by stage name). Timings hold
+        the start offset from the beginning of the run and the duration, in ms.
+
+    Raises:
+        The first exception raised by a stage; stages not yet started are
+        cancelled.
+    """
+    results: Dict[str, Any] = {}
+    timings: Dict[str, Dict[str, float]] = {}
+    run_started = time.perf_counter()
+    remaining = {
+        name: {d for d in stages[name].depends_on if d in selected}
+        for name in selected
+    }
+
+    def run(name: str) -> Any:
+        started = time.perf_counter()
+        try:
+            return stages[name].func(context, results)
+        finally:
+            finished = time.perf_counter()
+            timings[name] = {
+                'started_ms': round((started - run_started) * 1000, 2),
+                'duration_ms': round((finished - started) * 1000, 2),
+            }
+
+    def ready() -> List[str]:
+        names = [name for name, deps in remaining.items() if not deps]
+        for name in names:
+            del remaining[name]
+        return names
+
+    def complete(name: str, value: Any) -> None:
+        results[name] = value
+        for deps in remaining.values():
+            deps.discard(name)
+
+    if executor is None:
+        while remaining:
+            batch = ready()
+            if not batch:
+                raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+            for name in batch:
+                complete(name, run(name))
+        return results, timings
+
+    in_flight = {}
+    try:
+        while remaining or in_flight:
+            for name in ready():
+                in_flight[executor.submit(run, name)] = name
+            if not in_flight:
+                raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                complete(in_flight.pop(future), future.result())
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+    return results, timings
+
+
+# ============================================================================
+# V22 STAGES
+# ============================================================================
+
+def _stage_scoring(ctx: Dict, results: Dict) -> Dict:
+    """Core 16-layer risk scoring (V21)"""
+    input_data = ctx['input_data']
+    return get_engines().scorer.calculate_comprehensive_risk(
+        input_data,
+        input_data.get('modules', {})
+    )
+
+
+def _stage_enhanced(ctx: Dict, results: Dict) -> Dict:
+    """Enhanced algorithmic features: delay, routing, insurance"""
+    input_data = ctx['input_data']
+    risk_assessment = results['scoring']
+    enhancer = get_engines().enhancer
+    return {
+        'delay_prediction': enhancer.predictive_delay_model(
+            input_data.get('transport', {}),
+            risk_assessment['layer_scores']
+        ),
+        'route_alternatives': enhancer.route_optimization_suggestions(
+            input_data.get('transport', {}),
+            risk_assessment['layer_scores']
+        ),
+        'insurance_optimization': enhancer.insurance_optimization(
+            input_data.get('cargo', {}),
+            risk_assessment['layer_scores'],
+            risk_assessment['overall_score']
+        ),
+    }
+
+
+def _stage_ai_explanation(ctx: Dict, results: Dict) -> Dict:
+    """Human-readable explanations for risk scores (V22 Module #1)"""
+    risk_assessment = results['scoring']
+    return get_engines().explainer.generate_explanation(
+        risk_assessment['layer_scores'],
+        risk_assessment['category_scores'],
+        risk_assessment['overall_score'],
+        risk_assessment['risk_level']
+    )
+
+
+def _stage_driver_tree(ctx: Dict, results: Dict) -> Dict:
+    """Hierarchical risk factor tree and its summary (V22 Module #2)"""
+    driver_engine = get_engines().driver_tree
+    tree = driver_engine.build_driver_tree(results['scoring']['layer_scores'])
+    return {'tree': tree, 'summary': driver_engine.get_tree_summary(tree)}
+
+
+def _stage_esg(ctx: Dict, results: Dict) -> Dict:
+    """Environmental, Social and Governance assessment (V22 Module #3)"""
+    input_data = ctx['input_data']
+    return get_engines().esg.assess_esg(
+        input_data.get('seller', {}),
+        input_data.get('buyer', {}),
+        {
+            **input_data.get('cargo', {}),
+            **input_data.get('transport', {})  # Merge transport data for mode, priority, etc.
+        }
+    )
+
+
+def _stage_gfi(ctx: Dict, results: Dict) -> Dict:
+    """Global Freight Index for trade lane market intelligence (V22 Phase 2.5)"""
+    return get_engines().gfi.compute_index(
+        ctx['input_data'].get('transport', {}),
+        results['scoring']['layer_scores'].get('market_volatility', 40)
+    )
+
+
+def _stage_monte_carlo(ctx: Dict, results: Dict) -> Optional[Dict]:
+    """10,000-scenario probabilistic simulation (V22 Module #4, opt-in)"""
+    input_data = ctx['input_data']
+    if not input_data.get('modules', {}).get('monte_carlo'):
+        return None
+    return get_engines().monte_carlo.run_simulation(
+        input_data.get('transport', {}),
+        input_data.get('cargo', {}),
+        results['scoring']['layer_scores']
+    )
+
+
+def _stage_shock(ctx: Dict, results: Dict) -> Dict:
+    """Macro and disruption stress tests (V22 Phase 2.6)"""
+    return get_engines().shock.run_scenarios(
+        ctx['input_data'],
+        results['scoring'],
+        gfi_result=results.get('gfi'),
+        monte_carlo_result=results.get('monte_carlo')
+    )
+
+
+def _stage_ai_explanation_ultra(ctx: Dict, results: Dict) -> Dict:
+    """Multi-perspective explanation over all module outputs (V22 Phase 2.7)"""
+    driver_tree = results.get('driver_tree')
+    return get_engines().ultra.generate_explanation({
+        'input_data': ctx['input_data'],
+        'core': results['scoring'],
+        'driver_tree': driver_tree['tree'] if driver_tree else None,
+        'esg': results.get('esg'),
+        'monte_carlo': results.get('monte_carlo'),
+        'gfi': results.get('gfi'),
+        'shock': results.get('shock'),
+        'validation': ctx['validation'],
+    })
+
+
+V22_STAGES: Dict[str, Stage] = {
+    stage.name: stage for stage in (
+        Stage('scoring', _stage_scoring),
+        Stage('enhanced_features', _stage_enhanced, ('scoring',)),
+        Stage('ai_explanation', _stage_ai_explanation, ('scoring',)),
+        Stage('driver_tree', _stage_driver_tree, ('scoring',)),
+        Stage('esg', _stage_esg),
+        Stage('gfi', _stage_gfi, ('scoring',)),
+        Stage('monte_carlo', _stage_monte_carlo, ('scoring',)),
+        Stage('shock', _stage_shock, ('scoring', 'gfi', 'monte_carlo')),
+        Stage('ai_explanation_ultra', _stage_ai_explanation_ultra,
+              ('scoring', 'driver_tree', 'esg', 'monte_carlo', 'gfi', 'shock')),
+    )
+}
+
+# Optional response sections -> stage producing them. The core risk
+# assessment (scoring + GFI market adjustment) is always computed.
+V22_OUTPUT_STAGES = {
+    'operational_intelligence': 'enhanced_features',
+    'ai_explanation': 'ai_explanation',
+    'risk_driver_tree': 'driver_tree',
+    'esg_assessment': 'esg',
+    'global_freight_index': 'gfi',
+    'monte_carlo_simulation': 'monte_carlo',
+    'shock_scenarios': 'shock',
+    'ai_explanation_ultra': 'ai_explanation_ultra',
+}
+V22_CORE_STAGES = ('scoring', 'gfi')
+
+
+# ============================================================================
+# RESPONSE GENERATOR
+# ============================================================================
+
+def generate_risk_assessment_v22(input_data: Dict, outputs: Optional[Iterable[str]] = None) -> Dict:
     """
     V22 Complete API Response Generator
-    
+
     This function orchestrates all V22 modules to produce comprehensive
     risk assessment with support for modular features.
-    
+
     V22 Architecture:
     - Validator: Input validation (60+ rules)
     - Risk Scoring Engine: 16-layer risk calculation
     - Enhanced Features: Predictive analytics & optimization
-    
-    V22 Future Modules (placeholders below):
-    - AI Explanation Engine
-    - Risk Driver Tree
-    - ESG Scoring
-    - Monte Carlo Simulation
-    - Stress Testing
+    - AI Explanation, Risk Driver Tree, ESG, Global Freight Index,
+      Monte Carlo (when modules.monte_carlo is set), Shock Scenarios and
+      AI Explanation Ultra, run as a stage graph (see V22_STAGES)
+
+    Args:
+        input_data: Shipment input (transport, cargo, seller, buyer, modules)
+        outputs: Optional response sections to produce (keys of
+                 V22_OUTPUT_STAGES). None produces all of them.
+
+    Returns:
+        Response dict; metadata.pipeline holds per-stage timings
     """
-    
+    pipeline_started = time.perf_counter()
+    engines = get_engines()
+
     # ========================================================================
     # STEP 1: VALIDATION
     # ========================================================================
-    
-    validator = RiskCastV21Validator()
-    is_valid, validation_results = validator.validate_full_input(input_data)
-    
+
+    is_valid, validation_results = engines.validator.validate_full_input(input_data)
+    validation_ms = round((time.perf_counter() - pipeline_started) * 1000, 2)
+
+    validation_warnings = [
+        {
+            'field': r.field,
+            'message': r.message,
+            'suggestion': r.suggestion
+        }
+        for r in validation_results if r.severity == ValidationSeverity.WARNING
+    ]
+
     if not is_valid:
         return {
             'success': False,
@@ -79,215 +427,78 @@ def generate_risk_assessment_v22(input_data: Dict) -> Dict:
                 }
                 for r in validation_results if r.severity == ValidationSeverity.ERROR
             ],
-            'validation_warnings': [
-                {
-                    'field': r.field,
-                    'message': r.message,
-                    'suggestion': r.suggestion
-                }
-                for r in validation_results if r.severity == ValidationSeverity.WARNING
-            ]
+            'validation_warnings': validation_warnings
         }
-    
-    # ========================================================================
-    # STEP 2: CORE RISK SCORING
-    # ========================================================================
-    
-    scorer = RiskScoringEngineV21()
-    risk_assessment = scorer.calculate_comprehensive_risk(
-        input_data,
-        input_data.get('modules', {})
-    )
-    
-    # ========================================================================
-    # STEP 3: ENHANCED ALGORITHMIC FEATURES
-    # ========================================================================
-    
-    enhancer = EnhancedAlgorithmicFeaturesV21()
-    
-    delay_prediction = enhancer.predictive_delay_model(
-        input_data.get('transport', {}),
-        risk_assessment['layer_scores']
-    )
-    
-    route_alternatives = enhancer.route_optimization_suggestions(
-        input_data.get('transport', {}),
-        risk_assessment['layer_scores']
-    )
-    
-    insurance_rec = enhancer.insurance_optimization(
-        input_data.get('cargo', {}),
-        risk_assessment['layer_scores'],
-        risk_assessment['overall_score']
-    )
-    
-    # ========================================================================
-    # STEP 4: AI EXPLANATION ENGINE (V22 Module #1 - ACTIVE)
-    # ========================================================================
-    
-    # Generate human-readable explanations for risk scores
-    explainer = AIExplanationEngineV22()
-    ai_explanation = explainer.generate_explanation(
-        risk_assessment['layer_scores'],
-        risk_assessment['category_scores'],
-        risk_assessment['overall_score'],
-        risk_assessment['risk_level']
-    )
-    
-    # ========================================================================
-    # STEP 5: RISK DRIVER TREE ENGINE (V22 Module #2 - ACTIVE)
-    # ========================================================================
-    
-    # Build hierarchical risk factor tree showing contribution analysis
-    driver_engine = RiskDriverTreeEngineV22()
-    risk_driver_tree = driver_engine.build_driver_tree(
-        risk_assessment['layer_scores']
-    )
-    
-    # Generate tree summary statistics
-    tree_summary = driver_engine.get_tree_summary(risk_driver_tree)
-    
-    # ========================================================================
-    # STEP 6: ESG RISK ENGINE (V22 Module #3 - ACTIVE)
-    # ========================================================================
-    
-    # Assess Environmental, Social, and Governance factors
-    esg_engine = ESGEngineV22()
-    esg_assessment = esg_engine.assess_esg(
-        input_data.get('seller', {}),
-        input_data.get('buyer', {}),
-        {
-            **input_data.get('cargo', {}),
-            **input_data.get('transport', {})  # Merge transport data for mode, priority, etc.
-        }
-    )
-    
-    # ========================================================================
-    # STEP 7: GLOBAL FREIGHT INDEX (V22 Phase 2.5 - ACTIVE)
-    # ========================================================================
-    
-    # Compute Global Freight Index for trade lane market intelligence
-    gfi_engine = GlobalFreightIndexV22()
-    gfi_result = gfi_engine.compute_index(
-        input_data.get('transport', {}),
-        risk_assessment['layer_scores'].get('market_volatility', 40)
-    )
-    
+
+    validation = {
+        'is_valid': is_valid,
+        'warnings': validation_warnings
+    }
+
     # ========================================================================
-    # V22 FUTURE MODULES - INTEGRATION HOOKS
+    # STEP 2: STAGE GRAPH (scoring, then independent modules concurrently)
     # ========================================================================
-    
-    modules = input_data.get('modules', {})
-    
-    # Monte Carlo Simulation (V22 Module #4 - ACTIVE when enabled)
-    # Run 10,000-scenario probabilistic simulation
-    monte_carlo_results = None
-    if modules.get('monte_carlo'):
-        mc_engine = MonteCarloEngineV22(n_runs=10000)
-        monte_carlo_results = mc_engine.run_simulation(
-            input_data.get('transport', {}),
-            input_data.get('cargo', {}),
-            risk_assessment['layer_scores']
-        )
-    
-    # Shock Scenario Engine (V22 Phase 2.6 - ACTIVE)
-    # Run macro and disruption stress tests
-    shock_engine = ShockScenarioEngineV22()
-    shock_scenarios = shock_engine.run_scenarios(
-        input_data,
-        risk_assessment,
-        gfi_result=gfi_result,
-        monte_carlo_result=monte_carlo_results
+
+    outputs = None if outputs is None else set(outputs)
+    requested = V22_OUTPUT_STAGES.keys() if outputs is None else outputs
+    targets = list(V22_CORE_STAGES) + [V22_OUTPUT_STAGES[o] for o in requested if o in V22_OUTPUT_STAGES]
+    selected = resolve_stages(V22_STAGES, targets)
+
+    results, timings = run_stage_graph(
+        V22_STAGES,
+        selected,
+        {'input_data': input_data, 'validation': validation},
+        executor=_get_executor(),
     )
-    
-    # ========================================================================
-    # STEP 8: AI EXPLANATION ULTRA LAYER (V22 Phase 2.7 - ACTIVE)
-    # ========================================================================
-    
-    # Generate comprehensive multi-perspective explanation
-    ultra_engine = AIExplanationUltraV22()
-    ai_explanation_ultra = ultra_engine.generate_explanation({
-        'input_data': input_data,
-        'core': risk_assessment,
-        'driver_tree': risk_driver_tree,
-        'esg': esg_assessment,
-        'monte_carlo': monte_carlo_results,
-        'gfi': gfi_result,
-        'shock': shock_scenarios,
-        'validation': {
-            'is_valid': is_valid,
-            'warnings': [
-                {
-                    'field': r.field,
-                    'message': r.message,
-                    'suggestion': r.suggestion
-                }
-                for r in validation_results if r.severity == ValidationSeverity.WARNING
-            ]
-        }
-    })
-    
+
+    risk_assessment = results['scoring']
+    gfi_result = results['gfi']
+
     # ========================================================================
-    # STEP 9: BUILD COMPREHENSIVE RESPONSE
+    # STEP 3: BUILD COMPREHENSIVE RESPONSE
     # ========================================================================
-    
+
     response = {
         'success': True,
         'version': 'RiskCast V22.0',
         'timestamp': datetime.now().isoformat(),
-        
-        'validation': {
-            'is_valid': is_valid,
-            'warnings': [
-                {
-                    'field': r.field,
-                    'message': r.message,
-                    'suggestion': r.suggestion
-                }
-                for r in validation_results if r.severity == ValidationSeverity.WARNING
-            ]
-        },
-        
+
+        'validation': validation,
+
         'risk_assessment': {
             'overall_score': risk_assessment['overall_score'],
             'risk_level': risk_assessment['risk_level'],
             'risk_grade': risk_assessment['risk_grade'],
-            
+
             'layer_scores': risk_assessment['layer_scores'],
             'category_scores': risk_assessment['category_scores'],
             'sub_factor_scores': risk_assessment.get('sub_factor_scores', {}),  # V22 enhancement
-            
+
             # Market risk with GFI adjustment (V22 Phase 2.5)
             'market_risk': {
                 'base_market_volatility_score': risk_assessment['layer_scores'].get('market_volatility', 40),
                 'gfi_adjusted_market_volatility_score': gfi_result['pressure']['market_risk_gfi_adjusted'],
                 'pressure_level': gfi_result['pressure']['pressure_level'],
                 'adjustment_factor': round(
-                    gfi_result['pressure']['market_risk_gfi_adjusted'] / 
-                    max(risk_assessment['layer_scores'].get('market_volatility', 40), 1), 
+                    gfi_result['pressure']['market_risk_gfi_adjusted'] /
+                    max(risk_assessment['layer_scores'].get('market_volatility', 40), 1),
                     3
                 )
             },
-            
+
             'financial_impact': risk_assessment['financial_impact'],
-            
+
             'summary': f"Risk Score: {risk_assessment['overall_score']:.1f}/100 ({risk_assessment['risk_grade']}) - "
                       f"{risk_assessment['risk_level'].upper()} risk level. "
                       f"Expected loss: ${risk_assessment['financial_impact']['expected_loss_usd']:,.0f}."
         },
-        
-        'operational_intelligence': {
-            'delay_prediction': delay_prediction,
-            'route_alternatives': route_alternatives,
-            'insurance_optimization': insurance_rec
-        },
-        
+
         'recommendations': {
             'priority_actions': risk_assessment['recommendations'][:3],
             'all_recommendations': risk_assessment['recommendations'],
             'mitigation_plan': risk_assessment['mitigation_plan']
         },
-        
+
         'executive_summary': {
             'risk_verdict': risk_assessment['risk_level'].upper(),
             'key_concerns': [
@@ -298,33 +509,53 @@ def generate_risk_assessment_v22(input_data: Dict) -> Dict:
             'action_required': 'IMMEDIATE' if risk_assessment['risk_level'] in ['high', 'critical'] else 'STANDARD'
         }
     }
-    
+
     # ========================================================================
-    # STEP 10: ADD V22 MODULES TO RESPONSE
+    # STEP 4: ADD V22 MODULES TO RESPONSE (only the stages that ran)
     # ========================================================================
-    
-    # Add AI Explanation (V22 Module #1 - Active)
-    response['ai_explanation'] = ai_explanation
-    
-    # Add Risk Driver Tree (V22 Module #2 - Active)
-    response['risk_driver_tree'] = risk_driver_tree
-    response['risk_tree_summary'] = tree_summary
-    
-    # Add ESG Assessment (V22 Module #3 - Active)
-    response['esg_assessment'] = esg_assessment
-    
-    # Add Global Freight Index (V22 Phase 2.5 - Active)
-    response['global_freight_index'] = gfi_result
-    
-    # Add Shock Scenarios (V22 Phase 2.6 - Active)
-    response['shock_scenarios'] = shock_scenarios
-    
-    # Add AI Explanation Ultra (V22 Phase 2.7 - Active)
-    response['ai_explanation_ultra'] = ai_explanation_ultra
-    
-    if monte_carlo_results:
+
+    if 'enhanced_features' in results:
+        response['operational_intelligence'] = results['enhanced_features']
+
+    # AI Explanation (V22 Module #1)
+    if 'ai_explanation' in results:
+        response['ai_explanation'] = results['ai_explanation']
+
+    # Risk Driver Tree (V22 Module #2)
+    if 'driver_tree' in results:
+        response['risk_driver_tree'] = results['driver_tree']['tree']
+        response['risk_tree_summary'] = results['driver_tree']['summary']
+
+    # ESG Assessment (V22 Module #3)
+    if 'esg' in results:
+        response['esg_assessment'] = results['esg']
+
+    # Global Freight Index (V22 Phase 2.5)
+    if outputs is None or 'global_freight_index' in outputs:
+        response['global_freight_index'] = gfi_result
+
+    # Shock Scenarios (V22 Phase 2.6)
+    if 'shock' in results:
+        response['shock_scenarios'] = results['shock']
+
+    # AI Explanation Ultra (V22 Phase 2.7)
+    if 'ai_explanation_ultra' in results:
+        response['ai_explanation_ultra'] = results['ai_explanation_ultra']
+
+    monte_carlo_results = results.get('monte_carlo')
+    if monte_carlo_results and (outputs is None or 'monte_carlo_simulation' in outputs):
         response['monte_carlo_simulation'] = monte_carlo_results
-    
+
+    response['metadata'] = {
+        'pipeline': {
+            'total_ms': round((time.perf_counter() - pipeline_started) * 1000, 2),
+            'validation_ms': validation_ms,
+            'stages': {name: timings[name] for name in selected},
+            'skipped_stages': [name for name in V22_STAGES if name not in results],
+            'workers': V22_PIPELINE_MAX_WORKERS,
+        }
+    }
+
     return response
 
 
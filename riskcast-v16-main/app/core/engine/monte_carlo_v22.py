@@ -10,18 +10,18 @@ License: Proprietary
 """
 
 import numpy as np
-import hashlib
-import json
 from typing import Dict, List, Optional
 
+from app.core.engine.rng import make_rng, seed_from_payload
+
 
 class MonteCarloEngineV22:
     """
     Monte Carlo Simulation Engine that runs 10,000 probabilistic scenarios
     to model ETA variability and financial loss distributions.
     
-    Uses numpy for all random number generation to ensure reproducibility
-    and high-performance vectorized operations.
+    Uses a per-call numpy Generator (never the global np.random state) to
+    ensure reproducibility and thread safety with vectorized operations.
     
     CRITICAL: Deterministic by default - generates seed from input data hash
     to ensure same input → same output for reproducibility.
@@ -48,8 +48,6 @@ class MonteCarloEngineV22:
         """
         self.n_runs = n_runs
         self.random_seed = random_seed
-        if random_seed is not None:
-            np.random.seed(random_seed)
     
     @staticmethod
     def _generate_deterministic_seed(input_data: Dict) -> int:
@@ -82,12 +80,8 @@ class MonteCarloEngineV22:
             'sensitivity': layer_scores.get('cargo_sensitivity', 40),
         }
         
-        # Create hash from sorted JSON
-        seed_str = json.dumps(seed_data, sort_keys=True)
-        seed_hash = int(hashlib.md5(seed_str.encode()).hexdigest(), 16)
-        
-        # Convert to 32-bit integer (numpy seed range)
-        return seed_hash % (2**31)
+        # Hash of sorted JSON, reduced to the 32-bit numpy seed range
+        return seed_from_payload(seed_data)
     
     def run_simulation(self, transport: Dict, cargo: Dict, layer_scores: Dict) -> Dict:
         """
@@ -95,7 +89,8 @@ class MonteCarloEngineV22:
         
         CRITICAL: This method is deterministic. If random_seed was not provided
         in __init__, it will generate a deterministic seed from input data to
-        ensure same input → same output.
+        ensure same input → same output. All draws come from a Generator
+        private to this call, so concurrent simulations do not interfere.
         
         Args:
             transport: Transport information (transit_time, mode, etc.)
@@ -113,11 +108,10 @@ class MonteCarloEngineV22:
                 'cargo': cargo,
                 'layer_scores': layer_scores
             }
-            deterministic_seed = self._generate_deterministic_seed(input_data)
-            np.random.seed(deterministic_seed)
-            used_seed = deterministic_seed
+            used_seed = self._generate_deterministic_seed(input_data)
         else:
             used_seed = self.random_seed
+        rng = make_rng(used_seed)
         
         # Extract base parameters
         base_transit = transport.get('transit_time', 14)
@@ -137,7 +131,7 @@ class MonteCarloEngineV22:
         
         # 1. Carrier Delay Factor (Normal distribution)
         # Higher carrier risk = more delay variance
-        carrier_delay = np.random.normal(
+        carrier_delay = rng.normal(
             loc=carrier_risk,
             scale=0.15 * carrier_risk,
             size=self.n_runs
@@ -146,7 +140,7 @@ class MonteCarloEngineV22:
         
         # 2. Port Congestion Shock (Normal distribution)
         # Multiplier around 1.0, increases with port risk
-        port_multiplier = np.random.normal(
+        port_multiplier = rng.normal(
             loc=1 + port_risk * 0.3,
             scale=0.05,
             size=self.n_runs
@@ -156,31 +150,31 @@ class MonteCarloEngineV22:
         # 3. Weather Delay (Bernoulli event + Uniform days)
         # Probability increases with weather risk
         weather_prob = 0.2 + 0.3 * weather_risk
-        weather_event = np.random.binomial(n=1, p=weather_prob, size=self.n_runs)
-        weather_delay_days = np.random.uniform(low=1, high=6, size=self.n_runs)
+        weather_event = rng.binomial(n=1, p=weather_prob, size=self.n_runs)
+        weather_delay_days = rng.uniform(low=1, high=6, size=self.n_runs)
         weather_delay_days *= weather_event  # Only apply if event occurs
         
         # 4. Documentation Delay (Bernoulli event + fixed days)
         doc_prob = 0.1 + 0.2 * doc_risk
-        doc_event = np.random.binomial(n=1, p=doc_prob, size=self.n_runs)
-        doc_delay_days = np.random.uniform(low=1, high=4, size=self.n_runs)
+        doc_event = rng.binomial(n=1, p=doc_prob, size=self.n_runs)
+        doc_delay_days = rng.uniform(low=1, high=4, size=self.n_runs)
         doc_delay_days *= doc_event  # Only apply if event occurs
         
         # 5. Market Shock (Cauchy distribution - heavy tailed)
         # Heavy-tailed distribution to model extreme market events
-        market_shock = np.random.standard_cauchy(size=self.n_runs)
+        market_shock = rng.standard_cauchy(size=self.n_runs)
         market_shock = market_shock * (0.1 + 0.2 * market_risk) + 1.0
         market_shock = np.clip(market_shock, 0.7, 1.5)  # Reasonable bounds
         
         # 6. Cargo Sensitivity Penalty (Uniform distribution)
         # Additional delay factor based on cargo fragility
-        sensitivity_factor = 1 + sensitivity * np.random.uniform(
+        sensitivity_factor = 1 + sensitivity * rng.uniform(
             low=0.05, high=0.25, size=self.n_runs
         )
         
         # 7. Base Transit Noise (Normal around 1.0)
         # Small random variation in base transit time
-        transit_noise = np.random.normal(loc=1.0, scale=0.05, size=self.n_runs)
+        transit_noise = rng.normal(loc=1.0, scale=0.05, size=self.n_runs)
         transit_noise = np.clip(transit_noise, 0.85, 1.15)
         
         # ====================================================================
@@ -225,8 +219,8 @@ class MonteCarloEngineV22:
         
         # Catastrophic tail events (2% probability)
         catastrophic_prob = 0.02
-        catastrophic_event = np.random.binomial(n=1, p=catastrophic_prob, size=self.n_runs)
-        catastrophic_multiplier = np.random.uniform(low=2.0, high=4.0, size=self.n_runs)
+        catastrophic_event = rng.binomial(n=1, p=catastrophic_prob, size=self.n_runs)
+        catastrophic_multiplier = rng.uniform(low=2.0, high=4.0, size=self.n_runs)
         catastrophic_multiplier = np.where(catastrophic_event == 1, catastrophic_multiplier, 1.0)
         loss_distribution *= catastrophic_multiplier
         
@@ -48,6 +48,7 @@ from app.core.legacy.riskcast_v14_5_climate_upgrade import (
     ESGClimateResilience,
     ClimateAIAnalysis
 )
+from app.core.engine.rng import ensure_rng, make_rng, seed_from_key
 
 warnings.filterwarnings('ignore')
 
@@ -75,6 +76,9 @@ class RiskConfig:
     
     MC_ITERATIONS_MIN = 10000
     MC_ITERATIONS_MAX = 100000
+    # Shipments per vectorized draw in calculate_risk_batch
+    # (peak memory ≈ chunk × iterations × 13 layers × 8 bytes)
+    MC_BATCH_CHUNK_SIZE = int(os.getenv("MC_BATCH_CHUNK_SIZE", "32"))
     ANTITHETIC_SAMPLING = True
     USE_SOBOL = False
     
@@ -918,7 +922,8 @@ class MonteCarloEngine:
                                    means: np.ndarray, 
                                    volatilities: np.ndarray,
                                    correlation_matrix: np.ndarray,
-                                   scenario_volatility: float = 1.0) -> np.ndarray:
+                                   scenario_volatility: float = 1.0,
+                                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
         """
         Generate correlated samples with fat-tailed distribution
         
@@ -933,10 +938,12 @@ class MonteCarloEngine:
             volatilities: Volatility for each layer
             correlation_matrix: Correlation between layers
             scenario_volatility: Scenario-driven volatility multiplier
+            rng: Random stream for this call (fresh unseeded stream if None)
         
         Returns:
             Correlated samples (iterations × n_layers)
         """
+        rng = ensure_rng(rng)
         n_vars = len(means)
         
         # Adjust volatilities by scenario
@@ -958,12 +965,14 @@ class MonteCarloEngine:
             
             # Student-t for heavy tails
             z1 = student_t.rvs(df=RiskConfig.STUDENT_T_DF, 
-                              size=(half_iterations, n_vars))
+                              size=(half_iterations, n_vars),
+                              random_state=rng)
             z2 = -z1  # Antithetic variates
             z = np.vstack([z1, z2])
         else:
             z = student_t.rvs(df=RiskConfig.STUDENT_T_DF, 
-                            size=(self.iterations, n_vars))
+                            size=(self.iterations, n_vars),
+                            random_state=rng)
         
         # Normalize Student-t to standard normal scale
         z = z / np.sqrt(RiskConfig.STUDENT_T_DF / (RiskConfig.STUDENT_T_DF - 2))
@@ -975,8 +984,8 @@ class MonteCarloEngine:
         samples = means + correlated
         
         # Add extreme event shocks (tail events)
-        shock_mask = np.random.random(self.iterations) < RiskConfig.TAIL_SHOCK_PROBABILITY
-        shock_size = np.random.gamma(2, 1.5, size=self.iterations)
+        shock_mask = rng.random(self.iterations) < RiskConfig.TAIL_SHOCK_PROBABILITY
+        shock_size = rng.gamma(2, 1.5, size=self.iterations)
         samples[shock_mask] += shock_size[shock_mask][:, np.newaxis]
         
         # Clip to valid range
@@ -984,6 +993,79 @@ class MonteCarloEngine:
         
         return samples
     
+    def generate_correlated_samples_batch(self,
+                                         means: np.ndarray,
+                                         volatilities: np.ndarray,
+                                         correlation_matrices: np.ndarray,
+                                         scenario_volatilities: np.ndarray,
+                                         rngs: Optional[List[np.random.Generator]] = None) -> np.ndarray:
+        """
+        Batched version of generate_correlated_samples for N shipments
+        
+        Same model as the single-shipment path (Student-t base draws,
+        antithetic variates, Cholesky correlation, gamma tail shocks),
+        drawn as one (N × iterations × n_layers) tensor. Each shipment
+        draws from its own stream in the same order as the single path,
+        so a seeded shipment gets the same samples in or out of a batch.
+        
+        Args:
+            means: Layer means (N × n_layers)
+            volatilities: Layer volatilities (N × n_layers)
+            correlation_matrices: Per-shipment correlation (N × n_layers × n_layers)
+            scenario_volatilities: Scenario volatility multipliers (N,)
+            rngs: One random stream per shipment (fresh streams if None)
+        
+        Returns:
+            Correlated samples (N × iterations × n_layers)
+        """
+        n_batch, n_vars = means.shape
+        if rngs is None:
+            rngs = [ensure_rng() for _ in range(n_batch)]
+        
+        # Per-shipment covariance matrices
+        std_devs = volatilities * scenario_volatilities[:, np.newaxis] * means
+        cov_matrices = std_devs[:, :, np.newaxis] * std_devs[:, np.newaxis, :] * correlation_matrices
+        
+        # Stacked Cholesky; fall back per matrix only if one of them is not PD
+        try:
+            L = np.linalg.cholesky(cov_matrices)
+        except np.linalg.LinAlgError:
+            L = np.empty_like(cov_matrices)
+            for i in range(n_batch):
+                try:
+                    L[i] = np.linalg.cholesky(cov_matrices[i])
+                except np.linalg.LinAlgError:
+                    L[i] = self._nearest_pd_cholesky(cov_matrices[i])
+        
+        # Fat-tailed base samples and tail shocks, one stream per shipment
+        half_iterations = self.iterations // 2
+        n_samples = 2 * half_iterations if RiskConfig.ANTITHETIC_SAMPLING else self.iterations
+        z = np.empty((n_batch, n_samples, n_vars))
+        shock = np.empty((n_batch, n_samples))
+        for i, rng in enumerate(rngs):
+            if RiskConfig.ANTITHETIC_SAMPLING:
+                z1 = student_t.rvs(df=RiskConfig.STUDENT_T_DF,
+                                  size=(half_iterations, n_vars),
+                                  random_state=rng)
+                z[i, :half_iterations] = z1
+                z[i, half_iterations:] = -z1
+            else:
+                z[i] = student_t.rvs(df=RiskConfig.STUDENT_T_DF,
+                                    size=(n_samples, n_vars),
+                                    random_state=rng)
+            shock_mask = rng.random(n_samples) < RiskConfig.TAIL_SHOCK_PROBABILITY
+            shock[i] = np.where(shock_mask, rng.gamma(2, 1.5, size=n_samples), 0.0)
+        
+        z = z / np.sqrt(RiskConfig.STUDENT_T_DF / (RiskConfig.STUDENT_T_DF - 2))
+        
+        # Apply correlation structure: (N, iter, k) @ (N, k, k)
+        samples = means[:, np.newaxis, :] + z @ np.transpose(L, (0, 2, 1))
+        
+        # Extreme event shocks
+        samples += shock[:, :, np.newaxis]
+        
+        return np.clip(samples, RiskConfig.RISK_MIN, RiskConfig.RISK_MAX)
+    
     @staticmethod
     def _nearest_pd_cholesky(matrix: np.ndarray) -> np.ndarray:
         """
@@ -1004,7 +1086,8 @@ class MonteCarloEngine:
                                   layers: Dict[str, RiskLayer],
                                   weights: np.ndarray,
                                   context: Dict,
-                                  climate_vars: Optional[ClimateVariables] = None) -> np.ndarray:
+                                  climate_vars: Optional[ClimateVariables] = None,
+                                  rng: Optional[np.random.Generator] = None) -> np.ndarray:
         """
         Run full Monte Carlo simulation with scenario context
         
@@ -1013,10 +1096,12 @@ class MonteCarloEngine:
             weights: Layer importance weights
             context: Scenario-driven context variables
             climate_vars: Optional climate variables for tail shocks (v14.5)
+            rng: Random stream for this call (fresh unseeded stream if None)
         
         Returns:
             Risk distribution (iterations,)
         """
+        rng = ensure_rng(rng)
         layer_list = list(layers.values())
         n_layers = len(layer_list)
         
@@ -1040,7 +1125,7 @@ class MonteCarloEngine:
         
         # Generate samples
         samples = self.generate_correlated_samples(
-            means, volatilities, correlation, scenario_vol
+            means, volatilities, correlation, scenario_vol, rng=rng
         )
         
         # Calculate weighted risk for each simulation
@@ -1053,9 +1138,10 @@ class MonteCarloEngine:
         risk_distribution += interaction_boost
         if climate_vars is not None:
             climate_shocks = ClimateMonteCarloExtension.generate_climate_tail_shocks(
-                n_samples=self.iterations,
+                n_samples=samples.shape[0],
                 climate_vars=climate_vars,
-                base_tail_prob=RiskConfig.TAIL_SHOCK_PROBABILITY
+                base_tail_prob=RiskConfig.TAIL_SHOCK_PROBABILITY,
+                rng=rng
             )
             # Scale theo mức độ ảnh hưởng khí hậu (balanced)
             risk_distribution += climate_shocks * RiskConfig.CLIMATE_TAIL_STRENGTH
@@ -1065,6 +1151,79 @@ class MonteCarloEngine:
         
         return risk_distribution
     
+    def simulate_risk_distribution_batch(self,
+                                        layers_batch: List[Dict[str, RiskLayer]],
+                                        weights_batch: np.ndarray,
+                                        contexts: List[Dict],
+                                        climate_vars_batch: Optional[List[ClimateVariables]] = None,
+                                        rngs: Optional[List[np.random.Generator]] = None) -> np.ndarray:
+        """
+        Run Monte Carlo for N shipments in a single vectorized draw
+        
+        All shipments must share the same layer names and order (the v16
+        layer builder always produces the same 13 layers).
+        
+        Args:
+            layers_batch: Risk layers per shipment
+            weights_batch: Layer weights per shipment (N × n_layers)
+            contexts: Scenario context per shipment
+            climate_vars_batch: Optional climate variables per shipment
+            rngs: One random stream per shipment (fresh streams if None)
+        
+        Returns:
+            Risk distributions (N × iterations)
+        """
+        if not layers_batch:
+            return np.empty((0, self.iterations))
+        if rngs is None:
+            rngs = [ensure_rng() for _ in layers_batch]
+        
+        layer_names_list = list(layers_batch[0].keys())
+        for layers in layers_batch[1:]:
+            if list(layers.keys()) != layer_names_list:
+                raise ValueError("All shipments in a batch must share the same risk layers")
+        
+        means = np.array([
+            [layer.calculate_dynamic_score(context) for layer in layers.values()]
+            for layers, context in zip(layers_batch, contexts)
+        ])
+        volatilities = np.array([
+            [layer.volatility for layer in layers.values()]
+            for layers in layers_batch
+        ])
+        scenario_vols = np.array([context.get('volatility_mult', 1.0) for context in contexts])
+        
+        if climate_vars_batch is not None:
+            correlations = np.stack([
+                ClimateMonteCarloExtension.build_climate_correlation_matrix(layer_names_list, cv)
+                for cv in climate_vars_batch
+            ])
+        else:
+            base = self._build_correlation_matrix(tuple(layer_names_list))
+            correlations = np.broadcast_to(base, (len(layers_batch),) + base.shape)
+        
+        samples = self.generate_correlated_samples_batch(
+            means, volatilities, correlations, scenario_vols, rngs=rngs
+        )
+        
+        # Weighted risk per shipment and simulation: (N, iter, k) · (N, k)
+        weights_batch = np.asarray(weights_batch, dtype=float)
+        risk_distributions = np.einsum('nik,nk->ni', samples, weights_batch)
+        
+        risk_distributions += self._calculate_interaction_boost_vectorized(
+            samples, layer_names_list
+        )
+        if climate_vars_batch is not None:
+            climate_shocks = ClimateMonteCarloExtension.generate_climate_tail_shocks_batch(
+                n_samples=samples.shape[1],
+                climate_vars_batch=climate_vars_batch,
+                base_tail_prob=RiskConfig.TAIL_SHOCK_PROBABILITY,
+                rngs=rngs
+            )
+            risk_distributions += climate_shocks * RiskConfig.CLIMATE_TAIL_STRENGTH
+        
+        return np.clip(risk_distributions, RiskConfig.RISK_MIN, RiskConfig.RISK_MAX)
+    
     @staticmethod
     @lru_cache(maxsize=1)
     def _build_correlation_matrix(layer_names: tuple) -> np.ndarray:
@@ -1108,10 +1267,10 @@ class MonteCarloEngine:
         """
         Calculate interaction boost for all simulations (vectorized)
         
-        Significantly faster than loop-based approach
+        Significantly faster than loop-based approach. Works on a single
+        shipment (iterations × layers) or a batch (N × iterations × layers).
         """
-        n_samples = samples.shape[0]
-        boost = np.zeros(n_samples)
+        boost = np.zeros(samples.shape[:-1])
         
         # Create layer index map
         layer_idx = {name: i for i, name in enumerate(layer_names)}
@@ -1120,19 +1279,19 @@ class MonteCarloEngine:
         if 'packaging_quality' in layer_idx and 'cargo_sensitivity' in layer_idx:
             idx_pack = layer_idx['packaging_quality']
             idx_cargo = layer_idx['cargo_sensitivity']
-            mask = (samples[:, idx_cargo] > 7) & (samples[:, idx_pack] < 4)
+            mask = (samples[..., idx_cargo] > 7) & (samples[..., idx_pack] < 4)
             boost[mask] += 0.6
         
         if 'route_complexity' in layer_idx and 'weather_exposure' in layer_idx:
             idx_route = layer_idx['route_complexity']
             idx_weather = layer_idx['weather_exposure']
-            mask = (samples[:, idx_route] > 7) & (samples[:, idx_weather] > 7)
+            mask = (samples[..., idx_route] > 7) & (samples[..., idx_weather] > 7)
             boost[mask] += 0.55
         
         if 'transport_reliability' in layer_idx and 'priority_level' in layer_idx:
             idx_trans = layer_idx['transport_reliability']
             idx_prior = layer_idx['priority_level']
-            mask = (samples[:, idx_trans] < 4) & (samples[:, idx_prior] > 7)
+            mask = (samples[..., idx_trans] < 4) & (samples[..., idx_prior] > 7)
             boost[mask] += 0.65
         
         return boost
@@ -1202,6 +1361,49 @@ class FinancialRiskCalculator:
             'distribution': usd_losses.tolist()[:1000]  # Sample for visualization
         }
     
+    @staticmethod
+    def calculate_financial_distribution_batch(risk_distributions: np.ndarray,
+                                              shipment_values: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Batched calculate_financial_distribution over N shipments
+        
+        Args:
+            risk_distributions: Risk distributions (N × iterations)
+            shipment_values: Shipment values in USD (N,)
+        """
+        loss_pct = FinancialRiskCalculator.risk_to_loss_percentage(risk_distributions)
+        usd_losses = loss_pct * np.asarray(shipment_values, dtype=float)[:, np.newaxis]
+        
+        var_95_usd = np.percentile(usd_losses, 95, axis=1)
+        var_99_usd = np.percentile(usd_losses, 99, axis=1)
+        cvar_95_usd = FinancialRiskCalculator._tail_mean_batch(usd_losses, var_95_usd)
+        cvar_99_usd = FinancialRiskCalculator._tail_mean_batch(usd_losses, var_99_usd)
+        expected = usd_losses.mean(axis=1)
+        maximum = usd_losses.max(axis=1)
+        std = usd_losses.std(axis=1)
+        
+        return [
+            {
+                'expected_loss_usd': float(expected[i]),
+                'var_95_usd': float(var_95_usd[i]),
+                'var_99_usd': float(var_99_usd[i]),
+                'cvar_95_usd': float(cvar_95_usd[i]),
+                'cvar_99_usd': float(cvar_99_usd[i]),
+                'max_loss_usd': float(maximum[i]),
+                'loss_std_usd': float(std[i]),
+                'distribution': usd_losses[i, :1000].tolist()
+            }
+            for i in range(usd_losses.shape[0])
+        ]
+    
+    @staticmethod
+    def _tail_mean_batch(distributions: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+        """Row-wise mean of values >= threshold (CVaR); falls back to the threshold"""
+        tail_mask = distributions >= thresholds[:, np.newaxis]
+        counts = tail_mask.sum(axis=1)
+        sums = np.where(tail_mask, distributions, 0.0).sum(axis=1)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), thresholds)
+    
     @staticmethod
     def calculate_var(distribution: np.ndarray, confidence: float) -> float:
         """Calculate Value at Risk"""
@@ -1239,6 +1441,51 @@ class FinancialRiskCalculator:
         }
 
 
+    @staticmethod
+    def calculate_all_metrics_batch(distributions: np.ndarray) -> List[Dict[str, float]]:
+        """Batched calculate_all_metrics over N distributions (N × iterations)"""
+        var_95 = np.percentile(distributions, RiskConfig.VAR_CONFIDENCE_95 * 100, axis=1)
+        var_99 = np.percentile(distributions, RiskConfig.VAR_CONFIDENCE_99 * 100, axis=1)
+        cvar_95 = FinancialRiskCalculator._tail_mean_batch(distributions, var_95)
+        cvar_99 = FinancialRiskCalculator._tail_mean_batch(distributions, var_99)
+        
+        # Downside deviation: std of (x - 5.0) over x > 5.0, per row
+        target = 5.0
+        downside_mask = distributions > target
+        n_down = downside_mask.sum(axis=1)
+        excess = np.where(downside_mask, distributions - target, 0.0)
+        safe_n = np.maximum(n_down, 1)
+        down_mean = excess.sum(axis=1) / safe_n
+        down_var = np.where(downside_mask, (excess - down_mean[:, np.newaxis]) ** 2, 0.0).sum(axis=1) / safe_n
+        downside_deviation = np.where(n_down > 0, np.sqrt(down_var), 0.0)
+        
+        mean = distributions.mean(axis=1)
+        std = distributions.std(axis=1)
+        skewness = stats.skew(distributions, axis=1)
+        kurtosis = stats.kurtosis(distributions, axis=1)
+        minimum = distributions.min(axis=1)
+        maximum = distributions.max(axis=1)
+        median = np.median(distributions, axis=1)
+        
+        return [
+            {
+                'var_95': float(var_95[i]),
+                'var_99': float(var_99[i]),
+                'cvar_95': float(cvar_95[i]),
+                'cvar_99': float(cvar_99[i]),
+                'downside_deviation': float(downside_deviation[i]),
+                'mean': float(mean[i]),
+                'std': float(std[i]),
+                'skewness': float(skewness[i]),
+                'kurtosis': float(kurtosis[i]),
+                'min': float(minimum[i]),
+                'max': float(maximum[i]),
+                'median': float(median[i])
+            }
+            for i in range(distributions.shape[0])
+        ]
+
+
 # ===============================================================
 # DELAY DURATION ESTIMATOR
 # ===============================================================
@@ -1285,12 +1532,21 @@ class DelayEstimator:
         probability = 1 / (1 + np.exp(-z))
         return np.clip(probability, 0.01, 0.99)
     
+    @staticmethod
+    def estimate_delay_days_vectorized(risk_scores: np.ndarray) -> np.ndarray:
+        """Array version of estimate_delay_days (same piecewise model)"""
+        risk_scores = np.asarray(risk_scores, dtype=float)
+        low = (risk_scores / RiskConfig.BASE_DELAY_THRESHOLD) * 1.5
+        excess_risk = risk_scores - RiskConfig.BASE_DELAY_THRESHOLD
+        high = RiskConfig.MAX_DELAY_DAYS * (1 - np.exp(-0.4 * excess_risk))
+        return np.where(risk_scores < RiskConfig.BASE_DELAY_THRESHOLD, low, high)
+    
     @staticmethod
     def estimate_delay_distribution(risk_distribution: np.ndarray) -> Dict[str, Any]:
         """
         Calculate delay distribution across all simulations
         """
-        delay_days = np.array([DelayEstimator.estimate_delay_days(r) for r in risk_distribution])
+        delay_days = DelayEstimator.estimate_delay_days_vectorized(risk_distribution)
         
         return {
             'mean_delay_days': float(np.mean(delay_days)),
@@ -1300,6 +1556,30 @@ class DelayEstimator:
             'max_delay_days': float(np.max(delay_days)),
             'std_delay_days': float(np.std(delay_days))
         }
+    
+    @staticmethod
+    def estimate_delay_distribution_batch(risk_distributions: np.ndarray) -> List[Dict[str, Any]]:
+        """Batched estimate_delay_distribution over N distributions (N × iterations)"""
+        delay_days = DelayEstimator.estimate_delay_days_vectorized(risk_distributions)
+        
+        mean = delay_days.mean(axis=1)
+        median = np.median(delay_days, axis=1)
+        p95 = np.percentile(delay_days, 95, axis=1)
+        p99 = np.percentile(delay_days, 99, axis=1)
+        maximum = delay_days.max(axis=1)
+        std = delay_days.std(axis=1)
+        
+        return [
+            {
+                'mean_delay_days': float(mean[i]),
+                'median_delay_days': float(median[i]),
+                'p95_delay_days': float(p95[i]),
+                'p99_delay_days': float(p99[i]),
+                'max_delay_days': float(maximum[i]),
+                'std_delay_days': float(std[i])
+            }
+            for i in range(delay_days.shape[0])
+        ]
 
 
 # ===============================================================
@@ -3297,7 +3577,7 @@ class EnterpriseRiskEngineV16:
         # Store iterations for metadata
         self.iterations_used = iterations
     
-    def calculate_risk(self, shipment_data: Dict) -> Dict[str, Any]:
+    def calculate_risk(self, shipment_data: Dict, random_seed: Optional[int] = None) -> Dict[str, Any]:
         """
         V16.0 MAIN RISK CALCULATION PIPELINE
         
@@ -3308,27 +3588,142 @@ class EnterpriseRiskEngineV16:
         4. Run Monte Carlo with climate integration
         5. Generate comprehensive insights
         6. Create executive briefing
+        
+        Monte Carlo draws come from a private stream seeded from the input
+        hash (or random_seed), so same input → same output, also when
+        several calculations run concurrently.
         """
         
         print("\n" + "="*80)
         print("🚀 RISKCAST v16.0 - ENTERPRISE RISK CALCULATION")
         print("="*80)
         
+        prepared = self._prepare_simulation_inputs(shipment_data, random_seed, verbose=True)
+        
+        # === STEP 5: RUN MONTE CARLO ======================================
+        print("[5/8] Running Monte Carlo simulation (50,000 iterations)...")
+        risk_distribution = self.mc_engine.simulate_risk_distribution(
+            prepared['layers'],
+            prepared['adjusted_weights'],
+            prepared['base_context'],
+            climate_vars=prepared['climate_vars'],
+            rng=make_rng(prepared['random_seed'])
+        )
+        
+        # === STEP 6: CALCULATE METRICS ====================================
+        print("[6/8] Calculating financial & operational metrics...")
+        risk_metrics = self.financial_calculator.calculate_all_metrics(risk_distribution)
+        
+        # Climate-VaR
+        c_var_metrics = ClimateMonteCarloExtension.calculate_climate_var(risk_distribution)
+        
+        # Financial distribution
+        financial_dist = self.financial_calculator.calculate_financial_distribution(
+            risk_distribution,
+            prepared['enhanced_data'].shipment_value
+        )
+        
+        delay_dist = self.delay_estimator.estimate_delay_distribution(risk_distribution)
+        
+        result = self._assemble_result(
+            prepared, risk_metrics, c_var_metrics, financial_dist, delay_dist, verbose=True
+        )
+        
+        print("\n✅ Risk calculation complete!")
+        print("="*80 + "\n")
+        
+        return result
+    
+    def calculate_risk_batch(self,
+                             shipments: List[Dict],
+                             chunk_size: Optional[int] = None,
+                             random_seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        V16.0 BATCHED RISK CALCULATION
+        
+        Scores N shipments with one vectorized Monte Carlo draw per chunk
+        (chunk × iterations × layers) instead of one simulation per call.
+        Layer building and narrative generation stay per shipment; the
+        simulation, VaR/CVaR, financial and delay metrics run on the
+        whole chunk at once.
+        
+        Args:
+            shipments: List of shipment payloads (same format as calculate_risk)
+            chunk_size: Shipments per vectorized draw (defaults to
+                RiskConfig.MC_BATCH_CHUNK_SIZE, bounds peak memory)
+            random_seed: Seed shared by every shipment (common random
+                numbers: perturbed copies of one shipment see identical
+                draws, so score differences reflect the inputs only).
+                None = each shipment seeded from its own input hash.
+        
+        Returns:
+            One result dict per shipment, in input order, with the same
+            structure (and the same seeded draws) as calculate_risk
+        """
+        chunk_size = max(1, chunk_size or RiskConfig.MC_BATCH_CHUNK_SIZE)
+        results: List[Dict[str, Any]] = []
+        
+        for start in range(0, len(shipments), chunk_size):
+            prepared_batch = [
+                self._prepare_simulation_inputs(shipment_data, random_seed)
+                for shipment_data in shipments[start:start + chunk_size]
+            ]
+            
+            risk_distributions = self.mc_engine.simulate_risk_distribution_batch(
+                [p['layers'] for p in prepared_batch],
+                np.stack([p['adjusted_weights'] for p in prepared_batch]),
+                [p['base_context'] for p in prepared_batch],
+                climate_vars_batch=[p['climate_vars'] for p in prepared_batch],
+                rngs=[make_rng(p['random_seed']) for p in prepared_batch]
+            )
+            
+            metrics_batch = self.financial_calculator.calculate_all_metrics_batch(risk_distributions)
+            financial_batch = self.financial_calculator.calculate_financial_distribution_batch(
+                risk_distributions,
+                np.array([p['enhanced_data'].shipment_value for p in prepared_batch])
+            )
+            delay_batch = self.delay_estimator.estimate_delay_distribution_batch(risk_distributions)
+            
+            for i, prepared in enumerate(prepared_batch):
+                c_var_metrics = ClimateMonteCarloExtension.calculate_climate_var(risk_distributions[i])
+                results.append(self._assemble_result(
+                    prepared, metrics_batch[i], c_var_metrics, financial_batch[i], delay_batch[i]
+                ))
+        
+        return results
+    
+    def _prepare_simulation_inputs(self,
+                                   shipment_data: Dict,
+                                   random_seed: Optional[int] = None,
+                                   verbose: bool = False) -> Dict[str, Any]:
+        """
+        Pipeline stages 1-4: parse input, build climate variables, risk
+        layers, priority-aware weights and the base scenario context
+        """
+        from app.core.utils.cache import generate_cache_key
+        
+        if random_seed is None:
+            random_seed = seed_from_key(generate_cache_key(shipment_data))
+        
         # === STEP 1: PARSE ENHANCED DATA ===================================
-        print("\n[1/8] Parsing enhanced shipment data...")
+        if verbose:
+            print("\n[1/8] Parsing enhanced shipment data...")
         enhanced_data = self._parse_enhanced_data(shipment_data)
         
         # === STEP 2: BUILD CLIMATE VARIABLES ==============================
-        print("[2/8] Building climate variables...")
+        if verbose:
+            print("[2/8] Building climate variables...")
         climate_vars = self._build_climate_variables(enhanced_data)
         chi = climate_vars.calculate_CHI()
         
         # === STEP 3: BUILD 13 RISK LAYERS =================================
-        print("[3/8] Building 13 enhanced risk layers...")
+        if verbose:
+            print("[3/8] Building 13 enhanced risk layers...")
         layers = self._build_risk_layers_v16(enhanced_data, climate_vars)
         
         # === STEP 4: CALCULATE PRIORITY-AWARE WEIGHTS =====================
-        print("[4/8] Calculating priority-aware weights...")
+        if verbose:
+            print("[4/8] Calculating priority-aware weights...")
         priority_profile = PriorityProfile(
             profile=enhanced_data.priority_profile,
             speed_weight=enhanced_data.priority_speed_weight,
@@ -3343,40 +3738,50 @@ class EnterpriseRiskEngineV16:
             priority_profile
         )
         
-        # === STEP 5: RUN MONTE CARLO ======================================
-        print("[5/8] Running Monte Carlo simulation (50,000 iterations)...")
         scenario_engine = ScenarioEngine()
-        
         base_context = scenario_engine.build_scenario_context(
             scenario_engine.SCENARIOS['base'],
             chi
         )
         
-        risk_distribution = self.mc_engine.simulate_risk_distribution(
-            layers, adjusted_weights, base_context, climate_vars=climate_vars
-        )
-        
-        # === STEP 6: CALCULATE METRICS ====================================
-        print("[6/8] Calculating financial & operational metrics...")
-        risk_metrics = self.financial_calculator.calculate_all_metrics(risk_distribution)
-        
-        # Climate-VaR
-        c_var_metrics = ClimateMonteCarloExtension.calculate_climate_var(risk_distribution)
-        
-        # Financial distribution
-        financial_dist = self.financial_calculator.calculate_financial_distribution(
-            risk_distribution,
-            enhanced_data.shipment_value
-        )
+        return {
+            'enhanced_data': enhanced_data,
+            'climate_vars': climate_vars,
+            'chi': chi,
+            'layers': layers,
+            'priority_profile': priority_profile,
+            'base_weights': base_weights,
+            'adjusted_weights': adjusted_weights,
+            'base_context': base_context,
+            'random_seed': random_seed
+        }
+    
+    def _assemble_result(self,
+                         prepared: Dict[str, Any],
+                         risk_metrics: Dict[str, float],
+                         c_var_metrics: Dict[str, float],
+                         financial_dist: Dict[str, Any],
+                         delay_dist: Dict[str, Any],
+                         verbose: bool = False) -> Dict[str, Any]:
+        """
+        Pipeline stages 7-8: component insights, executive briefing and
+        the final response dict, from already-simulated metrics
+        """
+        enhanced_data = prepared['enhanced_data']
+        chi = prepared['chi']
+        layers = prepared['layers']
+        priority_profile = prepared['priority_profile']
+        base_weights = prepared['base_weights']
+        adjusted_weights = prepared['adjusted_weights']
         
         # Delay estimation
         overall_risk = risk_metrics['mean']
         delay_prob = self.delay_estimator.estimate_delay_probability(overall_risk)
         delay_days = self.delay_estimator.estimate_delay_days(overall_risk)
-        delay_dist = self.delay_estimator.estimate_delay_distribution(risk_distribution)
         
         # === STEP 7: GENERATE COMPONENT INSIGHTS ===========================
-        print("[7/8] Generating component insights...")
+        if verbose:
+            print("[7/8] Generating component insights...")
         
         # Carrier analysis
         carrier_perf = CarrierPerformance(
@@ -3452,7 +3857,8 @@ class EnterpriseRiskEngineV16:
         )
         
         # === STEP 8: GENERATE EXECUTIVE BRIEFING ==========================
-        print("[8/8] Generating executive briefing & recommendations...")
+        if verbose:
+            print("[8/8] Generating executive briefing & recommendations...")
         
         ai_generator = AIAnalysisGenerator()
         
@@ -3490,9 +3896,6 @@ class EnterpriseRiskEngineV16:
             priority_profile=priority_profile
         )
         
-        print("\n✅ Risk calculation complete!")
-        print("="*80 + "\n")
-        
         # === RETURN COMPREHENSIVE RESULTS =================================
         return {
             'overall_risk': float(overall_risk),
@@ -3572,6 +3975,7 @@ class EnterpriseRiskEngineV16:
             # Metadata
             'engine_version': 'v16.0',
             'calculation_timestamp': time.time(),
+            'random_seed': prepared['random_seed'],
             'input_completeness': self._assess_input_completeness(enhanced_data)
         }
     
@@ -4278,7 +4682,7 @@ def calculate_enterprise_risk(shipment_data: Dict, buyer: Optional[Dict] = None,
         Comprehensive risk analysis with v16.0 enhancements
         Includes meta.iterations_used in result
     """
-    from app.core.utils.cache import generate_cache_key, get_cache, set_cache
+    from app.core.utils.cache import generate_cache_key, get_cache, set_cache, single_flight
     
     # Merge seller/buyer into shipment_data if provided
     if seller:
@@ -4295,14 +4699,26 @@ def calculate_enterprise_risk(shipment_data: Dict, buyer: Optional[Dict] = None,
         logger.info(f"[Cache] Cache hit for key: {cache_key[:16]}...")
         return cached_result
     
-    # Cache miss - calculate
+    # Cache miss - calculate (concurrent identical requests share one run)
+    def _compute_and_store() -> Dict:
+        result = _compute_enterprise_risk(shipment_data)
+        # Store in cache
+        set_cache(cache_key, result)
+        return result
+    
+    # Return v16.0 comprehensive results (backward compatible)
+    return single_flight(cache_key, _compute_and_store)
+
+
+def _compute_enterprise_risk(shipment_data: Dict) -> Dict:
+    """
+    Uncached v16 calculation behind calculate_enterprise_risk
+    
+    Module-level (picklable) so it can run in a compute-executor worker
+    process; caching stays in the calling process.
+    """
     # Get iterations from request or use default
-    mc_iterations = shipment_data.get('mc_iterations')
-    if mc_iterations:
-        try:
-            mc_iterations = int(mc_iterations)
-        except (ValueError, TypeError):
-            mc_iterations = None
+    mc_iterations = _parse_mc_iterations(shipment_data.get('mc_iterations'))
     
     # Initialize v16 engine with configured iterations
     engine = EnterpriseRiskEngineV16(mc_iterations=mc_iterations)
@@ -4317,13 +4733,114 @@ def calculate_enterprise_risk(shipment_data: Dict, buyer: Optional[Dict] = None,
     # Also add to root level for easy access
     result['iterations_used'] = engine.iterations_used
     
-    # Store in cache
-    set_cache(cache_key, result)
-    
-    # Return v16.0 comprehensive results (backward compatible)
     return result
 
 
+async def calculate_enterprise_risk_async(shipment_data: Dict, buyer: Optional[Dict] = None,
+                                          seller: Optional[Dict] = None,
+                                          timeout: Optional[float] = None) -> Dict:
+    """
+    V16.0: Non-blocking variant of calculate_enterprise_risk for async endpoints
+    
+    The cache lookup happens on the event loop; the Monte Carlo simulation
+    runs on the shared compute executor (process pool by default).
+    
+    Raises:
+        ComputeCapacityError: Executor saturated (HTTP 503)
+        ComputeTimeoutError: Simulation exceeded the timeout (HTTP 504)
+    """
+    from app.core.utils.cache import generate_cache_key, get_cache, set_cache, single_flight_async
+    from app.core.compute_executor import run_in_compute
+    
+    if seller:
+        shipment_data['seller'] = seller
+    if buyer:
+        shipment_data['buyer'] = buyer
+    
+    cache_key = generate_cache_key(shipment_data)
+    cached_result = get_cache(cache_key)
+    if cached_result:
+        return cached_result
+    
+    async def _compute_and_store() -> Dict:
+        result = await run_in_compute(_compute_enterprise_risk, shipment_data, timeout=timeout)
+        set_cache(cache_key, result)
+        return result
+    
+    # Concurrent identical requests await the same in-flight simulation
+    return await single_flight_async(cache_key, _compute_and_store)
+
+
+def calculate_enterprise_risk_batch(shipments: List[Dict],
+                                    mc_iterations: Optional[int] = None,
+                                    chunk_size: Optional[int] = None,
+                                    random_seed: Optional[int] = None) -> List[Dict]:
+    """
+    V16.0: Batched counterpart of calculate_enterprise_risk
+    
+    Cached shipments are served from the result cache; the remaining ones
+    are scored together through EnterpriseRiskEngineV16.calculate_risk_batch.
+    
+    Args:
+        shipments: Shipment payloads (same format as calculate_enterprise_risk)
+        mc_iterations: Monte Carlo iterations for shipments that do not set
+            their own mc_iterations
+        chunk_size: Shipments per vectorized draw
+        random_seed: Common seed for all shipments (see calculate_risk_batch).
+            Such results differ from the per-input-seeded ones, so the
+            result cache is bypassed.
+    
+    Returns:
+        One result per shipment, in input order
+    """
+    from app.core.utils.cache import generate_cache_key, get_cache, set_cache
+    
+    results: List[Optional[Dict]] = [None] * len(shipments)
+    pending: Dict[Optional[int], List[int]] = {}
+    cache_keys: List[str] = []
+    
+    for i, shipment_data in enumerate(shipments):
+        # A per-shipment mc_iterations wins over the batch default, as in
+        # calculate_enterprise_risk; the effective count is part of the key
+        iterations = _parse_mc_iterations(shipment_data.get('mc_iterations')) or mc_iterations
+        key_data = shipment_data
+        if iterations and shipment_data.get('mc_iterations') != iterations:
+            key_data = {**shipment_data, 'mc_iterations': iterations}
+        cache_key = generate_cache_key(key_data)
+        cache_keys.append(cache_key)
+        cached_result = get_cache(cache_key) if random_seed is None else None
+        if cached_result:
+            results[i] = cached_result
+        else:
+            pending.setdefault(iterations, []).append(i)
+    
+    for iterations, pending_idx in pending.items():
+        engine = EnterpriseRiskEngineV16(mc_iterations=iterations)
+        computed = engine.calculate_risk_batch(
+            [shipments[i] for i in pending_idx],
+            chunk_size=chunk_size,
+            random_seed=random_seed
+        )
+        for i, result in zip(pending_idx, computed):
+            result['advanced_metrics']['iterations_used'] = engine.iterations_used
+            result['iterations_used'] = engine.iterations_used
+            if random_seed is None:
+                set_cache(cache_keys[i], result)
+            results[i] = result
+    
+    return results
+
+
+def _parse_mc_iterations(value) -> Optional[int]:
+    """Read a request-level mc_iterations the way calculate_enterprise_risk does"""
+    if not value:
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
 # ===============================================================
 # PERFORMANCE BENCHMARKING
 # ===============================================================
@@ -188,7 +188,10 @@ class RiskScoringEngineV21:
         buyer = validated_data.get('buyer', {})
         
         # Calculate sub-factors (V22 enhancement)
-        self.sub_factor_scores = self.calculate_sub_factors(transport, cargo, seller, buyer)
+        # Kept local so a shared engine instance is safe across threads;
+        # the attribute is still set for callers that read it afterwards
+        sub_factor_scores = self.calculate_sub_factors(transport, cargo, seller, buyer)
+        self.sub_factor_scores = sub_factor_scores
         
         layer_scores = {}
         
@@ -393,7 +396,7 @@ class RiskScoringEngineV21:
             'risk_grade': self._score_to_grade(overall_score),
             'layer_scores': {k: round(v, 2) for k, v in layer_scores.items()},
             'category_scores': category_scores,
-            'sub_factor_scores': self.sub_factor_scores,  # V22 enhancement
+            'sub_factor_scores': sub_factor_scores,  # V22 enhancement
             'recommendations': recommendations,
             'mitigation_plan': mitigation_plan,
             'financial_impact': self._estimate_financial_impact(
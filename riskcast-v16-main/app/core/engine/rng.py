@@ -0,0 +1,87 @@
+"""
+RISKCAST Random Streams
+=======================
+Per-call random number streams for the Monte Carlo engines.
+
+Every simulation draws from its own ``numpy.random.Generator`` built from a
+``SeedSequence`` instead of the process-global ``np.random`` state, so
+simulations can run concurrently in threads or processes without
+interfering with each other.
+
+CRITICAL: Determinism is preserved - the root seed is derived from the
+same input hash the engines already use (same input → same seed → same
+stream → same output).
+"""
+
+import hashlib
+import json
+from typing import Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+# Seeds are kept in the historical numpy 32-bit range so that values stored
+# in results / audit metadata stay comparable with older runs.
+SEED_MODULUS = 2**31
+
+
+def seed_from_key(key: str) -> int:
+    """
+    Derive an integer seed from a string key (e.g. a cache key / input hash)
+
+    Args:
+        key: Deterministic string identifying the input
+
+    Returns:
+        Integer seed value (0-2^31-1)
+    """
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    return int(digest, 16) % SEED_MODULUS
+
+
+def seed_from_payload(payload: Any) -> int:
+    """
+    Derive an integer seed from a JSON-serialisable payload
+
+    Uses the sorted JSON representation so dict ordering does not matter.
+
+    Args:
+        payload: Input data that fully determines the simulation
+
+    Returns:
+        Integer seed value (0-2^31-1)
+    """
+    return seed_from_key(json.dumps(payload, sort_keys=True, default=str))
+
+
+def make_rng(seed: Union[int, np.random.SeedSequence],
+             spawn_key: Sequence[int] = ()) -> np.random.Generator:
+    """
+    Create an independent Generator for one simulation call
+
+    Args:
+        seed: Root seed (or an existing SeedSequence)
+        spawn_key: Optional sub-stream identifier; different keys under the
+            same seed give statistically independent streams
+
+    Returns:
+        PCG64-backed numpy Generator
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        seed_seq = seed
+    else:
+        seed_seq = np.random.SeedSequence(int(seed), spawn_key=tuple(spawn_key))
+    return np.random.Generator(np.random.PCG64(seed_seq))
+
+
+def spawn_rngs(seed: int, n: int) -> List[np.random.Generator]:
+    """
+    Create ``n`` independent child streams from one root seed
+
+    Useful for fanning one deterministic request out to several workers.
+    """
+    return [make_rng(child) for child in np.random.SeedSequence(int(seed)).spawn(n)]
+
+
+def ensure_rng(rng: Optional[np.random.Generator] = None) -> np.random.Generator:
+    """Return ``rng`` or a fresh, OS-entropy seeded Generator when None"""
+    return rng if rng is not None else np.random.default_rng()
@@ -19,7 +19,7 @@ USE_MYSQL = os.getenv("USE_MYSQL", "false").lower() == "true"
 if USE_MYSQL:
     # Use MySQL-based storage
     try:
-        from app.core.engine_state_mysql import set_last_result_v2, get_last_result_v2
+        from app.core.engine_state_mysql import set_last_result_v2, set_last_result_v2_async, get_last_result_v2
         print("[Engine State] Using MySQL storage")
     except ImportError as e:
         print(f"[Engine State] MySQL not available, falling back to in-memory: {e}")
@@ -65,3 +65,7 @@ if not USE_MYSQL:
         except Exception:
             # If anything goes wrong, return empty dict
             return {}
+    
+    async def set_last_result_v2_async(result: Dict[str, Any]) -> None:
+        """Async variant of set_last_result_v2 (in-memory store never blocks)"""
+        set_last_result_v2(result)
@@ -9,8 +9,9 @@ CRITICAL ARCHITECTURE RULES:
 - MySQL is the authoritative source (replaces in-memory state)
 - No recomputation, no UI-side logic, pure pass-through
 """
+import asyncio
 from typing import Dict, Any, Optional
-from app.config.database import get_session
+from app.config.database import get_session, get_async_session, async_sessions_available
 from app.models.risk_analysis import RiskAnalysis
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
@@ -33,61 +34,7 @@ def set_last_result_v2(result: Dict[str, Any]) -> None:
     """
     try:
         with get_session() as db:
-            # Extract shipment_id from result
-            shipment_id = None
-            if result.get("shipment"):
-                shipment_id = result["shipment"].get("id") or result["shipment"].get("shipment_id")
-            
-            if not shipment_id:
-                # Generate shipment_id from route or timestamp
-                route = result.get("shipment", {}).get("route", "")
-                if route:
-                    shipment_id = f"SH-{route.replace(' ', '').replace('→', '-').replace('->', '-')}-{int(__import__('time').time())}"
-                else:
-                    shipment_id = f"SH-{int(__import__('time').time())}"
-            
-            # Check if risk analysis already exists for this shipment_id
-            existing = db.query(RiskAnalysis).filter(
-                RiskAnalysis.shipment_id == shipment_id
-            ).order_by(desc(RiskAnalysis.created_at)).first()
-            
-            if existing:
-                # Update existing record
-                existing.risk_score = result.get("risk_score") or result.get("overall_risk")
-                existing.overall_risk = result.get("overall_risk") or result.get("risk_score")
-                existing.risk_level = result.get("risk_level", "MEDIUM")
-                existing.confidence = result.get("confidence", 0.8)
-                existing.engine_result = result
-                existing.decision_summary = result.get("decision_summary")
-                existing.recommendations = result.get("recommendations")
-                existing.layers = result.get("layers")
-                existing.drivers = result.get("drivers") or result.get("risk_factors")
-                existing.scenarios = result.get("scenarios")
-                existing.financial = result.get("financial") or result.get("loss")
-                existing.ai_narrative = result.get("ai_narrative")
-                existing.engine_version = result.get("engine_version", "v2")
-                existing.language = result.get("language", "en")
-            else:
-                # Create new record
-                risk_analysis = RiskAnalysis(
-                    shipment_id=shipment_id,
-                    risk_score=result.get("risk_score") or result.get("overall_risk"),
-                    overall_risk=result.get("overall_risk") or result.get("risk_score"),
-                    risk_level=result.get("risk_level", "MEDIUM"),
-                    confidence=result.get("confidence", 0.8),
-                    engine_result=result,
-                    decision_summary=result.get("decision_summary"),
-                    recommendations=result.get("recommendations"),
-                    layers=result.get("layers"),
-                    drivers=result.get("drivers") or result.get("risk_factors"),
-                    scenarios=result.get("scenarios"),
-                    financial=result.get("financial") or result.get("loss"),
-                    ai_narrative=result.get("ai_narrative"),
-                    engine_version=result.get("engine_version", "v2"),
-                    language=result.get("language", "en")
-                )
-                db.add(risk_analysis)
-            
+            _store_result(db, result)
             db.commit()
             
     except Exception as e:
@@ -96,6 +43,84 @@ def set_last_result_v2(result: Dict[str, Any]) -> None:
         # Fallback: Don't fail the request, just log error
 
 
+async def set_last_result_v2_async(result: Dict[str, Any]) -> None:
+    """
+    Async variant of set_last_result_v2 for async routes.
+    
+    Uses the pooled async engine when an async driver (aiomysql/asyncmy) is
+    installed; otherwise runs the sync write in a worker thread so the event
+    loop is never blocked on MySQL.
+    """
+    if not async_sessions_available():
+        await asyncio.to_thread(set_last_result_v2, result)
+        return
+    
+    try:
+        async with get_async_session() as db:
+            await db.run_sync(lambda sync_db: _store_result(sync_db, result))
+    except Exception as e:
+        import logging
+        logging.error(f"[Engine State MySQL] Error storing result (async): {e}", exc_info=True)
+
+
+def _store_result(db: Session, result: Dict[str, Any]) -> None:
+    """Insert or update the RiskAnalysis row for an engine result (no commit)"""
+    # Extract shipment_id from result
+    shipment_id = None
+    if result.get("shipment"):
+        shipment_id = result["shipment"].get("id") or result["shipment"].get("shipment_id")
+    
+    if not shipment_id:
+        # Generate shipment_id from route or timestamp
+        route = result.get("shipment", {}).get("route", "")
+        if route:
+            shipment_id = f"SH-{route.replace(' ', '').replace('→', '-').replace('->', '-')}-{int(__import__('time').time())}"
+        else:
+            shipment_id = f"SH-{int(__import__('time').time())}"
+    
+    # Check if risk analysis already exists for this shipment_id
+    existing = db.query(RiskAnalysis).filter(
+        RiskAnalysis.shipment_id == shipment_id
+    ).order_by(desc(RiskAnalysis.created_at)).first()
+    
+    if existing:
+        # Update existing record
+        existing.risk_score = result.get("risk_score") or result.get("overall_risk")
+        existing.overall_risk = result.get("overall_risk") or result.get("risk_score")
+        existing.risk_level = result.get("risk_level", "MEDIUM")
+        existing.confidence = result.get("confidence", 0.8)
+        existing.engine_result = result
+        existing.decision_summary = result.get("decision_summary")
+        existing.recommendations = result.get("recommendations")
+        existing.layers = result.get("layers")
+        existing.drivers = result.get("drivers") or result.get("risk_factors")
+        existing.scenarios = result.get("scenarios")
+        existing.financial = result.get("financial") or result.get("loss")
+        existing.ai_narrative = result.get("ai_narrative")
+        existing.engine_version = result.get("engine_version", "v2")
+        existing.language = result.get("language", "en")
+    else:
+        # Create new record
+        risk_analysis = RiskAnalysis(
+            shipment_id=shipment_id,
+            risk_score=result.get("risk_score") or result.get("overall_risk"),
+            overall_risk=result.get("overall_risk") or result.get("risk_score"),
+            risk_level=result.get("risk_level", "MEDIUM"),
+            confidence=result.get("confidence", 0.8),
+            engine_result=result,
+            decision_summary=result.get("decision_summary"),
+            recommendations=result.get("recommendations"),
+            layers=result.get("layers"),
+            drivers=result.get("drivers") or result.get("risk_factors"),
+            scenarios=result.get("scenarios"),
+            financial=result.get("financial") or result.get("loss"),
+            ai_narrative=result.get("ai_narrative"),
+            engine_version=result.get("engine_version", "v2"),
+            language=result.get("language", "en")
+        )
+        db.add(risk_analysis)
+
+
 def get_last_result_v2() -> Dict[str, Any]:
     """
     Get the latest Engine v2 analysis result from MySQL database.
@@ -7,7 +7,7 @@ from app.core.engine_v2.risk_pipeline import RiskPipeline
 from app.core.engine_v2.risk_profile import RiskProfile, RiskProfileBuilder
 from app.core.engine_v2.scoring import UnifiedRiskScoring
 from app.core.engine_v2.fahp import FAHPSolver
-from app.core.engine_v2.topsis import TOPSISSolver
+from app.core.engine_v2.topsis import TOPSISSolver, TOPSISRanking, rank_alternatives
 from app.core.engine_v2.climate_model import ClimateRiskModel
 from app.core.engine_v2.network_model import NetworkRiskModel
 from app.core.engine_v2.llm_reasoner import LLMReasoner
@@ -19,6 +19,8 @@ __all__ = [
     'UnifiedRiskScoring',
     'FAHPSolver',
     'TOPSISSolver',
+    'TOPSISRanking',
+    'rank_alternatives',
     'ClimateRiskModel',
     'NetworkRiskModel',
     'LLMReasoner',
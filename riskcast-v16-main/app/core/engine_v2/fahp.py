@@ -4,9 +4,24 @@ Implements FAHP with triangular fuzzy numbers for risk factor weighting
 """
 
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, NamedTuple
 from dataclasses import dataclass
-import math
+from functools import lru_cache
+import os
+
+
+# Grid risk contexts are snapped to before solving (0 = cache on exact values).
+# Snapping lets nearby shipments share a cached solution but is an
+# approximation: a value that moves across a fuzzy-scale boundary can shift
+# weights by up to ~0.04 at a 0.01 quantum.
+FAHP_CONTEXT_QUANTUM = float(os.getenv("FAHP_CONTEXT_QUANTUM", "0"))
+FAHP_CACHE_SIZE = int(os.getenv("FAHP_CACHE_SIZE", "4096"))
+
+# Saaty's Random Index table, by matrix size
+RANDOM_INDEX = {
+    1: 0, 2: 0, 3: 0.58, 4: 0.90, 5: 1.12,
+    6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49
+}
 
 
 @dataclass
@@ -50,6 +65,14 @@ class FuzzyTriangular:
         return NotImplemented
 
 
+class FAHPSolution(NamedTuple):
+    """Cached FAHP result for one risk context"""
+    comparison_matrix: np.ndarray   # (n, n) crisp pairwise comparisons
+    fuzzy_weights: np.ndarray       # (n, 3) normalized fuzzy weights (l, m, u)
+    crisp_weights: np.ndarray       # (n,) defuzzified weights, sum to 1
+    consistency_ratio: float
+
+
 class FAHPSolver:
     """Fuzzy AHP solver for risk factor weighting"""
     
@@ -66,6 +89,9 @@ class FAHPSolver:
         9: FuzzyTriangular(8, 9, 9),           # Extreme importance
     }
     
+    # Same scale as a (9, 3) array of (l, m, u) rows
+    FUZZY_SCALE_ARRAY = np.array([[f.l, f.m, f.u] for f in FUZZY_SCALE.values()], dtype=float)
+    
     # Risk factors for FAHP analysis
     RISK_FACTORS = [
         "delay",
@@ -132,32 +158,8 @@ class FAHPSolver:
         Returns:
             Comparison matrix
         """
-        matrix = np.ones((self.n, self.n))
-        factor_idx = {factor: i for i, factor in enumerate(self.RISK_FACTORS)}
-        
-        # Get values for each factor (normalized to 1-9 scale)
-        factor_values = {}
-        for factor in self.RISK_FACTORS:
-            if factor in risk_context:
-                # Map risk value (0-1) to Saaty scale (1-9)
-                value = risk_context[factor]
-                factor_values[factor] = 1 + value * 8  # Scale to 1-9
-            else:
-                factor_values[factor] = 1.0
-        
-        # Build comparison matrix based on relative importance
-        for i, factor1 in enumerate(self.RISK_FACTORS):
-            for j, factor2 in enumerate(self.RISK_FACTORS):
-                if i == j:
-                    matrix[i, j] = 1.0
-                else:
-                    ratio = factor_values[factor1] / factor_values[factor2]
-                    # Clamp to Saaty scale 1-9
-                    ratio = max(1/9, min(9, ratio))
-                    matrix[i, j] = ratio
-                    if j > i:  # Set reciprocal
-                        matrix[j, i] = 1.0 / ratio
-        
+        values = np.array([risk_context.get(factor, 0.0) for factor in self.RISK_FACTORS], dtype=float)
+        matrix = context_comparison_matrix(values)
         self.comparison_matrix = matrix
         return matrix
     
@@ -171,55 +173,9 @@ class FAHPSolver:
         if self.comparison_matrix is None:
             raise ValueError("Comparison matrix not set")
         
-        n = self.n
-        fuzzy_weights = []
-        
-        # Step 1: Convert crisp comparison matrix to fuzzy
-        fuzzy_matrix = []
-        for i in range(n):
-            row = []
-            for j in range(n):
-                crisp_value = self.comparison_matrix[i, j]
-                # Find closest fuzzy scale
-                fuzzy_num = self._crisp_to_fuzzy(crisp_value)
-                row.append(fuzzy_num)
-            fuzzy_matrix.append(row)
-        
-        # Step 2: Geometric mean for each row
-        geometric_means = []
-        for i in range(n):
-            gm_l = 1.0
-            gm_m = 1.0
-            gm_u = 1.0
-            
-            for j in range(n):
-                fuzzy_num = fuzzy_matrix[i][j]
-                gm_l *= fuzzy_num.l
-                gm_m *= fuzzy_num.m
-                gm_u *= fuzzy_num.u
-            
-            # nth root
-            gm_l = gm_l ** (1.0 / n)
-            gm_m = gm_m ** (1.0 / n)
-            gm_u = gm_u ** (1.0 / n)
-            
-            geometric_means.append(FuzzyTriangular(gm_l, gm_m, gm_u))
-        
-        # Step 3: Normalize weights
-        sum_l = sum(gm.l for gm in geometric_means)
-        sum_m = sum(gm.m for gm in geometric_means)
-        sum_u = sum(gm.u for gm in geometric_means)
-        
-        for gm in geometric_means:
-            normalized = FuzzyTriangular(
-                l=gm.l / sum_u,  # Divide by max sum for lower bound
-                m=gm.m / sum_m,  # Divide by mean sum for middle
-                u=gm.u / sum_l   # Divide by min sum for upper bound
-            )
-            fuzzy_weights.append(normalized)
-        
-        self.fuzzy_weights = fuzzy_weights
-        return fuzzy_weights
+        weights = fuzzy_geometric_weights(fuzzify_matrix(self.comparison_matrix))
+        self.fuzzy_weights = [FuzzyTriangular(*row) for row in weights.tolist()]
+        return self.fuzzy_weights
     
     def compute_crisp_weights(self) -> Dict[str, float]:
         """
@@ -231,17 +187,8 @@ class FAHPSolver:
         if self.fuzzy_weights is None:
             self.compute_fuzzy_weights()
         
-        crisp_weights_list = [fw.defuzzify() for fw in self.fuzzy_weights]
-        
-        # Normalize to sum to 1
-        total = sum(crisp_weights_list)
-        if total > 0:
-            crisp_weights_list = [w / total for w in crisp_weights_list]
-        
-        crisp_weights = {
-            self.RISK_FACTORS[i]: crisp_weights_list[i]
-            for i in range(self.n)
-        }
+        fuzzy = np.array([[fw.l, fw.m, fw.u] for fw in self.fuzzy_weights])
+        crisp_weights = dict(zip(self.RISK_FACTORS, defuzzify_weights(fuzzy).tolist()))
         
         self.crisp_weights = crisp_weights
         return crisp_weights
@@ -256,51 +203,31 @@ class FAHPSolver:
         if self.comparison_matrix is None:
             raise ValueError("Comparison matrix not set")
         
-        n = self.n
-        matrix = self.comparison_matrix
-        
-        # Compute eigenvalues
-        eigenvalues, _ = np.linalg.eig(matrix)
-        lambda_max = max(eigenvalues.real)
-        
-        # Consistency Index (CI)
-        ci = (lambda_max - n) / (n - 1)
-        
-        # Random Index (RI) - from Saaty's table
-        ri_table = {
-            1: 0, 2: 0, 3: 0.58, 4: 0.90, 5: 1.12,
-            6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49
-        }
-        ri = ri_table.get(n, 1.49)
-        
-        # Consistency Ratio
-        if ri > 0:
-            cr = ci / ri
-        else:
-            cr = 0.0
-        
+        cr = consistency_ratio(self.comparison_matrix)
         self.consistency_ratio = cr
         return cr
     
     def _crisp_to_fuzzy(self, crisp_value: float) -> FuzzyTriangular:
         """Convert crisp value to closest fuzzy triangular number"""
-        # Find closest scale value
-        min_diff = float('inf')
-        closest_scale = 1
-        
-        for scale, fuzzy_num in self.FUZZY_SCALE.items():
-            diff = abs(crisp_value - fuzzy_num.m)
-            if diff < min_diff:
-                min_diff = diff
-                closest_scale = scale
-        
-        return self.FUZZY_SCALE[closest_scale]
+        scale = int(np.argmin(np.abs(crisp_value - self.FUZZY_SCALE_ARRAY[:, 1]))) + 1
+        return self.FUZZY_SCALE[scale]
+    
+    def _apply_solution(self, solution: FAHPSolution) -> Dict[str, float]:
+        """Expose a (possibly cached) solution through the solver attributes"""
+        self.comparison_matrix = solution.comparison_matrix
+        self.fuzzy_weights = [FuzzyTriangular(*row) for row in solution.fuzzy_weights.tolist()]
+        self.crisp_weights = dict(zip(self.RISK_FACTORS, solution.crisp_weights.tolist()))
+        self.consistency_ratio = solution.consistency_ratio
+        return dict(self.crisp_weights)
     
     def solve(self, risk_context: Optional[Dict[str, float]] = None,
               comparisons: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, float]:
         """
         Complete FAHP solving process
         
+        Risk-context solves are memoized, together with the consistency
+        ratio, on the exact context or on the FAHP_CONTEXT_QUANTUM grid.
+        
         Args:
             risk_context: Optional risk context for auto-comparison matrix
             comparisons: Optional manual comparisons
@@ -308,40 +235,152 @@ class FAHPSolver:
         Returns:
             Dictionary of factor weights
         """
-        # Build comparison matrix
         if comparisons:
             self.build_comparison_matrix(comparisons)
-        elif risk_context:
-            self.build_default_comparison_matrix(risk_context)
-        else:
-            # Use equal weights as default
-            self.comparison_matrix = np.ones((self.n, self.n))
-        
-        # Compute weights
-        self.compute_fuzzy_weights()
-        weights = self.compute_crisp_weights()
+            return self._apply_solution(solve_comparison_matrix(self.comparison_matrix))
         
-        # Check consistency
-        cr = self.check_consistency()
-        
-        if cr > 0.1:
-            # Warning: consistency ratio too high
-            pass  # Could raise warning here
-        
-        return weights
+        # No context means equal weights, which is the all-zero context
+        return self._apply_solution(_solve_context(quantize_context(risk_context or {})))
+
+
+# ============================================================================
+# VECTORIZED FAHP
+# ============================================================================
+
+def context_comparison_matrix(values: np.ndarray) -> np.ndarray:
+    """
+    Pairwise comparison matrix from per-factor risk values
+
+    Args:
+        values: (n,) risk values in 0-1 (missing factors as 0)
+
+    Returns:
+        (n, n) matrix of value ratios on the Saaty scale, clamped to [1/9, 9]
+    """
+    saaty = 1 + values * 8  # Map risk value (0-1) to Saaty scale (1-9)
+    matrix = np.clip(saaty[:, None] / saaty[None, :], 1 / 9, 9)
+    np.fill_diagonal(matrix, 1.0)
+    return matrix
+
+
+def fuzzify_matrix(matrix: np.ndarray) -> np.ndarray:
+    """
+    Convert a crisp comparison matrix to triangular fuzzy numbers
+
+    Each cell maps to the scale entry with the closest middle value
+    (ties go to the lower scale).
 
+    Args:
+        matrix: (n, n) crisp comparison matrix
 
+    Returns:
+        (n, n, 3) array of (l, m, u)
+    """
+    scale = FAHPSolver.FUZZY_SCALE_ARRAY
+    closest = np.argmin(np.abs(matrix[..., None] - scale[:, 1]), axis=-1)
+    return scale[closest]
 
 
+def fuzzy_geometric_weights(fuzzy_matrix: np.ndarray) -> np.ndarray:
+    """
+    Normalized fuzzy weights by the row geometric mean method
 
+    Args:
+        fuzzy_matrix: (n, n, 3) fuzzy comparison matrix
 
+    Returns:
+        (n, 3) fuzzy weights; l, m and u are divided by the sum of u, m and l
+    """
+    n = fuzzy_matrix.shape[0]
+    geometric_means = np.prod(fuzzy_matrix, axis=1) ** (1.0 / n)
+    return geometric_means / geometric_means.sum(axis=0)[::-1]
 
 
+def defuzzify_weights(fuzzy_weights: np.ndarray) -> np.ndarray:
+    """
+    Centroid-defuzzified weights normalized to sum to 1
 
+    Args:
+        fuzzy_weights: (n, 3) fuzzy weights
 
+    Returns:
+        (n,) crisp weights
+    """
+    crisp = (fuzzy_weights[:, 0] + 2 * fuzzy_weights[:, 1] + fuzzy_weights[:, 2]) / 4.0
+    total = crisp.sum()
+    return crisp / total if total > 0 else crisp
 
 
+def consistency_ratio(matrix: np.ndarray) -> float:
+    """
+    Saaty consistency ratio (CR) of a comparison matrix
 
+    Args:
+        matrix: (n, n) crisp comparison matrix
 
+    Returns:
+        CR (< 0.1 is considered consistent)
+    """
+    n = matrix.shape[0]
+    lambda_max = np.linalg.eigvals(matrix).real.max()
+    ci = (lambda_max - n) / (n - 1)
+    ri = RANDOM_INDEX.get(n, 1.49)
+    return float(ci / ri) if ri > 0 else 0.0
+
+
+def solve_comparison_matrix(matrix: np.ndarray) -> FAHPSolution:
+    """
+    Full FAHP solve for one comparison matrix
+
+    Args:
+        matrix: (n, n) crisp comparison matrix
+
+    Returns:
+        FAHPSolution with read-only arrays
+    """
+    fuzzy_weights = fuzzy_geometric_weights(fuzzify_matrix(matrix))
+    crisp_weights = defuzzify_weights(fuzzy_weights)
+    for array in (matrix, fuzzy_weights, crisp_weights):
+        array.flags.writeable = False
+    return FAHPSolution(matrix, fuzzy_weights, crisp_weights, consistency_ratio(matrix))
+
+
+def quantize_context(risk_context: Dict[str, float]) -> Tuple[float, ...]:
+    """
+    Cache key for a risk context
+
+    Values are used as-is, or snapped to the FAHP_CONTEXT_QUANTUM grid when
+    a quantum is configured.
+
+    Args:
+        risk_context: Risk factor values (missing factors count as 0)
+
+    Returns:
+        Tuple of factor values in RISK_FACTORS order
+    """
+    values = (float(risk_context.get(factor, 0.0)) for factor in FAHPSolver.RISK_FACTORS)
+    if FAHP_CONTEXT_QUANTUM <= 0:
+        return tuple(values)
+    return tuple(round(v / FAHP_CONTEXT_QUANTUM) * FAHP_CONTEXT_QUANTUM for v in values)
+
+
+@lru_cache(maxsize=FAHP_CACHE_SIZE)
+def _solve_context(key: Tuple[float, ...]) -> FAHPSolution:
+    """Solve (and memoize) FAHP for a risk context cache key"""
+    return solve_comparison_matrix(context_comparison_matrix(np.array(key, dtype=float)))
+
+
+def get_fahp_cache_info() -> Dict[str, int]:
+    """Get FAHP memo statistics"""
+    info = _solve_context.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+    }
 
 
+def clear_fahp_cache() -> None:
+    """Clear the FAHP memo"""
+    _solve_context.cache_clear()
@@ -20,6 +20,7 @@ from app.core.engine_v2.risk_driver_derivation import (
 )
 from app.core.utils.sanitizer import sanitize_input
 from app.core.regions.detector import RegionDetector
+from app.core.compute_executor import run_in_compute
 
 
 class RiskPipeline:
@@ -149,6 +150,109 @@ class RiskPipeline:
         Returns:
             Complete risk assessment result dictionary
         """
+        # Steps 1-9 are CPU-bound; run them on the compute executor so the
+        # event loop stays responsive. Thread backend: the pipeline holds
+        # solver/LLM clients that are not worth pickling per request.
+        scored = await run_in_compute(self._run_scoring_steps, shipment_data, backend="thread")
+        region_code = scored["region_code"]
+        region_config = scored["region_config"]
+        risk_context = scored["risk_context"]
+        fahp_weights = scored["fahp_weights"]
+        topsis_result = scored["topsis_result"]
+        climate_result = scored["climate_result"]
+        network_result = scored["network_result"]
+        score_components = scored["score_components"]
+        components_dict = scored["components_dict"]
+        risk_profile = scored["risk_profile"]
+        
+        # Step 10: Generate LLM reasoning (region-aware)
+        profile_dict = self.profile_builder.profile_to_dict(risk_profile)
+        reasoning_result = await self.llm_reasoner.generate_region_reasoning(
+            region=region_code,
+            lang=language,
+            profile=profile_dict,
+            factors=risk_context,
+            score=score_components.final_score,
+            region_config=region_config
+        )
+        
+        # Step 11: Build final result
+        result = {
+            "risk_score": round(score_components.final_score, 2),
+            "risk_level": risk_profile.level,
+            "confidence": round(reasoning_result.confidence_score, 2),
+            "profile": {
+                "score": risk_profile.score,
+                "level": risk_profile.level,
+                "confidence": risk_profile.confidence,
+                "explanation": risk_profile.explanation,
+                "factors": risk_profile.factors,
+                "matrix": {
+                    "probability": risk_profile.matrix.probability,
+                    "severity": risk_profile.matrix.severity,
+                    "quadrant": risk_profile.matrix.quadrant,
+                    "description": risk_profile.matrix.description,
+                },
+            },
+            # Drivers: Use refined derivation logic (Engine v3)
+            # This ensures drivers are structured, meaningful, and follow strict rules
+            "drivers": drivers_to_dict_list(
+                derive_risk_drivers(
+                    factors=risk_profile.factors,
+                    total_risk_score=score_components.final_score,
+                    components=components_dict
+                )
+            ),
+            "recommendations": reasoning_result.suggestions + risk_profile.recommendations,
+            "reasoning": {
+                "explanation": reasoning_result.explanation,
+                "business_justification": reasoning_result.business_justification,
+            },
+            "components": {
+                "fahp_weighted": round(score_components.fahp_weighted, 3),
+                "climate_risk": round(climate_result.overall_risk, 3),
+                "network_risk": round(network_result.overall_risk, 3),
+                "operational_risk": round(score_components.operational_risk, 3),
+                "missing_data_penalty": round(score_components.missing_data_penalty, 3),
+            },
+            "details": {
+                "climate": {
+                    "storm_probability": round(climate_result.storm_probability, 3),
+                    "wind_index": round(climate_result.wind_index, 3),
+                    "rainfall_intensity": round(climate_result.rainfall_intensity, 3),
+                },
+                "network": {
+                    "port_centrality": round(network_result.port_centrality, 3),
+                    "carrier_redundancy": round(network_result.carrier_redundancy, 3),
+                    "propagation_factor": round(network_result.propagation_factor, 3),
+                },
+                "fahp_weights": {k: round(v, 3) for k, v in fahp_weights.items()},
+                "topsis_score": round(topsis_result.closeness_coefficient, 3),
+            },
+            "region": {
+                "code": region_code,
+                "name": region_config.get("region_name", region_code),
+                "config": {
+                    "climate_weight": region_config.get("climate_weight"),
+                    "congestion_weight": region_config.get("congestion_weight"),
+                    "strike_weight": region_config.get("strike_weight"),
+                    "esg_weight": region_config.get("esg_weight"),
+                }
+            },
+        }
+        
+        return result
+    
+    def _run_scoring_steps(self, shipment_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Synchronous scoring part of the pipeline (steps 1-9, no I/O)
+        
+        Args:
+            shipment_data: Shipment data dictionary
+            
+        Returns:
+            Intermediate results consumed by run()
+        """
         # Step 1: Parse and sanitize inputs
         inputs = self.parse_inputs(shipment_data)
         
@@ -243,83 +347,19 @@ class RiskPipeline:
             confidence=0.85  # Can be computed from data quality
         )
         
-        # Step 10: Generate LLM reasoning (region-aware)
-        profile_dict = self.profile_builder.profile_to_dict(risk_profile)
-        reasoning_result = await self.llm_reasoner.generate_region_reasoning(
-            region=region_code,
-            lang=language,
-            profile=profile_dict,
-            factors=risk_context,
-            score=score_components.final_score,
-            region_config=region_config
-        )
-        
-        # Step 11: Build final result
-        result = {
-            "risk_score": round(score_components.final_score, 2),
-            "risk_level": risk_profile.level,
-            "confidence": round(reasoning_result.confidence_score, 2),
-            "profile": {
-                "score": risk_profile.score,
-                "level": risk_profile.level,
-                "confidence": risk_profile.confidence,
-                "explanation": risk_profile.explanation,
-                "factors": risk_profile.factors,
-                "matrix": {
-                    "probability": risk_profile.matrix.probability,
-                    "severity": risk_profile.matrix.severity,
-                    "quadrant": risk_profile.matrix.quadrant,
-                    "description": risk_profile.matrix.description,
-                },
-            },
-            # Drivers: Use refined derivation logic (Engine v3)
-            # This ensures drivers are structured, meaningful, and follow strict rules
-            "drivers": drivers_to_dict_list(
-                derive_risk_drivers(
-                    factors=risk_profile.factors,
-                    total_risk_score=score_components.final_score,
-                    components=components_dict
-                )
-            ),
-            "recommendations": reasoning_result.suggestions + risk_profile.recommendations,
-            "reasoning": {
-                "explanation": reasoning_result.explanation,
-                "business_justification": reasoning_result.business_justification,
-            },
-            "components": {
-                "fahp_weighted": round(score_components.fahp_weighted, 3),
-                "climate_risk": round(climate_result.overall_risk, 3),
-                "network_risk": round(network_result.overall_risk, 3),
-                "operational_risk": round(score_components.operational_risk, 3),
-                "missing_data_penalty": round(score_components.missing_data_penalty, 3),
-            },
-            "details": {
-                "climate": {
-                    "storm_probability": round(climate_result.storm_probability, 3),
-                    "wind_index": round(climate_result.wind_index, 3),
-                    "rainfall_intensity": round(climate_result.rainfall_intensity, 3),
-                },
-                "network": {
-                    "port_centrality": round(network_result.port_centrality, 3),
-                    "carrier_redundancy": round(network_result.carrier_redundancy, 3),
-                    "propagation_factor": round(network_result.propagation_factor, 3),
-                },
-                "fahp_weights": {k: round(v, 3) for k, v in fahp_weights.items()},
-                "topsis_score": round(topsis_result.closeness_coefficient, 3),
-            },
-            "region": {
-                "code": region_code,
-                "name": region_config.get("region_name", region_code),
-                "config": {
-                    "climate_weight": region_config.get("climate_weight"),
-                    "congestion_weight": region_config.get("congestion_weight"),
-                    "strike_weight": region_config.get("strike_weight"),
-                    "esg_weight": region_config.get("esg_weight"),
-                }
-            },
+        return {
+            "inputs": inputs,
+            "region_code": region_code,
+            "region_config": region_config,
+            "risk_context": risk_context,
+            "fahp_weights": fahp_weights,
+            "topsis_result": topsis_result,
+            "climate_result": climate_result,
+            "network_result": network_result,
+            "score_components": score_components,
+            "components_dict": components_dict,
+            "risk_profile": risk_profile,
         }
-        
-        return result
     
     def _apply_region_weights(self, fahp_weights: Dict[str, float], 
                               risk_context: Dict[str, float],
@@ -4,7 +4,7 @@ Multi-criteria decision making for alternative ranking
 """
 
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
 
 
@@ -18,6 +18,179 @@ class TOPSISResult:
     normalized_scores: Dict[str, float]
 
 
+@dataclass
+class TOPSISRanking:
+    """
+    Batched TOPSIS result
+
+    Arrays have the shape of the decision matrix without its criteria axis:
+    (n_alternatives,) for one matrix, (batch, n_alternatives) for a batch.
+    Masked-out alternatives have NaN closeness/distances and rank 0.
+    """
+    closeness: np.ndarray            # 0-1, higher is better
+    ranks: np.ndarray                # 1 = best; ties share the better rank
+    distance_to_ideal_positive: np.ndarray
+    distance_to_ideal_negative: np.ndarray
+    weighted_matrix: np.ndarray      # (..., n_alternatives, n_criteria)
+
+    def order(self) -> np.ndarray:
+        """Alternative indices best first (masked-out alternatives last)"""
+        closeness = np.where(np.isnan(self.closeness), -np.inf, self.closeness)
+        return np.argsort(-closeness, axis=-1, kind="stable")
+
+    def top(self, k: int) -> np.ndarray:
+        """Indices of the k best alternatives (per matrix for a batch)"""
+        return self.order()[..., :k]
+
+
+# ============================================================================
+# BATCHED TOPSIS
+# ============================================================================
+
+def normalize_decision_matrix(matrix: np.ndarray, method: str = "vector",
+                              mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Normalize decision matrices column-wise
+
+    Args:
+        matrix: (..., n_alternatives, n_criteria) decision matrix
+        method: Normalization method ("vector" or "min_max")
+        mask: Optional (..., n_alternatives) bool array of rows to include
+
+    Returns:
+        Normalized matrix (masked-out rows are left at 0)
+    """
+    if mask is not None:
+        matrix = np.where(mask[..., None], matrix, 0.0)
+
+    if method == "vector":
+        # Vector normalization (Euclidean norm)
+        norms = np.sqrt(np.sum(matrix ** 2, axis=-2, keepdims=True))
+        norms[norms == 0] = 1  # Avoid division by zero
+        return matrix / norms
+
+    if method == "min_max":
+        # Min-max normalization
+        if mask is None:
+            min_vals = np.min(matrix, axis=-2, keepdims=True)
+            max_vals = np.max(matrix, axis=-2, keepdims=True)
+        else:
+            min_vals = np.min(np.where(mask[..., None], matrix, np.inf), axis=-2, keepdims=True)
+            max_vals = np.max(np.where(mask[..., None], matrix, -np.inf), axis=-2, keepdims=True)
+        ranges = max_vals - min_vals
+        ranges[~np.isfinite(ranges) | (ranges == 0)] = 1  # Avoid division by zero
+        normalized = (matrix - min_vals) / ranges
+        return normalized if mask is None else np.where(mask[..., None], normalized, 0.0)
+
+    raise ValueError(f"Unknown normalization method: {method}")
+
+
+def competition_ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    Rank scores descending along the last axis ("1224" ranking)
+
+    Args:
+        scores: (..., n) scores, higher is better
+
+    Returns:
+        (..., n) int ranks starting at 1; equal scores share the better rank
+    """
+    order = np.argsort(-scores, axis=-1, kind="stable")
+    sorted_scores = np.take_along_axis(scores, order, axis=-1)
+    positions = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape)
+    starts_group = np.ones(scores.shape, dtype=bool)
+    starts_group[..., 1:] = sorted_scores[..., 1:] != sorted_scores[..., :-1]
+    group_rank = np.maximum.accumulate(np.where(starts_group, positions, 0), axis=-1) + 1
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, group_rank, axis=-1)
+    return ranks
+
+
+def rank_alternatives(matrix: Union[np.ndarray, Sequence],
+                      weights: Optional[Union[np.ndarray, Sequence[float]]] = None,
+                      directions: Optional[Sequence[Union[str, bool]]] = None,
+                      normalization: str = "vector",
+                      mask: Optional[np.ndarray] = None) -> TOPSISRanking:
+    """
+    Rank alternatives with TOPSIS in one vectorized pass
+
+    Ideal solutions are taken per decision matrix, so a batch ranks each
+    candidate set (lanes, carriers, routes, ...) independently.
+
+    Args:
+        matrix: (n_alternatives, n_criteria) decision matrix, or a
+                (batch, n_alternatives, n_criteria) stack of them
+        weights: (n_criteria,) or (batch, n_criteria) criterion weights;
+                 None weights criteria equally
+        directions: Per criterion "maximize"/"minimize" (or True for
+                    maximize); None maximizes every criterion
+        normalization: "vector" or "min_max"
+        mask: Optional (..., n_alternatives) bool array; False rows are
+              padding and are excluded from the ranking (for batches of
+              candidate sets of different sizes)
+
+    Returns:
+        TOPSISRanking
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim < 2:
+        raise ValueError("Decision matrix must be (n_alternatives, n_criteria) or batched")
+    m = matrix.shape[-1]
+
+    if weights is None:
+        weights = np.full(m, 1.0 / m)
+    weights = np.asarray(weights, dtype=float)[..., None, :]
+
+    if directions is None:
+        maximize = np.ones(m, dtype=bool)
+    else:
+        maximize = np.array([d == "maximize" if isinstance(d, str) else bool(d) for d in directions])
+    if maximize.shape != (m,):
+        raise ValueError(f"Expected {m} criterion directions, got {maximize.shape[0]}")
+
+    if mask is not None:
+        mask = np.broadcast_to(np.asarray(mask, dtype=bool), matrix.shape[:-1])
+
+    weighted = normalize_decision_matrix(matrix, normalization, mask) * weights
+
+    # Ideal solutions: best/worst of each criterion over the (unmasked) rows
+    if mask is None:
+        col_max = weighted.max(axis=-2, keepdims=True)
+        col_min = weighted.min(axis=-2, keepdims=True)
+    else:
+        col_max = np.where(mask[..., None], weighted, -np.inf).max(axis=-2, keepdims=True)
+        col_min = np.where(mask[..., None], weighted, np.inf).min(axis=-2, keepdims=True)
+    ideal_positive = np.where(maximize, col_max, col_min)
+    ideal_negative = np.where(maximize, col_min, col_max)
+
+    dist_positive = np.sqrt(np.sum((weighted - ideal_positive) ** 2, axis=-1))
+    dist_negative = np.sqrt(np.sum((weighted - ideal_negative) ** 2, axis=-1))
+
+    total = dist_positive + dist_negative
+    total[total == 0] = 1e-10  # Avoid division by zero
+    closeness = dist_negative / total
+
+    if mask is None:
+        ranks = competition_ranks(closeness)
+    else:
+        ranks = np.where(mask, competition_ranks(np.where(mask, closeness, -np.inf)), 0)
+        closeness = np.where(mask, closeness, np.nan)
+        dist_positive = np.where(mask, dist_positive, np.nan)
+        dist_negative = np.where(mask, dist_negative, np.nan)
+
+    return TOPSISRanking(
+        closeness=closeness,
+        ranks=ranks,
+        distance_to_ideal_positive=dist_positive,
+        distance_to_ideal_negative=dist_negative,
+        weighted_matrix=weighted,
+    )
+
+
+# ============================================================================
+# SOLVER
+# ============================================================================
+
 class TOPSISSolver:
     """TOPSIS solver for multi-criteria decision analysis"""
     
@@ -52,14 +225,10 @@ class TOPSISSolver:
         Returns:
             Decision matrix (n alternatives × m criteria)
         """
-        n = len(alternatives)
-        m = len(criteria)
-        
-        matrix = np.zeros((n, m))
-        
-        for i, alt in enumerate(alternatives):
-            for j, criterion in enumerate(criteria):
-                matrix[i, j] = alt.get(criterion, 0.0)
+        matrix = np.array(
+            [[alt.get(criterion, 0.0) for criterion in criteria] for alt in alternatives],
+            dtype=float
+        ).reshape(len(alternatives), len(criteria))
         
         self.decision_matrix = matrix
         return matrix
@@ -77,25 +246,7 @@ class TOPSISSolver:
         if self.decision_matrix is None:
             raise ValueError("Decision matrix not built")
         
-        matrix = self.decision_matrix
-        n, m = matrix.shape
-        
-        if method == "vector":
-            # Vector normalization (Euclidean norm)
-            norms = np.sqrt(np.sum(matrix ** 2, axis=0, keepdims=True))
-            norms[norms == 0] = 1  # Avoid division by zero
-            normalized = matrix / norms
-        elif method == "min_max":
-            # Min-max normalization
-            min_vals = np.min(matrix, axis=0, keepdims=True)
-            max_vals = np.max(matrix, axis=0, keepdims=True)
-            ranges = max_vals - min_vals
-            ranges[ranges == 0] = 1  # Avoid division by zero
-            normalized = (matrix - min_vals) / ranges
-        else:
-            raise ValueError(f"Unknown normalization method: {method}")
-        
-        return normalized
+        return normalize_decision_matrix(self.decision_matrix, method)
     
     def apply_weights(self, normalized_matrix: np.ndarray,
                      criteria: List[str], weights: Dict[str, float]) -> np.ndarray:
@@ -110,11 +261,9 @@ class TOPSISSolver:
         Returns:
             Weighted normalized matrix
         """
-        weighted = normalized_matrix.copy()
-        
-        for j, criterion in enumerate(criteria):
-            weight = weights.get(criterion, 1.0 / len(criteria))  # Equal weight if not specified
-            weighted[:, j] *= weight
+        # Equal weight if not specified
+        weight_vector = np.array([weights.get(criterion, 1.0 / len(criteria)) for criterion in criteria])
+        weighted = normalized_matrix * weight_vector
         
         self.weighted_matrix = weighted
         return weighted
@@ -131,21 +280,13 @@ class TOPSISSolver:
         Returns:
             Tuple of (ideal_positive, ideal_negative) vectors
         """
-        n, m = weighted_matrix.shape
-        ideal_positive = np.zeros(m)
-        ideal_negative = np.zeros(m)
+        maximize = np.array([self.criteria_directions.get(c, "maximize") == "maximize" for c in criteria])
+        col_max = weighted_matrix.max(axis=0)
+        col_min = weighted_matrix.min(axis=0)
         
-        for j, criterion in enumerate(criteria):
-            direction = self.criteria_directions.get(criterion, "maximize")
-            
-            if direction == "maximize":
-                # For maximization: ideal positive = max, ideal negative = min
-                ideal_positive[j] = np.max(weighted_matrix[:, j])
-                ideal_negative[j] = np.min(weighted_matrix[:, j])
-            else:  # minimize
-                # For minimization: ideal positive = min, ideal negative = max
-                ideal_positive[j] = np.min(weighted_matrix[:, j])
-                ideal_negative[j] = np.max(weighted_matrix[:, j])
+        # Maximization: ideal positive = max, ideal negative = min (and vice versa)
+        ideal_positive = np.where(maximize, col_max, col_min)
+        ideal_negative = np.where(maximize, col_min, col_max)
         
         self.ideal_positive = ideal_positive
         self.ideal_negative = ideal_negative
@@ -166,14 +307,9 @@ class TOPSISSolver:
         Returns:
             Tuple of (distances_to_positive, distances_to_negative)
         """
-        n = weighted_matrix.shape[0]
-        dist_positive = np.zeros(n)
-        dist_negative = np.zeros(n)
-        
-        for i in range(n):
-            # Euclidean distance
-            dist_positive[i] = np.sqrt(np.sum((weighted_matrix[i] - ideal_positive) ** 2))
-            dist_negative[i] = np.sqrt(np.sum((weighted_matrix[i] - ideal_negative) ** 2))
+        # Euclidean distances, all rows at once
+        dist_positive = np.sqrt(np.sum((weighted_matrix - ideal_positive) ** 2, axis=1))
+        dist_negative = np.sqrt(np.sum((weighted_matrix - ideal_negative) ** 2, axis=1))
         
         return dist_positive, dist_negative
     
@@ -231,43 +367,51 @@ class TOPSISSolver:
         # Calculate closeness coefficient
         closeness = self.calculate_closeness(dist_pos, dist_neg)
         
-        # For single alternative case, return the closeness coefficient
-        if len(alternatives) == 1:
-            score = float(closeness[0])
-            result = TOPSISResult(
-                closeness_coefficient=score,
-                distance_to_ideal_positive=float(dist_pos[0]),
-                distance_to_ideal_negative=float(dist_neg[0]),
-                ranking=1,
-                normalized_scores={criteria[i]: float(weighted[0, i]) for i in range(len(criteria))}
-            )
-        else:
-            # Rank alternatives (higher closeness = better)
-            rankings = np.argsort(closeness)[::-1]  # Descending order
-            rank = int(np.where(rankings == 0)[0][0]) + 1
+        # Rank alternatives (higher closeness = better); report the first one
+        ranks = competition_ranks(closeness)
+        
+        return TOPSISResult(
+            closeness_coefficient=float(closeness[0]),
+            distance_to_ideal_positive=float(dist_pos[0]),
+            distance_to_ideal_negative=float(dist_neg[0]),
+            ranking=int(ranks[0]),
+            normalized_scores={criteria[i]: float(weighted[0, i]) for i in range(len(criteria))}
+        )
+    
+    def rank(self, alternatives: List[Dict[str, float]],
+             criteria: List[str],
+             weights: Dict[str, float],
+             criteria_directions: Optional[Dict[str, str]] = None) -> List[TOPSISResult]:
+        """
+        Rank every alternative (solve() only reports the first one)
+        
+        Args:
+            alternatives: List of alternative solutions
+            criteria: List of criterion names
+            weights: Weights for each criterion
+            criteria_directions: "maximize" or "minimize" for each criterion
             
-            result = TOPSISResult(
-                closeness_coefficient=float(closeness[0]),
-                distance_to_ideal_positive=float(dist_pos[0]),
-                distance_to_ideal_negative=float(dist_neg[0]),
-                ranking=rank,
-                normalized_scores={criteria[i]: float(weighted[0, i]) for i in range(len(criteria))}
-            )
+        Returns:
+            One TOPSISResult per alternative, in input order
+        """
+        if criteria_directions:
+            self.criteria_directions = criteria_directions
         
-        return result
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        matrix = self.build_decision_matrix(alternatives, criteria)
+        ranking = rank_alternatives(
+            matrix,
+            weights=[weights.get(c, 1.0 / len(criteria)) for c in criteria],
+            directions=[self.criteria_directions.get(c, "maximize") for c in criteria],
+        )
+        self.weighted_matrix = ranking.weighted_matrix
+        
+        return [
+            TOPSISResult(
+                closeness_coefficient=float(ranking.closeness[i]),
+                distance_to_ideal_positive=float(ranking.distance_to_ideal_positive[i]),
+                distance_to_ideal_negative=float(ranking.distance_to_ideal_negative[i]),
+                ranking=int(ranking.ranks[i]),
+                normalized_scores=dict(zip(criteria, ranking.weighted_matrix[i].tolist()))
+            )
+            for i in range(len(alternatives))
+        ]
@@ -227,9 +227,12 @@ class ClimateMonteCarloExtension:
     def generate_climate_tail_shocks(
         n_samples: int,
         climate_vars: ClimateVariables,
-        base_tail_prob: float = 0.05
+        base_tail_prob: float = 0.05,
+        rng: Optional[np.random.Generator] = None
     ) -> np.ndarray:
         """Generate climate-driven tail shock distribution"""
+        if rng is None:
+            rng = np.random.default_rng()
         
         # Combined tail probability
         combined_prob = base_tail_prob + climate_vars.climate_tail_event_probability * 0.5
@@ -239,7 +242,7 @@ class ClimateMonteCarloExtension:
         shocks = np.zeros(n_samples)
         
         # Identify tail event samples
-        tail_mask = np.random.random(n_samples) < combined_prob
+        tail_mask = rng.random(n_samples) < combined_prob
         
         if np.any(tail_mask):
             # Calculate shock magnitude based on climate variables
@@ -251,10 +254,29 @@ class ClimateMonteCarloExtension:
             magnitude = base_magnitude * enso_mult * typhoon_mult * volatility_mult
             
             # Generate gamma-distributed shocks
-            shocks[tail_mask] = np.random.gamma(2.0, magnitude, size=np.sum(tail_mask))
+            shocks[tail_mask] = rng.gamma(2.0, magnitude, size=np.sum(tail_mask))
         
         return shocks
     
+    @staticmethod
+    def generate_climate_tail_shocks_batch(
+        n_samples: int,
+        climate_vars_batch: List[ClimateVariables],
+        base_tail_prob: float = 0.05,
+        rngs: Optional[List[np.random.Generator]] = None
+    ) -> np.ndarray:
+        """Generate climate-driven tail shocks for N shipments (N × n_samples)"""
+        if rngs is None:
+            rngs = [np.random.default_rng() for _ in climate_vars_batch]
+        
+        # Row i consumes its own stream exactly like generate_climate_tail_shocks
+        return np.stack([
+            ClimateMonteCarloExtension.generate_climate_tail_shocks(
+                n_samples, climate_vars, base_tail_prob, rng=rng
+            )
+            for climate_vars, rng in zip(climate_vars_batch, rngs)
+        ]) if climate_vars_batch else np.zeros((0, n_samples))
+    
     @staticmethod
     def build_climate_correlation_matrix(
         layer_names: List[str],
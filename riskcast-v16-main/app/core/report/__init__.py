@@ -3,14 +3,17 @@ RISKCAST Report Module
 Enterprise PDF report builder with AI-powered insights
 """
 
-from .pdf_builder import PDFReportBuilder
-from .pdf_layouts import PDFLayouts
+from .pdf_builder import PDFReportBuilder, get_pdf_builder, render_pdf_report
+from .pdf_layouts import PDFLayouts, get_pdf_layouts
 from .image_exporter import ImageExporter
 
 __all__ = [
     "PDFReportBuilder",
     "PDFLayouts",
     "ImageExporter",
+    "get_pdf_builder",
+    "get_pdf_layouts",
+    "render_pdf_report",
 ]
 
 
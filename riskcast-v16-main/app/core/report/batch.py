@@ -0,0 +1,374 @@
+"""
+RISKCAST Report - Batch Rendering Jobs
+Render many assessment reports in one background job
+
+ARCHITECTURE:
+- A job takes a set of assessments (audit trail IDs) and an output format
+- PDF: each report renders on a dedicated worker pool (processes by
+  default); workers build the shared stylesheet once at start-up and the
+  finished PDFs are written into a single zip archive on local disk
+- Excel: one workbook with a sheet per assessment
+- The job runs on a background thread; callers poll get_job() for progress
+- The pool is separate from the request compute executor, so month-end
+  batches do not take capacity from interactive requests
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import uuid
+import zipfile
+
+from .pdf_builder import render_pdf_report
+from .pdf_layouts import get_pdf_layouts
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+_ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
+REPORT_BATCH_DIR = os.getenv("REPORT_BATCH_DIR", str(_ROOT_DIR / "data" / "report_batches"))
+REPORT_BATCH_BACKEND = os.getenv("REPORT_BATCH_BACKEND", "process").lower()  # process | thread
+REPORT_BATCH_WORKERS = int(os.getenv("REPORT_BATCH_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+REPORT_BATCH_MP_START_METHOD = os.getenv("REPORT_BATCH_MP_START_METHOD", "spawn")
+REPORT_BATCH_MAX_ITEMS = int(os.getenv("REPORT_BATCH_MAX_ITEMS", "1000"))
+REPORT_BATCH_MAX_JOBS = int(os.getenv("REPORT_BATCH_MAX_JOBS", "100"))  # Job records kept for polling
+
+REPORT_FORMATS = ("pdf", "xlsx")
+
+
+# ============================
+# WORKER-SIDE HELPERS (must be module level to be picklable)
+# ============================
+
+def _warm_report_worker() -> None:
+    """Process pool initializer: build styles and fonts once per worker"""
+    try:
+        get_pdf_layouts()
+    except Exception as e:  # pragma: no cover - best effort
+        logger.warning(f"[ReportBatch] Failed to pre-build PDF layouts in worker: {e}")
+
+
+# ============================
+# ASSESSMENT -> REPORT DATA
+# ============================
+
+def _as_text_list(items: Any) -> List[str]:
+    """Normalize drivers/recommendations (strings or dicts) to strings"""
+    if not isinstance(items, list):
+        return []
+    texts = []
+    for item in items:
+        if isinstance(item, dict):
+            text = next((item[k] for k in ("text", "title", "name", "factor", "action", "description") if item.get(k)), None)
+            texts.append(str(text if text is not None else item))
+        else:
+            texts.append(str(item))
+    return texts
+
+
+def assessment_report_data(assessment: Dict[str, Any], request: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Map a stored assessment response to the PDF report data layout
+
+    Accepts the flat report layout as well as persona responses
+    (summary / executive_summary, key_drivers, action_items).
+
+    Args:
+        assessment: Assessment response payload
+        request: Original shipment request (used for the route label)
+
+    Returns:
+        Report data dictionary for PDFReportBuilder
+    """
+    summary = assessment.get("summary") or assessment.get("executive_summary") or {}
+    risk_score = assessment.get("risk_score", summary.get("overall_risk", 0)) or 0
+    confidence = assessment.get("confidence", summary.get("confidence", 0)) or 0
+    factors = assessment.get("factors")
+
+    request = request or {}
+    if request.get("pol") and request.get("pod"):
+        route = f"{request['pol']} → {request['pod']}"
+    else:
+        route = assessment.get("route") or request.get("trade_lane") or request.get("route") or "Unknown Route"
+
+    return {
+        "risk_score": float(risk_score),
+        "risk_level": str(assessment.get("risk_level") or summary.get("risk_level") or "Unknown"),
+        "confidence": confidence / 100 if confidence > 1 else confidence,
+        "profile": assessment.get("profile") or {},
+        "matrix": assessment.get("matrix") or {},
+        "factors": factors if isinstance(factors, dict) else {},
+        "drivers": _as_text_list(assessment.get("drivers") or assessment.get("key_drivers")),
+        "recommendations": _as_text_list(assessment.get("recommendations") or assessment.get("action_items")),
+        "timeline": assessment.get("timeline") or [],
+        "network": assessment.get("network") or {},
+        "scenario_comparisons": assessment.get("scenario_comparisons") or [],
+        "charts": assessment.get("charts") or {},
+        "route": route,
+    }
+
+
+def load_assessment_reports(assessment_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Resolve assessment IDs (audit trail entries) to report data
+
+    Returns:
+        Dict mapping each ID to its report data, or None if not found
+    """
+    from app.models.audit_trail import AuditService
+
+    reports: Dict[str, Optional[Dict[str, Any]]] = {}
+    for assessment_id in assessment_ids:
+        entry = AuditService.get_entry(assessment_id)
+        if entry is None:
+            reports[assessment_id] = None
+            continue
+        data = assessment_report_data(entry.response_payload or {}, entry.request_payload or {})
+        if entry.risk_score is not None:
+            data["risk_score"] = float(entry.risk_score)
+        if entry.risk_level:
+            data["risk_level"] = entry.risk_level
+        reports[assessment_id] = data
+    return reports
+
+
+def _safe_name(name: str, max_length: int = 80) -> str:
+    """File/sheet-safe version of an assessment ID"""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)[:max_length] or "report"
+
+
+# ============================
+# JOBS
+# ============================
+
+@dataclass
+class ReportBatchJob:
+    """State of one batch rendering job"""
+    job_id: str
+    format: str
+    assessment_ids: List[str]
+    status: str = "queued"  # queued | running | completed | failed
+    completed: int = 0
+    failed: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.assessment_ids)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        processed = self.completed + self.failed
+        return {
+            "job_id": self.job_id,
+            "format": self.format,
+            "status": self.status,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "progress": round(processed / self.total, 4) if self.total else 1.0,
+            "errors": dict(self.errors),
+            "error": self.error,
+            "output_file": Path(self.output_path).name if self.output_path else None,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class ReportBatchService:
+    """
+    Runs batch rendering jobs on a dedicated worker pool
+
+    Usage:
+        service = get_report_batch_service()
+        job = service.submit({"id-1": report_data, ...}, fmt="pdf")
+        service.get_job(job.job_id).to_dict()  # poll progress
+    """
+
+    def __init__(
+        self,
+        output_dir: str = REPORT_BATCH_DIR,
+        workers: int = REPORT_BATCH_WORKERS,
+        backend: str = REPORT_BATCH_BACKEND
+    ):
+        self.output_dir = Path(output_dir)
+        self.workers = max(1, workers)
+        self.backend = backend if backend in ("process", "thread") else "process"
+        self._pool: Optional[Executor] = None
+        self._jobs: Dict[str, ReportBatchJob] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.backend == "process":
+                    try:
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context(REPORT_BATCH_MP_START_METHOD),
+                            initializer=_warm_report_worker
+                        )
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"[ReportBatch] Process pool unavailable ({e}), falling back to threads")
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="riskcast-report-batch"
+                    )
+            return self._pool
+
+    def submit(self, reports: Dict[str, Dict[str, Any]], fmt: str = "pdf") -> ReportBatchJob:
+        """
+        Start a batch job in the background
+
+        Args:
+            reports: Report data keyed by assessment ID
+            fmt: "pdf" (zip of PDFs) or "xlsx" (one multi-sheet workbook)
+
+        Returns:
+            The queued job (poll get_job for progress)
+        """
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {fmt}")
+        if not reports:
+            raise ValueError("No assessments to render")
+        if len(reports) > REPORT_BATCH_MAX_ITEMS:
+            raise ValueError(f"Too many assessments ({len(reports)} > {REPORT_BATCH_MAX_ITEMS})")
+
+        job = ReportBatchJob(job_id=f"batch-{uuid.uuid4().hex[:12]}", format=fmt, assessment_ids=list(reports))
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune_jobs()
+
+        threading.Thread(
+            target=self._run, args=(job, reports), name=f"report-{job.job_id}", daemon=True
+        ).start()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[ReportBatchJob]:
+        """Job by ID (None if unknown or pruned)"""
+        return self._jobs.get(job_id)
+
+    def _prune_jobs(self) -> None:
+        """Forget the oldest finished jobs beyond REPORT_BATCH_MAX_JOBS and delete their output files"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(self._jobs) - REPORT_BATCH_MAX_JOBS)]:
+            job = self._jobs.pop(job_id)
+            if job.output_path:
+                try:
+                    Path(job.output_path).unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f"[ReportBatch] Could not remove {job.output_path}: {e}")
+
+    def _run(self, job: ReportBatchJob, reports: Dict[str, Dict[str, Any]]) -> None:
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        final_path = self.output_dir / f"{job.job_id}.{'zip' if job.format == 'pdf' else 'xlsx'}"
+        temp_path = final_path.with_name(final_path.name + ".part")
+
+        try:
+            if job.format == "pdf":
+                self._render_pdf_archive(job, reports, temp_path)
+            else:
+                self._render_workbook(job, reports, temp_path)
+            os.replace(temp_path, final_path)
+            job.output_path = str(final_path)
+            job.status = "completed" if job.completed else "failed"
+        except Exception as e:
+            logger.error(f"[ReportBatch] Job {job.job_id} failed: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = "failed"
+            temp_path.unlink(missing_ok=True)
+        finally:
+            job.finished_at = datetime.utcnow()
+            logger.info(
+                f"[ReportBatch] Job {job.job_id}: {job.completed}/{job.total} rendered, "
+                f"{job.failed} failed ({job.status})"
+            )
+
+    def _render_pdf_archive(self, job: ReportBatchJob, reports: Dict[str, Dict[str, Any]], path: Path) -> None:
+        """Render PDFs on the pool and write them into a zip as they finish"""
+        pool = self._get_pool()
+        futures = {pool.submit(render_pdf_report, data): assessment_id for assessment_id, data in reports.items()}
+        used_names = set()
+
+        # PDFs are already compressed; store them as-is
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+            for future in as_completed(futures):
+                assessment_id = futures[future]
+                try:
+                    pdf_bytes = future.result()
+                except Exception as e:
+                    job.errors[assessment_id] = str(e)
+                    job.failed += 1
+                    continue
+
+                name = _safe_name(assessment_id)
+                while name in used_names:
+                    name += "_"
+                used_names.add(name)
+                archive.writestr(f"{name}.pdf", pdf_bytes)
+                job.completed += 1
+
+    def _render_workbook(self, job: ReportBatchJob, reports: Dict[str, Dict[str, Any]], path: Path) -> None:
+        """Write one workbook with a sheet per assessment"""
+        from app.ai_system_advisor.excel_export import RecommendationExporter
+
+        exporter = RecommendationExporter()
+
+        def _on_sheet(assessment_id: str, error: Optional[Exception]) -> None:
+            if error is None:
+                job.completed += 1
+            else:
+                job.errors[assessment_id] = str(error)
+                job.failed += 1
+
+        workbook = exporter.export_assessment_workbook(list(reports.items()), on_sheet=_on_sheet)
+        path.write_bytes(workbook.getvalue())
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_service: Optional[ReportBatchService] = None
+_service_lock = threading.Lock()
+
+
+def get_report_batch_service() -> ReportBatchService:
+    """Get the shared batch rendering service"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ReportBatchService()
+    return _service
+
+
+def shutdown_report_batch_service(wait: bool = True) -> None:
+    """Shut down the shared service's worker pool (application shutdown hook)"""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.shutdown(wait=wait)
+            _service = None
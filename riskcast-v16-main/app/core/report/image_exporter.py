@@ -1,13 +1,47 @@
 """
 RISKCAST Report - Image Exporter
 Utilities for processing chart images and base64 conversion
+
+Processed chart images are cached by content hash, so a chart that
+appears in many reports is decoded and resized only once per process.
 """
 
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Tuple
 import base64
+import hashlib
 import io
+import os
+import threading
 from PIL import Image
 
+# Processed chart cache (content hash + target size -> PNG bytes)
+REPORT_IMAGE_CACHE_SIZE = int(os.getenv("REPORT_IMAGE_CACHE_SIZE", "256"))
+
+_image_cache: "OrderedDict[Tuple[str, int, int], Optional[bytes]]" = OrderedDict()
+_image_cache_lock = threading.Lock()
+_image_cache_stats = {"hits": 0, "misses": 0}
+
+
+def chart_content_hash(base64_string: str) -> str:
+    """Content address of a base64 chart image (data URL prefix ignored)"""
+    if base64_string.startswith('data:image'):
+        base64_string = base64_string.split(',', 1)[1]
+    return hashlib.sha256(base64_string.encode('ascii', 'ignore')).hexdigest()
+
+
+def get_image_cache_info() -> dict:
+    """Chart image cache statistics"""
+    with _image_cache_lock:
+        return {**_image_cache_stats, "size": len(_image_cache), "max_size": REPORT_IMAGE_CACHE_SIZE}
+
+
+def clear_image_cache() -> None:
+    """Drop all cached chart images"""
+    with _image_cache_lock:
+        _image_cache.clear()
+        _image_cache_stats.update(hits=0, misses=0)
+
 
 class ImageExporter:
     """Image export and processing utilities"""
@@ -94,6 +128,8 @@ class ImageExporter:
         """
         Process chart image from base64 for PDF
         
+        Results are cached by image content and target size.
+        
         Args:
             base64_string: Base64 encoded chart image
             max_width: Maximum width for PDF
@@ -102,6 +138,25 @@ class ImageExporter:
         Returns:
             Image bytes ready for PDF or None if invalid
         """
+        key = (chart_content_hash(base64_string), max_width, max_height)
+        with _image_cache_lock:
+            if key in _image_cache:
+                _image_cache.move_to_end(key)
+                _image_cache_stats["hits"] += 1
+                return _image_cache[key]
+            _image_cache_stats["misses"] += 1
+        
+        result = ImageExporter._process_chart_image(base64_string, max_width, max_height)
+        
+        with _image_cache_lock:
+            _image_cache[key] = result
+            while len(_image_cache) > REPORT_IMAGE_CACHE_SIZE:
+                _image_cache.popitem(last=False)
+        return result
+    
+    @staticmethod
+    def _process_chart_image(base64_string: str, max_width: int, max_height: int) -> Optional[bytes]:
+        """Decode, resize and re-encode a chart image (uncached)"""
         image = ImageExporter.decode_base64_image(base64_string)
         if not image:
             return None
@@ -1,31 +1,118 @@
 """
 RISKCAST Report - PDF Builder
 Enterprise-grade PDF report generator with comprehensive risk analysis
+
+Styles and layouts are built once per process (get_pdf_layouts) and the
+builder is a shared singleton. Finished reports are cached by a hash of
+the report data, so re-downloading the same assessment skips the
+ReportLab build entirely.
 """
 
+from collections import OrderedDict
 from io import BytesIO
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any
 from datetime import datetime
+import copy
+import hashlib
+import json
+import os
+import threading
 from reportlab.lib.pagesizes import letter  # type: ignore
 from reportlab.lib.units import inch  # type: ignore
 from reportlab.lib import colors  # type: ignore
 from reportlab.platypus import (  # type: ignore
     SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle,
-    Image as RLImage, KeepTogether, PageBreakIfNeeded
+    Image as RLImage, KeepTogether
 )
 from reportlab.lib.styles import getSampleStyleSheet  # type: ignore
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY  # type: ignore
 
-from .pdf_layouts import PDFLayouts
+from .pdf_layouts import PDFLayouts, get_pdf_layouts
 from .image_exporter import ImageExporter
 
+# Whole-report cache (report hash -> PDF bytes)
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "64"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REPORT_STREAM_CHUNK_SIZE = int(os.getenv("REPORT_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+_report_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_report_cache_bytes = 0
+_report_cache_lock = threading.Lock()
+_report_cache_stats = {"hits": 0, "misses": 0}
+
+
+def report_cache_key(data: Dict[str, Any]) -> str:
+    """
+    Content hash of the report data.
+    
+    Includes the generation date, since the cover page prints it.
+    """
+    payload = json.dumps(data, sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode('utf-8'))
+    digest.update(datetime.now().strftime("%Y-%m-%d").encode('ascii'))
+    return digest.hexdigest()
+
+
+def get_cached_report(key: str) -> Optional[bytes]:
+    """Cached PDF bytes for a report hash, if any"""
+    with _report_cache_lock:
+        pdf_bytes = _report_cache.get(key)
+        if pdf_bytes is None:
+            _report_cache_stats["misses"] += 1
+            return None
+        _report_cache.move_to_end(key)
+        _report_cache_stats["hits"] += 1
+        return pdf_bytes
+
+
+def cache_report(key: str, pdf_bytes: bytes) -> None:
+    """Store PDF bytes, evicting least recently used reports over the limits"""
+    global _report_cache_bytes
+    if len(pdf_bytes) > REPORT_CACHE_MAX_BYTES:
+        return
+    with _report_cache_lock:
+        previous = _report_cache.pop(key, None)
+        _report_cache_bytes -= len(previous) if previous else 0
+        _report_cache[key] = pdf_bytes
+        _report_cache_bytes += len(pdf_bytes)
+        while len(_report_cache) > REPORT_CACHE_SIZE or _report_cache_bytes > REPORT_CACHE_MAX_BYTES:
+            _, evicted = _report_cache.popitem(last=False)
+            _report_cache_bytes -= len(evicted)
+
+
+def get_report_cache_info() -> Dict[str, int]:
+    """Report cache statistics"""
+    with _report_cache_lock:
+        return {**_report_cache_stats, "size": len(_report_cache), "bytes": _report_cache_bytes}
+
+
+def clear_report_cache() -> None:
+    """Drop all cached reports"""
+    global _report_cache_bytes
+    with _report_cache_lock:
+        _report_cache.clear()
+        _report_cache_bytes = 0
+        _report_cache_stats.update(hits=0, misses=0)
+
+
+def iter_pdf_chunks(pdf_bytes: bytes, chunk_size: int = REPORT_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a finished PDF in chunks for a streaming response"""
+    view = memoryview(pdf_bytes)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
 
 class PDFReportBuilder:
     """Enterprise PDF report builder"""
     
-    def __init__(self):
-        """Initialize PDF builder"""
-        self.layouts = PDFLayouts()
+    def __init__(self, layouts: Optional[PDFLayouts] = None):
+        """
+        Initialize PDF builder
+        
+        Args:
+            layouts: Layouts to use; defaults to the shared, pre-built layouts
+        """
+        self.layouts = layouts or get_pdf_layouts()
         self.image_exporter = ImageExporter()
         self.styles = self.layouts.styles
         self.margins = self.layouts.get_margins()
@@ -45,6 +132,31 @@ class PDFReportBuilder:
         Returns:
             BytesIO buffer containing PDF
         """
+        return BytesIO(self.generate_report_bytes(data))
+    
+    def generate_report_bytes(self, data: Dict[str, Any], use_cache: bool = True) -> bytes:
+        """
+        Generate a PDF report, reusing a cached copy of identical reports
+        
+        Args:
+            data: Report data dictionary (see generate_report)
+            use_cache: Look up and store the report in the report cache
+            
+        Returns:
+            PDF bytes
+        """
+        if not use_cache:
+            return self._render(data)
+        
+        key = report_cache_key(data)
+        pdf_bytes = get_cached_report(key)
+        if pdf_bytes is None:
+            pdf_bytes = self._render(data)
+            cache_report(key, pdf_bytes)
+        return pdf_bytes
+    
+    def _render(self, data: Dict[str, Any]) -> bytes:
+        """Build the PDF with ReportLab"""
         buffer = BytesIO()
         
         # Create PDF document
@@ -101,8 +213,7 @@ class PDFReportBuilder:
         # Build PDF
         doc.build(story, onFirstPage=self._add_footer, onLaterPages=self._add_footer)
         
-        buffer.seek(0)
-        return buffer
+        return buffer.getvalue()
     
     def _build_cover_page(self, data: Dict[str, Any]) -> List:
         """Build cover page"""
@@ -128,7 +239,8 @@ class PDFReportBuilder:
         # Risk Score (large)
         risk_score = data.get('risk_score', 0)
         score_color = self.layouts.get_risk_color(risk_score)
-        score_style = self.styles['RiskScore']
+        # Copy: the shared stylesheet must not carry one report's color into the next
+        score_style = copy.copy(self.styles['RiskScore'])
         score_style.textColor = score_color
         
         score_text = Paragraph(
@@ -674,21 +786,24 @@ class PDFReportBuilder:
         canvas.restoreState()
 
 
+_builder: Optional[PDFReportBuilder] = None
+_builder_lock = threading.Lock()
 
 
+def get_pdf_builder() -> PDFReportBuilder:
+    """Get the shared PDF report builder"""
+    global _builder
+    if _builder is None:
+        with _builder_lock:
+            if _builder is None:
+                _builder = PDFReportBuilder()
+    return _builder
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def render_pdf_report(data: Dict[str, Any]) -> bytes:
+    """
+    Render a report with the shared builder (uncached)
+    
+    Module-level so it can be dispatched to the compute executor.
+    """
+    return get_pdf_builder().generate_report_bytes(data, use_cache=False)
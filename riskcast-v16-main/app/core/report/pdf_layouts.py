@@ -9,7 +9,8 @@ from reportlab.lib.units import inch, mm  # type: ignore
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle  # type: ignore
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY  # type: ignore
 from reportlab.platypus import Paragraph, Spacer, PageBreak, Image as RLImage  # type: ignore
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+import threading
 
 # Color theme
 PRIMARY_COLOR = '#00FFC8'  # Neon cyan
@@ -101,8 +102,8 @@ class PDFLayouts:
             fontName=FONT_BOLD,
         ))
         
-        # Body text
-        self.styles.add(ParagraphStyle(
+        # Body text (replaces the sample sheet's BodyText; add() rejects duplicates)
+        self.styles.byName['BodyText'] = (ParagraphStyle(
             name='BodyText',
             parent=self.styles['Normal'],
             fontSize=11,
@@ -206,21 +207,16 @@ class PDFLayouts:
         return Spacer(1, height)
 
 
+_layouts: Optional[PDFLayouts] = None
+_layouts_lock = threading.Lock()
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+def get_pdf_layouts() -> PDFLayouts:
+    """Get the shared layouts (stylesheet is built once per process)"""
+    global _layouts
+    if _layouts is None:
+        with _layouts_lock:
+            if _layouts is None:
+                _layouts = PDFLayouts()
+    return _layouts
 
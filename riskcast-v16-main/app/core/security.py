@@ -5,12 +5,323 @@ RISKCAST v17 - Production Security
 """
 
 from fastapi import Header, HTTPException, Depends, Request
-from typing import Optional, Callable
+from typing import Any, Dict, List, Optional, Callable, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
+import asyncio
 import hmac
 import hashlib
 import json
 import os
+import threading
+
+from app.core.utils.cache import LRUTTLCache
+
+
+# Verified-key cache: revocation/regeneration invalidates the local entry
+# immediately; other worker processes pick the change up within the TTL.
+API_KEY_CACHE_TTL = int(os.getenv("API_KEY_CACHE_TTL", "60"))  # Seconds
+API_KEY_NEGATIVE_CACHE_TTL = int(os.getenv("API_KEY_NEGATIVE_CACHE_TTL", "5"))  # Unknown keys
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+API_KEY_USAGE_FLUSH_INTERVAL = float(os.getenv("API_KEY_USAGE_FLUSH_INTERVAL", "10"))  # Seconds
+
+
+# ============================================================
+# VERIFIED KEY CACHE
+# ============================================================
+
+@dataclass
+class CachedAPIKey:
+    """
+    Detached snapshot of a verified APIKey row.
+    
+    Safe to share between requests (no database session attached). Exposes
+    the same read API as APIKey (has_scope, is_valid, record_usage, ...).
+    """
+    id: int
+    key_hash: str
+    key_prefix: str
+    name: str
+    user_id: Optional[str]
+    organization_id: Optional[str]
+    scopes: List[str] = field(default_factory=list)
+    expires_at: Optional[datetime] = None
+    revoked: bool = False
+    revoked_at: Optional[datetime] = None
+    revoked_reason: Optional[str] = None
+    rate_limit_requests: Optional[int] = None
+    rate_limit_window: Optional[int] = None
+    
+    @classmethod
+    def from_model(cls, api_key) -> 'CachedAPIKey':
+        return cls(
+            id=api_key.id,
+            key_hash=api_key.key_hash,
+            key_prefix=api_key.key_prefix,
+            name=api_key.name,
+            user_id=api_key.user_id,
+            organization_id=api_key.organization_id,
+            scopes=api_key.get_scopes(),
+            expires_at=api_key.expires_at,
+            revoked=bool(api_key.revoked),
+            revoked_at=api_key.revoked_at,
+            revoked_reason=api_key.revoked_reason,
+            rate_limit_requests=api_key.rate_limit_requests,
+            rate_limit_window=api_key.rate_limit_window
+        )
+    
+    def is_valid(self) -> bool:
+        """Check if API key is still valid (expiry is re-checked on every call)."""
+        if self.revoked:
+            return False
+        if self.expires_at and self.expires_at < datetime.utcnow():
+            return False
+        return True
+    
+    def get_scopes(self) -> List[str]:
+        return list(self.scopes)
+    
+    def has_scope(self, required_scope: str) -> bool:
+        """Same matching rules as APIKey.has_scope (wildcard and 'prefix:*')."""
+        if '*' in self.scopes or required_scope in self.scopes:
+            return True
+        for scope in self.scopes:
+            if scope.endswith(':*') and required_scope.startswith(scope[:-2]):
+                return True
+        return False
+    
+    def record_usage(self):
+        """Count a request (aggregated in memory, flushed in batches)."""
+        get_usage_aggregator().record(self.id)
+
+
+_UNKNOWN_KEY = object()  # Negative-cache marker
+_verified_key_cache = LRUTTLCache(
+    max_entries=API_KEY_CACHE_MAX_ENTRIES,
+    max_bytes=16 * 1024 * 1024,
+    default_ttl=API_KEY_CACHE_TTL
+)
+
+
+def invalidate_api_key(key_hash: Optional[str] = None) -> int:
+    """
+    Drop verified-key cache entries.
+    
+    Call after revoking or regenerating a key so the change takes effect
+    immediately in this process.
+    
+    Args:
+        key_hash: Hash of the key to drop (None clears the whole cache)
+    
+    Returns:
+        Number of entries removed
+    """
+    if key_hash is None:
+        return _verified_key_cache.clear()
+    return 1 if _verified_key_cache.delete(key_hash) else 0
+
+
+def _lookup_api_key(key_hash: str) -> Any:
+    """
+    Load a key by hash (runs in a worker thread).
+    
+    Returns:
+        CachedAPIKey, None if unknown, or a MockAPIKey if the database is unavailable
+    """
+    from app.models.api_key import APIKey
+    
+    # Try to get database session
+    try:
+        from app.database import get_db
+        db_gen = get_db()
+        db = next(db_gen)
+    except Exception:
+        # If database not available, use simple validation
+        # In production, this should always use the database
+        print("[Security] Warning: Database not available for API key validation")
+        # Return a mock object for development
+        class MockAPIKey:
+            user_id = "dev_user"
+            organization_id = "dev_org"
+            def has_scope(self, scope): return True
+            def record_usage(self): pass
+            def is_valid(self): return True
+        return MockAPIKey()
+    
+    try:
+        api_key = db.query(APIKey).filter(APIKey.key_hash == key_hash).first()
+        return CachedAPIKey.from_model(api_key) if api_key else None
+    finally:
+        db_gen.close()
+
+
+def get_api_key_cache_stats() -> Dict[str, Any]:
+    """Verified-key cache and pending usage statistics."""
+    return {
+        "cache": _verified_key_cache.stats(),
+        "usage": get_usage_aggregator().get_stats()
+    }
+
+
+# ============================================================
+# USAGE AGGREGATION
+# ============================================================
+
+class APIKeyUsageAggregator:
+    """
+    In-memory request counters for API keys.
+    
+    record() only bumps a dict entry; a background thread writes the
+    accumulated counts and latest last_used_at every flush_interval seconds
+    as one batched UPDATE (request_count = request_count + n), so
+    authentication does no per-request write. Counts from a failed flush
+    are merged back and retried.
+    """
+    
+    def __init__(self, flush_interval: float = API_KEY_USAGE_FLUSH_INTERVAL,
+                 session_factory: Optional[Callable[[], Any]] = None):
+        self.flush_interval = flush_interval
+        self._session_factory = session_factory
+        self._pending: Dict[int, Tuple[int, datetime]] = {}  # {key_id: (count, last_used_at)}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._stats = {"recorded": 0, "flushed": 0, "flushes": 0, "flush_errors": 0}
+    
+    def record(self, key_id: int, when: Optional[datetime] = None):
+        """Count one request for key_id."""
+        when = when or datetime.utcnow()
+        with self._lock:
+            count, last_used = self._pending.get(key_id, (0, when))
+            self._pending[key_id] = (count + 1, max(last_used, when))
+            self._stats["recorded"] += 1
+            if self._worker is None and not self._stop.is_set():
+                self._worker = threading.Thread(target=self._run, name="api-key-usage-flush", daemon=True)
+                self._worker.start()
+    
+    def get_pending(self, key_id: int) -> Tuple[int, Optional[datetime]]:
+        """Unflushed (count, last_used_at) for a key in this process."""
+        with self._lock:
+            return self._pending.get(key_id, (0, None))
+    
+    def flush(self) -> int:
+        """
+        Write pending counters now.
+        
+        Returns:
+            Number of keys updated
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"[Security] API key usage flush failed ({len(batch)} keys), will retry: {e}")
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                    for key_id, (count, last_used) in batch.items():
+                        pending_count, pending_last = self._pending.get(key_id, (0, last_used))
+                        self._pending[key_id] = (pending_count + count, max(pending_last, last_used))
+                return 0
+            
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["flushed"] += sum(count for count, _ in batch.values())
+            return len(batch)
+    
+    def close(self):
+        """Stop the background thread and flush what is left."""
+        self._stop.set()
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout=5)
+        self.flush()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "pending_keys": len(self._pending),
+                "pending_requests": sum(count for count, _ in self._pending.values()),
+                "flush_interval": self.flush_interval
+            }
+    
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+    
+    def _write(self, batch: Dict[int, Tuple[int, datetime]]):
+        """One executemany UPDATE for the whole batch."""
+        from sqlalchemy import bindparam, case, func, update
+        from app.models.api_key import APIKey
+        
+        if self._session_factory is None:
+            from app.database import SessionLocal
+            self._session_factory = SessionLocal
+        
+        table = APIKey.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                # request_count may be NULL on rows created outside the ORM
+                request_count=func.coalesce(table.c.request_count, 0) + bindparam("b_count"),
+                last_used_at=case(
+                    (table.c.last_used_at.is_(None), bindparam("b_last_used")),
+                    (table.c.last_used_at < bindparam("b_last_used"), bindparam("b_last_used")),
+                    else_=table.c.last_used_at
+                )
+            )
+        )
+        rows = [
+            {"b_id": key_id, "b_count": count, "b_last_used": last_used}
+            for key_id, (count, last_used) in sorted(batch.items())  # Stable lock order
+        ]
+        
+        db = self._session_factory()
+        try:
+            db.connection().execute(stmt, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+_usage_aggregator: Optional[APIKeyUsageAggregator] = None
+_usage_aggregator_lock = threading.Lock()
+
+
+def get_usage_aggregator() -> APIKeyUsageAggregator:
+    """Get the process-wide usage aggregator."""
+    global _usage_aggregator
+    if _usage_aggregator is None:
+        with _usage_aggregator_lock:
+            if _usage_aggregator is None:
+                _usage_aggregator = APIKeyUsageAggregator()
+    return _usage_aggregator
+
+
+def flush_api_key_usage(close: bool = False) -> int:
+    """
+    Flush aggregated usage counters (application shutdown hook).
+    
+    Args:
+        close: Also stop the background flush thread
+    """
+    if _usage_aggregator is None:
+        return 0
+    if close:
+        pending = _usage_aggregator.get_stats()["pending_keys"]
+        _usage_aggregator.close()
+        return pending
+    return _usage_aggregator.flush()
 
 
 # ============================================================
@@ -27,11 +338,16 @@ async def verify_api_key(
     Usage:
         @router.get("/protected")
         async def protected_endpoint(api_key = Depends(verify_api_key)):
-            # api_key is validated APIKey object
+            # api_key is a validated CachedAPIKey
             return {"user_id": api_key.user_id}
     
+    Verified keys are cached for API_KEY_CACHE_TTL seconds (unknown keys
+    for API_KEY_NEGATIVE_CACHE_TTL), so only cache misses touch the database,
+    and that lookup runs in a worker thread. Usage counters are aggregated
+    in memory and flushed in batches instead of committed per request.
+    
     Returns:
-        APIKey object if valid
+        CachedAPIKey snapshot if valid
     
     Raises:
         HTTPException 401 if key is missing or invalid
@@ -56,72 +372,59 @@ async def verify_api_key(
             }
         )
     
-    try:
-        # Import here to avoid circular imports
-        from app.models.api_key import APIKey
-        
-        # Try to get database session
+    from app.models.api_key import APIKey
+    
+    # Hash the provided key
+    key_hash = APIKey.hash_key(x_api_key)
+    
+    api_key = _verified_key_cache.get(key_hash)
+    if api_key is None:
         try:
-            from app.database import get_db
-            db = next(get_db())
-        except Exception:
-            # If database not available, use simple validation
-            # In production, this should always use the database
-            print("[Security] Warning: Database not available for API key validation")
-            # Return a mock object for development
-            class MockAPIKey:
-                user_id = "dev_user"
-                organization_id = "dev_org"
-                def has_scope(self, scope): return True
-                def record_usage(self): pass
-                def is_valid(self): return True
-            return MockAPIKey()
-        
-        # Hash the provided key
-        key_hash = APIKey.hash_key(x_api_key)
-        
-        # Look up in database
-        api_key = db.query(APIKey).filter(APIKey.key_hash == key_hash).first()
-        
-        if not api_key:
+            # Database lookup off the event loop; cached for API_KEY_CACHE_TTL
+            api_key = await asyncio.to_thread(_lookup_api_key, key_hash)
+        except Exception as e:
+            print(f"[Security] Error validating API key: {e}")
             raise HTTPException(
-                status_code=401,
-                detail={'error': 'Invalid API key'}
+                status_code=500,
+                detail={'error': 'Error validating API key'}
             )
         
-        if not api_key.is_valid():
-            if api_key.revoked:
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        'error': 'API key revoked',
-                        'revoked_at': api_key.revoked_at.isoformat() if api_key.revoked_at else None,
-                        'reason': api_key.revoked_reason
-                    }
-                )
-            else:
-                raise HTTPException(
-                    status_code=403,
-                    detail={
-                        'error': 'API key expired',
-                        'expired_at': api_key.expires_at.isoformat() if api_key.expires_at else None
-                    }
-                )
-        
-        # Update usage stats
-        api_key.record_usage()
-        db.commit()
-        
-        return api_key
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"[Security] Error validating API key: {e}")
+        if api_key is None:
+            _verified_key_cache.set(key_hash, _UNKNOWN_KEY, ttl=API_KEY_NEGATIVE_CACHE_TTL)
+        elif isinstance(api_key, CachedAPIKey):
+            _verified_key_cache.set(key_hash, api_key)
+        else:
+            return api_key  # Development fallback (no database)
+    
+    if api_key is None or api_key is _UNKNOWN_KEY:
         raise HTTPException(
-            status_code=500,
-            detail={'error': 'Error validating API key'}
+            status_code=401,
+            detail={'error': 'Invalid API key'}
         )
+    
+    if not api_key.is_valid():
+        if api_key.revoked:
+            raise HTTPException(
+                status_code=403,
+                detail={
+                    'error': 'API key revoked',
+                    'revoked_at': api_key.revoked_at.isoformat() if api_key.revoked_at else None,
+                    'reason': api_key.revoked_reason
+                }
+            )
+        else:
+            raise HTTPException(
+                status_code=403,
+                detail={
+                    'error': 'API key expired',
+                    'expired_at': api_key.expires_at.isoformat() if api_key.expires_at else None
+                }
+            )
+    
+    # Update usage stats (aggregated, flushed in batches)
+    api_key.record_usage()
+    
+    return api_key
 
 
 def require_scope(required_scope: str) -> Callable:
@@ -12,8 +12,11 @@ ARCHITECTURE:
 import os
 import json
 import hashlib
+import sqlite3
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import logging
 
@@ -25,6 +28,8 @@ USE_MYSQL = os.getenv("USE_MYSQL", "false").lower() == "true"
 # File-based storage configuration
 STATE_STORAGE_DIR = Path(__file__).parent.parent.parent / "data" / "state"
 STATE_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+STATE_MANIFEST_FILE = "_manifest.sqlite3"
+STATE_MANIFEST_TIMEOUT = float(os.getenv("STATE_MANIFEST_TIMEOUT", "10"))
 
 
 def generate_shipment_id(state: Dict[str, Any]) -> str:
@@ -60,10 +65,189 @@ def generate_shipment_id(state: Dict[str, Any]) -> str:
     return shipment_id
 
 
+# ============================================================
+# FILE-BASED MANIFEST
+# ============================================================
+
+class StateManifest:
+    """
+    Compact SQLite index of the file-based state store.
+
+    Keeps shipment_id -> created_at / updated_at / size so listing and
+    pagination never open the state files, and saves can preserve
+    created_at without re-reading the previous file. The manifest is
+    rebuilt from the state files when it is created, when it indexes
+    fewer shipments than there are files at start-up, and after a save
+    whose index update failed.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / STATE_MANIFEST_FILE
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stale = False  # Set when a save could not be indexed
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        is_new = not self.path.exists()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shipments ("
+                " shipment_id TEXT PRIMARY KEY,"
+                " created_at TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL,"
+                " size INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_shipments_updated_at"
+                " ON shipments (updated_at DESC, shipment_id)"
+            )
+        if is_new or self.count() < sum(1 for _ in self.directory.glob("*.json")):
+            self.rebuild()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Per-thread connection to the manifest database."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=STATE_MANIFEST_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, shipment_id: str) -> Optional[Dict[str, Any]]:
+        """Manifest entry for a shipment, or None if not indexed."""
+        self._refresh()
+        row = self._connect().execute(
+            "SELECT shipment_id, created_at, updated_at, size FROM shipments WHERE shipment_id = ?",
+            (shipment_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def upsert(self, shipment_id: str, created_at: str, updated_at: str, size: int) -> None:
+        """Record a save; an existing created_at is kept."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO shipments (shipment_id, created_at, updated_at, size) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT(shipment_id) DO UPDATE SET"
+                " updated_at = excluded.updated_at, size = excluded.size",
+                (shipment_id, created_at, updated_at, size)
+            )
+
+    def mark_stale(self) -> None:
+        """Rebuild from the state files before the next listing."""
+        self._stale = True
+
+    def _refresh(self) -> None:
+        if self._stale:
+            self._stale = False
+            try:
+                self.rebuild()
+            except Exception:
+                self._stale = True
+                raise
+
+    def list(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Shipments ordered by most recently updated
+
+        Args:
+            limit: Maximum number of entries
+            offset: Number of entries to skip
+
+        Returns:
+            List of shipment metadata
+        """
+        self._refresh()
+        rows = self._connect().execute(
+            "SELECT shipment_id, created_at, updated_at, size FROM shipments"
+            " ORDER BY updated_at DESC, shipment_id LIMIT ? OFFSET ?",
+            (max(int(limit), 0), max(int(offset), 0))
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def count(self) -> int:
+        """Number of indexed shipments."""
+        self._refresh()
+        return self._connect().execute("SELECT COUNT(*) FROM shipments").fetchone()[0]
+
+    def rebuild(self) -> int:
+        """
+        Re-index every state file in the directory.
+
+        Returns:
+            Number of shipments indexed
+        """
+        entries = []
+        for state_file in self.directory.glob("*.json"):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                fallback = datetime.utcfromtimestamp(state_file.stat().st_mtime).isoformat() + "Z"
+                entries.append((
+                    data.get("shipment_id", state_file.stem),
+                    data.get("created_at") or fallback,
+                    data.get("updated_at") or fallback,
+                    state_file.stat().st_size
+                ))
+            except Exception as e:
+                logger.warning(f"[State Storage] Error indexing {state_file}: {e}")
+
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM shipments")
+            conn.executemany(
+                "INSERT OR REPLACE INTO shipments (shipment_id, created_at, updated_at, size) VALUES (?, ?, ?, ?)",
+                entries
+            )
+        logger.info(f"[State Storage] Rebuilt manifest with {len(entries)} shipments")
+        return len(entries)
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict[str, Any]:
+        return {"shipment_id": row[0], "created_at": row[1], "updated_at": row[2], "size": row[3]}
+
+
+_manifest: Optional[StateManifest] = None
+_manifest_lock = threading.Lock()
+
+
+def get_state_manifest() -> StateManifest:
+    """Get the manifest for the current state storage directory."""
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None or _manifest.directory != Path(STATE_STORAGE_DIR):
+            _manifest = StateManifest(STATE_STORAGE_DIR)
+        return _manifest
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    """Write a file via a temp file in the same directory and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# ============================================================
+# FILE-BASED STORAGE
+# ============================================================
+
 def save_state_file_based(shipment_id: str, state: Dict[str, Any]) -> bool:
     """
     Save state to file-based storage
-    
+
+    The state file is replaced atomically and the manifest updated;
+    created_at comes from the manifest, not from the previous file.
+
     Args:
         shipment_id: Shipment identifier
         state: RISKCAST_STATE dictionary
@@ -72,23 +256,25 @@ def save_state_file_based(shipment_id: str, state: Dict[str, Any]) -> bool:
         True if successful
     """
     try:
-        # Add metadata
+        manifest = get_state_manifest()
+        now = datetime.utcnow().isoformat() + "Z"
+        entry = manifest.get(shipment_id)
+
         state_with_meta = {
             "shipment_id": shipment_id,
             "state": state,
-            "updated_at": datetime.utcnow().isoformat() + "Z",
-            "created_at": datetime.utcnow().isoformat() + "Z"  # Will be updated if file exists
+            "updated_at": now,
+            "created_at": entry["created_at"] if entry else now
         }
-        
-        # Load existing to preserve created_at
-        existing = load_state_file_based(shipment_id)
-        if existing and "created_at" in existing:
-            state_with_meta["created_at"] = existing["created_at"]
-        
-        # Save to file
-        state_file = STATE_STORAGE_DIR / f"{shipment_id}.json"
-        with open(state_file, 'w', encoding='utf-8') as f:
-            json.dump(state_with_meta, f, indent=2, ensure_ascii=False)
+        payload = json.dumps(state_with_meta, indent=2, ensure_ascii=False).encode('utf-8')
+
+        _write_atomic(Path(STATE_STORAGE_DIR) / f"{shipment_id}.json", payload)
+        try:
+            manifest.upsert(shipment_id, state_with_meta["created_at"], now, len(payload))
+        except sqlite3.Error as e:
+            # The state file is saved; re-index from the files on the next listing
+            logger.warning(f"[State Storage] Could not index shipment {shipment_id}: {e}")
+            manifest.mark_stale()
         
         logger.info(f"[State Storage] Saved state for shipment {shipment_id}")
         return True
@@ -109,7 +295,7 @@ def load_state_file_based(shipment_id: str) -> Optional[Dict[str, Any]]:
         State dictionary with metadata or None if not found
     """
     try:
-        state_file = STATE_STORAGE_DIR / f"{shipment_id}.json"
+        state_file = Path(STATE_STORAGE_DIR) / f"{shipment_id}.json"
         
         if not state_file.exists():
             return None
@@ -167,43 +353,57 @@ def load_state(shipment_id: str) -> Optional[Dict[str, Any]]:
         return load_state_file_based(shipment_id)
 
 
-def list_shipments(limit: int = 100) -> list:
+def list_shipments(limit: int = 100, offset: int = 0) -> list:
     """
     List recent shipments
     
     Args:
         limit: Maximum number of shipments to return
+        offset: Number of shipments to skip (for pagination)
         
     Returns:
         List of shipment metadata
     """
-    shipments = []
-    
     try:
         if USE_MYSQL:
             try:
                 from app.core.state_storage_mysql import list_shipments_mysql
-                return list_shipments_mysql(limit)
+                return list_shipments_mysql(limit, offset)
             except ImportError:
                 pass
         
-        # File-based: list all state files
-        for state_file in sorted(STATE_STORAGE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
-            try:
-                with open(state_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    shipments.append({
-                        "shipment_id": data.get("shipment_id", state_file.stem),
-                        "updated_at": data.get("updated_at"),
-                        "created_at": data.get("created_at")
-                    })
-                    if len(shipments) >= limit:
-                        break
-            except Exception as e:
-                logger.warning(f"[State Storage] Error reading {state_file}: {e}")
+        # File-based: served from the manifest, newest first
+        return [
+            {
+                "shipment_id": entry["shipment_id"],
+                "updated_at": entry["updated_at"],
+                "created_at": entry["created_at"]
+            }
+            for entry in get_state_manifest().list(limit, offset)
+        ]
         
     except Exception as e:
         logger.error(f"[State Storage] Error listing shipments: {e}")
-    
-    return shipments
+        return []
+
+
+def count_shipments() -> int:
+    """
+    Total number of stored shipments
 
+    Returns:
+        Shipment count (0 on error)
+    """
+    try:
+        if USE_MYSQL:
+            try:
+                from app.core.state_storage_mysql import count_shipments_mysql
+                return count_shipments_mysql()
+            except ImportError:
+                pass
+
+        return get_state_manifest().count()
+
+    except Exception as e:
+        logger.error(f"[State Storage] Error counting shipments: {e}")
+        return 0
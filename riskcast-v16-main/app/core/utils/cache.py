@@ -8,12 +8,21 @@ ARCHITECTURE:
 - Cache key generated from normalized RiskRequest (hash)
 - TTL configurable via environment
 - Same inputs return cached results (within tolerance)
+- In-memory backend is bounded: LRU + TTL eviction under an entry limit and
+  an approximate byte budget, thread-safe (compute-executor threads share it)
+- Single-flight: concurrent identical requests that miss the cache share
+  one in-flight computation instead of each running the full simulation
 """
+import asyncio
 import os
 import hashlib
 import json
+import sys
+import threading
 import time
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
 from functools import lru_cache
 import logging
 
@@ -26,6 +35,9 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 # Cache configuration
 CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))  # Default 1 hour
 CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # Default 64 MB
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
 
 # Initialize Redis client if enabled
 redis_client = None
@@ -43,8 +55,173 @@ if USE_REDIS:
         logger.warning(f"[Cache] Redis connection failed: {e}, falling back to in-memory cache")
         USE_REDIS = False
 
+
+
+def approximate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """
+    Approximate deep size of a cached value in bytes
+    
+    Walks dicts, lists, tuples and sets (the shapes engine results are built
+    from) and sums sys.getsizeof; shared objects are counted once.
+    
+    Args:
+        obj: Value to measure
+        
+    Returns:
+        Approximate size in bytes
+    """
+    if _seen is None:
+        _seen = set()
+    obj_id = id(obj)
+    if obj_id in _seen:
+        return 0
+    _seen.add(obj_id)
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += approximate_size(k, _seen) + approximate_size(v, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += approximate_size(item, _seen)
+    elif hasattr(obj, 'nbytes'):
+        # numpy arrays: getsizeof may not include a non-owned buffer
+        size = max(size, int(obj.nbytes))
+    return size
+
+
+class LRUTTLCache:
+    """
+    Bounded in-memory cache with LRU + TTL eviction
+    
+    Entries expire after their TTL; when the entry limit or byte budget is
+    exceeded the least recently used entries are evicted. All operations
+    are guarded by a lock so thread-pool workers can share the cache.
+    """
+    
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 default_ttl: int = CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()  # {key: (value, expires_at, size)}
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._rejected = 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value (marking it recently used) or None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at, _ = entry
+            if time.time() >= expires_at:
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        Store a value, evicting expired then least recently used entries
+        
+        Returns:
+            False if the value alone exceeds the byte budget (not cached)
+        """
+        size = approximate_size(value)
+        expires_at = time.time() + (ttl or self.default_ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes:
+                self._rejected += 1
+                return False
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+            return True
+    
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+                return True
+            return False
+    
+    def clear(self, prefix: Optional[str] = None) -> int:
+        """Remove all entries (or those whose key starts with prefix)"""
+        with self._lock:
+            if prefix is None:
+                cleared = len(self._data)
+                self._data.clear()
+                self._bytes = 0
+                return cleared
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                self._remove(k)
+            return len(keys)
+    
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and time.time() < entry[1]
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+    
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "keys": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "rejected_oversize": self._rejected,
+            }
+    
+    def _remove(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+    
+    def _evict(self) -> None:
+        """Drop expired entries, then LRU entries until within limits (lock held)"""
+        if len(self._data) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        now = time.time()
+        for k in [k for k, (_, exp, _) in self._data.items() if now >= exp]:
+            self._remove(k)
+            self._expirations += 1
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self._evictions += 1
+
+
 # In-memory cache (fallback or default)
-_memory_cache: Dict[str, tuple] = {}  # {cache_key: (data, timestamp)}
+_memory_cache = LRUTTLCache()
+
+# Redis backend hit/miss counters (memory backend keeps its own)
+_redis_stats = {"hits": 0, "misses": 0}
 
 
 def normalize_request_for_cache(request: Dict[str, Any]) -> Dict[str, Any]:
@@ -136,17 +313,12 @@ def get_cache(key: str) -> Optional[Dict[str, Any]]:
             # Redis backend
             cached = redis_client.get(key)
             if cached:
+                _redis_stats["hits"] += 1
                 return json.loads(cached)
+            _redis_stats["misses"] += 1
         else:
-            # In-memory backend
-            if key in _memory_cache:
-                data, timestamp = _memory_cache[key]
-                # Check TTL
-                if time.time() - timestamp < CACHE_TTL:
-                    return data
-                else:
-                    # Expired, remove from cache
-                    del _memory_cache[key]
+            # In-memory backend (LRU + TTL)
+            return _memory_cache.get(key)
     except Exception as e:
         logger.warning(f"[Cache] Error getting cache key {key}: {e}")
     
@@ -172,21 +344,133 @@ def set_cache(key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> Non
             # Redis backend
             redis_client.setex(key, ttl, json.dumps(value))
         else:
-            # In-memory backend
-            _memory_cache[key] = (value, time.time())
-            # Simple cleanup: remove expired entries if cache gets too large
-            if len(_memory_cache) > 1000:
-                current_time = time.time()
-                expired_keys = [
-                    k for k, (_, ts) in _memory_cache.items()
-                    if current_time - ts >= ttl
-                ]
-                for k in expired_keys:
-                    del _memory_cache[k]
+            # In-memory backend (evicts expired / LRU entries to stay in budget)
+            if not _memory_cache.set(key, value, ttl):
+                logger.warning(f"[Cache] Value for {key[:32]} exceeds CACHE_MAX_BYTES, not cached")
     except Exception as e:
         logger.warning(f"[Cache] Error setting cache key {key}: {e}")
 
 
+# ============================
+# SINGLE-FLIGHT (request coalescing)
+# ============================
+
+_flight_lock = threading.Lock()
+_sync_flights: Dict[str, Future] = {}
+_async_flights: Dict[str, "asyncio.Task"] = {}
+_flight_stats = {"leaders": 0, "coalesced": 0, "errors": 0}
+
+
+def _record_flight(stat: str) -> None:
+    with _flight_lock:
+        _flight_stats[stat] += 1
+
+
+def single_flight(key: str, compute: Callable[[], Any]) -> Any:
+    """
+    Run compute() once per key across concurrent threads
+    
+    The first caller for a key (the leader) runs compute(); callers arriving
+    while it is in flight block and receive the leader's result (or its
+    exception). Nothing is retained once the call finishes - pair with
+    set_cache() for reuse across time.
+    
+    Args:
+        key: Coalescing key (normally generate_cache_key(request))
+        compute: Zero-argument callable producing the result
+        
+    Returns:
+        Result of the (shared) computation
+    """
+    if not SINGLE_FLIGHT_ENABLED:
+        return compute()
+    
+    with _flight_lock:
+        flight = _sync_flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = Future()
+            _sync_flights[key] = flight
+            _flight_stats["leaders"] += 1
+        else:
+            _flight_stats["coalesced"] += 1
+    
+    if not leader:
+        return flight.result()
+    
+    try:
+        result = compute()
+    except BaseException as e:
+        _record_flight("errors")
+        flight.set_exception(e)
+        raise
+    else:
+        flight.set_result(result)
+        return result
+    finally:
+        with _flight_lock:
+            _sync_flights.pop(key, None)
+
+
+async def single_flight_async(key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Async counterpart of single_flight for coroutine computations
+    
+    The computation runs as its own task, so a caller that is cancelled
+    (e.g. request timeout) does not cancel the work other callers await.
+    
+    Args:
+        key: Coalescing key (normally generate_cache_key(request))
+        compute: Zero-argument callable returning an awaitable
+        
+    Returns:
+        Result of the (shared) computation
+    """
+    if not SINGLE_FLIGHT_ENABLED:
+        return await compute()
+    
+    loop = asyncio.get_running_loop()
+    with _flight_lock:
+        task = _async_flights.get(key)
+        if task is not None and task.get_loop() is not loop:
+            task = None  # Stale entry from another event loop
+        if task is None:
+            task = loop.create_task(compute())
+            _async_flights[key] = task
+            _flight_stats["leaders"] += 1
+            
+            def _done(t: "asyncio.Task", _key: str = key) -> None:
+                with _flight_lock:
+                    if _async_flights.get(_key) is t:
+                        del _async_flights[_key]
+                    if not t.cancelled() and t.exception() is not None:
+                        _flight_stats["errors"] += 1
+            
+            task.add_done_callback(_done)
+        else:
+            _flight_stats["coalesced"] += 1
+    
+    return await asyncio.shield(task)
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """
+    Coalescing statistics
+    
+    Returns:
+        leaders (computations run), coalesced (duplicate calls that shared a
+        leader's result instead of computing), in-flight count and the
+        fraction of calls deduplicated
+    """
+    with _flight_lock:
+        stats = dict(_flight_stats)
+        stats["in_flight"] = len(_sync_flights) + len(_async_flights)
+    total = stats["leaders"] + stats["coalesced"]
+    stats["enabled"] = SINGLE_FLIGHT_ENABLED
+    stats["dedup_ratio"] = round(stats["coalesced"] / total, 4) if total else 0.0
+    return stats
+
+
 def clear_cache(pattern: Optional[str] = None) -> int:
     """
     Clear cache entries
@@ -216,15 +500,10 @@ def clear_cache(pattern: Optional[str] = None) -> int:
             # In-memory backend
             if pattern:
                 # Simple pattern matching (starts with)
-                prefix = pattern.replace("*", "")
-                keys_to_delete = [k for k in _memory_cache.keys() if k.startswith(prefix)]
-                for k in keys_to_delete:
-                    del _memory_cache[k]
-                    cleared += 1
+                cleared = _memory_cache.clear(prefix=pattern.replace("*", ""))
             else:
                 # Clear all
-                cleared = len(_memory_cache)
-                _memory_cache.clear()
+                cleared = _memory_cache.clear()
     except Exception as e:
         logger.warning(f"[Cache] Error clearing cache: {e}")
     
@@ -250,11 +529,15 @@ def get_cache_stats() -> Dict[str, Any]:
             info = redis_client.info("memory")
             stats["memory_used"] = info.get("used_memory_human", "unknown")
             stats["keys"] = redis_client.dbsize()
+            stats["hits"] = _redis_stats["hits"]
+            stats["misses"] = _redis_stats["misses"]
         else:
-            # Memory stats
-            stats["keys"] = len(_memory_cache)
-            stats["memory_used"] = "N/A (in-memory)"
+            # Memory stats (keys, bytes, hits/misses, evictions)
+            stats.update(_memory_cache.stats())
+            stats["memory_used"] = f"{stats['bytes'] / (1024 * 1024):.2f} MB (approx)"
     except Exception as e:
         logger.warning(f"[Cache] Error getting cache stats: {e}")
     
+    stats["single_flight"] = get_single_flight_stats()
+    
     return stats
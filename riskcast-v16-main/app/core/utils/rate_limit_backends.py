@@ -0,0 +1,398 @@
+"""
+RISKCAST - Rate Limit Backends
+GCRA (token bucket) rate limiting with pluggable state storage
+
+Every key holds a single float, the theoretical arrival time (TAT), so a
+check is O(1) in time and memory regardless of traffic. A limit of
+`limit` requests per `window` seconds behaves as a bucket of `limit`
+tokens refilled at limit/window tokens per second.
+
+Backends (RATE_LIMIT_BACKEND):
+- memory : in-process dict, LRU-bounded to RATE_LIMIT_MAX_KEYS keys
+- shared : mmap'd hash table shared by all workers on the host
+           (RATE_LIMIT_SHM_PATH, RATE_LIMIT_SHM_SLOTS), so N uvicorn
+           workers enforce one limit instead of N x limit
+- redis  : Lua script executed atomically in Redis (REDIS_URL), for
+           multi-host deployments; uses the Redis clock
+
+A backend that cannot be initialised falls back to "memory" with a warning.
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536"))  # 16 bytes per slot
+RATE_LIMIT_SHM_PATH = os.getenv(
+    "RATE_LIMIT_SHM_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "riskcast-ratelimit.bin")
+)
+RATE_LIMIT_REDIS_PREFIX = os.getenv("RATE_LIMIT_REDIS_PREFIX", "riskcast:rl:")
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one rate limit check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # Seconds until the next request would be allowed (0 if allowed)
+    reset_after: float  # Seconds until the bucket is full again
+
+    def headers(self) -> Dict[str, str]:
+        """X-RateLimit-* headers (Reset as a Unix timestamp)"""
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(int(time.time() + self.reset_after)),
+        }
+
+
+def gcra(tat: Optional[float], now: float, limit: int, window: float, cost: int = 1):
+    """
+    Generic cell rate algorithm step
+
+    Args:
+        tat: Stored theoretical arrival time (None for a new key)
+        now: Current time (seconds)
+        limit: Requests allowed per window (bucket size)
+        window: Window length in seconds
+        cost: Tokens this request consumes (0 = peek)
+
+    Returns:
+        (RateLimitResult, new TAT to store or None if unchanged)
+    """
+    limit = max(1, int(limit))
+    interval = window / limit
+    tat = now if tat is None or tat < now else tat
+    # A peek reports whether a one-token request would pass
+    new_tat = tat + interval * max(cost, 1)
+    allow_at = new_tat - window
+
+    # The epsilon absorbs float error on large epoch timestamps
+    if now < allow_at:
+        remaining = max(0, int((window - (tat - now)) / interval + 1e-9))
+        return RateLimitResult(False, limit, remaining, allow_at - now, tat - now), None
+    if cost == 0:
+        remaining = max(0, int((window - (tat - now)) / interval + 1e-9))
+        return RateLimitResult(True, limit, remaining, 0.0, tat - now), None
+
+    remaining = max(0, int((window - (new_tat - now)) / interval + 1e-9))
+    return RateLimitResult(True, limit, remaining, 0.0, new_tat - now), new_tat
+
+
+class RateLimitBackend:
+    """Interface for rate limit state storage"""
+
+    name = "base"
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> RateLimitResult:
+        """Consume `cost` tokens for key and report whether the request is allowed"""
+        raise NotImplementedError
+
+    def peek(self, key: str, limit: int, window: float) -> RateLimitResult:
+        """Report the current state of key without consuming"""
+        return self.hit(key, limit, window, cost=0)
+
+    def reset(self, key: str) -> None:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+# ============================
+# IN-PROCESS BACKEND
+# ============================
+
+class InProcessBackend(RateLimitBackend):
+    """
+    Per-process GCRA state, bounded to max_keys (least recently used keys
+    are dropped first; a dropped key simply starts with a full bucket).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max(1, max_keys)
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> RateLimitResult:
+        now = time.time()
+        with self._lock:
+            result, new_tat = gcra(self._tats.get(key), now, limit, window, cost)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+                while len(self._tats) > self.max_keys:
+                    self._tats.popitem(last=False)
+                    self._evictions += 1
+            return result
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._tats.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": self.name, "keys": len(self._tats), "max_keys": self.max_keys,
+                    "evictions": self._evictions}
+
+
+# ============================
+# SHARED-MEMORY BACKEND
+# ============================
+
+_SHM_MAGIC = b"RCRL0001"
+_SHM_HEADER = struct.Struct("<8sQ")  # magic, slot count
+_SHM_SLOT = struct.Struct("<Qd")  # key fingerprint (0 = empty), TAT
+_SHM_PROBE_LIMIT = 16
+
+
+class SharedMemoryBackend(RateLimitBackend):
+    """
+    GCRA state in a memory-mapped file shared by all local worker processes.
+
+    The table is a fixed-size open-addressing hash table (bounded memory:
+    slots x 16 bytes). Each key maps to a 64-bit fingerprint; a lookup
+    probes at most 16 slots. If none is free or expired, the slot whose
+    bucket refills soonest is reused. Updates are serialised with flock
+    (across processes) plus a thread lock (within a process).
+    """
+
+    name = "shared"
+
+    def __init__(self, path: str = RATE_LIMIT_SHM_PATH, slots: int = RATE_LIMIT_SHM_SLOTS):
+        if not FCNTL_AVAILABLE:
+            raise RuntimeError("Shared-memory rate limiting requires fcntl (POSIX)")
+        self.path = path
+        self.slots = max(_SHM_PROBE_LIMIT, slots)
+        self._size = _SHM_HEADER.size + self.slots * _SHM_SLOT.size
+        self._lock = threading.Lock()
+        self._replacements = 0
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != self._size or os.pread(self._fd, 8, 0) != _SHM_MAGIC:
+                # New (or differently sized) table: start empty
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self._size)
+                os.pwrite(self._fd, _SHM_HEADER.pack(_SHM_MAGIC, self.slots), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mm = mmap.mmap(self._fd, self._size)
+
+    @staticmethod
+    def _fingerprint(key: str) -> int:
+        value = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+        return value or 1  # 0 marks an empty slot
+
+    def _offset(self, index: int) -> int:
+        return _SHM_HEADER.size + (index % self.slots) * _SHM_SLOT.size
+
+    def _find_slot(self, fingerprint: int, now: float):
+        """Return (offset, stored TAT or None) for fingerprint (lock held)"""
+        start = fingerprint % self.slots
+        reusable = None
+        oldest_offset, oldest_tat = None, math.inf
+        for probe in range(_SHM_PROBE_LIMIT):
+            offset = self._offset(start + probe)
+            stored_fp, tat = _SHM_SLOT.unpack_from(self._mm, offset)
+            if stored_fp == fingerprint:
+                return offset, tat
+            if stored_fp == 0 or tat <= now:
+                if reusable is None:
+                    reusable = offset
+            elif tat < oldest_tat:
+                oldest_offset, oldest_tat = offset, tat
+        if reusable is None:
+            reusable = oldest_offset
+            self._replacements += 1
+        return reusable, None
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> RateLimitResult:
+        fingerprint = self._fingerprint(key)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                offset, tat = self._find_slot(fingerprint, now)
+                result, new_tat = gcra(tat, now, limit, window, cost)
+                if new_tat is not None:
+                    _SHM_SLOT.pack_into(self._mm, offset, fingerprint, new_tat)
+                return result
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def reset(self, key: str) -> None:
+        fingerprint = self._fingerprint(key)
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset, tat = self._find_slot(fingerprint, time.time())
+                if tat is not None:
+                    _SHM_SLOT.pack_into(self._mm, offset, 0, 0.0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            active = sum(
+                1 for i in range(self.slots)
+                if _SHM_SLOT.unpack_from(self._mm, self._offset(i))[1] > now
+            )
+            return {"backend": self.name, "path": self.path, "slots": self.slots,
+                    "active_keys": active, "replacements": self._replacements}
+
+
+# ============================
+# REDIS BACKEND
+# ============================
+
+# KEYS[1] = bucket key; ARGV = limit, window (ms), cost
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms}
+GCRA_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = window / limit
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+  tat = now
+end
+local new_tat = tat + interval * math.max(cost, 1)
+local allow_at = new_tat - window
+
+if now < allow_at then
+  local remaining = math.floor((window - (tat - now)) / interval)
+  return {0, math.max(0, remaining), allow_at - now, tat - now}
+end
+if cost == 0 then
+  local remaining = math.floor((window - (tat - now)) / interval)
+  return {1, math.max(0, remaining), 0, tat - now}
+end
+
+redis.call('SET', KEYS[1], new_tat, 'PX', math.max(1, math.ceil(new_tat - now)))
+local remaining = math.floor((window - (new_tat - now)) / interval)
+return {1, math.max(0, remaining), 0, new_tat - now}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    GCRA in Redis via an atomic Lua script (one round trip per check).
+
+    Redis errors fall back to a local in-process backend, so a Redis outage
+    degrades to per-process limits instead of failing requests.
+    """
+
+    name = "redis"
+
+    def __init__(self, client: Any = None, redis_url: Optional[str] = None,
+                 prefix: str = RATE_LIMIT_REDIS_PREFIX):
+        if client is None:
+            import redis  # Optional dependency
+            client = redis.from_url(redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+            client.ping()
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(GCRA_LUA)
+        self._fallback = InProcessBackend()
+        self._errors = 0
+
+    def hit(self, key: str, limit: int, window: float, cost: int = 1) -> RateLimitResult:
+        limit = max(1, int(limit))
+        try:
+            allowed, remaining, retry_ms, reset_ms = self._script(
+                keys=[self.prefix + key], args=[limit, int(window * 1000), cost]
+            )
+        except Exception as e:
+            self._errors += 1
+            logger.warning(f"[RateLimit] Redis error, using local limits: {e}")
+            return self._fallback.hit(key, limit, window, cost)
+        return RateLimitResult(bool(int(allowed)), limit, int(remaining),
+                               float(retry_ms) / 1000.0, float(reset_ms) / 1000.0)
+
+    def reset(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"[RateLimit] Redis error on reset: {e}")
+        self._fallback.reset(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "errors": self._errors, "fallback": self._fallback.get_stats()}
+
+
+# ============================
+# FACTORY
+# ============================
+
+_backend: Optional[RateLimitBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_rate_limit_backend(kind: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    """
+    Create a backend by name ("memory", "shared", "redis")
+
+    Falls back to InProcessBackend if the requested backend is unavailable.
+    """
+    kind = (kind or "memory").lower()
+    try:
+        if kind == "shared":
+            return SharedMemoryBackend()
+        if kind == "redis":
+            return RedisBackend()
+    except Exception as e:
+        logger.warning(f"[RateLimit] '{kind}' backend unavailable ({e}), using in-process limits")
+        return InProcessBackend()
+    if kind != "memory":
+        logger.warning(f"[RateLimit] Unknown backend '{kind}', using in-process limits")
+    return InProcessBackend()
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Process-wide backend selected by RATE_LIMIT_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_rate_limit_backend()
+                logger.info(f"[RateLimit] Using '{_backend.name}' backend")
+    return _backend
@@ -3,40 +3,31 @@ RISKCAST Security - Rate Limiting
 Prevents abuse, brute-force attacks, and spam
 """
 
-import time
-from collections import defaultdict
+import math
 from typing import Optional
 from fastapi import Request, HTTPException, status
 from functools import wraps
 import os
 
+from app.core.utils.rate_limit_backends import RateLimitBackend, get_rate_limit_backend
+
 
 class RateLimiter:
-    """In-memory rate limiter (for production, use Redis)"""
+    """
+    Per-IP GCRA (token bucket) rate limiter over a one-minute window.
+    
+    State is one timestamp per (IP, limit) key in a RateLimitBackend, so
+    memory stays bounded and limits can be shared across workers
+    (RATE_LIMIT_BACKEND=shared|redis).
+    """
+    
+    WINDOW_SECONDS = 60
+    KEY_PREFIX = "api:"
     
-    def __init__(self):
-        self.requests = defaultdict(list)
+    def __init__(self, backend: Optional[RateLimitBackend] = None):
+        self.backend = backend if backend is not None else get_rate_limit_backend()
         self.max_requests_per_minute = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
         self.max_requests_per_minute_ai = int(os.getenv("RATE_LIMIT_AI_PER_MINUTE", "10"))
-        self.cleanup_interval = 300  # Cleanup old entries every 5 minutes
-        self.last_cleanup = time.time()
-    
-    def cleanup_old_entries(self):
-        """Remove old rate limit entries"""
-        current_time = time.time()
-        if current_time - self.last_cleanup < self.cleanup_interval:
-            return
-        
-        cutoff_time = current_time - 60  # Remove entries older than 1 minute
-        for ip in list(self.requests.keys()):
-            self.requests[ip] = [
-                req_time for req_time in self.requests[ip]
-                if req_time > cutoff_time
-            ]
-            if not self.requests[ip]:
-                del self.requests[ip]
-        
-        self.last_cleanup = current_time
     
     def get_client_ip(self, request: Request) -> str:
         """Get client IP address from request"""
@@ -68,29 +59,14 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, remaining, reset_in_seconds)
         """
-        self.cleanup_old_entries()
-        
         if limit is None:
             limit = self.max_requests_per_minute
         
-        current_time = time.time()
-        cutoff_time = current_time - 60
-        self.requests[ip] = [
-            req_time for req_time in self.requests[ip]
-            if req_time > cutoff_time
-        ]
+        # Separate buckets per limit so stricter endpoints don't share a budget
+        result = self.backend.hit(f"{self.KEY_PREFIX}{ip}:{limit}", limit, self.WINDOW_SECONDS)
+        reset_in = math.ceil(result.retry_after if not result.allowed else result.reset_after)
         
-        # Check if limit exceeded
-        request_count = len(self.requests[ip])
-        is_allowed = request_count < limit
-        remaining = max(0, limit - request_count)
-        reset_in = int(60 - (current_time - (self.requests[ip][0] if self.requests[ip] else current_time)))
-        
-        if is_allowed:
-            # Record this request
-            self.requests[ip].append(current_time)
-        
-        return is_allowed, remaining, reset_in
+        return result.allowed, result.remaining, reset_in
     
     def check_rate_limit(self, request: Request, limit: Optional[int] = None) -> None:
         """
@@ -104,6 +80,8 @@ class RateLimiter:
             HTTPException: If rate limit exceeded
         """
         ip = self.get_client_ip(request)
+        if limit is None:
+            limit = self.max_requests_per_minute
         is_allowed, remaining, reset_in = self.is_allowed(ip, limit)
         
         if not is_allowed:
@@ -180,24 +158,3 @@ def ai_rate_limit(f):
         return await f(*args, **kwargs)
     
     return wrapper
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
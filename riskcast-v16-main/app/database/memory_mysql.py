@@ -2,10 +2,16 @@
 MySQL-based Memory System
 Replaces JSON file-based memory system
 """
-from typing import Dict, List, Optional, Any
+from typing import Callable, Deque, Dict, List, Optional, Any
+from collections import deque
 from datetime import datetime
+import logging
+import os
+import threading
+import time
 import uuid
 import json
+import weakref
 
 from app.config.database import get_session
 from app.models.shipment import ShipmentDB
@@ -13,7 +19,18 @@ from app.models.risk_analysis import RiskAnalysis
 from app.models.scenario import Scenario
 from app.models.kv_store import KVStore
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, insert
+
+logger = logging.getLogger(__name__)
+
+# Bulk write configuration
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "500"))
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "200"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "2.0"))  # Seconds
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+
+# Started write-behind queues, closed by the application shutdown hook
+_write_behind_queues: "weakref.WeakSet[ShipmentWriteBehindQueue]" = weakref.WeakSet()
 
 
 class MemorySystemMySQL:
@@ -21,7 +38,8 @@ class MemorySystemMySQL:
     
     def __init__(self):
         """Initialize MySQL memory system"""
-        pass
+        self._write_behind: Optional["ShipmentWriteBehindQueue"] = None
+        self._write_behind_lock = threading.Lock()
     
     def save_shipment(self, shipment_data: Dict, risk_analysis: Dict, summary: str = "") -> str:
         """
@@ -38,56 +56,166 @@ class MemorySystemMySQL:
         shipment_id = str(uuid.uuid4())
         
         with get_session() as db:
-            # Extract route info
-            pol = shipment_data.get("pol_code") or shipment_data.get("pol") or shipment_data.get("origin", "")
-            pod = shipment_data.get("pod_code") or shipment_data.get("pod") or shipment_data.get("destination", "")
-            route = shipment_data.get("route", "")
-            
-            # Create shipment record
-            shipment = ShipmentDB(
-                id=str(uuid.uuid4()),
-                shipment_id=shipment_id,
-                pol=pol,
-                pod=pod,
-                route=route,
-                carrier=shipment_data.get("carrier", ""),
-                etd=self._parse_datetime(shipment_data.get("etd")),
-                eta=self._parse_datetime(shipment_data.get("eta")),
-                transit_time=str(shipment_data.get("transit_time", "")),
-                cargo_type=shipment_data.get("cargo_type", ""),
-                cargo_value=str(shipment_data.get("cargo_value", "")),
-                container=shipment_data.get("container", ""),
-                packaging=shipment_data.get("packaging", ""),
-                incoterm=shipment_data.get("incoterm", ""),
-                shipment_data=shipment_data
-            )
-            
-            db.add(shipment)
-            
-            # Create risk analysis record
-            risk_analysis_record = RiskAnalysis(
-                id=str(uuid.uuid4()),
-                shipment_id=shipment_id,
-                risk_score=risk_analysis.get("risk_score") or risk_analysis.get("overall_risk_index"),
-                overall_risk=risk_analysis.get("overall_risk_index") or risk_analysis.get("risk_score"),
-                risk_level=risk_analysis.get("risk_level", "MEDIUM"),
-                confidence=risk_analysis.get("confidence", 0.8),
-                engine_result=risk_analysis,
-                recommendations=risk_analysis.get("recommendations"),
-                layers=risk_analysis.get("layers"),
-                drivers=risk_analysis.get("drivers") or risk_analysis.get("risk_factors"),
-                scenarios=risk_analysis.get("scenarios"),
-                financial=risk_analysis.get("financial"),
-                ai_narrative=risk_analysis.get("ai_narrative"),
-                engine_version="v2",
-                language=shipment_data.get("language", "en")
-            )
-            
-            db.add(risk_analysis_record)
+            db.add(ShipmentDB(**self._build_shipment_row(shipment_id, shipment_data)))
+            db.add(RiskAnalysis(**self._build_risk_row(shipment_id, shipment_data, risk_analysis)))
             db.commit()
         
         return shipment_id
     
+    def save_shipments_bulk(self, records: List[Dict], chunk_size: Optional[int] = None) -> Dict:
+        """
+        Save many shipment analyses with batched inserts
+        
+        Each chunk is one transaction holding both the shipments and the
+        risk_analyses rows (executemany / multi-row INSERT). If a chunk
+        fails, it is rolled back and replayed row by row inside savepoints,
+        so one bad row only fails itself.
+        
+        Args:
+            records: List of {"shipment_data", "risk_analysis", "summary"
+                     (optional), "shipment_id" (optional, pre-assigned)}
+            chunk_size: Rows per transaction (defaults to BULK_INSERT_CHUNK_SIZE)
+        
+        Returns:
+            {"shipment_ids": [id or None per record], "saved": int,
+             "failed": [{"index", "shipment_id", "error"}]}
+        """
+        chunk_size = max(1, chunk_size or BULK_INSERT_CHUNK_SIZE)
+        shipment_ids: List[Optional[str]] = [None] * len(records)
+        failed: List[Dict] = []
+        
+        # Build rows up front so malformed records fail individually
+        prepared = []
+        for index, record in enumerate(records):
+            shipment_id = record.get("shipment_id") or str(uuid.uuid4())
+            try:
+                shipment_data = record.get("shipment_data") or {}
+                risk_analysis = record.get("risk_analysis") or {}
+                prepared.append((
+                    index,
+                    shipment_id,
+                    self._build_shipment_row(shipment_id, shipment_data),
+                    self._build_risk_row(shipment_id, shipment_data, risk_analysis)
+                ))
+            except Exception as e:
+                failed.append({"index": index, "shipment_id": shipment_id, "error": str(e)})
+        
+        for start in range(0, len(prepared), chunk_size):
+            chunk = prepared[start:start + chunk_size]
+            try:
+                with get_session() as db:
+                    db.execute(insert(ShipmentDB), [row[2] for row in chunk])
+                    db.execute(insert(RiskAnalysis), [row[3] for row in chunk])
+                for index, shipment_id, _, _ in chunk:
+                    shipment_ids[index] = shipment_id
+            except Exception as chunk_error:
+                logger.warning(
+                    f"[Memory MySQL] Bulk chunk of {len(chunk)} failed ({chunk_error}), retrying row by row"
+                )
+                self._save_rows_individually(chunk, shipment_ids, failed)
+        
+        failed.sort(key=lambda f: f["index"])
+        return {
+            "shipment_ids": shipment_ids,
+            "saved": sum(1 for sid in shipment_ids if sid is not None),
+            "failed": failed
+        }
+    
+    def _save_rows_individually(self, chunk: List[tuple], shipment_ids: List[Optional[str]],
+                                failed: List[Dict]) -> None:
+        """Replay a failed chunk with one savepoint per record (shipment + analysis together)"""
+        saved: List[tuple] = []
+        row_failures: List[Dict] = []
+        try:
+            with get_session() as db:
+                for index, shipment_id, shipment_row, risk_row in chunk:
+                    try:
+                        with db.begin_nested():
+                            db.execute(insert(ShipmentDB), [shipment_row])
+                            db.execute(insert(RiskAnalysis), [risk_row])
+                        saved.append((index, shipment_id))
+                    except Exception as e:
+                        row_failures.append({"index": index, "shipment_id": shipment_id, "error": str(e)})
+        except Exception as e:
+            # The outer commit failed: nothing from this chunk was written
+            logger.error(f"[Memory MySQL] Row-by-row replay of {len(chunk)} records failed: {e}")
+            failed.extend(
+                {"index": index, "shipment_id": shipment_id, "error": str(e)}
+                for index, shipment_id, _, _ in chunk
+            )
+            return
+        
+        # Only report ids as saved once the transaction has committed
+        for index, shipment_id in saved:
+            shipment_ids[index] = shipment_id
+        failed.extend(row_failures)
+    
+    def save_shipment_deferred(self, shipment_data: Dict, risk_analysis: Dict, summary: str = "") -> str:
+        """
+        Queue a shipment analysis on the write-behind queue
+        
+        Returns immediately with the shipment_id; the row is written by the
+        next batched flush (size or time threshold). Falls back to a direct
+        save once the queue has been closed (application shutdown).
+        """
+        try:
+            return self.write_behind.enqueue(shipment_data, risk_analysis, summary)
+        except WriteBehindClosedError:
+            return self.save_shipment(shipment_data, risk_analysis, summary)
+    
+    @property
+    def write_behind(self) -> "ShipmentWriteBehindQueue":
+        """Lazily started write-behind queue for this memory system"""
+        if self._write_behind is None:
+            with self._write_behind_lock:
+                if self._write_behind is None:
+                    self._write_behind = ShipmentWriteBehindQueue(self)
+        return self._write_behind
+    
+    def _build_shipment_row(self, shipment_id: str, shipment_data: Dict) -> Dict:
+        """Column values for a ShipmentDB row"""
+        # Extract route info
+        pol = shipment_data.get("pol_code") or shipment_data.get("pol") or shipment_data.get("origin", "")
+        pod = shipment_data.get("pod_code") or shipment_data.get("pod") or shipment_data.get("destination", "")
+        
+        return {
+            "id": str(uuid.uuid4()),
+            "shipment_id": shipment_id,
+            "pol": pol,
+            "pod": pod,
+            "route": shipment_data.get("route", ""),
+            "carrier": shipment_data.get("carrier", ""),
+            "etd": self._parse_datetime(shipment_data.get("etd")),
+            "eta": self._parse_datetime(shipment_data.get("eta")),
+            "transit_time": str(shipment_data.get("transit_time", "")),
+            "cargo_type": shipment_data.get("cargo_type", ""),
+            "cargo_value": str(shipment_data.get("cargo_value", "")),
+            "container": shipment_data.get("container", ""),
+            "packaging": shipment_data.get("packaging", ""),
+            "incoterm": shipment_data.get("incoterm", ""),
+            "shipment_data": shipment_data
+        }
+    
+    def _build_risk_row(self, shipment_id: str, shipment_data: Dict, risk_analysis: Dict) -> Dict:
+        """Column values for a RiskAnalysis row"""
+        return {
+            "id": str(uuid.uuid4()),
+            "shipment_id": shipment_id,
+            "risk_score": risk_analysis.get("risk_score") or risk_analysis.get("overall_risk_index"),
+            "overall_risk": risk_analysis.get("overall_risk_index") or risk_analysis.get("risk_score"),
+            "risk_level": risk_analysis.get("risk_level", "MEDIUM"),
+            "confidence": risk_analysis.get("confidence", 0.8),
+            "engine_result": risk_analysis,
+            "recommendations": risk_analysis.get("recommendations"),
+            "layers": risk_analysis.get("layers"),
+            "drivers": risk_analysis.get("drivers") or risk_analysis.get("risk_factors"),
+            "scenarios": risk_analysis.get("scenarios"),
+            "financial": risk_analysis.get("financial"),
+            "ai_narrative": risk_analysis.get("ai_narrative"),
+            "engine_version": "v2",
+            "language": shipment_data.get("language", "en")
+        }
+    
     def get_shipment(self, shipment_id: str) -> Optional[Dict]:
         """
         Retrieve shipment from MySQL database
@@ -98,6 +226,18 @@ class MemorySystemMySQL:
         Returns:
             Shipment memory dict or None
         """
+        # Deferred saves are readable before the write-behind flush
+        if self._write_behind is not None:
+            queued = self._write_behind.find(shipment_id)
+            if queued is not None:
+                return {
+                    "shipment_id": shipment_id,
+                    "timestamp": queued["queued_at"],
+                    "shipment_data": queued["shipment_data"],
+                    "risk_analysis": queued["risk_analysis"],
+                    "summary": queued["summary"]
+                }
+        
         with get_session() as db:
             shipment = db.query(Shipment).filter(Shipment.shipment_id == shipment_id).first()
             if not shipment:
@@ -345,6 +485,157 @@ class MemorySystemMySQL:
         return insights
 
 
+class WriteBehindClosedError(RuntimeError):
+    """Raised when enqueueing on a closed write-behind queue"""
+
+
+class ShipmentWriteBehindQueue:
+    """
+    Write-behind buffer for shipment analyses
+    
+    Records are buffered in memory and written with save_shipments_bulk by a
+    background thread when WRITE_BEHIND_MAX_BATCH records are pending or
+    WRITE_BEHIND_FLUSH_INTERVAL seconds have passed. Enqueue blocks
+    (back-pressure) if WRITE_BEHIND_MAX_PENDING records are waiting.
+    Failed rows are reported to on_failure and kept in recent_failures.
+    """
+    
+    def __init__(self, memory: MemorySystemMySQL,
+                 max_batch: int = WRITE_BEHIND_MAX_BATCH,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING,
+                 on_failure: Optional[Callable[[List[Dict]], None]] = None):
+        self.memory = memory
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.max_batch, max_pending)
+        self.on_failure = on_failure
+        
+        self._pending: List[Dict] = []
+        self._in_flight: List[Dict] = []  # Batch being written by flush()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # One flush at a time keeps insert order
+        self._closed = False
+        self._stats = {"enqueued": 0, "flushed": 0, "failed": 0, "flushes": 0}
+        self.recent_failures: Deque[Dict] = deque(maxlen=100)
+        
+        self._worker = threading.Thread(target=self._run, name="shipment-write-behind", daemon=True)
+        self._worker.start()
+        _write_behind_queues.add(self)
+    
+    def enqueue(self, shipment_data: Dict, risk_analysis: Dict, summary: str = "") -> str:
+        """Buffer one record; returns its (pre-assigned) shipment_id"""
+        shipment_id = str(uuid.uuid4())
+        with self._cond:
+            while not self._closed and len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            # Checked after waiting too: close() may have run meanwhile
+            if self._closed:
+                raise WriteBehindClosedError("Write-behind queue is closed")
+            self._pending.append({
+                "shipment_id": shipment_id,
+                "shipment_data": shipment_data,
+                "risk_analysis": risk_analysis,
+                "summary": summary,
+                "queued_at": datetime.now().isoformat()
+            })
+            self._stats["enqueued"] += 1
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+        return shipment_id
+    
+    def flush(self) -> Dict:
+        """Write everything pending now (synchronously)"""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._in_flight = batch
+                self._cond.notify_all()
+            if not batch:
+                return {"shipment_ids": [], "saved": 0, "failed": []}
+            
+            try:
+                result = self.memory.save_shipments_bulk(batch)
+            except Exception as e:
+                logger.error(f"[Memory MySQL] Write-behind flush failed: {e}", exc_info=True)
+                result = {
+                    "shipment_ids": [None] * len(batch),
+                    "saved": 0,
+                    "failed": [
+                        {"index": i, "shipment_id": r["shipment_id"], "error": str(e)}
+                        for i, r in enumerate(batch)
+                    ]
+                }
+            
+            with self._cond:
+                self._in_flight = []
+                self._stats["flushes"] += 1
+                self._stats["flushed"] += result["saved"]
+                self._stats["failed"] += len(result["failed"])
+                self.recent_failures.extend(result["failed"])
+            if result["failed"] and self.on_failure is not None:
+                try:
+                    self.on_failure(result["failed"])
+                except Exception as e:
+                    logger.warning(f"[Memory MySQL] Write-behind failure callback raised: {e}")
+            return result
+    
+    def close(self, flush: bool = True) -> None:
+        """Stop the background thread (flushing pending records first)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join(timeout=max(5.0, self.flush_interval * 2))
+        _write_behind_queues.discard(self)
+        with self._cond:
+            pending = len(self._pending)
+        if flush:
+            if pending:
+                logger.info(f"[Memory MySQL] Flushing {pending} queued shipments on close")
+            self.flush()
+        elif pending:
+            logger.warning(f"[Memory MySQL] Write-behind queue closed with {pending} unsaved shipments")
+    
+    def find(self, shipment_id: str) -> Optional[Dict]:
+        """Queued or in-flight record for shipment_id (None once written)"""
+        with self._cond:
+            for record in self._in_flight:
+                if record["shipment_id"] == shipment_id:
+                    return record
+            for record in self._pending:
+                if record["shipment_id"] == shipment_id:
+                    return record
+        return None
+    
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return {**self._stats, "pending": len(self._pending)}
+    
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                has_work = bool(self._pending)
+            if has_work:
+                self.flush()
+
+
+def close_write_behind_queues(flush: bool = True) -> None:
+    """Close every started write-behind queue (application shutdown hook)"""
+    for queue in list(_write_behind_queues):
+        try:
+            queue.close(flush=flush)
+        except Exception as e:
+            logger.error(f"[Memory MySQL] Error closing write-behind queue: {e}", exc_info=True)
+
+
 # Global MySQL memory instance
 memory_system_mysql = MemorySystemMySQL()
 
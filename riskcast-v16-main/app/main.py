@@ -3,13 +3,18 @@
 RISKCAST Enterprise AI - FastAPI Application
 Main entry point for the RISKCAST backend server
 """
+import asyncio
+import logging
 import multiprocessing
 import os
+import sys
 import importlib
 import importlib.util
 from pathlib import Path
 from typing import Any, Dict
 
+logger = logging.getLogger(__name__)
+
 # Windows multiprocessing fix - MUST be at top level
 multiprocessing.freeze_support()
 
@@ -54,7 +59,6 @@ else:
 # Core modules
 from app.core import build_helper
 from app.core.templates import templates
-from app.middleware.cache_headers import CacheHeadersMiddleware
 from app.core.engine_state import get_last_result_v2
 
 app = FastAPI(
@@ -64,32 +68,13 @@ app = FastAPI(
 )
 
 # ============================
-# MIDDLEWARE (Order matters - first added is outermost)
+# MIDDLEWARE (Order matters - last added is outermost)
 # ============================
-# Request ID Middleware (outermost - generates request_id for tracing)
-from app.middleware.request_id import RequestIDMiddleware
-app.add_middleware(RequestIDMiddleware)
-
-# Error Handler v2 (catches all errors, uses StandardResponse)
-# Uses StandardResponse and custom_exceptions for consistent error handling
-from app.middleware.error_handler_v2 import ErrorHandlerMiddleware
-app.add_middleware(ErrorHandlerMiddleware)
-
-# Timeout Middleware (RC-C005): Prevents long-running requests
-from app.middleware.timeout_middleware import TimeoutMiddleware
-app.add_middleware(TimeoutMiddleware, default_timeout=30.0)
-
-# Metrics Middleware (Phase 3): Prometheus metrics collection
-from app.middleware.metrics_middleware import MetricsMiddleware
-app.add_middleware(MetricsMiddleware)
-
-# Rate Limiting Middleware (Phase 6 - Day 16): Prevents abuse
-from app.middleware.rate_limiter import RateLimiterMiddleware
-app.add_middleware(RateLimiterMiddleware)
-
-# Security Headers Middleware
-from app.middleware.security_headers import SecurityHeadersMiddleware
-app.add_middleware(SecurityHeadersMiddleware)
+# Fused pure-ASGI pipeline: request ID, rate limiting, Prometheus metrics,
+# timeout (RC-C005), standardized error handling and security/cache headers
+# in a single layer (no per-middleware task or response re-streaming)
+from app.middleware.asgi_pipeline import ASGIPipelineMiddleware
+app.add_middleware(ASGIPipelineMiddleware, default_timeout=30.0)
 
 # CORS Middleware (restricted origins)
 # SECURITY: In production, restrict ALLOWED_ORIGINS to specific domains
@@ -128,9 +113,6 @@ app.add_middleware(
     expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-Request-ID"],
 )
 
-# Cache Headers Middleware (for production assets)
-app.add_middleware(CacheHeadersMiddleware)
-
 # Session Middleware (for storing shipment data between pages)
 from starlette.middleware.sessions import SessionMiddleware  # type: ignore
 # CRITICAL: Fail if SESSION_SECRET_KEY is not set in production
@@ -572,6 +554,72 @@ async def metrics():
     """Prometheus metrics endpoint"""
     return get_metrics_endpoint()()
 
+# Compute executor lifecycle (CPU-bound engine calls run off the event loop)
+from app.core.compute_executor import get_compute_executor, get_compute_stats, shutdown_compute_executor
+
+@app.on_event("startup")
+async def warm_compute_executor():
+    """Start compute workers eagerly so the first risk requests don't pay for engine imports"""
+    if os.getenv("COMPUTE_WARM_ON_STARTUP", "true").lower() == "true":
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, get_compute_executor().warm_up)
+        except Exception as e:
+            logger.warning(f"Compute executor warm-up failed: {e}")
+
+@app.on_event("shutdown")
+async def stop_compute_executor():
+    """Stop compute worker processes"""
+    shutdown_compute_executor(wait=False)
+
+@app.on_event("shutdown")
+async def stop_report_batch_pool():
+    """Stop batch report workers (only if the batch module was loaded)"""
+    report_batch = sys.modules.get("app.core.report.batch")
+    if report_batch is not None:
+        report_batch.shutdown_report_batch_service(wait=False)
+
+@app.on_event("shutdown")
+async def flush_shipment_write_behind():
+    """Write shipments still queued for deferred saving (only if the MySQL memory module was loaded)"""
+    memory_mysql = sys.modules.get("app.database.memory_mysql")
+    if memory_mysql is not None:
+        await asyncio.to_thread(memory_mysql.close_write_behind_queues, True)
+
+@app.on_event("shutdown")
+async def close_audit_log():
+    """Flush the durable audit segment log (only if the audit module was loaded)"""
+    audit_trail = sys.modules.get("app.models.audit_trail")
+    if audit_trail is not None:
+        audit_trail.AuditService.close()
+
+@app.on_event("shutdown")
+async def flush_api_key_usage_counters():
+    """Write API key usage aggregated since the last periodic flush"""
+    security = sys.modules.get("app.core.security")
+    if security is not None:
+        await asyncio.to_thread(security.flush_api_key_usage, True)
+
+@app.on_event("shutdown")
+async def close_database_pools():
+    """Close pooled MySQL connections (only if the database layer was loaded)"""
+    database = sys.modules.get("app.config.database")
+    if database is not None:
+        await database.dispose_engines()
+
+@app.get("/health/db-pool", tags=["monitoring"])
+async def health_db_pool():
+    """MySQL connection pool occupancy and connect/checkout counters"""
+    try:
+        from app.config.database import get_pool_stats
+    except ImportError as e:
+        return {"available": False, "error": str(e)}
+    return {"available": True, **get_pool_stats()}
+
+@app.get("/health/compute", tags=["monitoring"])
+async def health_compute():
+    """Compute executor queue depth, outcomes and queue-wait vs compute-time"""
+    return get_compute_stats()
+
 # Health Check Endpoint (for monitoring)
 @app.get("/health", tags=["monitoring"])
 async def health():
@@ -8,11 +8,19 @@ RISKCAST v17 - Production Excellence
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+import math
 import time
 import hashlib
-from typing import Optional, Dict
+from typing import Optional
 import os
 
+from app.core.utils.rate_limit_backends import (
+    RateLimitBackend,
+    RateLimitResult,
+    RedisBackend,
+    get_rate_limit_backend,
+)
+
 # Try to import redis, graceful fallback if not available
 try:
     import redis
@@ -29,22 +37,23 @@ class AdvancedRateLimiter(BaseHTTPMiddleware):
     Features:
     - Per-user rate limits (by API key or IP)
     - Per-endpoint rate limits
-    - Sliding window algorithm
-    - Graceful degradation if Redis unavailable
+    - GCRA (token bucket): one timestamp per key, atomic Lua script in Redis
+    - Graceful degradation if Redis unavailable (RATE_LIMIT_BACKEND backend:
+      in-process or shared memory across local workers)
     
     Usage:
         from app.middleware.advanced_rate_limit import AdvancedRateLimiter
         app.add_middleware(AdvancedRateLimiter)
     """
     
-    def __init__(self, app, redis_url: Optional[str] = None):
+    def __init__(self, app, redis_url: Optional[str] = None, backend: Optional[RateLimitBackend] = None):
         super().__init__(app)
         
         self.redis_client = None
         self.redis_available = False
         
         # Initialize Redis if available
-        if REDIS_AVAILABLE:
+        if backend is None and REDIS_AVAILABLE:
             try:
                 url = redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
                 self.redis_client = redis.from_url(url)
@@ -54,11 +63,12 @@ class AdvancedRateLimiter(BaseHTTPMiddleware):
             except Exception as e:
                 print(f"[AdvancedRateLimiter] ⚠️ Redis unavailable: {e}")
                 self.redis_available = False
-        else:
+        elif backend is None:
             print("[AdvancedRateLimiter] ⚠️ redis-py not installed, using in-memory fallback")
         
-        # In-memory fallback store
-        self._memory_store: Dict[str, list] = {}
+        if backend is None:
+            backend = RedisBackend(self.redis_client) if self.redis_available else get_rate_limit_backend()
+        self.backend = backend
         
         # Rate limit configurations per endpoint
         self.rate_limits = {
@@ -100,16 +110,11 @@ class AdvancedRateLimiter(BaseHTTPMiddleware):
         rate_config = self._get_rate_config(endpoint)
         
         # Check rate limit
-        allowed, remaining = self._check_rate_limit(
-            user_id=user_id,
-            endpoint=endpoint,
-            max_requests=rate_config['requests'],
-            window_seconds=rate_config['window']
-        )
+        result = self._hit(user_id, endpoint, rate_config['requests'], rate_config['window'])
         
-        if not allowed:
+        if not result.allowed:
             # Rate limit exceeded
-            retry_after = self._get_retry_after(user_id, endpoint, rate_config['window'])
+            retry_after = max(1, math.ceil(result.retry_after))
             raise HTTPException(
                 status_code=429,
                 detail={
@@ -130,9 +135,7 @@ class AdvancedRateLimiter(BaseHTTPMiddleware):
         response = await call_next(request)
         
         # Add rate limit headers to response
-        response.headers['X-RateLimit-Limit'] = str(rate_config['requests'])
-        response.headers['X-RateLimit-Remaining'] = str(remaining)
-        response.headers['X-RateLimit-Reset'] = str(int(time.time()) + rate_config['window'])
+        response.headers.update(result.headers())
         
         return response
     
@@ -174,6 +177,14 @@ class AdvancedRateLimiter(BaseHTTPMiddleware):
         
         return self.rate_limits['default']
     
+    @staticmethod
+    def _key(user_id: str, endpoint: str) -> str:
+        return f"adv:{user_id}:{endpoint}"
+    
+    def _hit(self, user_id: str, endpoint: str, max_requests: int, window_seconds: int) -> RateLimitResult:
+        """Consume one request from the user's bucket for this endpoint."""
+        return self.backend.hit(self._key(user_id, endpoint), max_requests, window_seconds)
+    
     def _check_rate_limit(
         self,
         user_id: str,
@@ -182,102 +193,13 @@ class AdvancedRateLimiter(BaseHTTPMiddleware):
         window_seconds: int
     ) -> tuple:
         """
-        Check if request is within rate limit using sliding window.
+        Check if request is within rate limit.
         
         Returns:
             (allowed: bool, remaining: int)
         """
-        if self.redis_available and self.redis_client:
-            return self._check_redis_rate_limit(
-                user_id, endpoint, max_requests, window_seconds
-            )
-        else:
-            return self._check_memory_rate_limit(
-                user_id, endpoint, max_requests, window_seconds
-            )
-    
-    def _check_redis_rate_limit(
-        self,
-        user_id: str,
-        endpoint: str,
-        max_requests: int,
-        window_seconds: int
-    ) -> tuple:
-        """Redis-based sliding window rate limiter."""
-        key = f"ratelimit:{user_id}:{endpoint.replace('/', '_')}"
-        now = time.time()
-        window_start = now - window_seconds
-        
-        try:
-            pipe = self.redis_client.pipeline()
-            
-            # Remove old entries
-            pipe.zremrangebyscore(key, 0, window_start)
-            
-            # Count requests in current window
-            pipe.zcard(key)
-            
-            # Add current request
-            pipe.zadd(key, {str(now): now})
-            
-            # Set expiry
-            pipe.expire(key, window_seconds)
-            
-            results = pipe.execute()
-            request_count = results[1]
-            
-            allowed = request_count < max_requests
-            remaining = max(0, max_requests - request_count - 1)
-            
-            return allowed, remaining
-        except Exception as e:
-            # Fallback to allow if Redis fails
-            print(f"[AdvancedRateLimiter] Redis error: {e}")
-            return True, max_requests
-    
-    def _check_memory_rate_limit(
-        self,
-        user_id: str,
-        endpoint: str,
-        max_requests: int,
-        window_seconds: int
-    ) -> tuple:
-        """In-memory fallback rate limiter."""
-        key = f"{user_id}:{endpoint}"
-        now = time.time()
-        
-        if key not in self._memory_store:
-            self._memory_store[key] = []
-        
-        # Remove old entries
-        self._memory_store[key] = [
-            timestamp for timestamp in self._memory_store[key]
-            if timestamp > now - window_seconds
-        ]
-        
-        request_count = len(self._memory_store[key])
-        
-        # Check count
-        if request_count >= max_requests:
-            return False, 0
-        
-        # Add current request
-        self._memory_store[key].append(now)
-        remaining = max_requests - request_count - 1
-        
-        return True, remaining
-    
-    def _get_retry_after(self, user_id: str, endpoint: str, window_seconds: int) -> int:
-        """Get seconds until rate limit resets."""
-        if self.redis_available and self.redis_client:
-            try:
-                key = f"ratelimit:{user_id}:{endpoint.replace('/', '_')}"
-                ttl = self.redis_client.ttl(key)
-                return max(1, ttl) if ttl > 0 else window_seconds
-            except Exception:
-                pass
-        
-        return window_seconds
+        result = self._hit(user_id, endpoint, max_requests, window_seconds)
+        return result.allowed, result.remaining
     
     def update_rate_limit(self, endpoint: str, requests: int, window: int):
         """Dynamically update rate limit for an endpoint."""
@@ -291,25 +213,13 @@ class AdvancedRateLimiter(BaseHTTPMiddleware):
             if endpoint == 'default':
                 continue
             
-            key = f"{user_id}:{endpoint}"
-            
-            if self.redis_available and self.redis_client:
-                try:
-                    redis_key = f"ratelimit:{user_id}:{endpoint.replace('/', '_')}"
-                    count = self.redis_client.zcard(redis_key)
-                    stats[endpoint] = {
-                        'used': count,
-                        'limit': config['requests'],
-                        'remaining': max(0, config['requests'] - count)
-                    }
-                except Exception:
-                    pass
-            elif key in self._memory_store:
-                count = len(self._memory_store[key])
+            result = self.backend.peek(self._key(user_id, endpoint), config['requests'], config['window'])
+            used = config['requests'] - result.remaining
+            if used > 0:
                 stats[endpoint] = {
-                    'used': count,
+                    'used': used,
                     'limit': config['requests'],
-                    'remaining': max(0, config['requests'] - count)
+                    'remaining': result.remaining
                 }
         
         return stats
@@ -63,6 +63,48 @@ else:
     error_counter = None
 
 
+def normalize_endpoint(path: str) -> str:
+    """
+    Normalize endpoint path for metrics grouping.
+    
+    Examples:
+    - /api/v1/risk/v2/analyze -> /api/v1/risk/v2/analyze
+    - /results/data -> /results/data
+    - /assets/index-abc123.js -> /assets/*
+    """
+    # Normalize asset paths
+    if path.startswith("/assets/"):
+        return "/assets/*"
+    if path.startswith("/static/"):
+        return "/static/*"
+    if path.startswith("/dist/"):
+        return "/dist/*"
+    
+    # Keep API paths as-is (they're already normalized)
+    return path
+
+
+def record_response(method: str, endpoint: str, status_code: int, duration: float) -> None:
+    """Record request count, duration and 4xx/5xx errors for a response"""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    request_counter.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+    request_duration.labels(method=method, endpoint=endpoint).observe(duration)
+    
+    # Track errors (4xx and 5xx)
+    if status_code >= 400:
+        error_type = "client" if status_code < 500 else "server"
+        error_counter.labels(method=method, endpoint=endpoint, error_type=error_type).inc()
+
+
+def record_exception(method: str, endpoint: str, duration: float) -> None:
+    """Record a request that ended in an unhandled exception"""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    error_counter.labels(method=method, endpoint=endpoint, error_type="exception").inc()
+    request_duration.labels(method=method, endpoint=endpoint).observe(duration)
+
+
 class MetricsMiddleware(BaseHTTPMiddleware):
     """
     Middleware that collects Prometheus metrics for all requests.
@@ -90,7 +132,7 @@ class MetricsMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
         
         # Extract endpoint (simplified path for grouping)
-        endpoint = self._normalize_endpoint(request.url.path)
+        endpoint = normalize_endpoint(request.url.path)
         method = request.method
         
         # Track active requests
@@ -102,75 +144,19 @@ class MetricsMiddleware(BaseHTTPMiddleware):
         try:
             # Process request
             response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Record metrics
-            status_code = response.status_code
-            request_counter.labels(
-                method=method,
-                endpoint=endpoint,
-                status_code=status_code
-            ).inc()
-            
-            request_duration.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(duration)
-            
-            # Track errors (4xx and 5xx)
-            if status_code >= 400:
-                error_type = "client" if status_code < 500 else "server"
-                error_counter.labels(
-                    method=method,
-                    endpoint=endpoint,
-                    error_type=error_type
-                ).inc()
-            
+            record_response(method, endpoint, response.status_code, time.time() - start_time)
             return response
             
-        except Exception as e:
-            # Record error
-            duration = time.time() - start_time
-            error_counter.labels(
-                method=method,
-                endpoint=endpoint,
-                error_type="exception"
-            ).inc()
-            
-            request_duration.labels(
-                method=method,
-                endpoint=endpoint
-            ).observe(duration)
-            
-            # Re-raise exception (error handler will catch it)
+        except Exception:
+            # Record error, then re-raise (error handler will catch it)
+            record_exception(method, endpoint, time.time() - start_time)
             raise
             
         finally:
             # Decrement active requests
             active_requests.labels(method=method, endpoint=endpoint).dec()
     
-    @staticmethod
-    def _normalize_endpoint(path: str) -> str:
-        """
-        Normalize endpoint path for metrics grouping.
-        
-        Examples:
-        - /api/v1/risk/v2/analyze -> /api/v1/risk/v2/analyze
-        - /results/data -> /results/data
-        - /assets/index-abc123.js -> /assets/*
-        """
-        # Normalize asset paths
-        if path.startswith("/assets/"):
-            return "/assets/*"
-        if path.startswith("/static/"):
-            return "/static/*"
-        if path.startswith("/dist/"):
-            return "/dist/*"
-        
-        # Keep API paths as-is (they're already normalized)
-        return path
+    _normalize_endpoint = staticmethod(normalize_endpoint)
 
 
 def get_metrics_endpoint():
@@ -4,26 +4,37 @@ Rate Limiting Middleware (Phase 6 - Day 16)
 CRITICAL: Prevents abuse and ensures fair resource usage.
 Applies rate limits to all API endpoints.
 """
+import math
 import time
-from typing import Dict, Tuple
-from collections import defaultdict
+from typing import Dict, Optional, Tuple
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 import logging
 
+from app.core.utils.rate_limit_backends import (
+    RateLimitBackend,
+    RateLimitResult,
+    get_rate_limit_backend,
+)
+
 logger = logging.getLogger(__name__)
 
 
-# Rate limit storage (in-memory, use Redis in production)
-_rate_limit_storage: Dict[str, Dict[str, Tuple[float, int]]] = defaultdict(dict)
+# Paths that are never rate limited
+RATE_LIMIT_EXEMPT_PREFIXES = ("/assets/", "/static/", "/dist/", "/metrics", "/health")
 
 
-class RateLimiterMiddleware(BaseHTTPMiddleware):
+class RateLimiter:
     """
-    Rate limiting middleware.
+    GCRA (token bucket) rate limiter per client IP and path.
+    
+    Shared by RateLimiterMiddleware and the fused ASGI pipeline. State lives
+    in a RateLimitBackend (one timestamp per key; in-process, shared memory
+    across workers, or Redis - see RATE_LIMIT_BACKEND).
     
-    Limits:
+    Limits (a full bucket allows the whole limit as a burst, then refills
+    at limit/window requests per second):
     - Default: 100 requests per minute per IP
     - Risk analysis: 10 requests per minute per IP
     - AI advisor: 20 requests per minute per IP
@@ -39,69 +50,18 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
         "default": (100, 60),  # 100 req/min for other endpoints
     }
     
-    def __init__(self, app, storage=None):
-        super().__init__(app)
-        # Use provided storage or in-memory default
-        self.storage = storage or _rate_limit_storage
+    KEY_PREFIX = "mw:"
     
-    async def dispatch(self, request: Request, call_next):
-        """
-        Apply rate limiting to request.
-        
-        Args:
-            request: FastAPI Request object
-            call_next: Next middleware/handler in chain
-            
-        Returns:
-            Response (or 429 if rate limit exceeded)
-        """
-        # Skip rate limiting for static files
-        path = request.url.path
-        if path.startswith(("/assets/", "/static/", "/dist/", "/metrics", "/health")):
-            return await call_next(request)
-        
-        # Get client identifier (IP address)
-        client_ip = self._get_client_ip(request)
-        
-        # Determine rate limit for this endpoint
-        limit, window_seconds = self._get_rate_limit(path)
-        
-        # Check rate limit
-        if not self._check_rate_limit(client_ip, path, limit, window_seconds):
-            # Rate limit exceeded
-            logger.warning(
-                f"Rate limit exceeded: {client_ip} -> {path}",
-                extra={
-                    "request_id": getattr(request.state, "request_id", None),
-                    "client_ip": client_ip,
-                    "path": path,
-                    "limit": limit,
-                    "window": window_seconds,
-                }
-            )
-            
-            # Return 429 Too Many Requests
-            from app.utils.standard_responses import StandardResponse
-            return StandardResponse.error(
-                message=f"Rate limit exceeded: {limit} requests per {window_seconds} seconds",
-                error_code="RATE_LIMIT_EXCEEDED",
-                status_code=429,
-                error_type="client",
-                request=request
-            )
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add rate limit headers
-        remaining, reset_time = self._get_rate_limit_info(client_ip, path, limit, window_seconds)
-        response.headers["X-RateLimit-Limit"] = str(limit)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int(reset_time))
-        
-        return response
+    def __init__(self, backend: Optional[RateLimitBackend] = None):
+        # Use provided backend or the process-wide one
+        self.backend = backend if backend is not None else get_rate_limit_backend()
     
-    def _get_client_ip(self, request: Request) -> str:
+    @staticmethod
+    def is_exempt(path: str) -> bool:
+        """Static files and monitoring endpoints are not rate limited"""
+        return path.startswith(RATE_LIMIT_EXEMPT_PREFIXES)
+    
+    def get_client_ip(self, request: Request) -> str:
         """Extract client IP address from request"""
         # Check X-Forwarded-For header (for proxies)
         forwarded_for = request.headers.get("X-Forwarded-For")
@@ -120,7 +80,7 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
         
         return "unknown"
     
-    def _get_rate_limit(self, path: str) -> Tuple[int, int]:
+    def get_rate_limit(self, path: str) -> Tuple[int, int]:
         """Get rate limit for endpoint"""
         # Check exact path match
         if path in self.RATE_LIMITS:
@@ -134,59 +94,109 @@ class RateLimiterMiddleware(BaseHTTPMiddleware):
         # Default limit
         return self.RATE_LIMITS["default"]
     
-    def _check_rate_limit(self, client_ip: str, path: str, limit: int, window_seconds: int) -> bool:
+    def _key(self, client_ip: str, path: str) -> str:
+        return f"{self.KEY_PREFIX}{client_ip}:{path}"
+    
+    def hit(self, client_ip: str, path: str, limit: int, window_seconds: int) -> RateLimitResult:
+        """
+        Count one request against the limit.
+        
+        Returns:
+            RateLimitResult (allowed, remaining, retry_after, headers())
+        """
+        return self.backend.hit(self._key(client_ip, path), limit, window_seconds)
+    
+    def check_rate_limit(self, client_ip: str, path: str, limit: int, window_seconds: int) -> bool:
         """
         Check if request is within rate limit.
         
         Returns:
             True if within limit, False if exceeded
         """
-        key = f"{client_ip}:{path}"
-        now = time.time()
+        return self.hit(client_ip, path, limit, window_seconds).allowed
+    
+    def get_rate_limit_info(self, client_ip: str, path: str, limit: int, window_seconds: int) -> Tuple[int, float]:
+        """Get remaining requests and reset time (when the bucket is full again)"""
+        result = self.backend.peek(self._key(client_ip, path), limit, window_seconds)
+        return result.remaining, time.time() + result.reset_after
+    
+    def rate_limit_headers(self, client_ip: str, path: str, limit: int, window_seconds: int) -> Dict[str, str]:
+        """X-RateLimit-* response headers"""
+        return self.backend.peek(self._key(client_ip, path), limit, window_seconds).headers()
+    
+    def rejection_response(self, request: Request, client_ip: str, path: str,
+                           limit: int, window_seconds: int, retry_after: Optional[float] = None) -> Response:
+        """Log the rejection and build the 429 response"""
+        logger.warning(
+            f"Rate limit exceeded: {client_ip} -> {path}",
+            extra={
+                "request_id": getattr(request.state, "request_id", None),
+                "client_ip": client_ip,
+                "path": path,
+                "limit": limit,
+                "window": window_seconds,
+            }
+        )
+        
+        # Return 429 Too Many Requests
+        from app.utils.standard_responses import StandardResponse
+        response = StandardResponse.error(
+            message=f"Rate limit exceeded: {limit} requests per {window_seconds} seconds",
+            error_code="RATE_LIMIT_EXCEEDED",
+            status_code=429,
+            error_type="client",
+            request=request
+        )
+        if retry_after is not None:
+            response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return response
+
+
+class RateLimiterMiddleware(BaseHTTPMiddleware):
+    """
+    Rate limiting middleware (see RateLimiter for the limits).
+    """
+    
+    RATE_LIMITS = RateLimiter.RATE_LIMITS
+    
+    def __init__(self, app, backend: Optional[RateLimitBackend] = None):
+        super().__init__(app)
+        self.limiter = RateLimiter(backend)
+        self.limiter.RATE_LIMITS = self.RATE_LIMITS  # Subclasses may override the limits
+    
+    async def dispatch(self, request: Request, call_next):
+        """
+        Apply rate limiting to request.
         
-        # Get current count and window start
-        if key in self.storage:
-            window_start, count = self.storage[key]
+        Args:
+            request: FastAPI Request object
+            call_next: Next middleware/handler in chain
             
-            # Check if window has expired
-            if now - window_start < window_seconds:
-                # Still in window
-                if count >= limit:
-                    return False  # Rate limit exceeded
-                # Increment count
-                self.storage[key] = (window_start, count + 1)
-            else:
-                # New window
-                self.storage[key] = (now, 1)
-        else:
-            # First request
-            self.storage[key] = (now, 1)
+        Returns:
+            Response (or 429 if rate limit exceeded)
+        """
+        # Skip rate limiting for static files
+        path = request.url.path
+        if self.limiter.is_exempt(path):
+            return await call_next(request)
         
-        return True
-    
-    def _get_rate_limit_info(self, client_ip: str, path: str, limit: int, window_seconds: int) -> Tuple[int, float]:
-        """Get remaining requests and reset time"""
-        key = f"{client_ip}:{path}"
-        now = time.time()
+        # Get client identifier (IP address)
+        client_ip = self.limiter.get_client_ip(request)
         
-        if key in self.storage:
-            window_start, count = self.storage[key]
-            
-            if now - window_start < window_seconds:
-                remaining = max(0, limit - count)
-                reset_time = window_start + window_seconds
-            else:
-                remaining = limit
-                reset_time = now + window_seconds
-        else:
-            remaining = limit
-            reset_time = now + window_seconds
+        # Determine rate limit for this endpoint
+        limit, window_seconds = self.limiter.get_rate_limit(path)
         
-        return remaining, reset_time
-
-
-# Production: Use Redis for distributed rate limiting
-# Example:
-# from redis import Redis
-# redis_client = Redis(host='localhost', port=6379, db=0)
-# rate_limiter = RateLimiterMiddleware(app, storage=redis_client)
+        # Check rate limit
+        result = self.limiter.hit(client_ip, path, limit, window_seconds)
+        if not result.allowed:
+            return self.limiter.rejection_response(
+                request, client_ip, path, limit, window_seconds, retry_after=result.retry_after
+            )
+        
+        # Process request
+        response = await call_next(request)
+        
+        # Add rate limit headers
+        response.headers.update(result.headers())
+        
+        return response
@@ -5,6 +5,7 @@ Adds security headers to all responses
 
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from typing import Dict
 import os
 
 # CSP Policy - Content Security Policy configuration
@@ -60,29 +61,35 @@ CSP_POLICY = os.getenv(
 )
 
 
+# Headers added to every response
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Content-Security-Policy": CSP_POLICY,
+    # Permissions Policy (formerly Feature Policy)
+    "Permissions-Policy": (
+        "geolocation=(), microphone=(), camera=(), "
+        "payment=(), usb=(), magnetometer=(), gyroscope=()"
+    ),
+}
+
+# HSTS (only for HTTPS)
+HSTS_HEADER = ("Strict-Transport-Security", "max-age=31536000; includeSubDomains")
+
+
+def get_security_headers(scheme: str) -> Dict[str, str]:
+    """Security headers for a response served over `scheme` (http/https)"""
+    if scheme == "https":
+        return {**SECURITY_HEADERS, HSTS_HEADER[0]: HSTS_HEADER[1]}
+    return SECURITY_HEADERS
+
+
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """Middleware to add security headers to all responses"""
     
     async def dispatch(self, request, call_next):
         response = await call_next(request)
-        
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = CSP_POLICY
-        
-        # HSTS (only for HTTPS)
-        if request.url.scheme == "https":
-            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        # Permissions Policy (formerly Feature Policy)
-        response.headers["Permissions-Policy"] = (
-            "geolocation=(), microphone=(), camera=(), "
-            "payment=(), usb=(), magnetometer=(), gyroscope=()"
-        )
-        
+        response.headers.update(get_security_headers(request.url.scheme))
         return response
-
-
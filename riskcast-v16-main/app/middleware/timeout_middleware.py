@@ -5,12 +5,14 @@ CRITICAL: Prevents long-running requests from blocking the server.
 Applies timeout to all API requests to ensure system responsiveness.
 """
 import asyncio
-from typing import Callable
+from typing import Callable, Optional
 from fastapi import Request, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 import logging
 
+from app.core.compute_executor import set_request_deadline, reset_request_deadline
+
 logger = logging.getLogger(__name__)
 
 # Default timeout: 30 seconds for API requests
@@ -25,6 +27,44 @@ ENDPOINT_TIMEOUTS = {
 }
 
 
+# Paths served without a timeout (static files are fast)
+TIMEOUT_EXEMPT_PREFIXES = ("/assets/", "/static/", "/dist/")
+
+
+def get_endpoint_timeout(path: str, default_timeout: float = DEFAULT_TIMEOUT) -> Optional[float]:
+    """
+    Timeout for a request path
+    
+    Returns:
+        Seconds, or None for paths that are not timed out (static files)
+    """
+    if path.startswith(TIMEOUT_EXEMPT_PREFIXES):
+        return None
+    return ENDPOINT_TIMEOUTS.get(path, default_timeout)
+
+
+def timeout_response(request: Request, timeout: float) -> Response:
+    """Log the timeout and build the 504 response"""
+    logger.warning(
+        f"Request timeout: {request.method} {request.url.path} exceeded {timeout}s",
+        extra={
+            "request_id": getattr(request.state, "request_id", None),
+            "path": request.url.path,
+            "timeout": timeout
+        }
+    )
+    
+    # Return 504 Gateway Timeout
+    from app.utils.standard_responses import StandardResponse
+    return StandardResponse.error(
+        message=f"Request timeout: operation exceeded {timeout} seconds",
+        error_code="REQUEST_TIMEOUT",
+        status_code=504,
+        error_type="server",
+        request=request
+    )
+
+
 class TimeoutMiddleware(BaseHTTPMiddleware):
     """
     Middleware that applies timeout to requests.
@@ -49,13 +89,15 @@ class TimeoutMiddleware(BaseHTTPMiddleware):
             Response (or 504 if timeout exceeded)
         """
         # Determine timeout for this endpoint
-        path = request.url.path
-        timeout = ENDPOINT_TIMEOUTS.get(path, self.default_timeout)
+        timeout = get_endpoint_timeout(request.url.path, self.default_timeout)
         
         # Skip timeout for static files (they're fast)
-        if path.startswith(("/assets/", "/static/", "/dist/")):
+        if timeout is None:
             return await call_next(request)
         
+        # Publish the deadline so compute-executor tasks dispatched by the
+        # endpoint never outlive the request (and queued ones get cancelled)
+        deadline_token = set_request_deadline(timeout)
         try:
             # Run request with timeout
             response = await asyncio.wait_for(
@@ -66,24 +108,6 @@ class TimeoutMiddleware(BaseHTTPMiddleware):
             
         except asyncio.TimeoutError:
             # Request exceeded timeout
-            logger.warning(
-                f"Request timeout: {request.method} {path} exceeded {timeout}s",
-                extra={
-                    "request_id": getattr(request.state, "request_id", None),
-                    "path": path,
-                    "timeout": timeout
-                }
-            )
-            
-            # Return 504 Gateway Timeout
-            from app.utils.standard_responses import StandardResponse
-            return StandardResponse.error(
-                message=f"Request timeout: operation exceeded {timeout} seconds",
-                error_code="REQUEST_TIMEOUT",
-                status_code=504,
-                error_type="server",
-                request=request
-            )
-        except Exception as e:
-            # Re-raise other exceptions (they'll be handled by error handler)
-            raise
+            return timeout_response(request, timeout)
+        finally:
+            reset_request_deadline(deadline_token)
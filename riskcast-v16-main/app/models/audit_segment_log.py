@@ -0,0 +1,411 @@
+"""
+RISKCAST Audit Segment Log
+==========================
+Append-only, durable storage for the audit hash chain.
+
+Layout (one directory):
+- segment-000001.log, segment-000002.log, ...  framed records
+- segment-000001.ckpt.json                      checkpoint written when a
+                                                segment is sealed
+- redaction.key                                 secret for keyed user hashes
+                                                in redaction records
+
+Segments are never rewritten: entry frames written before a redaction
+keep the original user id on disk (redactions are applied on recovery)
+until the segments are compacted or expire under the retention policy.
+
+Record frame: 1-byte type | 4-byte length | 4-byte CRC32 | JSON payload
+- type 'E': audit entry (AuditEntry.to_dict())
+- type 'R': redaction applied later (GDPR anonymization)
+
+Durability: writes are fsynced in batches (every AUDIT_FSYNC_BATCH records or
+AUDIT_FSYNC_INTERVAL seconds, and always when a segment is sealed or the log
+is closed). A torn frame at the tail of the last segment (crash mid-write)
+is detected by length/CRC and truncated on recovery; damage inside a sealed
+segment raises AuditLogCorruptionError.
+
+Each sealed segment's checkpoint carries the Merkle root of its entries'
+chain hashes, so verification only needs to rehash segments appended since
+the last verified checkpoint.
+
+Author: RISKCAST Team
+Version: 2.0
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+AUDIT_SEGMENT_MAX_ENTRIES = int(os.getenv("AUDIT_SEGMENT_MAX_ENTRIES", "10000"))
+AUDIT_FSYNC_BATCH = int(os.getenv("AUDIT_FSYNC_BATCH", "64"))
+AUDIT_FSYNC_INTERVAL = float(os.getenv("AUDIT_FSYNC_INTERVAL", "1.0"))
+
+FRAME_HEADER = struct.Struct(">BII")
+RECORD_ENTRY = ord("E")
+RECORD_REDACTION = ord("R")
+
+_SEGMENT_RE = re.compile(r"^segment-(\d{6})\.log$")
+REDACTION_KEY_FILE = "redaction.key"
+
+
+class AuditLogCorruptionError(RuntimeError):
+    """A sealed segment is damaged (only the active tail may be truncated)"""
+
+
+def merkle_root(leaf_hashes: List[str]) -> str:
+    """
+    Merkle root (SHA-256) over hex leaf hashes.
+
+    Odd nodes are paired with themselves; the root of no leaves is the
+    genesis hash.
+    """
+    if not leaf_hashes:
+        return "0" * 64
+    level = [bytes.fromhex(h) for h in leaf_hashes]
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hashlib.sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+    return level[0].hex()
+
+
+class AuditSegmentLog:
+    """
+    Append-only segment log for audit entries.
+
+    Usage:
+        log = AuditSegmentLog("data/audit")
+        log.recover()                          # once, at startup
+        entries, redactions = log.read_records()
+        log.append_entry(entry.to_dict(), entry.chain_hash)
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_entries: int = AUDIT_SEGMENT_MAX_ENTRIES,
+        fsync_batch: int = AUDIT_FSYNC_BATCH,
+        fsync_interval: float = AUDIT_FSYNC_INTERVAL
+    ):
+        self.directory = directory
+        self.segment_max_entries = max(1, segment_max_entries)
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._segment_number = 0
+        self._segment_first_index = 0
+        self._segment_hashes: List[str] = []
+        self._segment_recovered_entries = 0  # Entries already in the reopened tail segment
+        self._segment_first_previous_hash = "0" * 64
+        self._total_entries = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._recovered = False
+        self.checkpoints: List[Dict[str, Any]] = []
+
+        os.makedirs(directory, exist_ok=True)
+
+    # ============================
+    # RECOVERY
+    # ============================
+
+    def recover(self) -> None:
+        """
+        Rebuild the log state and open the tail segment for appends.
+
+        Only frame headers (type, length, CRC) and checkpoints are read; the
+        JSON payloads are decoded by read_records(). A torn tail is
+        truncated, but only in the last segment: a sealed segment that fails
+        its length/CRC check or disagrees with its checkpoint raises
+        AuditLogCorruptionError instead of silently losing entries.
+        """
+        with self._lock:
+            segments = self._list_segments()
+            total = 0
+            previous_hash = "0" * 64
+
+            for position, number in enumerate(segments):
+                path = self._segment_path(number)
+                is_last = position == len(segments) - 1
+
+                count = 0
+                valid_length = 0
+                for record_type, _, end_offset in self._scan_frames(path):
+                    if record_type == RECORD_ENTRY:
+                        count += 1
+                    valid_length = end_offset
+
+                checkpoint = self._load_checkpoint(number)
+                if os.path.getsize(path) > valid_length:
+                    if not is_last:
+                        logger.error(
+                            f"[Audit Log] Corrupt frame in sealed segment {os.path.basename(path)} "
+                            f"at byte {valid_length}; refusing to truncate"
+                        )
+                        raise AuditLogCorruptionError(f"Corrupt sealed audit segment: {path}")
+                    logger.warning(f"[Audit Log] Truncating torn tail of {os.path.basename(path)} at byte {valid_length}")
+                    with open(path, "r+b") as f:
+                        f.truncate(valid_length)
+                        f.flush()
+                        os.fsync(f.fileno())
+
+                if checkpoint is not None and checkpoint.get("count") != count:
+                    logger.error(
+                        f"[Audit Log] Segment {os.path.basename(path)} holds {count} entries, "
+                        f"checkpoint says {checkpoint.get('count')}"
+                    )
+                    raise AuditLogCorruptionError(f"Audit segment does not match its checkpoint: {path}")
+
+                if is_last and checkpoint is None and count < self.segment_max_entries:
+                    # Tail segment stays open for appends; its chain hashes are
+                    # only read back if and when it is sealed
+                    self._segment_number = number
+                    self._segment_first_index = total
+                    self._segment_hashes = []
+                    self._segment_recovered_entries = count
+                    self._segment_first_previous_hash = previous_hash
+                else:
+                    if checkpoint is None:
+                        # Crash between the last record and the checkpoint write
+                        checkpoint = self._write_checkpoint(
+                            number, total, self._read_chain_hashes(number), previous_hash
+                        )
+                    self.checkpoints.append(checkpoint)
+                    previous_hash = checkpoint["last_chain_hash"]
+                total += count
+
+            self._total_entries = total
+            if self._segment_number == 0:
+                self._segment_number = (segments[-1] + 1) if segments else 1
+                self._segment_first_index = total
+                self._segment_hashes = []
+                self._segment_recovered_entries = 0
+                self._segment_first_previous_hash = previous_hash
+            self._open_segment()
+            self._recovered = True
+
+            logger.info(
+                f"[Audit Log] Recovered {total} entries from {len(segments)} segment(s) in {self.directory}"
+            )
+
+    def read_records(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Decode every record written so far (used to rebuild in-memory stores).
+
+        Returns:
+            (entry dicts in append order, redaction records)
+        """
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._file.flush()
+            entries: List[Dict[str, Any]] = []
+            redactions: List[Dict[str, Any]] = []
+            for number in self._list_segments():
+                for record_type, payload in self._read_payloads(number):
+                    if record_type == RECORD_ENTRY:
+                        entries.append(payload)
+                    elif record_type == RECORD_REDACTION:
+                        redactions.append(payload)
+            return entries, redactions
+
+    def _scan_frames(self, path: str) -> Iterator[Tuple[int, bytes, int]]:
+        """Yield (type, raw payload, end offset) for every intact frame in a segment"""
+        size = os.path.getsize(path)
+        if size == 0:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offset = 0
+            header_size = FRAME_HEADER.size
+            while offset + header_size <= size:
+                record_type, length, crc = FRAME_HEADER.unpack_from(mm, offset)
+                start = offset + header_size
+                end = start + length
+                if record_type not in (RECORD_ENTRY, RECORD_REDACTION) or end > size:
+                    break
+                payload = mm[start:end]
+                if zlib.crc32(payload) != crc:
+                    break
+                yield record_type, payload, end
+                offset = end
+
+    def _read_payloads(self, number: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for record_type, payload, _ in self._scan_frames(self._segment_path(number)):
+            yield record_type, json.loads(payload)
+
+    def _read_chain_hashes(self, number: int) -> List[str]:
+        return [
+            payload.get("chain_hash", "")
+            for record_type, payload in self._read_payloads(number)
+            if record_type == RECORD_ENTRY
+        ]
+
+    # ============================
+    # APPEND
+    # ============================
+
+    def append_entry(self, entry_dict: Dict[str, Any], chain_hash: str) -> None:
+        """Append one audit entry (sealing the segment when it is full)"""
+        with self._lock:
+            self._ensure_open()
+            self._write_frame(RECORD_ENTRY, entry_dict)
+            self._segment_hashes.append(chain_hash)
+            self._total_entries += 1
+            if self._segment_recovered_entries + len(self._segment_hashes) >= self.segment_max_entries:
+                self._seal_segment()
+            else:
+                self._maybe_sync()
+
+    def append_redaction(self, redaction: Dict[str, Any]) -> None:
+        """Record a redaction (applied to matching entries on recovery)"""
+        with self._lock:
+            self._ensure_open()
+            self._write_frame(RECORD_REDACTION, redaction)
+            self._sync()  # Redactions are rare and must not be lost
+
+    def redaction_key(self) -> bytes:
+        """Secret used to hash user ids in redaction records (created on first use)"""
+        path = os.path.join(self.directory, REDACTION_KEY_FILE)
+        with self._lock:
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                with open(path, "rb") as f:
+                    return f.read()
+            key = os.urandom(32)
+            with os.fdopen(fd, "wb") as f:
+                f.write(key)
+                f.flush()
+                os.fsync(f.fileno())
+            return key
+
+    def flush(self) -> None:
+        """fsync anything written since the last sync"""
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "entries": self._total_entries,
+                "sealed_segments": len(self.checkpoints),
+                "open_segment": self._segment_number,
+                "open_segment_entries": self._segment_recovered_entries + len(self._segment_hashes),
+                "unsynced_records": self._unsynced,
+            }
+
+    def _ensure_open(self) -> None:
+        if not self._recovered:
+            raise RuntimeError("AuditSegmentLog.recover() must run before appending")
+        if self._file is None:
+            self._open_segment()
+
+    def _open_segment(self) -> None:
+        self._file = open(self._segment_path(self._segment_number), "ab")
+
+    def _write_frame(self, record_type: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+        self._file.write(FRAME_HEADER.pack(record_type, len(data), zlib.crc32(data)))
+        self._file.write(data)
+        self._unsynced += 1
+
+    def _maybe_sync(self) -> None:
+        if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self._sync()
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _seal_segment(self) -> None:
+        """fsync, write the Merkle checkpoint and roll to a new segment"""
+        self._sync()
+        self._file.close()
+        hashes = self._segment_hashes
+        if self._segment_recovered_entries:
+            # Segment reopened after a restart: hashes of the earlier entries
+            # were not decoded during recovery
+            hashes = self._read_chain_hashes(self._segment_number)
+        checkpoint = self._write_checkpoint(
+            self._segment_number, self._segment_first_index,
+            hashes, self._segment_first_previous_hash
+        )
+        self.checkpoints.append(checkpoint)
+
+        self._segment_number += 1
+        self._segment_first_index += len(hashes)
+        self._segment_first_previous_hash = checkpoint["last_chain_hash"]
+        self._segment_hashes = []
+        self._segment_recovered_entries = 0
+        self._open_segment()
+
+    # ============================
+    # CHECKPOINTS
+    # ============================
+
+    def _write_checkpoint(self, number: int, first_index: int, hashes: List[str],
+                          first_previous_hash: str) -> Dict[str, Any]:
+        checkpoint = {
+            "segment": number,
+            "first_index": first_index,
+            "count": len(hashes),
+            "first_previous_hash": first_previous_hash,
+            "last_chain_hash": hashes[-1] if hashes else first_previous_hash,
+            "merkle_root": merkle_root(hashes),
+        }
+        path = self._checkpoint_path(number)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return checkpoint
+
+    def _load_checkpoint(self, number: int) -> Optional[Dict[str, Any]]:
+        path = self._checkpoint_path(number)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Audit Log] Unreadable checkpoint {path}: {e}")
+            return None
+
+    def _list_segments(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"segment-{number:06d}.log")
+
+    def _checkpoint_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"segment-{number:06d}.ckpt.json")
@@ -15,16 +15,27 @@ Version: 2.0
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from dataclasses import dataclass, field, asdict
 from enum import Enum
+import bisect
+import os
 import hashlib
+import heapq
+import hmac
 import json
 import uuid
 import logging
 
+from app.models.audit_segment_log import AuditSegmentLog, merkle_root
+
 logger = logging.getLogger(__name__)
 
+# Durable audit log directory (empty = in-memory only)
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "")
+# Secret for keyed user hashes in redaction records (empty = per-log key file)
+AUDIT_REDACTION_KEY = os.getenv("AUDIT_REDACTION_KEY", "")
+
 
 class AuditEventType(Enum):
     """Types of auditable events."""
@@ -189,17 +200,79 @@ class AuditTrailStore:
     """
     In-memory audit trail store.
     
+    Indexes (maintained on append, so lookups never scan the log):
+    - audit_id -> position (hash index, O(1) get_by_id)
+    - timestamp -> positions (sorted, bisect range scans)
+    - user / organization / event type -> positions
+    - risk score bucket (width RISK_SCORE_BUCKET_WIDTH) -> positions
+    
+    Queries pick the most selective index, walk it in append order and stop
+    after `limit` matches; `cursor` continues after the last returned entry.
+    
     In production, this would be backed by:
     - PostgreSQL with JSONB
     - Append-only log (Kafka, etc.)
     - Immutable storage (S3 with Object Lock)
     """
     
-    def __init__(self):
+    RISK_SCORE_BUCKET_WIDTH = 10.0
+    MAX_RISK_SCORE_BUCKET = 10  # Scores >= 100 share the top bucket
+    
+    def __init__(self, log_dir: Optional[str] = None, log: Optional[AuditSegmentLog] = None):
+        """
+        Args:
+            log_dir: Directory for the durable segment log (None = memory only)
+            log: Pre-built AuditSegmentLog (overrides log_dir)
+        """
         self._entries: List[AuditEntry] = []
         self._last_hash: str = "0" * 64  # Genesis hash
+        # Incremental verification state: entries [0, _verified_upto) verified
+        self._verified_upto: int = 0
+        self._index_by_id: Dict[str, int] = {}
         self._index_by_user: Dict[str, List[int]] = {}
         self._index_by_org: Dict[str, List[int]] = {}
+        self._index_by_event_type: Dict[AuditEventType, List[int]] = {}
+        self._index_by_score_bucket: Dict[Optional[int], List[int]] = {}
+        # Timestamp index: parallel sorted lists (key, position)
+        self._ts_keys: List[datetime] = []
+        self._ts_positions: List[int] = []
+        self._ts_in_append_order = True  # False once an out-of-order timestamp arrives
+        
+        self._log = log or (AuditSegmentLog(log_dir) if log_dir else None)
+        if AUDIT_REDACTION_KEY:
+            self._redaction_key = AUDIT_REDACTION_KEY.encode("utf-8")
+        elif self._log is not None:
+            self._redaction_key = self._log.redaction_key()
+        else:
+            self._redaction_key = os.urandom(32)
+        if self._log is not None:
+            self._recover_from_log()
+    
+    def _recover_from_log(self) -> None:
+        """Rebuild entries and indexes from the segment log (startup)"""
+        self._log.recover()
+        entry_dicts, redactions = self._log.read_records()
+        for data in entry_dicts:
+            entry = AuditEntry.from_dict(data)
+            index = len(self._entries)
+            self._entries.append(entry)
+            self._index_entry(entry, index)
+        if self._entries:
+            self._last_hash = self._entries[-1].chain_hash
+        users_by_hash: Optional[Dict[str, str]] = None
+        for redaction in redactions:
+            user_id = redaction.get('user_id')  # Records written before keyed hashing
+            if user_id is None:
+                if users_by_hash is None:
+                    users_by_hash = {self._user_hash(u): u for u in self._index_by_user if u}
+                user_id = users_by_hash.get(redaction.get('user_hash'))
+            if user_id is not None:
+                self._apply_anonymization(user_id, redaction['anonymized_id'])
+    
+    def close(self) -> None:
+        """Flush and close the durable log (if any)"""
+        if self._log is not None:
+            self._log.close()
     
     def append(self, entry: AuditEntry) -> str:
         """
@@ -209,34 +282,59 @@ class AuditTrailStore:
             Chain hash of the new entry
         """
         # Compute chain hash
-        entry.compute_chain_hash(self._last_hash)
-        self._last_hash = entry.chain_hash
+        chain_hash = entry.compute_chain_hash(self._last_hash)
+        
+        # Persist before exposing the entry (append-only, fsync-batched);
+        # the chain only advances once the write succeeded
+        if self._log is not None:
+            self._log.append_entry(entry.to_dict(), chain_hash)
+        self._last_hash = chain_hash
         
         # Store entry
         index = len(self._entries)
         self._entries.append(entry)
+        self._index_entry(entry, index)
+        
+        logger.info(f"Audit entry appended: {entry.audit_id}")
+        
+        return entry.chain_hash
+    
+    def _index_entry(self, entry: AuditEntry, index: int) -> None:
+        """Add entry (at position index) to every index"""
+        self._index_by_id[entry.audit_id] = index
         
-        # Update indices
         if entry.user_id:
-            if entry.user_id not in self._index_by_user:
-                self._index_by_user[entry.user_id] = []
-            self._index_by_user[entry.user_id].append(index)
+            self._index_by_user.setdefault(entry.user_id, []).append(index)
         
         if entry.organization_id:
-            if entry.organization_id not in self._index_by_org:
-                self._index_by_org[entry.organization_id] = []
-            self._index_by_org[entry.organization_id].append(index)
+            self._index_by_org.setdefault(entry.organization_id, []).append(index)
         
-        logger.info(f"Audit entry appended: {entry.audit_id}")
+        self._index_by_event_type.setdefault(entry.event_type, []).append(index)
+        self._index_by_score_bucket.setdefault(self._score_bucket(entry.risk_score), []).append(index)
         
-        return entry.chain_hash
+        if not self._ts_keys or entry.timestamp >= self._ts_keys[-1]:
+            self._ts_keys.append(entry.timestamp)
+            self._ts_positions.append(index)
+        else:
+            # Out-of-order timestamp (e.g. imported entries): keep the index sorted
+            insert_at = bisect.bisect_right(self._ts_keys, entry.timestamp)
+            self._ts_keys.insert(insert_at, entry.timestamp)
+            self._ts_positions.insert(insert_at, index)
+            self._ts_in_append_order = False
+    
+    @classmethod
+    def _score_bucket(cls, risk_score: Optional[float]) -> Optional[int]:
+        if risk_score is None:
+            return None
+        return min(max(int(risk_score // cls.RISK_SCORE_BUCKET_WIDTH), 0), cls.MAX_RISK_SCORE_BUCKET)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
     
     def get_by_id(self, audit_id: str) -> Optional[AuditEntry]:
         """Get entry by audit ID."""
-        for entry in self._entries:
-            if entry.audit_id == audit_id:
-                return entry
-        return None
+        index = self._index_by_id.get(audit_id)
+        return self._entries[index] if index is not None else None
     
     def get_by_user(self, user_id: str) -> List[AuditEntry]:
         """Get all entries for a user."""
@@ -257,14 +355,58 @@ class AuditTrailStore:
         event_type: AuditEventType = None,
         min_risk_score: float = None,
         max_risk_score: float = None,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[AuditEntry]:
         """
         Query audit entries with filters.
         """
-        results = []
+        return self.query_page(
+            start_date=start_date,
+            end_date=end_date,
+            user_id=user_id,
+            organization_id=organization_id,
+            event_type=event_type,
+            min_risk_score=min_risk_score,
+            max_risk_score=max_risk_score,
+            limit=limit,
+            cursor=cursor
+        )['entries']
+    
+    def query_page(
+        self,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        user_id: str = None,
+        organization_id: str = None,
+        event_type: AuditEventType = None,
+        min_risk_score: float = None,
+        max_risk_score: float = None,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Query one page of audit entries (append order).
+        
+        Args:
+            cursor: Opaque cursor from a previous page's next_cursor
+            
+        Returns:
+            Dict with 'entries' and 'next_cursor' (None on the last page)
+        """
+        after = self._decode_cursor(cursor)
+        candidates = self._select_candidates(
+            start_date, end_date, user_id, organization_id,
+            event_type, min_risk_score, max_risk_score, after
+        )
+        
+        results: List[AuditEntry] = []
+        last_position = None
+        has_more = False
         
-        for entry in self._entries:
+        for position in candidates:
+            entry = self._entries[position]
+            
             # Apply filters
             if start_date and entry.timestamp < start_date:
                 continue
@@ -281,12 +423,102 @@ class AuditTrailStore:
             if max_risk_score is not None and (entry.risk_score or 100) > max_risk_score:
                 continue
             
-            results.append(entry)
-            
             if len(results) >= limit:
+                has_more = True
                 break
+            
+            results.append(entry)
+            last_position = position
+        
+        return {
+            'entries': results,
+            'next_cursor': str(last_position) if has_more and last_position is not None else None
+        }
+    
+    @staticmethod
+    def _decode_cursor(cursor: Optional[str]) -> int:
+        if cursor in (None, ""):
+            return -1
+        try:
+            return int(cursor)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid audit query cursor: {cursor!r}")
+    
+    def _select_candidates(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        user_id: Optional[str],
+        organization_id: Optional[str],
+        event_type: Optional[AuditEventType],
+        min_risk_score: Optional[float],
+        max_risk_score: Optional[float],
+        after: int
+    ) -> Iterator[int]:
+        """
+        Positions (ascending, > after) from the most selective index.
         
-        return results
+        Every index yields a superset of the matches; query_page applies the
+        exact filters.
+        """
+        options: List[Tuple[int, str, Any]] = []  # (estimated size, kind, position source)
+        
+        if user_id:
+            positions = self._index_by_user.get(user_id, [])
+            options.append((len(positions), 'list', positions))
+        if organization_id:
+            positions = self._index_by_org.get(organization_id, [])
+            options.append((len(positions), 'list', positions))
+        if event_type:
+            positions = self._index_by_event_type.get(event_type, [])
+            options.append((len(positions), 'list', positions))
+        if min_risk_score is not None or max_risk_score is not None:
+            buckets = self._score_buckets_for_range(min_risk_score, max_risk_score)
+            lists = [self._index_by_score_bucket.get(b, []) for b in buckets]
+            options.append((sum(len(l) for l in lists), 'lists', lists))
+        if start_date or end_date:
+            lo = bisect.bisect_left(self._ts_keys, start_date) if start_date else 0
+            hi = bisect.bisect_right(self._ts_keys, end_date) if end_date else len(self._ts_keys)
+            options.append((max(0, hi - lo), 'time', (lo, hi)))
+        
+        if not options:
+            return iter(range(after + 1, len(self._entries)))
+        
+        _, kind, source = min(options, key=lambda option: option[0])
+        
+        if kind == 'time':
+            lo, hi = source
+            if self._ts_in_append_order:
+                # Timestamp order == append order: positions are ascending
+                start = bisect.bisect_right(self._ts_positions, after, lo, hi)
+                return (self._ts_positions[i] for i in range(start, hi))
+            return iter(sorted(p for p in self._ts_positions[lo:hi] if p > after))
+        
+        if kind == 'lists':
+            # Several score buckets: merge their ascending position lists
+            return heapq.merge(*[self._positions_after(positions, after) for positions in source])
+        
+        return self._positions_after(source, after)
+    
+    @staticmethod
+    def _positions_after(positions: List[int], after: int) -> Iterator[int]:
+        """Iterate an ascending position list from the first position > after"""
+        start = bisect.bisect_right(positions, after)
+        return (positions[i] for i in range(start, len(positions)))
+    
+    def _score_buckets_for_range(
+        self,
+        min_risk_score: Optional[float],
+        max_risk_score: Optional[float]
+    ) -> List[Optional[int]]:
+        """Buckets that can hold a score matching the (None-tolerant) filters"""
+        low = self._score_bucket(min_risk_score) if min_risk_score is not None else 0
+        high = self._score_bucket(max_risk_score) if max_risk_score is not None else self.MAX_RISK_SCORE_BUCKET
+        buckets: List[Optional[int]] = list(range(low, high + 1))
+        # A missing score counts as 0 for min and 100 for max filters
+        if (min_risk_score is None or min_risk_score <= 0) and (max_risk_score is None or max_risk_score >= 100):
+            buckets.append(None)
+        return buckets
     
     def verify_chain_integrity(
         self,
@@ -349,6 +581,48 @@ class AuditTrailStore:
         
         return integrity_valid, broken_links
     
+    def verify_incremental(self) -> Tuple[bool, List[Dict], int]:
+        """
+        Verify only entries appended since the last successful verification.
+        
+        Entries are rehashed and chain-linked as in verify_chain_integrity;
+        sealed log segments that are fully inside the new range must also
+        match their checkpoint Merkle root.
+        
+        Returns:
+            Tuple of (is_valid, list of broken links, entries checked)
+        """
+        start = self._verified_upto
+        end = len(self._entries)
+        if start >= end:
+            return True, [], 0
+        
+        is_valid, broken_links = self.verify_chain_integrity(start, end)
+        
+        if self._log is not None:
+            for checkpoint in self._log.checkpoints:
+                first = checkpoint['first_index']
+                last = first + checkpoint['count']
+                if first < start or last > end:
+                    continue
+                root = merkle_root([e.chain_hash for e in self._entries[first:last]])
+                if root != checkpoint['merkle_root']:
+                    is_valid = False
+                    broken_links.append({
+                        'segment': checkpoint['segment'],
+                        'first_index': first,
+                        'issue': 'Segment Merkle root mismatch - entries altered or missing'
+                    })
+        
+        if is_valid:
+            self._verified_upto = end
+        
+        return is_valid, broken_links, end - start
+    
+    def reset_verification(self) -> None:
+        """Forget verified checkpoints (next incremental verify rehashes everything)"""
+        self._verified_upto = 0
+    
     def export_for_user(self, user_id: str) -> Dict:
         """
         Export all data for a user (GDPR compliance).
@@ -366,10 +640,31 @@ class AuditTrailStore:
         """
         Anonymize user data (GDPR right to be forgotten).
         
-        Note: Cannot delete due to audit integrity requirements.
+        Note: Cannot delete due to audit integrity requirements. The
+        redaction record stores only a keyed hash of the user id; entry
+        frames already on disk keep the raw id until segment compaction.
         """
+        user_hash = self._user_hash(user_id)
+        anonymized_id = f"ANONYMIZED_{user_hash[:8]}"
+        count = self._apply_anonymization(user_id, anonymized_id)
+        
+        if count and self._log is not None:
+            # Entry frames are immutable; the redaction is replayed on recovery
+            self._log.append_redaction({
+                'user_hash': user_hash,
+                'anonymized_id': anonymized_id,
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        
+        return count
+    
+    def _user_hash(self, user_id: str) -> str:
+        """Keyed hash of a user id (matches redaction records on recovery)"""
+        return hmac.new(self._redaction_key, user_id.encode("utf-8"), hashlib.sha256).hexdigest()
+    
+    def _apply_anonymization(self, user_id: str, anonymized_id: str) -> int:
+        """Redact a user's entries in memory and re-key the user index."""
         indices = self._index_by_user.get(user_id, [])
-        anonymized_id = f"ANONYMIZED_{hashlib.sha256(user_id.encode()).hexdigest()[:8]}"
         
         for idx in indices:
             entry = self._entries[idx]
@@ -409,7 +704,7 @@ class AuditTrailStore:
 
 
 # Global audit store instance
-_audit_store = AuditTrailStore()
+_audit_store = AuditTrailStore(log_dir=AUDIT_LOG_DIR or None)
 
 
 class AuditService:
@@ -480,17 +775,36 @@ class AuditService:
         return _audit_store.query(**kwargs)
     
     @staticmethod
-    def verify_integrity() -> Dict:
-        """Verify audit chain integrity."""
-        is_valid, broken_links = _audit_store.verify_chain_integrity()
+    def query_page(**kwargs) -> Dict[str, Any]:
+        """Query one page of audit entries (cursor pagination)."""
+        return _audit_store.query_page(**kwargs)
+    
+    @staticmethod
+    def verify_integrity(full: bool = False) -> Dict:
+        """
+        Verify audit chain integrity.
+        
+        Incremental by default: only entries appended since the last
+        successful verification are rehashed. full=True rehashes the chain.
+        """
+        if full:
+            _audit_store.reset_verification()
+        is_valid, broken_links, checked = _audit_store.verify_incremental()
         
         return {
             'integrity_valid': is_valid,
-            'entries_checked': len(_audit_store._entries),
+            'entries_checked': checked,
+            'entries_total': len(_audit_store),
+            'verification_mode': 'full' if full else 'incremental',
             'broken_links': broken_links,
             'verification_timestamp': datetime.utcnow().isoformat()
         }
     
+    @staticmethod
+    def close() -> None:
+        """Flush the durable audit log (application shutdown)."""
+        _audit_store.close()
+    
     @staticmethod
     def export_user_data(user_id: str) -> Dict:
         """Export all data for a user (GDPR)."""
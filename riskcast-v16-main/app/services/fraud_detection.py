@@ -18,12 +18,22 @@ from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 from enum import Enum
+from array import array
+from collections import OrderedDict
 import hashlib
 import logging
+import math
+import os
 import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Rolling per-user behavior index
+FRAUD_HISTORY_WINDOW = int(os.getenv("FRAUD_HISTORY_WINDOW", "50"))
+FRAUD_INDEX_MAX_USERS = int(os.getenv("FRAUD_INDEX_MAX_USERS", "100000"))
+
 
 class SignalSeverity(Enum):
     """Severity level of fraud signals."""
@@ -99,6 +109,187 @@ class FraudAnalysisResult:
         }
 
 
+# ============================================================================
+# USER BEHAVIOR INDEX
+# ============================================================================
+
+@dataclass(frozen=True)
+class UserBehaviorStats:
+    """Summary of a user's recent assessments, as used by the history checks."""
+    count: int
+    mean_score: float
+    all_identical: bool
+    burst_detected: bool
+
+
+class UserBehaviorWindow:
+    """
+    Rolling window of one user's recent risk scores and timestamps.
+    
+    Scores and epoch timestamps live in fixed-size ring buffers; the
+    running sum, the run of identical trailing scores and the most recent
+    burst are maintained on every record, so both updates and stats are O(1).
+    """
+    
+    # Burst: this many requests within BURST_SECONDS
+    BURST_REQUESTS = 10
+    BURST_SECONDS = 60.0
+    
+    __slots__ = ("capacity", "scores", "timestamps", "count", "head",
+                 "score_sum", "identical_run", "last_burst_at")
+    
+    def __init__(self, capacity: int = FRAUD_HISTORY_WINDOW):
+        self.capacity = max(capacity, 1)
+        self.scores = array("f", bytes(4 * self.capacity))
+        self.timestamps = array("d", bytes(8 * self.capacity))
+        self.count = 0
+        self.head = 0  # Next write position
+        self.score_sum = 0.0
+        self.identical_run = 0
+        self.last_burst_at = -math.inf
+    
+    def _at(self, back: int) -> int:
+        """Ring position of the entry `back` steps before the newest (0 = newest)."""
+        return (self.head - 1 - back) % self.capacity
+    
+    def record(self, score: float, timestamp: float) -> None:
+        """Add an assessment, evicting the oldest one when the window is full."""
+        score = float(np.float32(score))  # Compare at storage precision
+        if self.count == self.capacity:
+            self.score_sum -= self.scores[self.head]
+        else:
+            self.count += 1
+        
+        previous = self.scores[self._at(0)] if self.count > 1 else None
+        self.identical_run = self.identical_run + 1 if score == previous else 1
+        
+        self.scores[self.head] = score
+        self.timestamps[self.head] = timestamp
+        self.head = (self.head + 1) % self.capacity
+        self.score_sum += score
+        
+        # Burst ending at this entry: compare with the entry BURST_REQUESTS - 1 back
+        back = self.BURST_REQUESTS - 1
+        if self.count > back and timestamp - self.timestamps[self._at(back)] < self.BURST_SECONDS:
+            self.last_burst_at = timestamp
+    
+    def stats(self) -> UserBehaviorStats:
+        """Summarize the window."""
+        oldest = self.timestamps[self._at(self.count - 1)] if self.count else math.inf
+        if math.isnan(oldest):
+            # Undated history entries (sorted first) never age a burst out
+            oldest = -math.inf
+        return UserBehaviorStats(
+            count=self.count,
+            mean_score=self.score_sum / self.count if self.count else 0.0,
+            all_identical=self.count > 0 and self.identical_run >= self.count,
+            # A burst counts while any of its requests is still in the window
+            burst_detected=self.last_burst_at > -math.inf and self.last_burst_at >= oldest
+        )
+    
+    @classmethod
+    def from_history(cls, history: List[Dict]) -> "UserBehaviorWindow":
+        """
+        Build a window from a list of past assessments.
+        
+        Args:
+            history: Dicts with 'risk_score' and optional 'timestamp'
+                     (datetime, ISO string or epoch seconds)
+            
+        Returns:
+            Window holding the whole history in timestamp order
+        """
+        entries = [(_to_epoch(h.get('timestamp')), h.get('risk_score', 0)) for h in history]
+        # Undated entries first so they never sit between two dated ones
+        entries.sort(key=lambda e: (not math.isnan(e[0]), e[0] if not math.isnan(e[0]) else 0))
+        window = cls(capacity=len(entries))
+        for timestamp, score in entries:
+            window.record(score, timestamp)
+        return window
+
+
+def _to_epoch(value: Any) -> float:
+    """Convert a history timestamp to epoch seconds (NaN if missing/unparseable)."""
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        if isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                from dateutil import parser
+                value = parser.parse(value)
+        return value.timestamp()
+    except Exception:
+        return math.nan
+
+
+class UserBehaviorIndex:
+    """
+    Incremental per-user behavior index.
+    
+    Keeps a UserBehaviorWindow for each user (least recently active users
+    are evicted beyond max_users), so history checks need no history
+    lookups. Thread-safe.
+    """
+    
+    def __init__(self, window: int = FRAUD_HISTORY_WINDOW, max_users: int = FRAUD_INDEX_MAX_USERS):
+        self.window = window
+        self.max_users = max_users
+        self._users: "OrderedDict[str, UserBehaviorWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def record(self, user_id: str, risk_score: float, timestamp: Optional[float] = None) -> None:
+        """
+        Record an assessment for a user.
+        
+        Args:
+            user_id: User identifier
+            risk_score: Risk score of the assessment
+            timestamp: Epoch seconds (default: now)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            window = self._users.get(user_id)
+            if window is None:
+                window = self._users[user_id] = UserBehaviorWindow(self.window)
+                if len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_id)
+            window.record(risk_score, timestamp)
+    
+    def get_stats(self, user_id: str) -> Optional[UserBehaviorStats]:
+        """Get a user's behavior summary (None if the user has no history)."""
+        with self._lock:
+            window = self._users.get(user_id)
+            return window.stats() if window is not None else None
+    
+    def forget(self, user_id: str) -> None:
+        """Drop a user's history."""
+        with self._lock:
+            self._users.pop(user_id, None)
+    
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+# Global behavior index
+_behavior_index = UserBehaviorIndex()
+
+
+def get_behavior_index() -> UserBehaviorIndex:
+    """Get the global user behavior index."""
+    return _behavior_index
+
+
+# ============================================================================
+# DETECTOR
+# ============================================================================
+
 class FraudDetector:
     """
     Detect patterns indicative of gaming or fraud.
@@ -109,6 +300,9 @@ class FraudDetector:
     3. User behavior pattern analysis
     4. Cross-field consistency checks
     5. Temporal pattern analysis
+    
+    The detector keeps no per-request state, so one instance can be shared
+    across concurrent requests.
     """
     
     # Critical fields that should always be provided
@@ -138,42 +332,52 @@ class FraudDetector:
         SignalSeverity.CRITICAL: 1.0
     }
     
-    def __init__(self):
-        self.signals: List[FraudSignal] = []
+    def __init__(self, behavior_index: Optional[UserBehaviorIndex] = None):
+        self.behavior_index = behavior_index if behavior_index is not None else get_behavior_index()
     
     def analyze_request(
         self,
         request_data: Dict[str, Any],
         user_history: Optional[List[Dict]] = None,
-        ip_address: Optional[str] = None
+        ip_address: Optional[str] = None,
+        user_id: Optional[str] = None
     ) -> FraudAnalysisResult:
         """
         Run all fraud detection checks on a request.
         
         Args:
             request_data: Shipment data from request
-            user_history: Previous assessments from this user
+            user_history: Previous assessments from this user (takes
+                          precedence over the behavior index)
             ip_address: Client IP for behavior analysis
+            user_id: User whose behavior index entry feeds the history checks
             
         Returns:
             FraudAnalysisResult with signals, score, and recommendation
         """
-        self.signals = []
+        signals: List[FraudSignal] = []
         
         # Run all detection checks
-        self._check_strategic_omissions(request_data)
-        self._check_value_anomalies(request_data)
-        self._check_benford_law(request_data)
-        self._check_round_numbers(request_data)
-        self._check_cross_field_consistency(request_data)
-        self._check_temporal_anomalies(request_data)
+        self._check_strategic_omissions(request_data, signals)
+        self._check_value_anomalies(request_data, signals)
+        self._check_benford_law(request_data, signals)
+        self._check_round_numbers(request_data, signals)
+        self._check_cross_field_consistency(request_data, signals)
+        self._check_temporal_anomalies(request_data, signals)
         
         if user_history:
-            self._check_user_patterns(user_history)
-            self._check_systematic_probing(user_history)
+            stats = UserBehaviorWindow.from_history(user_history).stats()
+        elif user_id:
+            stats = self.behavior_index.get_stats(user_id)
+        else:
+            stats = None
+        
+        if stats is not None:
+            self._check_user_patterns(stats, signals)
+            self._check_systematic_probing(stats, signals)
         
         # Calculate overall fraud score
-        fraud_score = self._compute_fraud_score()
+        fraud_score = self._compute_fraud_score(signals)
         
         # Determine recommended action
         action = self._recommend_action(fraud_score)
@@ -182,19 +386,20 @@ class FraudDetector:
         risk_penalty = self._calculate_risk_penalty(fraud_score)
         
         # Generate explanation
-        explanation = self._generate_explanation(fraud_score, action)
+        explanation = self._generate_explanation(signals, fraud_score, action)
         
         return FraudAnalysisResult(
             fraud_score=fraud_score,
-            signals=self.signals,
+            signals=signals,
             recommended_action=action,
             risk_penalty=risk_penalty,
             explanation=explanation,
             timestamp=datetime.utcnow()
         )
     
+    @staticmethod
     def _add_signal(
-        self,
+        signals: List[FraudSignal],
         signal_type: SignalType,
         severity: SignalSeverity,
         description: str,
@@ -204,7 +409,7 @@ class FraudDetector:
         actual: Any = None
     ):
         """Add a fraud signal."""
-        self.signals.append(FraudSignal(
+        signals.append(FraudSignal(
             signal_type=signal_type,
             severity=severity,
             description=description,
@@ -214,7 +419,7 @@ class FraudDetector:
             actual_value=actual
         ))
     
-    def _check_strategic_omissions(self, data: Dict):
+    def _check_strategic_omissions(self, data: Dict, signals: List[FraudSignal]):
         """Detect strategic omission of high-risk fields."""
         
         # Check critical fields
@@ -223,6 +428,7 @@ class FraudDetector:
         if len(missing_critical) > 0:
             severity = SignalSeverity.HIGH if len(missing_critical) > 2 else SignalSeverity.MEDIUM
             self._add_signal(
+                signals,
                 signal_type=SignalType.MISSING_CRITICAL_DATA,
                 severity=severity,
                 description=f"Missing critical fields: {', '.join(missing_critical)}",
@@ -234,13 +440,14 @@ class FraudDetector:
         
         if len(missing_high_risk) >= 3:
             self._add_signal(
+                signals,
                 signal_type=SignalType.STRATEGIC_OMISSION,
                 severity=SignalSeverity.MEDIUM,
                 description=f"Multiple high-risk fields omitted: {', '.join(missing_high_risk[:3])}...",
                 confidence=0.6
             )
     
-    def _check_value_anomalies(self, data: Dict):
+    def _check_value_anomalies(self, data: Dict, signals: List[FraudSignal]):
         """Detect unusual value patterns."""
         
         cargo_value = data.get('cargo_value')
@@ -251,6 +458,7 @@ class FraudDetector:
                 # Extremely low value (potential underreporting)
                 if value < 1000 and data.get('cargo_type') in ['electronics', 'machinery', 'hazardous']:
                     self._add_signal(
+                        signals,
                         signal_type=SignalType.VALUE_ANOMALY,
                         severity=SignalSeverity.HIGH,
                         description=f"Cargo value ${value:,.0f} unusually low for {data.get('cargo_type')}",
@@ -263,6 +471,7 @@ class FraudDetector:
                 # Extremely high value (potential gaming for insurance)
                 if value > 10_000_000:
                     self._add_signal(
+                        signals,
                         signal_type=SignalType.VALUE_ANOMALY,
                         severity=SignalSeverity.MEDIUM,
                         description=f"Extremely high cargo value ${value:,.0f} - requires verification",
@@ -273,7 +482,7 @@ class FraudDetector:
             except (ValueError, TypeError):
                 pass
     
-    def _check_benford_law(self, data: Dict):
+    def _check_benford_law(self, data: Dict, signals: List[FraudSignal]):
         """Check if values follow Benford's Law distribution."""
         
         # Collect numeric values
@@ -313,13 +522,14 @@ class FraudDetector:
         # High chi-square indicates deviation from Benford
         if chi_square > 20:  # Threshold for suspicion
             self._add_signal(
+                signals,
                 signal_type=SignalType.BENFORD_VIOLATION,
                 severity=SignalSeverity.LOW,
                 description="Numeric values deviate from expected Benford's Law distribution",
                 confidence=0.4
             )
     
-    def _check_round_numbers(self, data: Dict):
+    def _check_round_numbers(self, data: Dict, signals: List[FraudSignal]):
         """Detect suspiciously round numbers."""
         
         round_fields = []
@@ -344,13 +554,14 @@ class FraudDetector:
         
         if len(round_fields) >= 2:
             self._add_signal(
+                signals,
                 signal_type=SignalType.ROUND_NUMBER,
                 severity=SignalSeverity.LOW,
                 description=f"Multiple suspiciously round values: {round_fields}",
                 confidence=0.3
             )
     
-    def _check_cross_field_consistency(self, data: Dict):
+    def _check_cross_field_consistency(self, data: Dict, signals: List[FraudSignal]):
         """Check for inconsistencies between related fields."""
         
         # Air freight with ocean containers
@@ -359,6 +570,7 @@ class FraudDetector:
         
         if 'air' in transport and any(c in container for c in ['20ft', '40ft', 'reefer']):
             self._add_signal(
+                signals,
                 signal_type=SignalType.CROSS_FIELD_INCONSISTENCY,
                 severity=SignalSeverity.HIGH,
                 description="Air freight cannot use ocean containers",
@@ -382,6 +594,7 @@ class FraudDetector:
                     expected_min_days = distance / 800  # ~800km/day for sea
                     if transit < expected_min_days * 0.5:
                         self._add_signal(
+                            signals,
                             signal_type=SignalType.CROSS_FIELD_INCONSISTENCY,
                             severity=SignalSeverity.MEDIUM,
                             description=f"Transit time {transit} days too short for {distance}km by sea",
@@ -404,6 +617,7 @@ class FraudDetector:
                 
                 if sv < cv * 0.5 or sv > cv * 2:
                     self._add_signal(
+                        signals,
                         signal_type=SignalType.CROSS_FIELD_INCONSISTENCY,
                         severity=SignalSeverity.MEDIUM,
                         description=f"Shipment value ${sv:,.0f} inconsistent with cargo value ${cv:,.0f}",
@@ -412,7 +626,7 @@ class FraudDetector:
             except (ValueError, TypeError):
                 pass
     
-    def _check_temporal_anomalies(self, data: Dict):
+    def _check_temporal_anomalies(self, data: Dict, signals: List[FraudSignal]):
         """Detect temporal anomalies in dates."""
         
         etd = data.get('etd') or data.get('departure_date')
@@ -428,6 +642,7 @@ class FraudDetector:
             if departure < now:
                 days_past = (now - departure).days
                 self._add_signal(
+                    signals,
                     signal_type=SignalType.TEMPORAL_ANOMALY,
                     severity=SignalSeverity.HIGH,
                     description=f"Retroactive assessment: shipment departed {days_past} days ago",
@@ -438,6 +653,7 @@ class FraudDetector:
             # Far future assessment
             elif (departure - now).days > 180:
                 self._add_signal(
+                    signals,
                     signal_type=SignalType.TEMPORAL_ANOMALY,
                     severity=SignalSeverity.LOW,
                     description="Assessing shipment >6 months in advance",
@@ -447,16 +663,16 @@ class FraudDetector:
         except Exception:
             pass
     
-    def _check_user_patterns(self, history: List[Dict]):
+    def _check_user_patterns(self, stats: UserBehaviorStats, signals: List[FraudSignal]):
         """Analyze user behavior patterns."""
         
-        if len(history) < 5:
+        if stats.count < 5:
             return
         
         # Check for identical scores (potential testing/gaming)
-        scores = [h.get('risk_score', 0) for h in history]
-        if len(set(scores)) == 1 and len(scores) >= 5:
+        if stats.all_identical:
             self._add_signal(
+                signals,
                 signal_type=SignalType.USER_BEHAVIOR,
                 severity=SignalSeverity.MEDIUM,
                 description="All recent assessments have identical risk scores",
@@ -464,60 +680,46 @@ class FraudDetector:
             )
         
         # Check for systematic low scores
-        avg_score = np.mean(scores)
-        if avg_score < 30 and len(scores) >= 10:
+        avg_score = stats.mean_score
+        if avg_score < 30 and stats.count >= 10:
             self._add_signal(
+                signals,
                 signal_type=SignalType.USER_BEHAVIOR,
                 severity=SignalSeverity.LOW,
                 description=f"User average risk score ({avg_score:.1f}) unusually low",
                 confidence=0.5
             )
     
-    def _check_systematic_probing(self, history: List[Dict]):
+    def _check_systematic_probing(self, stats: UserBehaviorStats, signals: List[FraudSignal]):
         """Detect systematic parameter sweeping (reverse engineering)."""
         
-        if len(history) < 10:
+        if stats.count < 10:
             return
         
-        # Check if user is varying single parameters systematically
-        # (Simplified detection)
-        
-        # Count rapid-fire requests
-        timestamps = [h.get('timestamp') for h in history if h.get('timestamp')]
-        if len(timestamps) >= 5:
-            try:
-                from dateutil import parser
-                times = [parser.parse(t) if isinstance(t, str) else t for t in timestamps]
-                times.sort()
-                
-                # Check for burst activity (>10 requests in 1 minute)
-                for i in range(len(times) - 10):
-                    window = times[i:i+10]
-                    if (window[-1] - window[0]).total_seconds() < 60:
-                        self._add_signal(
-                            signal_type=SignalType.SYSTEMATIC_PROBING,
-                            severity=SignalSeverity.HIGH,
-                            description="Rapid-fire requests detected (>10/minute) - possible automated probing",
-                            confidence=0.8
-                        )
-                        break
-            except Exception:
-                pass
+        # Rapid-fire requests (burst tracked incrementally by the window)
+        if stats.burst_detected:
+            self._add_signal(
+                signals,
+                signal_type=SignalType.SYSTEMATIC_PROBING,
+                severity=SignalSeverity.HIGH,
+                description="Rapid-fire requests detected (>10/minute) - possible automated probing",
+                confidence=0.8
+            )
     
-    def _compute_fraud_score(self) -> float:
+    def _compute_fraud_score(self, signals: List[FraudSignal]) -> float:
         """Aggregate signals into overall fraud score (0-100)."""
         
-        if not self.signals:
+        if not signals:
             return 0.0
         
         weighted_sum = sum(
             self.SEVERITY_WEIGHTS[s.severity] * s.confidence * 100
-            for s in self.signals
+            for s in signals
         )
         
         # Normalize by number of signals (with cap)
         max_signals = 5  # Normalize assuming up to 5 significant signals
-        normalized = weighted_sum / max(len(self.signals), 1)
+        normalized = weighted_sum / max(len(signals), 1)
         
         # Scale to 0-100
         fraud_score = min(normalized, 100)
@@ -549,12 +751,13 @@ class FraudDetector:
     
     def _generate_explanation(
         self, 
+        signals: List[FraudSignal],
         fraud_score: float, 
         action: RecommendedAction
     ) -> str:
         """Generate human-readable explanation."""
         
-        if not self.signals:
+        if not signals:
             return "No gaming or fraud signals detected. Normal processing."
         
         action_explanations = {
@@ -565,7 +768,7 @@ class FraudDetector:
         }
         
         top_signals = sorted(
-            self.signals, 
+            signals, 
             key=lambda s: self.SEVERITY_WEIGHTS[s.severity] * s.confidence,
             reverse=True
         )[:3]
@@ -580,21 +783,38 @@ class FraudDetector:
         return explanation
 
 
+# Shared detector (stateless, safe to reuse across requests)
+_detector = FraudDetector()
+
+
 # Convenience function for API integration
 def analyze_request_for_fraud(
     request_data: Dict[str, Any],
     user_history: Optional[List[Dict]] = None,
-    ip_address: Optional[str] = None
+    ip_address: Optional[str] = None,
+    user_id: Optional[str] = None
 ) -> Dict:
     """
     Analyze a request for fraud/gaming signals.
     
     Returns analysis result as dictionary.
     """
-    detector = FraudDetector()
-    result = detector.analyze_request(
+    result = _detector.analyze_request(
         request_data,
         user_history=user_history,
-        ip_address=ip_address
+        ip_address=ip_address,
+        user_id=user_id
     )
     return result.to_dict()
+
+
+def record_assessment(user_id: Optional[str], risk_score: float) -> None:
+    """
+    Record a completed assessment in the global behavior index.
+    
+    Args:
+        user_id: User identifier (anonymous requests are not tracked)
+        risk_score: Risk score returned to the user
+    """
+    if user_id:
+        _behavior_index.record(user_id, risk_score)
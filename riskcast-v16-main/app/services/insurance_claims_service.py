@@ -10,8 +10,9 @@ from uuid import uuid4
 import logging
 
 from app.models.insurance import (
-    Claim, ClaimType, Policy, TriggerEvaluation
+    Claim, ClaimType, Policy
 )
+from app.services.parametric_engine import TriggerEvaluation
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +19,8 @@ from enum import Enum
 from datetime import datetime
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -84,9 +86,10 @@ class PortfolioPremiumResult:
     risk_distribution: Dict
     recommendations: List[str]
     individual_shipments: List[Dict]
+    shipments_page: Optional[Dict] = None  # offset/limit/total when paginated
     
     def to_dict(self) -> Dict:
-        return {
+        result = {
             'total_premium_before_discount': self.total_premium_before_discount,
             'portfolio_discount_pct': self.portfolio_discount_pct,
             'total_premium_after_discount': self.total_premium_after_discount,
@@ -97,6 +100,87 @@ class PortfolioPremiumResult:
             'recommendations': self.recommendations,
             'individual_shipments': self.individual_shipments
         }
+        if self.shipments_page is not None:
+            result['individual_shipments_page'] = self.shipments_page
+        return result
+
+
+@dataclass
+class PortfolioBook:
+    """
+    Columnar pricing of a shipment book (one NumPy array per field).
+    
+    Built by InsurancePremiumCalculator.price_book. Totals and the risk
+    distribution are computed on the arrays; per-shipment dicts are only
+    materialized for the rows requested via rows().
+    """
+    shipment_ids: List[str]
+    transport_modes: List[str]
+    cargo_types: List[str]
+    additional_factors: List[Optional[Dict]]
+    cargo_value: np.ndarray
+    risk_score: np.ndarray
+    base_rate: np.ndarray
+    risk_class_index: np.ndarray
+    risk_multiplier: np.ndarray
+    additional_multiplier: np.ndarray
+    premium_rate: np.ndarray
+    premium: np.ndarray
+    premium_usd: np.ndarray  # Rounded to cents, as in calculate_premium
+    baseline_premium: np.ndarray
+    deductible: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.shipment_ids)
+    
+    def risk_class_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.risk_class_index, minlength=len(RISK_CLASS_ORDER))
+        return {rc.value: int(count) for rc, count in zip(RISK_CLASS_ORDER, counts)}
+    
+    def row(self, i: int) -> Dict:
+        """One shipment in the calculate_premium result format (plus shipment_id)."""
+        risk_class = RISK_CLASS_ORDER[self.risk_class_index[i]]
+        cargo_value = self.cargo_value[i].item()
+        risk_score = self.risk_score[i].item()
+        base_rate = self.base_rate[i].item()
+        final_rate = self.premium_rate[i].item()
+        premium = self.premium[i].item()
+        premium_usd = round(premium, 2)
+        baseline_premium = self.baseline_premium[i].item()
+        factors = self.additional_factors[i] or {}
+        return {
+            'shipment_id': self.shipment_ids[i],
+            'premium_usd': premium_usd,
+            'premium_rate': round(final_rate, 6),
+            'base_rate': base_rate,
+            'risk_class': risk_class.value,
+            'risk_class_description': risk_class.description,
+            'risk_multiplier': risk_class.multiplier,
+            'additional_multiplier': round(self.additional_multiplier[i].item(), 4),
+            'recommended_deductible_usd': self.deductible[i].item(),
+            'coverage_details': {
+                'cargo_value': cargo_value,
+                'transport_mode': self.transport_modes[i],
+                'cargo_type': self.cargo_types[i],
+                'risk_score': risk_score
+            },
+            'comparison_to_baseline': {
+                'baseline_premium': round(baseline_premium, 2),
+                'adjustment_amount': round(premium - baseline_premium, 2),
+                'adjustment_pct': round((final_rate - base_rate) / base_rate * 100, 1)
+            },
+            'recommendations': InsurancePremiumCalculator._generate_recommendations(
+                risk_score=risk_score,
+                risk_class=risk_class,
+                cargo_value=cargo_value,
+                additional_factors=factors
+            )
+        }
+    
+    def rows(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Shipments [offset, offset + limit) as result dicts."""
+        end = len(self) if limit is None else min(len(self), offset + limit)
+        return [self.row(i) for i in range(max(0, offset), end)]
 
 
 class InsurancePremiumCalculator:
@@ -136,6 +220,16 @@ class InsurancePremiumCalculator:
         'raw_materials': 0.85     # Bulk, lower value density
     }
     
+    # Boolean additional factors and their premium multipliers (applied in this order)
+    ADDITIONAL_FACTOR_MULTIPLIERS = {
+        'hazmat': 1.30,                  # Hazmat surcharge
+        'temperature_controlled': 1.15,  # Refrigerated/temperature controlled
+        'single_mode_direct': 0.95,      # Simple single-mode shipment discount
+        'peak_season': 1.05,             # Peak season adjustment
+        'preferred_shipper': 0.90,       # Known good shipper discount
+        'new_route': 1.10,               # No historical data on the route
+    }
+    
     @staticmethod
     def calculate_premium(
         cargo_value: float,
@@ -247,30 +341,10 @@ class InsurancePremiumCalculator:
         elif cargo_value > 1000000:
             multiplier *= 1.15
         
-        # Hazmat surcharge
-        if additional_factors.get('hazmat'):
-            multiplier *= 1.30
-        
-        # Refrigerated/temperature controlled
-        if additional_factors.get('temperature_controlled'):
-            multiplier *= 1.15
-        
-        # Multi-modal complexity discount (already priced into multimodal base rate)
-        # But if explicitly flagged as simple single-mode, small discount
-        if additional_factors.get('single_mode_direct'):
-            multiplier *= 0.95
-        
-        # Peak season adjustment
-        if additional_factors.get('peak_season'):
-            multiplier *= 1.05
-        
-        # Known good shipper discount
-        if additional_factors.get('preferred_shipper'):
-            multiplier *= 0.90
-        
-        # New route surcharge (no historical data)
-        if additional_factors.get('new_route'):
-            multiplier *= 1.10
+        # Boolean factors (hazmat, temperature control, seasonality, shipper, route)
+        for factor, factor_multiplier in InsurancePremiumCalculator.ADDITIONAL_FACTOR_MULTIPLIERS.items():
+            if additional_factors.get(factor):
+                multiplier *= factor_multiplier
         
         # Claims history adjustment
         claims_history = additional_factors.get('claims_history_factor', 1.0)
@@ -378,14 +452,103 @@ class InsurancePremiumCalculator:
         
         return recommendations
     
+    @staticmethod
+    def _lookup(values: List[str], table: Dict[str, float], default: float) -> np.ndarray:
+        """Map (case-insensitive) category names to table values, one lookup per distinct name."""
+        names, inverse = np.unique(np.array([v.lower() for v in values], dtype=object), return_inverse=True)
+        return np.array([table.get(name, default) for name in names], dtype=float)[inverse]
+    
+    @staticmethod
+    def price_book(shipments: List[Dict]) -> PortfolioBook:
+        """
+        Price a whole book of shipments in vectorized form.
+        
+        Same rules as calculate_premium (risk class, cargo/value/factor
+        multipliers, deductible), applied to arrays.
+        
+        Args:
+            shipments: Shipment dicts (see calculate_portfolio_premium)
+            
+        Returns:
+            PortfolioBook with one array per priced field
+        """
+        n = len(shipments)
+        shipment_ids = [s.get('shipment_id') or f'shipment_{i + 1}' for i, s in enumerate(shipments)]
+        transport_modes = [s['transport_mode'] for s in shipments]
+        cargo_types = [s.get('cargo_type') or 'general' for s in shipments]
+        additional_factors = [s.get('additional_factors') for s in shipments]
+        cargo_value = np.fromiter((s['cargo_value'] for s in shipments), dtype=float, count=n)
+        risk_score = np.fromiter((s['risk_score'] for s in shipments), dtype=float, count=n)
+        
+        base_rate = InsurancePremiumCalculator._lookup(
+            transport_modes,
+            InsurancePremiumCalculator.BASELINE_RATES,
+            InsurancePremiumCalculator.BASELINE_RATES['default']
+        )
+        
+        # Risk class: [0,30) A, [30,50) B, [50,70) C, [70,85) D, otherwise E
+        risk_class_index = np.searchsorted(RISK_CLASS_EDGES, risk_score, side='right')
+        risk_class_index[risk_score < 0] = len(RISK_CLASS_ORDER) - 1
+        risk_multiplier = np.array([rc.multiplier for rc in RISK_CLASS_ORDER])[risk_class_index]
+        
+        # Additional multipliers
+        additional_multiplier = InsurancePremiumCalculator._lookup(
+            cargo_types, InsurancePremiumCalculator.CARGO_ADJUSTMENTS, 1.0
+        )
+        additional_multiplier[cargo_value > 500000] *= 1.10  # High-value cargo surcharge
+        with_factors = [i for i, factors in enumerate(additional_factors) if factors]
+        if with_factors:
+            for factor, factor_multiplier in FACTOR_MULTIPLIERS.items():
+                flagged = [i for i in with_factors if additional_factors[i].get(factor)]
+                additional_multiplier[flagged] *= factor_multiplier
+            additional_multiplier[with_factors] *= np.array([
+                additional_factors[i].get('claims_history_factor', 1.0) for i in with_factors
+            ], dtype=float)
+        
+        premium_rate = base_rate * risk_multiplier * additional_multiplier
+        premium = cargo_value * premium_rate
+        baseline_premium = cargo_value * base_rate
+        
+        # Deductible: 5% / 4% / 3% / 2% of cargo value by risk band, bounded to [500, 50000]
+        deductible_pct = np.select(
+            [risk_score < 30, risk_score < 50, risk_score < 70],
+            [0.05, 0.04, 0.03],
+            default=0.02
+        )
+        deductible = np.round(np.clip(cargo_value * deductible_pct, 500, 50000), 2)
+        
+        return PortfolioBook(
+            shipment_ids=shipment_ids,
+            transport_modes=transport_modes,
+            cargo_types=cargo_types,
+            additional_factors=additional_factors,
+            cargo_value=cargo_value,
+            risk_score=risk_score,
+            base_rate=base_rate,
+            risk_class_index=risk_class_index,
+            risk_multiplier=risk_multiplier,
+            additional_multiplier=additional_multiplier,
+            premium_rate=premium_rate,
+            premium=premium,
+            premium_usd=np.round(premium, 2),
+            baseline_premium=baseline_premium,
+            deductible=deductible
+        )
+    
     @staticmethod
     def calculate_portfolio_premium(
-        shipments: List[Dict]
+        shipments: List[Dict],
+        include_shipments: bool = True,
+        offset: int = 0,
+        limit: Optional[int] = None
     ) -> PortfolioPremiumResult:
         """
         Calculate total premium for a portfolio of shipments.
         Includes portfolio diversification discount.
         
+        The book is priced column-wise (price_book); only the requested page
+        of individual shipment results is built.
+        
         Args:
             shipments: List of shipment dictionaries with:
                 - cargo_value: float
@@ -393,6 +556,10 @@ class InsurancePremiumCalculator:
                 - risk_score: float
                 - cargo_type: str (optional)
                 - additional_factors: Dict (optional)
+            include_shipments: Include individual shipment results
+            offset: First individual shipment to include
+            limit: Max individual shipments to include (None = all; when set,
+                   the result carries page metadata)
                 
         Returns:
             PortfolioPremiumResult with portfolio analysis
@@ -400,26 +567,9 @@ class InsurancePremiumCalculator:
         if not shipments:
             raise ValueError("Shipments list cannot be empty")
         
-        total_premium = 0
-        shipment_premiums = []
-        risk_distribution = {rc.value: 0 for rc in RiskClass}
-        
-        for idx, shipment in enumerate(shipments):
-            result = InsurancePremiumCalculator.calculate_premium(
-                cargo_value=shipment['cargo_value'],
-                transport_mode=shipment['transport_mode'],
-                risk_score=shipment['risk_score'],
-                cargo_type=shipment.get('cargo_type', 'general'),
-                additional_factors=shipment.get('additional_factors')
-            )
-            
-            total_premium += result.premium_usd
-            risk_distribution[result.risk_class] += 1
-            
-            shipment_premiums.append({
-                'shipment_id': shipment.get('shipment_id', f'shipment_{idx + 1}'),
-                **result.to_dict()
-            })
+        book = InsurancePremiumCalculator.price_book(shipments)
+        total_premium = float(book.premium_usd.sum())
+        risk_distribution = book.risk_class_counts()
         
         # Calculate portfolio discount based on size and diversification
         portfolio_size = len(shipments)
@@ -453,6 +603,22 @@ class InsurancePremiumCalculator:
             total_premium=total_premium
         )
         
+        # Individual results (optionally one page)
+        shipments_page = None
+        if not include_shipments:
+            individual_shipments = []
+        else:
+            individual_shipments = book.rows(offset, limit)
+            if limit is not None or offset:
+                next_offset = offset + len(individual_shipments)
+                shipments_page = {
+                    'offset': offset,
+                    'limit': limit,
+                    'returned': len(individual_shipments),
+                    'total': portfolio_size,
+                    'next_offset': next_offset if next_offset < portfolio_size else None
+                }
+        
         return PortfolioPremiumResult(
             total_premium_before_discount=round(total_premium, 2),
             portfolio_discount_pct=round(total_discount * 100, 1),
@@ -468,7 +634,8 @@ class InsurancePremiumCalculator:
                 for k, v in risk_distribution.items() if v > 0
             },
             recommendations=recommendations,
-            individual_shipments=shipment_premiums
+            individual_shipments=individual_shipments,
+            shipments_page=shipments_page
         )
     
     @staticmethod
@@ -580,6 +747,14 @@ class InsurancePremiumCalculator:
         }
 
 
+# Vectorized lookup tables for price_book, derived from the scalar tables above.
+# Risk classes in boundary order (index = position in RISK_CLASS_EDGES + 1)
+RISK_CLASS_ORDER = list(InsurancePremiumCalculator.RISK_CLASS_BOUNDARIES)
+RISK_CLASS_EDGES = np.array([
+    upper for _, upper in list(InsurancePremiumCalculator.RISK_CLASS_BOUNDARIES.values())[:-1]
+], dtype=float)
+FACTOR_MULTIPLIERS = InsurancePremiumCalculator.ADDITIONAL_FACTOR_MULTIPLIERS
+
 # Convenience functions
 def calculate_premium(
     cargo_value: float,
@@ -597,9 +772,9 @@ def calculate_premium(
     return result.to_dict()
 
 
-def calculate_portfolio_premium(shipments: List[Dict]) -> Dict:
+def calculate_portfolio_premium(shipments: List[Dict], **kwargs) -> Dict:
     """Calculate portfolio premium."""
-    result = InsurancePremiumCalculator.calculate_portfolio_premium(shipments)
+    result = InsurancePremiumCalculator.calculate_portfolio_premium(shipments, **kwargs)
     return result.to_dict()
 
 
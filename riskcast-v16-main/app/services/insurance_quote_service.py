@@ -17,9 +17,20 @@ from app.services.parametric_engine import (
     ParametricPricingEngine, ParametricQuote
 )
 from app.services.insurance_premium_calculator import InsurancePremiumCalculator
+from app.services.parametric_history import ExceedanceCurve, get_historical_store
 
 logger = logging.getLogger(__name__)
 
+# Sample series used when the historical store has no data for a location
+SAMPLE_DWELL_DAYS = ExceedanceCurve.from_values([8, 10, 12, 15, 18, 20, 22, 25, 8, 10])
+SAMPLE_RAINFALL_MM = ExceedanceCurve.from_values([50, 80, 120, 140, 160, 180, 200, 100, 90, 110])
+
+
+def historical_curve(location: str, metric: str, sample: ExceedanceCurve) -> ExceedanceCurve:
+    """Stored exceedance curve for a location, falling back to the sample series."""
+    curve = get_historical_store().get(location, metric)
+    return curve if curve is not None and len(curve) else sample
+
 
 class InsuranceQuoteService:
     """
@@ -240,10 +251,8 @@ class InsuranceQuoteService:
             )
             trigger.payout_structure = payout_structure
             
-            # Mock historical data (in production, fetch from database/API)
-            historical_data = [
-                {"dwell_days": d} for d in [8, 10, 12, 15, 18, 20, 22, 25, 8, 10]
-            ]
+            # Historical dwell times (precomputed exceedance curve)
+            historical_data = historical_curve(destination_port, "dwell_days", SAMPLE_DWELL_DAYS)
             
             # Price parametric product
             parametric_quote = ParametricPricingEngine.price_port_congestion_parametric(
@@ -331,10 +340,8 @@ class InsuranceQuoteService:
             )
             trigger.payout_structure = payout_structure
             
-            # Mock historical data
-            historical_data = [
-                {"rainfall_mm": r} for r in [50, 80, 120, 140, 160, 180, 200, 100, 90, 110]
-            ]
+            # Historical rainfall (precomputed exceedance curve)
+            historical_data = historical_curve(origin_port, "rainfall_mm", SAMPLE_RAINFALL_MM)
             
             # Price parametric product
             parametric_quote = ParametricPricingEngine.price_rainfall_parametric(
@@ -8,20 +8,29 @@ Core engine for parametric insurance products:
 - Basis risk assessment
 """
 
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from enum import Enum
 import math
 import logging
 
+import numpy as np
+from scipy.spatial import cKDTree
+
 from app.models.insurance import (
     ParametricTrigger, PayoutStructure, InsuranceQuote, 
     PremiumBreakdown, PricingBreakdown
 )
+from app.services.parametric_history import ExceedanceCurve, Thresholds
 
 logger = logging.getLogger(__name__)
 
+HistoricalData = Union[List[Dict[str, Any]], ExceedanceCurve]
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_COVERAGE_RADIUS_KM = 100.0
+
 
 class TriggerType(str, Enum):
     WEATHER_RAINFALL = "weather_rainfall"
@@ -58,10 +67,55 @@ class ParametricPricingEngine:
     Pricing engine for parametric insurance products.
     """
     
+    @staticmethod
+    def _as_curve(historical_data: HistoricalData, field: str) -> ExceedanceCurve:
+        """Accept either raw records or a precomputed exceedance curve."""
+        if isinstance(historical_data, ExceedanceCurve):
+            return historical_data
+        return ExceedanceCurve.from_records(historical_data, field)
+    
+    @staticmethod
+    def rainfall_pricing_curve(
+        curve: ExceedanceCurve,
+        thresholds: Thresholds,
+        payout_per_mm: float = 50.0
+    ) -> Dict[str, np.ndarray]:
+        """
+        Rainfall pricing components for one or many thresholds.
+        
+        Args:
+            curve: Historical rainfall exceedance curve
+            thresholds: Trigger threshold(s) in mm
+            payout_per_mm: Payout per mm of excess rainfall
+            
+        Returns:
+            Dict of arrays: burn_rate, avg_excess, expected_payout,
+            volatility_margin, premium
+        """
+        # Calculate historical trigger frequency (burn rate) and average excess
+        burn_rate = curve.burn_rate(thresholds)
+        avg_excess = curve.average_excess(thresholds)
+        expected_payout = burn_rate * (avg_excess * payout_per_mm)
+        
+        # Apply load factor (covers overhead, profit, capital cost)
+        load_factor = 1.3
+        premium = expected_payout * load_factor
+        
+        # Risk margins for volatility
+        volatility_margin = ParametricPricingEngine._calculate_volatility_margin(curve, thresholds)
+        
+        return {
+            "burn_rate": burn_rate,
+            "avg_excess": avg_excess,
+            "expected_payout": expected_payout,
+            "volatility_margin": volatility_margin,
+            "premium": premium * (1 + volatility_margin),
+        }
+    
     @staticmethod
     def price_rainfall_parametric(
         trigger: ParametricTrigger,
-        historical_data: List[Dict[str, Any]],
+        historical_data: HistoricalData,
         cargo_value: float
     ) -> ParametricQuote:
         """
@@ -69,39 +123,20 @@ class ParametricPricingEngine:
         
         Args:
             trigger: Rainfall trigger definition
-            historical_data: Historical weather data
+            historical_data: Historical weather records or a rainfall_mm
+                             ExceedanceCurve from the historical store
             cargo_value: Cargo value for context
             
         Returns:
             ParametricQuote with pricing details
         """
-        # Calculate historical trigger frequency (burn rate)
-        trigger_events = [
-            d for d in historical_data 
-            if d.get("rainfall_mm", 0) > trigger.threshold
-        ]
-        burn_rate = len(trigger_events) / len(historical_data) if historical_data else 0.0
-        
-        # Calculate average excess rainfall
-        if trigger_events:
-            avg_excess = sum(
-                d["rainfall_mm"] - trigger.threshold 
-                for d in trigger_events
-            ) / len(trigger_events)
-        else:
-            avg_excess = 0.0
-        
-        # Calculate expected payout
+        curve = ParametricPricingEngine._as_curve(historical_data, "rainfall_mm")
         payout_per_mm = trigger.payout_structure.payout_per_unit if trigger.payout_structure else 50.0
-        expected_payout = burn_rate * (avg_excess * payout_per_mm)
+        pricing = ParametricPricingEngine.rainfall_pricing_curve(curve, trigger.threshold, payout_per_mm)
         
-        # Apply load factor (covers overhead, profit, capital cost)
-        load_factor = 1.3
-        premium = expected_payout * load_factor
-        
-        # Risk margins for volatility
-        volatility_adjustment = ParametricPricingEngine._calculate_volatility_margin(trigger_events)
-        final_premium = premium * (1 + volatility_adjustment)
+        burn_rate = float(pricing["burn_rate"])
+        expected_payout = float(pricing["expected_payout"])
+        final_premium = float(pricing["premium"])
         
         # Calculate loss ratio
         loss_ratio = expected_payout / final_premium if final_premium > 0 else 0.0
@@ -123,10 +158,45 @@ class ParametricPricingEngine:
             basis_risk_score=0.15  # Default, should be calculated based on correlation
         )
     
+    @staticmethod
+    def port_congestion_pricing_curve(
+        curve: ExceedanceCurve,
+        thresholds: Thresholds,
+        payout_per_day: float = 1000.0,
+        max_days: float = 30
+    ) -> Dict[str, np.ndarray]:
+        """
+        Port congestion pricing components for one or many thresholds.
+        
+        Args:
+            curve: Historical dwell-time exceedance curve
+            thresholds: Trigger threshold(s) in days
+            payout_per_day: Payout per day of excess dwell time
+            max_days: Cap on paid excess days per event
+            
+        Returns:
+            Dict of arrays: exceedance_probability, avg_excess_days,
+            expected_payout, premium
+        """
+        # Exceedance probability and average (capped) excess days
+        exceedance_probability = curve.burn_rate(thresholds)
+        avg_excess_days = curve.average_excess(thresholds, cap=max_days)
+        expected_payout = exceedance_probability * avg_excess_days * payout_per_day
+        
+        # Load factor (lower than weather due to better data quality)
+        load_factor = 1.2
+        
+        return {
+            "exceedance_probability": exceedance_probability,
+            "avg_excess_days": avg_excess_days,
+            "expected_payout": expected_payout,
+            "premium": expected_payout * load_factor,
+        }
+    
     @staticmethod
     def price_port_congestion_parametric(
         trigger: ParametricTrigger,
-        historical_data: List[Dict[str, Any]],
+        historical_data: HistoricalData,
         cargo_value: float
     ) -> ParametricQuote:
         """
@@ -134,37 +204,23 @@ class ParametricPricingEngine:
         
         Args:
             trigger: Port congestion trigger definition
-            historical_data: Historical port congestion data
+            historical_data: Historical port congestion records or a
+                             dwell_days ExceedanceCurve from the historical store
             cargo_value: Cargo value for context
             
         Returns:
             ParametricQuote with pricing details
         """
-        # Analyze historical dwell times
-        dwell_times = [d.get("dwell_days", 0) for d in historical_data]
-        threshold_days = trigger.threshold
-        
-        # Calculate exceedance probability
-        exceedances = [d for d in dwell_times if d > threshold_days]
-        exceedance_probability = len(exceedances) / len(dwell_times) if dwell_times else 0.0
-        
-        # Calculate average excess days
-        if exceedances:
-            max_days = trigger.payout_structure.maximum_days if trigger.payout_structure else 30
-            avg_excess_days = sum(
-                min(d - threshold_days, max_days) 
-                for d in exceedances
-            ) / len(exceedances)
-        else:
-            avg_excess_days = 0.0
-        
-        # Expected payout
+        curve = ParametricPricingEngine._as_curve(historical_data, "dwell_days")
+        max_days = trigger.payout_structure.maximum_days if trigger.payout_structure else 30
         payout_per_day = trigger.payout_structure.payout_per_unit if trigger.payout_structure else 1000.0
-        expected_payout = exceedance_probability * avg_excess_days * payout_per_day
+        pricing = ParametricPricingEngine.port_congestion_pricing_curve(
+            curve, trigger.threshold, payout_per_day, max_days
+        )
         
-        # Load factor (lower than weather due to better data quality)
-        load_factor = 1.2
-        premium = expected_payout * load_factor
+        exceedance_probability = float(pricing["exceedance_probability"])
+        expected_payout = float(pricing["expected_payout"])
+        premium = float(pricing["premium"])
         
         # Loss ratio
         loss_ratio = expected_payout / premium if premium > 0 else 0.0
@@ -246,23 +302,15 @@ class ParametricPricingEngine:
         )
     
     @staticmethod
-    def _calculate_volatility_margin(trigger_events: List[Dict[str, Any]]) -> float:
-        """Calculate volatility adjustment based on historical variance."""
-        if len(trigger_events) < 2:
-            return 0.15  # Default 15% margin
-        
-        # Calculate coefficient of variation
-        values = [d.get("rainfall_mm", 0) for d in trigger_events]
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        std_dev = math.sqrt(variance)
-        
-        if mean > 0:
-            cv = std_dev / mean
-            # Higher volatility = higher margin (capped at 30%)
-            return min(cv * 0.1, 0.30)
-        
-        return 0.15
+    def _calculate_volatility_margin(curve: ExceedanceCurve, thresholds: Thresholds) -> np.ndarray:
+        """Volatility adjustment for the exceedances above each threshold."""
+        count = curve.count_above(thresholds)
+        mean, std_dev = curve.tail_moments(thresholds)
+        
+        # Coefficient of variation; higher volatility = higher margin (capped at 30%)
+        cv = np.divide(std_dev, mean, out=np.zeros_like(mean), where=mean > 0)
+        margin = np.where(mean > 0, np.minimum(cv * 0.1, 0.30), 0.15)
+        return np.where(count < 2, 0.15, margin)
 
 
 class ParametricTriggerEvaluator:
@@ -396,22 +444,39 @@ class ParametricTriggerEvaluator:
         """
         # Check if cyclone entered coverage area
         coverage_center = trigger.location.get("coordinates", {})
-        coverage_radius = trigger.location.get("radius_km", 100)
+        coverage_radius = trigger.location.get("radius_km", DEFAULT_COVERAGE_RADIUS_KM)
         
-        track_points = cyclone_data.get("forecast_track", [])
-        entered_area = False
-        max_wind_in_area = 0
+        lats, lons, winds = track_arrays(cyclone_data.get("forecast_track", []))
+        in_area = haversine_km(
+            coverage_center.get("lat", 0), coverage_center.get("lon", 0), lats, lons
+        ) <= coverage_radius
         
-        for point in track_points:
-            distance = ParametricTriggerEvaluator._calculate_distance(
-                coverage_center,
-                {"lat": point.get("lat"), "lon": point.get("lon")}
-            )
-            
-            if distance <= coverage_radius:
-                entered_area = True
-                max_wind_in_area = max(max_wind_in_area, point.get("wind_kph", 0))
+        entered_area = bool(in_area.any())
+        max_wind_in_area = float(winds[in_area].max(initial=0.0))
         
+        return ParametricTriggerEvaluator.cyclone_evaluation(
+            trigger, cyclone_data, entered_area, max_wind_in_area
+        )
+    
+    @staticmethod
+    def cyclone_evaluation(
+        trigger: ParametricTrigger,
+        cyclone_data: Dict[str, Any],
+        entered_area: bool,
+        max_wind_in_area: float
+    ) -> TriggerEvaluation:
+        """
+        Build the cyclone TriggerEvaluation from track exposure.
+        
+        Args:
+            trigger: Cyclone trigger definition
+            cyclone_data: Cyclone tracking data (for the storm id)
+            entered_area: Whether any track point fell in the coverage area
+            max_wind_in_area: Highest wind (kph) among those points
+            
+        Returns:
+            TriggerEvaluation result
+        """
         if not entered_area:
             return TriggerEvaluation(
                 triggered=False,
@@ -427,7 +492,8 @@ class ParametricTriggerEvaluator:
             )
         
         # Binary payout
-        payout_amount = trigger.payout_structure.maximum_payout if trigger.payout_structure else 25000.0
+        payout_structure = getattr(trigger, "payout_structure", None)
+        payout_amount = payout_structure.maximum_payout if payout_structure else 25000.0
         
         return TriggerEvaluation(
             triggered=True,
@@ -460,6 +526,171 @@ class ParametricTriggerEvaluator:
         return R * c
 
 
+def haversine_km(lat1: Any, lon1: Any, lat2: Any, lon2: Any) -> np.ndarray:
+    """
+    Great-circle distance in km between lat/lon points (degrees).
+    
+    Inputs broadcast against each other, so one call covers any number of
+    point pairs (e.g. one center against a whole track).
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def track_arrays(track_points: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Forecast track as (lats, lons, winds) arrays.
+    
+    Points without coordinates are dropped; missing wind counts as 0.
+    """
+    points = [
+        (p["lat"], p["lon"], p.get("wind_kph") or 0)
+        for p in track_points if p.get("lat") is not None and p.get("lon") is not None
+    ]
+    if not points:
+        empty = np.empty(0)
+        return empty, empty, empty
+    lats, lons, winds = np.array(points, dtype=float).T
+    return lats, lons, winds
+
+
+def _unit_vectors(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Lat/lon (degrees) to points on the unit sphere, shape (n, 3)."""
+    lat, lon = np.radians(lats), np.radians(lons)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+@dataclass
+class CycloneExposure:
+    """A policy whose coverage area a cyclone track entered."""
+    policy_number: str
+    max_wind_kph: float
+    threshold_kph: float
+    triggered: bool
+    evaluation: TriggerEvaluation
+
+
+class CyclonePolicyIndex:
+    """
+    Spatial index of cyclone (natcat) policy coverage areas.
+    
+    Coverage centers are stored in a KD-tree on the unit sphere, where
+    chord length grows monotonically with great-circle distance. A track
+    is matched against every policy in one pass: a ball query with the
+    largest coverage radius finds candidate (point, policy) pairs, and a
+    vectorized haversine check against each policy's own radius keeps the
+    pairs inside the coverage area.
+    """
+    
+    def __init__(self):
+        self._triggers: Dict[str, ParametricTrigger] = {}
+        self._tree: Optional[cKDTree] = None
+        self._dirty = False
+    
+    def add(self, policy_number: str, trigger: ParametricTrigger) -> bool:
+        """
+        Index a policy's coverage area.
+        
+        Returns:
+            False if the trigger has no coverage coordinates (not indexed)
+        """
+        coordinates = (trigger.location or {}).get("coordinates") or {}
+        if coordinates.get("lat") is None or coordinates.get("lon") is None:
+            self.remove(policy_number)
+            return False
+        self._triggers[policy_number] = trigger
+        self._dirty = True
+        return True
+    
+    def remove(self, policy_number: str) -> None:
+        """Drop a policy from the index."""
+        if self._triggers.pop(policy_number, None) is not None:
+            self._dirty = True
+    
+    def __len__(self) -> int:
+        return len(self._triggers)
+    
+    def __contains__(self, policy_number: str) -> bool:
+        return policy_number in self._triggers
+    
+    def _build(self) -> None:
+        """(Re)build the arrays and KD-tree after registrations changed."""
+        self._policy_numbers = list(self._triggers)
+        triggers = [self._triggers[n] for n in self._policy_numbers]
+        centers = [t.location["coordinates"] for t in triggers]
+        self._lats = np.array([c["lat"] for c in centers], dtype=float)
+        self._lons = np.array([c["lon"] for c in centers], dtype=float)
+        self._radii = np.array(
+            [t.location.get("radius_km", DEFAULT_COVERAGE_RADIUS_KM) for t in triggers], dtype=float
+        )
+        self._thresholds = np.array([t.threshold for t in triggers], dtype=float)
+        self._tree = cKDTree(_unit_vectors(self._lats, self._lons)) if triggers else None
+        self._dirty = False
+    
+    def match_track(self, lats: np.ndarray, lons: np.ndarray, winds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Policies whose coverage area the track entered.
+        
+        Args:
+            lats, lons, winds: Track point arrays (see track_arrays)
+            
+        Returns:
+            Tuple of (policy row indices, max in-area wind per policy)
+        """
+        if self._dirty or self._tree is None and self._triggers:
+            self._build()
+        if self._tree is None or lats.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        
+        # Chord length for the largest coverage radius
+        max_angle = min(self._radii.max() / EARTH_RADIUS_KM, math.pi)
+        neighbors = self._tree.query_ball_point(_unit_vectors(lats, lons), r=2 * math.sin(max_angle / 2))
+        
+        counts = np.fromiter((len(n) for n in neighbors), dtype=np.int64, count=len(neighbors))
+        if counts.sum() == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        point_idx = np.repeat(np.arange(len(neighbors)), counts)
+        policy_idx = np.concatenate([np.asarray(n, dtype=np.int64) for n in neighbors if n])
+        
+        # Exact check against each policy's own radius
+        distances = haversine_km(self._lats[policy_idx], self._lons[policy_idx], lats[point_idx], lons[point_idx])
+        inside = distances <= self._radii[policy_idx]
+        policy_idx, point_idx = policy_idx[inside], point_idx[inside]
+        
+        max_wind = np.zeros(len(self._policy_numbers))
+        np.maximum.at(max_wind, policy_idx, winds[point_idx])
+        entered = np.unique(policy_idx)
+        return entered, max_wind[entered]
+    
+    def evaluate_track(self, cyclone_data: Dict[str, Any]) -> List[CycloneExposure]:
+        """
+        Evaluate one cyclone track against every indexed policy.
+        
+        Args:
+            cyclone_data: Cyclone data with a "forecast_track" of
+                          {"lat", "lon", "wind_kph"} points
+            
+        Returns:
+            One CycloneExposure per policy whose coverage area the track entered
+        """
+        entered, max_wind = self.match_track(*track_arrays(cyclone_data.get("forecast_track", [])))
+        exposures = []
+        for row, wind in zip(entered.tolist(), max_wind.tolist()):
+            policy_number = self._policy_numbers[row]
+            trigger = self._triggers[policy_number]
+            evaluation = ParametricTriggerEvaluator.cyclone_evaluation(trigger, cyclone_data, True, wind)
+            exposures.append(CycloneExposure(
+                policy_number=policy_number,
+                max_wind_kph=wind,
+                threshold_kph=float(self._thresholds[row]),
+                triggered=evaluation.triggered,
+                evaluation=evaluation
+            ))
+        return exposures
+
+
 class BasisRiskCalculator:
     """
     Calculates basis risk (mismatch between trigger and actual loss).
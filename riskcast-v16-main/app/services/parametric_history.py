@@ -0,0 +1,201 @@
+"""
+RISKCAST Parametric Historical Data Store
+=========================================
+Columnar store of historical index values (rainfall, dwell times, ...)
+used to price parametric products.
+
+Each (location, metric) series is kept as a sorted NumPy array together
+with suffix sums of the values and their squares. That turns burn rate,
+average excess and tail volatility for any threshold into a binary
+search plus a few array lookups, so pricing sweeps over many thresholds
+stay cheap. Series can be persisted as .npy files and are memory-mapped
+when loaded back.
+"""
+
+from typing import Dict, Iterable, List, Optional, Any, Tuple, Union
+from pathlib import Path
+import hashlib
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PARAMETRIC_HISTORY_DIR = os.getenv("PARAMETRIC_HISTORY_DIR", "")  # Empty = in-memory only
+
+Thresholds = Union[float, np.ndarray, List[float]]
+
+
+class ExceedanceCurve:
+    """
+    Threshold exceedance statistics for one historical series.
+
+    All query methods accept a scalar threshold or an array of thresholds
+    and return values of the same shape.
+    """
+
+    def __init__(self, sorted_values: np.ndarray, suffix_sums: Optional[np.ndarray] = None):
+        """
+        Args:
+            sorted_values: Observations in ascending order
+            suffix_sums: (n + 1, 2) array of suffix sums of values and of
+                         squared values; computed if not given
+        """
+        self.values = sorted_values
+        if suffix_sums is None:
+            suffix_sums = np.zeros((len(sorted_values) + 1, 2))
+            suffix_sums[:-1, 0] = np.cumsum(sorted_values[::-1])[::-1]
+            suffix_sums[:-1, 1] = np.cumsum(np.square(sorted_values)[::-1])[::-1]
+        self.suffix_sums = suffix_sums
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "ExceedanceCurve":
+        """Build a curve from raw observations."""
+        return cls(np.sort(np.fromiter(values, dtype=float)))
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], field: str) -> "ExceedanceCurve":
+        """Build a curve from a list of dicts; missing values count as 0."""
+        return cls.from_values(r.get(field, 0) for r in records)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _split(self, thresholds: Thresholds) -> Tuple[np.ndarray, np.ndarray]:
+        """Index of the first value above each threshold, and the count above."""
+        idx = np.searchsorted(self.values, thresholds, side="right")
+        return idx, len(self.values) - idx
+
+    def count_above(self, thresholds: Thresholds) -> np.ndarray:
+        """Number of observations strictly above each threshold."""
+        return self._split(thresholds)[1]
+
+    def burn_rate(self, thresholds: Thresholds) -> np.ndarray:
+        """Historical frequency of observations above each threshold."""
+        count = self.count_above(thresholds)
+        return count / len(self.values) if len(self.values) else np.zeros_like(count, dtype=float)
+
+    def excess_sum(self, thresholds: Thresholds, cap: Optional[float] = None) -> np.ndarray:
+        """
+        Total excess over each threshold across all exceedances.
+
+        Args:
+            thresholds: Threshold(s)
+            cap: Optional per-observation limit on the excess
+        """
+        thresholds = np.asarray(thresholds, dtype=float)
+        idx, count = self._split(thresholds)
+        if cap is None:
+            return self.suffix_sums[idx, 0] - count * thresholds
+
+        # Observations beyond threshold + cap contribute exactly the cap
+        capped = np.searchsorted(self.values, thresholds + cap, side="right")
+        within = self.suffix_sums[idx, 0] - self.suffix_sums[capped, 0] - (capped - idx) * thresholds
+        return within + (len(self.values) - capped) * cap
+
+    def average_excess(self, thresholds: Thresholds, cap: Optional[float] = None) -> np.ndarray:
+        """Mean excess over each threshold among exceedances (0 if none)."""
+        count = self.count_above(thresholds)
+        total = self.excess_sum(thresholds, cap)
+        return np.divide(total, count, out=np.zeros_like(total, dtype=float), where=count > 0)
+
+    def tail_moments(self, thresholds: Thresholds) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Mean and (population) standard deviation of observations above each threshold.
+
+        Returns:
+            Tuple of (mean, std); both 0 where there are no exceedances
+        """
+        idx, count = self._split(thresholds)
+        safe = np.maximum(count, 1)
+        mean = np.where(count > 0, self.suffix_sums[idx, 0] / safe, 0.0)
+        variance = np.where(count > 0, self.suffix_sums[idx, 1] / safe - mean ** 2, 0.0)
+        return mean, np.sqrt(np.maximum(variance, 0.0))
+
+
+class HistoricalSeriesStore:
+    """
+    Exceedance curves keyed by (location, metric).
+
+    With a directory configured, series are persisted as .npy files and
+    memory-mapped on first access.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+        self._curves: Dict[Tuple[str, str], ExceedanceCurve] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_stem(location: str, metric: str) -> str:
+        """Readable file name for a series; the key hash keeps sanitized names distinct"""
+        key = f"{location}__{metric}"
+        digest = hashlib.sha256(f"{location}\0{metric}".encode("utf-8")).hexdigest()[:12]
+        return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', key)}.{digest}"
+
+    def put(self, location: str, metric: str, values: Iterable[float], persist: bool = True) -> ExceedanceCurve:
+        """
+        Store a historical series, replacing any existing one.
+
+        Args:
+            location: Location key (e.g. port code)
+            metric: Metric name (e.g. "rainfall_mm", "dwell_days")
+            values: Raw observations
+            persist: Also write the series to the store directory
+
+        Returns:
+            The exceedance curve for the series
+        """
+        curve = ExceedanceCurve.from_values(values)
+        if persist and self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            stem = self._file_stem(location, metric)
+            np.save(self.directory / f"{stem}.values.npy", curve.values)
+            np.save(self.directory / f"{stem}.sums.npy", curve.suffix_sums)
+        with self._lock:
+            self._curves[(location, metric)] = curve
+        return curve
+
+    def get(self, location: str, metric: str) -> Optional[ExceedanceCurve]:
+        """
+        Exceedance curve for a series, or None if there is no data.
+        """
+        key = (location, metric)
+        curve = self._curves.get(key)
+        if curve is not None or not self.directory:
+            return curve
+
+        stem = self._file_stem(location, metric)
+        values_path = self.directory / f"{stem}.values.npy"
+        if not values_path.exists():
+            return None
+        try:
+            curve = ExceedanceCurve(
+                np.load(values_path, mmap_mode="r"),
+                np.load(self.directory / f"{stem}.sums.npy", mmap_mode="r")
+            )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load historical series {location}/{metric}: {e}")
+            return None
+        with self._lock:
+            self._curves[key] = curve
+        return curve
+
+    def clear(self) -> None:
+        """Drop in-memory curves (persisted files are kept)."""
+        with self._lock:
+            self._curves.clear()
+
+
+_store: Optional[HistoricalSeriesStore] = None
+
+
+def get_historical_store() -> HistoricalSeriesStore:
+    """Get the shared historical series store."""
+    global _store
+    if _store is None:
+        _store = HistoricalSeriesStore(PARAMETRIC_HISTORY_DIR or None)
+    return _store
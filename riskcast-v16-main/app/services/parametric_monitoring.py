@@ -4,25 +4,88 @@ RISKCAST Parametric Insurance Monitoring System
 Monitors parametric triggers and processes automatic claims.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import asyncio
+import json
 import logging
+import os
+import time
 
-from app.models.insurance import Policy, ParametricTrigger, TriggerEvaluation
-from app.services.parametric_engine import ParametricTriggerEvaluator
+from app.models.insurance import Policy, ParametricTrigger
+from app.services.parametric_engine import CyclonePolicyIndex, ParametricTriggerEvaluator, TriggerEvaluation
 
 logger = logging.getLogger(__name__)
 
+# Scheduler configuration
+PARAMETRIC_MAX_CONCURRENCY = int(os.getenv("PARAMETRIC_MAX_CONCURRENCY", "32"))  # In-flight fetches/claims
+PARAMETRIC_STAGGER_FRACTION = float(os.getenv("PARAMETRIC_STAGGER_FRACTION", "0.1"))  # Of the loop interval
+PARAMETRIC_STAGGER_MAX_SECONDS = float(os.getenv("PARAMETRIC_STAGGER_MAX_SECONDS", "60"))
+PARAMETRIC_BACKOFF_BASE_SECONDS = float(os.getenv("PARAMETRIC_BACKOFF_BASE_SECONDS", "30"))
+PARAMETRIC_BACKOFF_MAX_SECONDS = float(os.getenv("PARAMETRIC_BACKOFF_MAX_SECONDS", "1800"))
+
+# (trigger_type, data_source, location) - policies sharing it share one fetch
+SourceKey = Tuple[str, str, str]
+
+
+@dataclass
+class SourceState:
+    """Fetch health of one data source (per-source exponential backoff)."""
+    consecutive_failures: int = 0
+    retry_at: float = 0.0  # time.monotonic() before which the source is skipped
+    last_success: Optional[datetime] = None
+    last_error: Optional[str] = None
+    
+    def backed_off(self, now: float) -> bool:
+        return now < self.retry_at
+    
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.retry_at = 0.0
+        self.last_success = datetime.now()
+        self.last_error = None
+    
+    def record_failure(self, error: Exception, now: float) -> float:
+        """Register a failed fetch and return the backoff delay in seconds."""
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        delay = min(
+            PARAMETRIC_BACKOFF_MAX_SECONDS,
+            PARAMETRIC_BACKOFF_BASE_SECONDS * 2 ** (self.consecutive_failures - 1)
+        )
+        self.retry_at = now + delay
+        return delay
+
+
+def source_key(trigger: ParametricTrigger) -> SourceKey:
+    """Grouping key: trigger type, data source and (normalized) location."""
+    location = json.dumps(trigger.location or {}, sort_keys=True, default=str)
+    return (trigger.trigger_type, trigger.data_source or "", location)
+
 
 class ParametricMonitor:
     """
     Monitors parametric insurance policies for trigger events.
+    
+    A monitoring cycle groups due policies by data source (trigger type +
+    data source + location), fetches each source once for all policies in
+    the group, and evaluates them together. Source fetches and claim
+    processing run concurrently under a semaphore, optionally staggered
+    across the cycle; a failing source is backed off exponentially without
+    affecting the others.
+    
+    Cyclone (natcat) coverage areas are also kept in a spatial index so a
+    storm track can be matched against every policy in a single pass.
     """
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = PARAMETRIC_MAX_CONCURRENCY):
         self.active_policies: Dict[str, Policy] = {}
         self.monitoring_jobs: Dict[str, Dict[str, Any]] = {}
+        self.max_concurrency = max(1, max_concurrency)
+        self.source_states: Dict[SourceKey, SourceState] = {}
+        self.cycle_stats: Dict[str, Any] = {"cycles": 0, "last_cycle": None}
+        self.cyclone_index = CyclonePolicyIndex()
     
     def register_policy(self, policy: Policy) -> None:
         """
@@ -51,6 +114,11 @@ class ParametricMonitor:
             "triggered": False
         }
         
+        if policy.trigger.trigger_type == "natcat":
+            self.cyclone_index.add(policy.policy_number, policy.trigger)
+        else:
+            self.cyclone_index.remove(policy.policy_number)
+        
         logger.info(f"Registered policy {policy.policy_number} for parametric monitoring")
     
     async def check_policy(self, policy_number: str) -> Optional[TriggerEvaluation]:
@@ -91,57 +159,264 @@ class ParametricMonitor:
             # Evaluate trigger
             evaluation = self._evaluate_trigger(policy.trigger, current_data)
             
-            # Update last check time
-            job["last_check"] = datetime.now()
-            
-            if evaluation.triggered:
-                job["triggered"] = True
-                logger.info(
-                    f"Trigger met for policy {policy_number}: "
-                    f"Payout=${evaluation.payout_amount:,.2f}"
-                )
-                
-                # Process automatic claim
-                await self._process_automatic_claim(policy, evaluation)
-            
+            await self._apply_evaluation(policy, evaluation)
             return evaluation
             
         except Exception as e:
             logger.error(f"Error checking policy {policy_number}: {e}", exc_info=True)
             return None
     
-    async def check_all_policies(self) -> Dict[str, TriggerEvaluation]:
+    async def _apply_evaluation(self, policy: Policy, evaluation: TriggerEvaluation) -> None:
+        """Record a check and process the automatic claim if the trigger was met."""
+        job = self.monitoring_jobs[policy.policy_number]
+        
+        # Update last check time
+        job["last_check"] = datetime.now()
+        
+        if evaluation.triggered:
+            job["triggered"] = True
+            logger.info(
+                f"Trigger met for policy {policy.policy_number}: "
+                f"Payout=${evaluation.payout_amount:,.2f}"
+            )
+            
+            # Process automatic claim
+            await self._process_automatic_claim(policy, evaluation)
+    
+    def _group_due_policies(self, policy_numbers: Iterable[str]) -> Dict[SourceKey, List[str]]:
         """
-        Check all active policies.
+        Drop expired policies, skip triggered ones and group the rest by source.
+        """
+        now = datetime.now()
+        groups: Dict[SourceKey, List[str]] = {}
+        
+        for policy_number in list(policy_numbers):
+            policy = self.active_policies.get(policy_number)
+            if policy is None:
+                continue
+            if now > policy.expiry_date:
+                logger.info(f"Policy {policy_number} has expired, removing from monitoring")
+                self.unregister_policy(policy_number)
+                continue
+            if self.monitoring_jobs[policy_number]["triggered"] or not policy.trigger:
+                continue
+            groups.setdefault(source_key(policy.trigger), []).append(policy_number)
         
+        return groups
+    
+    async def check_policies(
+        self,
+        policy_numbers: Iterable[str],
+        stagger_seconds: float = 0.0,
+        ad_hoc: bool = False
+    ) -> Dict[str, TriggerEvaluation]:
+        """
+        Check a set of policies, fetching each data source once.
+        
+        Args:
+            policy_numbers: Policies to check
+            stagger_seconds: Spread source fetches evenly over this window
+            ad_hoc: Out-of-band check (e.g. a webhook): fetch sources even
+                while they are backed off and do not record it as a
+                scheduler cycle in cycle_stats
+            
         Returns:
             Dict mapping policy_number to TriggerEvaluation
         """
-        results = {}
+        started = time.monotonic()
+        started_at = datetime.now()
+        groups = self._group_due_policies(policy_numbers)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: Dict[str, TriggerEvaluation] = {}
+        counters = {"fetched": 0, "failed": 0, "backed_off": 0}
         
-        for policy_number in list(self.active_policies.keys()):
-            evaluation = await self.check_policy(policy_number)
-            if evaluation:
-                results[policy_number] = evaluation
+        step = stagger_seconds / len(groups) if groups else 0.0
+        await asyncio.gather(*[
+            self._check_source_group(key, members, semaphore, i * step, results, counters,
+                                     ignore_backoff=ad_hoc)
+            for i, (key, members) in enumerate(groups.items())
+        ])
+        
+        duration = time.monotonic() - started
+        if ad_hoc:
+            logger.info(
+                f"Ad-hoc parametric check: {len(results)} policies, "
+                f"{counters['fetched']}/{len(groups)} sources in {duration:.2f}s"
+            )
+            return results
+        
+        self.cycle_stats["last_cycle"] = {
+            "started_at": started_at.isoformat(),
+            "duration_seconds": round(duration, 3),
+            "policies_checked": len(results),
+            "sources": len(groups),
+            "sources_fetched": counters["fetched"],
+            "sources_failed": counters["failed"],
+            "sources_backed_off": counters["backed_off"],
+            "triggered": sum(1 for e in results.values() if e.triggered),
+        }
+        logger.info(
+            f"Parametric check: {len(results)} policies, {counters['fetched']}/{len(groups)} sources "
+            f"in {duration:.2f}s ({counters['failed']} failed, {counters['backed_off']} backed off)"
+        )
+        return results
+    
+    async def evaluate_cyclone_track(self, cyclone_data: Dict[str, Any]) -> Dict[str, TriggerEvaluation]:
+        """
+        Evaluate a cyclone track against all registered natcat policies at once.
         
+        Uses the spatial index instead of evaluating the track per policy;
+        only policies whose coverage area the track entered are returned.
+        
+        Args:
+            cyclone_data: Cyclone data with a "forecast_track"
+            
+        Returns:
+            Dict mapping policy_number to TriggerEvaluation
+        """
+        exposures = self.cyclone_index.evaluate_track(cyclone_data)
+        due = {n for members in self._group_due_policies(e.policy_number for e in exposures).values() for n in members}
+        results: Dict[str, TriggerEvaluation] = {}
+        
+        for exposure in exposures:
+            if exposure.policy_number not in due:
+                continue
+            policy = self.active_policies[exposure.policy_number]
+            try:
+                await self._apply_evaluation(policy, exposure.evaluation)
+            except Exception as e:
+                logger.error(f"Error processing cyclone trigger for {policy.policy_number}: {e}", exc_info=True)
+                continue
+            results[policy.policy_number] = exposure.evaluation
+        
+        logger.info(
+            f"Cyclone {cyclone_data.get('storm_id')}: {len(exposures)} of {len(self.cyclone_index)} "
+            f"policies exposed, {sum(1 for e in results.values() if e.triggered)} triggered"
+        )
         return results
     
+    async def _check_source_group(
+        self,
+        key: SourceKey,
+        policy_numbers: List[str],
+        semaphore: asyncio.Semaphore,
+        delay: float,
+        results: Dict[str, TriggerEvaluation],
+        counters: Dict[str, int],
+        ignore_backoff: bool = False
+    ) -> None:
+        """Fetch one source and evaluate every policy that depends on it."""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        state = self.source_states.setdefault(key, SourceState())
+        if not ignore_backoff and state.backed_off(time.monotonic()):
+            counters["backed_off"] += 1
+            return
+        
+        # Policies in a group share the trigger type, source and location
+        trigger = self.active_policies[policy_numbers[0]].trigger
+        try:
+            async with semaphore:
+                current_data = await self._fetch_trigger_data(trigger)
+        except Exception as e:
+            delay = state.record_failure(e, time.monotonic())
+            counters["failed"] += 1
+            logger.warning(
+                f"Fetching {key[0]} data from {key[1] or 'default source'} failed "
+                f"({state.consecutive_failures}x), retrying in {delay:.0f}s: {e}"
+            )
+            return
+        state.record_success()
+        counters["fetched"] += 1
+        
+        async def _evaluate(policy_number: str) -> None:
+            policy = self.active_policies.get(policy_number)
+            if policy is None:
+                return
+            try:
+                evaluation = self._evaluate_trigger(policy.trigger, current_data)
+                if evaluation.triggered:
+                    # Claim processing does I/O: bound it like the fetches
+                    async with semaphore:
+                        await self._apply_evaluation(policy, evaluation)
+                else:
+                    await self._apply_evaluation(policy, evaluation)
+                results[policy_number] = evaluation
+            except Exception as e:
+                logger.error(f"Error checking policy {policy_number}: {e}", exc_info=True)
+        
+        await asyncio.gather(*[_evaluate(policy_number) for policy_number in policy_numbers])
+    
+    async def check_all_policies(self, stagger_seconds: float = 0.0) -> Dict[str, TriggerEvaluation]:
+        """
+        Check all active policies.
+        
+        Args:
+            stagger_seconds: Spread source fetches evenly over this window
+        
+        Returns:
+            Dict mapping policy_number to TriggerEvaluation
+        """
+        return await self.check_policies(list(self.active_policies.keys()), stagger_seconds)
+    
     async def start_monitoring_loop(self, interval_seconds: int = 3600) -> None:
         """
         Start continuous monitoring loop.
         
+        Cycles are scheduled at a fixed rate (start + n * interval). Lag is
+        how late a cycle started; ticks missed because a cycle overran are
+        skipped rather than run back to back.
+        
         Args:
             interval_seconds: Check interval in seconds (default: 1 hour)
         """
         logger.info(f"Starting parametric monitoring loop (interval: {interval_seconds}s)")
+        stagger = min(interval_seconds * PARAMETRIC_STAGGER_FRACTION, PARAMETRIC_STAGGER_MAX_SECONDS)
+        next_run = time.monotonic()
         
         while True:
+            lag = max(0.0, time.monotonic() - next_run)
             try:
-                await self.check_all_policies()
-                await asyncio.sleep(interval_seconds)
+                await self.check_all_policies(stagger_seconds=stagger)
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}", exc_info=True)
-                await asyncio.sleep(60)  # Wait 1 minute before retrying
+            
+            self.cycle_stats["cycles"] += 1
+            if self.cycle_stats["last_cycle"] is not None:
+                self.cycle_stats["last_cycle"]["lag_seconds"] = round(lag, 3)
+            
+            next_run += interval_seconds
+            now = time.monotonic()
+            if now > next_run:
+                missed = int((now - next_run) // interval_seconds) + 1
+                logger.warning(
+                    f"Parametric monitoring cycle overran its {interval_seconds}s interval, "
+                    f"skipping {missed} tick(s)"
+                )
+                next_run += missed * interval_seconds
+            await asyncio.sleep(next_run - now)
+    
+    def get_monitoring_stats(self) -> Dict[str, Any]:
+        """Cycle timing and per-source health for the monitoring scheduler."""
+        now = time.monotonic()
+        return {
+            "active_policies": len(self.active_policies),
+            "cycles": self.cycle_stats["cycles"],
+            "last_cycle": self.cycle_stats["last_cycle"],
+            "sources": len(self.source_states),
+            "sources_backed_off": [
+                {
+                    "trigger_type": key[0],
+                    "data_source": key[1],
+                    "location": key[2],
+                    "consecutive_failures": state.consecutive_failures,
+                    "retry_in_seconds": round(state.retry_at - now, 1),
+                    "last_error": state.last_error,
+                }
+                for key, state in self.source_states.items() if state.backed_off(now)
+            ],
+        }
     
     def unregister_policy(self, policy_number: str) -> None:
         """Unregister a policy from monitoring."""
@@ -149,6 +424,7 @@ class ParametricMonitor:
             del self.active_policies[policy_number]
         if policy_number in self.monitoring_jobs:
             del self.monitoring_jobs[policy_number]
+        self.cyclone_index.remove(policy_number)
         logger.info(f"Unregistered policy {policy_number} from monitoring")
     
     async def _fetch_trigger_data(self, trigger: ParametricTrigger) -> Dict[str, Any]:
@@ -9,13 +9,22 @@ Version: 2.0
 """
 
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import copy
+import os
 
 logger = logging.getLogger(__name__)
 
+# Worker threads for per-shipment scoring when no batch calculator is available
+SENSITIVITY_MAX_WORKERS = int(os.getenv("SENSITIVITY_MAX_WORKERS", str(min(8, os.cpu_count() or 2))))
+
+# Threshold search (bisection on the parameter value)
+THRESHOLD_MAX_ITERATIONS = 20
+THRESHOLD_TOLERANCE = 1.0  # Score points
+
 
 @dataclass
 class SensitivityResult:
@@ -51,6 +60,12 @@ class SensitivityAnalyzer:
     1. Tornado diagrams showing parameter importance
     2. Elasticity analysis
     3. Threshold analysis (what parameter values trigger risk level changes)
+    
+    All perturbed shipments of an analysis are scored together: with the
+    default engine in one batched Monte Carlo call using common random
+    numbers (every shipment sees the same draws, seeded from the baseline),
+    so score deltas come from the parameter change rather than sampling
+    noise. Custom scalar calculators are fanned out over a thread pool.
     """
     
     # Parameters that can be varied and their expected types
@@ -69,7 +84,12 @@ class SensitivityAnalyzer:
         'climate_resilience': {'type': 'numeric', 'min': 0, 'max': 10},
     }
     
-    def __init__(self, risk_calculator_func: Optional[callable] = None):
+    def __init__(
+        self,
+        risk_calculator_func: Optional[Callable] = None,
+        batch_calculator_func: Optional[Callable] = None,
+        max_workers: int = SENSITIVITY_MAX_WORKERS
+    ):
         """
         Initialize analyzer.
         
@@ -77,20 +97,34 @@ class SensitivityAnalyzer:
             risk_calculator_func: Function that takes shipment dict and returns
                                  dict with 'risk_score' or 'overall_risk' key.
                                  If None, uses default engine.
+            batch_calculator_func: Function (shipments, random_seed) -> list of
+                                  result dicts scoring all shipments with the
+                                  same random draws. Defaults to the batched
+                                  engine when risk_calculator_func is None.
+            max_workers: Threads used when scoring shipment by shipment
         """
         if risk_calculator_func is None:
             from app.core.engine.risk_engine_v16 import calculate_enterprise_risk
             self.calculate_risk = calculate_enterprise_risk
+            if batch_calculator_func is None:
+                batch_calculator_func = _engine_batch_calculator
         else:
             self.calculate_risk = risk_calculator_func
         
+        self.calculate_risk_batch = batch_calculator_func
+        self.max_workers = max(1, max_workers)
+        
         self.baseline_shipment: Optional[Dict] = None
         self.baseline_score: Optional[float] = None
+        self._common_seed: Optional[int] = None
     
     def _get_risk_score(self, shipment: Dict) -> float:
         """Extract risk score from engine result."""
-        result = self.calculate_risk(shipment)
-        
+        return self._extract_score(self.calculate_risk(shipment))
+    
+    @staticmethod
+    def _extract_score(result: Dict) -> float:
+        """Risk score (0-100) from an engine result."""
         # Handle different result formats
         if 'risk_score' in result:
             return float(result['risk_score'])
@@ -100,6 +134,54 @@ class SensitivityAnalyzer:
         else:
             raise ValueError("Engine result missing risk_score or overall_risk")
     
+    def _begin(self, baseline_shipment: Dict) -> None:
+        """Store the baseline and derive the common random seed from it."""
+        from app.core.engine.rng import seed_from_key
+        from app.core.utils.cache import generate_cache_key
+        
+        self.baseline_shipment = copy.deepcopy(baseline_shipment)
+        self._common_seed = seed_from_key(generate_cache_key(self.baseline_shipment))
+    
+    def _perturbed(self, param: str, value: float) -> Dict:
+        """Baseline copy with one parameter replaced (nested data is shared, read-only)."""
+        shipment = dict(self.baseline_shipment)
+        shipment[param] = value
+        return shipment
+    
+    def _score_batch(self, shipments: List[Dict]) -> List[Optional[float]]:
+        """
+        Score shipments together.
+        
+        Uses the batch calculator (one call, common random numbers) when
+        available; otherwise, or if the batch call fails, scores shipments
+        individually on a thread pool.
+        
+        Returns:
+            One score per shipment (None where scoring failed)
+        """
+        if not shipments:
+            return []
+        
+        if self.calculate_risk_batch is not None:
+            try:
+                results = self.calculate_risk_batch(shipments, self._common_seed)
+                return [self._extract_score(r) for r in results]
+            except Exception as e:
+                logger.warning(f"Batched scoring failed, scoring shipments individually: {e}")
+        
+        def _safe_score(shipment: Dict) -> Optional[float]:
+            try:
+                return self._get_risk_score(shipment)
+            except Exception as e:
+                logger.warning(f"Could not score perturbed shipment: {e}")
+                return None
+        
+        workers = min(self.max_workers, len(shipments))
+        if workers <= 1:
+            return [_safe_score(shipment) for shipment in shipments]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sensitivity") as pool:
+            return list(pool.map(_safe_score, shipments))
+    
     def run_tornado_analysis(
         self, 
         baseline_shipment: Dict,
@@ -109,6 +191,9 @@ class SensitivityAnalyzer:
         """
         Create tornado diagram showing parameter sensitivity.
         
+        The baseline and the low/high variant of every parameter (2×P+1
+        shipments) are scored in a single batch.
+        
         Args:
             baseline_shipment: Base shipment data to vary from
             parameters: List of parameters to vary (None = all analyzable)
@@ -117,8 +202,7 @@ class SensitivityAnalyzer:
         Returns:
             TornadoResult with ordered sensitivities
         """
-        self.baseline_shipment = copy.deepcopy(baseline_shipment)
-        self.baseline_score = self._get_risk_score(self.baseline_shipment)
+        self._begin(baseline_shipment)
         
         if parameters is None:
             # Only analyze parameters that exist in the shipment
@@ -129,16 +213,33 @@ class SensitivityAnalyzer:
         
         logger.info(f"Running tornado analysis on {len(parameters)} parameters")
         
-        sensitivities: List[SensitivityResult] = []
-        
+        # Baseline first, then (low, high) per parameter
+        plans: List[Tuple[str, float, float, float]] = []
+        shipments = [self.baseline_shipment]
         for param in parameters:
             try:
-                result = self._analyze_single_parameter(
-                    param, variation_pct
-                )
-                sensitivities.append(result)
+                original_value, low_value, high_value = self._perturbation_values(param, variation_pct)
             except Exception as e:
                 logger.warning(f"Could not analyze {param}: {e}")
+                continue
+            plans.append((param, original_value, low_value, high_value))
+            shipments.append(self._perturbed(param, low_value))
+            shipments.append(self._perturbed(param, high_value))
+        
+        scores = self._score_batch(shipments)
+        if scores[0] is None:
+            raise ValueError("Could not score baseline shipment")
+        self.baseline_score = scores[0]
+        
+        sensitivities: List[SensitivityResult] = []
+        for i, (param, original_value, low_value, high_value) in enumerate(plans):
+            low_score, high_score = scores[1 + 2 * i], scores[2 + 2 * i]
+            if low_score is None or high_score is None:
+                logger.warning(f"Could not analyze {param}: scoring failed")
+                continue
+            sensitivities.append(self._build_result(
+                param, original_value, low_value, high_value, low_score, high_score
+            ))
         
         # Sort by sensitivity (descending)
         sensitivities.sort(key=lambda x: x.sensitivity, reverse=True)
@@ -151,12 +252,8 @@ class SensitivityAnalyzer:
             total_parameters=len(sensitivities)
         )
     
-    def _analyze_single_parameter(
-        self, 
-        param: str, 
-        variation_pct: float
-    ) -> SensitivityResult:
-        """Analyze sensitivity to a single parameter."""
+    def _perturbation_values(self, param: str, variation_pct: float) -> Tuple[float, float, float]:
+        """Baseline, low and high values for a parameter (clamped to its bounds)."""
         original_value = self.baseline_shipment.get(param)
         
         if original_value is None or original_value == 0:
@@ -175,15 +272,33 @@ class SensitivityAnalyzer:
         low_value = max(low_value, param_config.get('min', 0))
         high_value = min(high_value, param_config.get('max', float('inf')))
         
-        # Test low value
-        test_shipment = copy.deepcopy(self.baseline_shipment)
-        test_shipment[param] = low_value
-        low_score = self._get_risk_score(test_shipment)
-        
-        # Test high value
-        test_shipment[param] = high_value
-        high_score = self._get_risk_score(test_shipment)
-        
+        return original_value, low_value, high_value
+    
+    def _analyze_single_parameter(
+        self, 
+        param: str, 
+        variation_pct: float
+    ) -> SensitivityResult:
+        """Analyze sensitivity to a single parameter."""
+        original_value, low_value, high_value = self._perturbation_values(param, variation_pct)
+        low_score, high_score = self._score_batch([
+            self._perturbed(param, low_value),
+            self._perturbed(param, high_value),
+        ])
+        if low_score is None or high_score is None:
+            raise ValueError(f"Could not score perturbations of {param}")
+        return self._build_result(param, original_value, low_value, high_value, low_score, high_score)
+    
+    def _build_result(
+        self,
+        param: str,
+        original_value: float,
+        low_value: float,
+        high_value: float,
+        low_score: float,
+        high_score: float
+    ) -> SensitivityResult:
+        """Sensitivity metrics for one parameter."""
         # Calculate metrics
         sensitivity = abs(high_score - low_score)
         
@@ -215,6 +330,11 @@ class SensitivityAnalyzer:
         """
         Find parameter values that trigger specific risk levels.
         
+        Bisection runs for all targets at once: each iteration scores the
+        current midpoint of every unresolved target in one batch (targets
+        sharing a midpoint share the evaluation), so the search costs at
+        most 20 batch calls instead of up to 20 engine runs per target.
+        
         Args:
             baseline_shipment: Base shipment data
             param: Parameter to analyze
@@ -223,37 +343,40 @@ class SensitivityAnalyzer:
         Returns:
             Dict mapping target level to parameter value (or None if not reachable)
         """
-        self.baseline_shipment = copy.deepcopy(baseline_shipment)
+        self._begin(baseline_shipment)
         param_config = self.ANALYZABLE_PARAMETERS.get(param, {'min': 0, 'max': 100})
         
-        results = {}
+        targets = np.asarray(target_risk_levels, dtype=float)
+        low = np.full(targets.shape, float(param_config.get('min', 0)))
+        high = np.full(targets.shape, float(param_config.get('max', 100)))
+        found = np.full(targets.shape, np.nan)
+        active = np.ones(targets.shape, dtype=bool)
         
-        for target in target_risk_levels:
-            # Binary search for parameter value
-            low = param_config.get('min', 0)
-            high = param_config.get('max', 100)
+        for _ in range(THRESHOLD_MAX_ITERATIONS):
+            idx = np.flatnonzero(active)
+            if idx.size == 0:
+                break
             
-            found_value = None
+            mid = (low[idx] + high[idx]) / 2
+            unique_mid, inverse = np.unique(mid, return_inverse=True)
+            unique_scores = self._score_batch([self._perturbed(param, float(v)) for v in unique_mid])
+            score = np.array([np.nan if s is None else s for s in unique_scores])[inverse]
             
-            for _ in range(20):  # Max iterations
-                mid = (low + high) / 2
-                
-                test_shipment = copy.deepcopy(self.baseline_shipment)
-                test_shipment[param] = mid
-                score = self._get_risk_score(test_shipment)
-                
-                if abs(score - target) < 1:  # Within 1 point
-                    found_value = mid
-                    break
-                
-                if score < target:
-                    low = mid
-                else:
-                    high = mid
+            # Unscorable midpoints end the search for that target
+            active[idx[np.isnan(score)]] = False
             
-            results[target] = found_value
+            hit = np.abs(score - targets[idx]) < THRESHOLD_TOLERANCE  # Within 1 point
+            found[idx[hit]] = mid[hit]
+            active[idx[hit]] = False
+            
+            below = score < targets[idx]
+            low[idx] = np.where(below, mid, low[idx])
+            high[idx] = np.where(below, high[idx], mid)
         
-        return results
+        return {
+            target: (None if np.isnan(value) else float(value))
+            for target, value in zip(target_risk_levels, found)
+        }
     
     def generate_report(self, tornado_result: TornadoResult) -> Dict:
         """Generate sensitivity analysis report as dictionary."""
@@ -373,3 +496,16 @@ def analyze_shipment_sensitivity(
         variation_pct=variation_pct
     )
     return analyzer.generate_report(result)
+
+
+def _engine_batch_calculator(shipments: List[Dict], random_seed: Optional[int]) -> List[Dict]:
+    """Score shipments with the batched v16 engine using one common seed."""
+    from app.core.engine.risk_engine_v16 import calculate_enterprise_risk_batch
+    
+    mc_iterations = shipments[0].get('mc_iterations') if shipments else None
+    try:
+        mc_iterations = int(mc_iterations) if mc_iterations else None
+    except (ValueError, TypeError):
+        mc_iterations = None
+    
+    return calculate_enterprise_risk_batch(shipments, mc_iterations=mc_iterations, random_seed=random_seed)
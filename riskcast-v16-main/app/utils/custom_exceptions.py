@@ -111,3 +111,43 @@ class ExternalAPIError(RISKCASTException):
             details=details or {}
         )
 
+
+
+class ComputeCapacityError(RISKCASTException):
+    """Compute executor is saturated (too many queued engine tasks)"""
+    
+    def __init__(
+        self,
+        message: str = "Risk engine is at capacity, please retry shortly",
+        in_flight: Optional[int] = None,
+        capacity: Optional[int] = None,
+        details: Optional[Dict[str, Any]] = None
+    ):
+        self.in_flight = in_flight
+        self.capacity = capacity
+        super().__init__(
+            message=message,
+            error_code="COMPUTE_CAPACITY_EXCEEDED",
+            details=details or {"in_flight": in_flight, "capacity": capacity}
+        )
+
+
+class ComputeTimeoutError(RISKCASTException):
+    """Engine task did not finish within its timeout"""
+    
+    def __init__(
+        self,
+        message: Optional[str] = None,
+        timeout: Optional[float] = None,
+        details: Optional[Dict[str, Any]] = None
+    ):
+        self.timeout = timeout
+        if message is None:
+            message = "Risk engine timeout"
+            if timeout is not None:
+                message += f": operation exceeded {timeout:.1f} seconds"
+        super().__init__(
+            message=message,
+            error_code="COMPUTE_TIMEOUT",
+            details=details or {"timeout": timeout}
+        )
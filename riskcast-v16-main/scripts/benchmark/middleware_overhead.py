@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Middleware overhead micro-benchmark for RISKCAST.
+
+Compares per-request latency of a small JSON endpoint with:
+- no middleware (baseline)
+- the previous chained BaseHTTPMiddleware stack
+  (RequestID, ErrorHandler, Timeout, Metrics, RateLimiter, SecurityHeaders, CacheHeaders)
+- the fused pure-ASGI pipeline (ASGIPipelineMiddleware)
+
+Requests are driven straight through the ASGI interface (no sockets, no
+HTTP client), so the numbers isolate middleware cost.
+
+Usage:
+    python scripts/benchmark/middleware_overhead.py
+    python scripts/benchmark/middleware_overhead.py --requests 5000 --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi import FastAPI  # noqa: E402
+
+from app.core.utils.rate_limit_backends import InProcessBackend  # noqa: E402
+from app.middleware.asgi_pipeline import ASGIPipelineMiddleware  # noqa: E402
+from app.middleware.cache_headers import CacheHeadersMiddleware  # noqa: E402
+from app.middleware.error_handler_v2 import ErrorHandlerMiddleware  # noqa: E402
+from app.middleware.metrics_middleware import MetricsMiddleware  # noqa: E402
+from app.middleware.rate_limiter import RateLimiter, RateLimiterMiddleware  # noqa: E402
+from app.middleware.request_id import RequestIDMiddleware  # noqa: E402
+from app.middleware.security_headers import SecurityHeadersMiddleware  # noqa: E402
+from app.middleware.timeout_middleware import TimeoutMiddleware  # noqa: E402
+
+
+# ============================================================
+# APPS UNDER TEST
+# ============================================================
+
+UNLIMITED = {"default": (10**9, 60)}
+
+
+class UnlimitedRateLimiterMiddleware(RateLimiterMiddleware):
+    """Legacy rate limiter with limits high enough that every request does full work"""
+    RATE_LIMITS = UNLIMITED
+
+
+def _base_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"status": "ok", "value": 42}
+
+    return app
+
+
+def build_bare() -> FastAPI:
+    return _base_app()
+
+
+def build_legacy_stack() -> FastAPI:
+    app = _base_app()
+    # Same registration order as app/main.py before the fused pipeline
+    app.add_middleware(RequestIDMiddleware)
+    app.add_middleware(ErrorHandlerMiddleware)
+    app.add_middleware(TimeoutMiddleware, default_timeout=30.0)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(UnlimitedRateLimiterMiddleware, backend=InProcessBackend())
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(CacheHeadersMiddleware)
+    return app
+
+
+def build_fused() -> FastAPI:
+    app = _base_app()
+    limiter = RateLimiter(InProcessBackend())
+    limiter.RATE_LIMITS = UNLIMITED
+    app.add_middleware(ASGIPipelineMiddleware, default_timeout=30.0, rate_limiter=limiter)
+    return app
+
+
+# ============================================================
+# DRIVER
+# ============================================================
+
+def _scope(app: FastAPI) -> Dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/ping", "raw_path": b"/api/ping",
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80), "app": app,
+    }
+
+
+async def _run(app: FastAPI, requests: int) -> List[float]:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    timings = []
+    for _ in range(requests):
+        scope = _scope(app)
+        start = time.perf_counter()
+        await app(scope, receive, send)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def benchmark(builder: Callable[[], FastAPI], requests: int, rounds: int) -> Dict[str, float]:
+    app = builder()
+    asyncio.run(_run(app, 200))  # Warm-up (builds the middleware stack)
+    medians, p99s = [], []
+    for _ in range(rounds):
+        timings = sorted(asyncio.run(_run(app, requests)))
+        medians.append(statistics.median(timings))
+        p99s.append(timings[int(len(timings) * 0.99) - 1])
+    return {"median_us": min(medians) * 1e6, "p99_us": min(p99s) * 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure per-request middleware overhead")
+    parser.add_argument("--requests", type=int, default=3000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds (best round is reported)")
+    args = parser.parse_args()
+
+    results = {
+        "bare": benchmark(build_bare, args.requests, args.rounds),
+        "legacy BaseHTTPMiddleware stack": benchmark(build_legacy_stack, args.requests, args.rounds),
+        "fused ASGI pipeline": benchmark(build_fused, args.requests, args.rounds),
+    }
+    bare = results["bare"]["median_us"]
+
+    print(f"{'configuration':<34}{'median (us)':>14}{'p99 (us)':>12}{'overhead (us)':>16}")
+    print("-" * 76)
+    for name, r in results.items():
+        print(f"{name:<34}{r['median_us']:>14.1f}{r['p99_us']:>12.1f}{r['median_us'] - bare:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
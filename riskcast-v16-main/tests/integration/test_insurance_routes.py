@@ -0,0 +1,52 @@
+"""
+Integration tests for the insurance v2 API routes
+"""
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+SWEEP_URL = "/api/v2/insurance/parametric/pricing-sweep"
+
+
+class TestParametricPricingSweep:
+    """Test POST /api/v2/insurance/parametric/pricing-sweep"""
+
+    def test_route_is_mounted(self):
+        """Pricing sweep is registered on the app"""
+        assert SWEEP_URL in app.openapi()["paths"]
+    
+    def test_unauthenticated_insurance_routes_not_mounted(self):
+        """Only the pricing endpoints of the insurance router are exposed"""
+        paths = app.openapi()["paths"]
+        assert "/api/v2/insurance/transactions/create" not in paths
+        assert "/api/v2/insurance/kyc/verify" not in paths
+        assert "/api/v2/insurance/claims/submit" not in paths
+        assert client.post("/api/v2/insurance/kyc/verify", json={}).status_code == 404
+
+    def test_port_congestion_sweep(self):
+        """Premiums are returned per threshold and fall as the threshold rises"""
+        response = client.post(SWEEP_URL, json={
+            "trigger_type": "port_congestion",
+            "location": "CNSHA",
+            "thresholds": [5, 10, 20],
+            "payout_per_unit": 1000.0,
+            "maximum_days": 20
+        })
+
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["thresholds"] == [5, 10, 20]
+        assert len(data["premium"]) == 3
+        assert data["premium"][0] >= data["premium"][1] >= data["premium"][2]
+
+    def test_non_numeric_thresholds_rejected(self):
+        """Invalid thresholds are a client error, not a 500"""
+        for thresholds in (["high"], [10, None], "150"):
+            response = client.post(SWEEP_URL, json={"trigger_type": "weather", "thresholds": thresholds})
+            assert response.status_code == 400
+
+    def test_unknown_trigger_type_rejected(self):
+        """Only weather and port congestion can be swept"""
+        response = client.post(SWEEP_URL, json={"trigger_type": "earthquake", "thresholds": [1]})
+        assert response.status_code == 400
@@ -0,0 +1,151 @@
+"""
+Unit tests for cached API key verification and batched usage counters
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.database as database
+from app.core import security
+from app.models.api_key import APIKey
+
+
+@pytest.fixture
+def key_db(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    APIKey.__table__.create(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    monkeypatch.setattr(database, "SessionLocal", factory)
+
+    aggregator = security.APIKeyUsageAggregator(flush_interval=3600, session_factory=factory)
+    monkeypatch.setattr(security, "_usage_aggregator", aggregator)
+    security.invalidate_api_key()
+    yield factory
+    aggregator.close()
+    security.invalidate_api_key()
+    engine.dispose()
+
+
+def _create_key(factory, **kwargs):
+    api_key, actual_key = APIKey.create(name="test", user_id="u1", **kwargs)
+    db = factory()
+    db.add(api_key)
+    db.commit()
+    key_id = api_key.id
+    db.close()
+    return key_id, actual_key
+
+
+def _verify(key):
+    return asyncio.run(security.verify_api_key(x_api_key=key))
+
+
+class TestVerifiedKeyCache:
+    """Test cache hits, invalidation and negative caching"""
+
+    def test_second_request_served_from_cache(self, key_db, monkeypatch):
+        _, actual_key = _create_key(key_db, scopes=["risk:*"])
+        api_key = _verify(actual_key)
+        assert api_key.user_id == "u1"
+        assert api_key.has_scope("risk:analyze")
+        assert not api_key.has_scope("admin:keys")
+
+        lookups = []
+        original = security._lookup_api_key
+        monkeypatch.setattr(security, "_lookup_api_key", lambda h: lookups.append(h) or original(h))
+        for _ in range(5):
+            _verify(actual_key)
+        assert lookups == []
+        assert security.get_api_key_cache_stats()["cache"]["hits"] >= 5
+
+    def test_revocation_takes_effect_after_invalidation(self, key_db):
+        key_id, actual_key = _create_key(key_db)
+        cached = _verify(actual_key)
+
+        db = key_db()
+        row = db.query(APIKey).filter(APIKey.id == key_id).one()
+        row.revoke("compromised")
+        db.commit()
+        db.close()
+
+        _verify(actual_key)  # Still cached in this process
+        assert security.invalidate_api_key(cached.key_hash) == 1
+        with pytest.raises(HTTPException) as exc:
+            _verify(actual_key)
+        assert exc.value.status_code == 403
+        assert exc.value.detail["reason"] == "compromised"
+
+    def test_expiry_checked_on_cached_entry(self, key_db):
+        _, actual_key = _create_key(key_db, expires_in_days=1)
+        cached = _verify(actual_key)
+        cached.expires_at = datetime.utcnow() - timedelta(seconds=1)
+
+        with pytest.raises(HTTPException) as exc:
+            _verify(actual_key)
+        assert exc.value.status_code == 403
+
+    def test_unknown_key_is_negatively_cached(self, key_db, monkeypatch):
+        lookups = []
+        original = security._lookup_api_key
+        monkeypatch.setattr(security, "_lookup_api_key", lambda h: lookups.append(h) or original(h))
+
+        for _ in range(3):
+            with pytest.raises(HTTPException) as exc:
+                _verify("rsk_does_not_exist")
+            assert exc.value.status_code == 401
+        assert len(lookups) == 1
+
+
+class TestUsageAggregation:
+    """Test in-memory usage counters and batched flush"""
+
+    def test_usage_flushed_in_one_batch(self, key_db):
+        first_id, first_key = _create_key(key_db)
+        second_id, second_key = _create_key(key_db)
+
+        for _ in range(7):
+            _verify(first_key)
+        for _ in range(3):
+            _verify(second_key)
+
+        aggregator = security.get_usage_aggregator()
+        assert aggregator.get_pending(first_id)[0] == 7
+
+        db = key_db()
+        assert db.query(APIKey).filter(APIKey.id == first_id).one().request_count == 0
+        db.close()
+
+        assert aggregator.flush() == 2
+        db = key_db()
+        rows = {k.id: k for k in db.query(APIKey).all()}
+        assert rows[first_id].request_count == 7
+        assert rows[second_id].request_count == 3
+        assert rows[first_id].last_used_at is not None
+        db.close()
+        assert aggregator.get_stats()["pending_keys"] == 0
+
+    def test_failed_flush_keeps_counts(self, key_db):
+        key_id, _ = _create_key(key_db)
+
+        def broken_factory():
+            raise RuntimeError("database down")
+
+        aggregator = security.APIKeyUsageAggregator(flush_interval=3600, session_factory=broken_factory)
+        aggregator.record(key_id)
+        aggregator.record(key_id)
+        assert aggregator.flush() == 0
+        assert aggregator.get_pending(key_id)[0] == 2
+        assert aggregator.get_stats()["flush_errors"] == 1
+
+        aggregator._session_factory = key_db
+        aggregator.record(key_id)
+        assert aggregator.flush() == 1
+        db = key_db()
+        assert db.query(APIKey).filter(APIKey.id == key_id).one().request_count == 3
+        db.close()
+        aggregator.close()
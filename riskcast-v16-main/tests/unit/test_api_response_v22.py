@@ -0,0 +1,139 @@
+"""
+Unit tests for the V22 stage-graph pipeline
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.engine import api_response_v22 as v22
+from app.core.engine.api_response_v22 import Stage, resolve_stages, run_stage_graph
+
+
+SHIPMENT = {
+    "transport": {
+        "trade_lane": "Vietnam to USA", "mode": "sea_freight", "shipment_type": "fcl",
+        "priority": "balanced", "carrier": "Maersk Line", "incoterm": "FOB",
+        "incoterm_location": "Ho Chi Minh Port", "pol": "VNSGN", "pod": "USLAX",
+        "container_type": "40hc", "etd": "15/01/2026", "transit_time": 22, "reliability_score": 88,
+    },
+    "cargo": {
+        "cargo_type": "electronics", "hs_code": "847130", "packing_type": "carton",
+        "packages": 500, "gross_weight": 12000.0, "net_weight": 11500.0, "volume_m3": 60.0,
+        "insurance_value": 250000.0, "insurance_coverage": "icc_b", "sensitivity": "fragile",
+        "dangerous_goods": False,
+    },
+    "seller": {
+        "company_name": "VN Electronics Co Ltd", "business_type": "Manufacturer", "country": "Vietnam",
+        "city": "Ho Chi Minh City", "address": "123 Nguyen Hue Street", "contact_person": "Nguyen Van A",
+        "email": "export@vnelectronics.com", "phone": "+84901234567", "tax_id": "0123456789",
+    },
+    "buyer": {
+        "company_name": "USA Tech Imports Inc", "business_type": "Importer", "country": "USA",
+        "city": "Los Angeles", "address": "456 Main Street", "contact_person": "John Smith",
+        "email": "john@usatechimports.com", "phone": "+13105551234", "tax_id": "987654321",
+    },
+    "modules": {"monte_carlo": True},
+}
+
+
+def sleeping_stage(seconds, value):
+    def func(ctx, results):
+        time.sleep(seconds)
+        return value
+    return func
+
+
+def comparable(response):
+    response = {k: v for k, v in response.items() if k not in ("timestamp", "metadata")}
+    return json.dumps(response, sort_keys=True, default=str)
+
+
+class TestStageGraph:
+    """Test dependency resolution and concurrent execution"""
+
+    def test_independent_stages_run_concurrently(self):
+        stages = {
+            "root": Stage("root", sleeping_stage(0, 1)),
+            "a": Stage("a", sleeping_stage(0.1, 2), ("root",)),
+            "b": Stage("b", sleeping_stage(0.1, 3), ("root",)),
+            "c": Stage("c", sleeping_stage(0.1, 4), ("root",)),
+            "join": Stage("join", lambda ctx, r: r["a"] + r["b"] + r["c"], ("a", "b", "c")),
+        }
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            started = time.perf_counter()
+            results, timings = run_stage_graph(stages, list(stages), {}, executor=pool)
+            elapsed = time.perf_counter() - started
+
+        assert results["join"] == 9
+        assert elapsed < 0.25
+        assert timings["join"]["started_ms"] >= timings["a"]["started_ms"] + timings["a"]["duration_ms"]
+
+    def test_resolve_pulls_in_dependencies_only(self):
+        stages = {
+            "root": Stage("root", sleeping_stage(0, 1)),
+            "a": Stage("a", sleeping_stage(0, 2), ("root",)),
+            "b": Stage("b", sleeping_stage(0, 3), ("root",)),
+            "c": Stage("c", lambda ctx, r: (r["a"], r.get("b")), ("a", "b")),
+        }
+        assert resolve_stages(stages, ["a"]) == ["root", "a"]
+        assert resolve_stages(stages, ["c"]) == ["root", "a", "b", "c"]
+
+        # A dependency left out of the selection reads as None
+        results, _ = run_stage_graph(stages, ["root", "a", "c"], {})
+        assert results["c"] == (2, None)
+
+    def test_stage_error_propagates_and_cancels_pending(self):
+        ran = []
+        stages = {
+            "boom": Stage("boom", lambda ctx, r: 1 / 0),
+            "after": Stage("after", lambda ctx, r: ran.append("after"), ("boom",)),
+        }
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with pytest.raises(ZeroDivisionError):
+                run_stage_graph(stages, list(stages), {}, executor=pool)
+        assert ran == []
+
+
+class TestV22Pipeline:
+    """Test the V22 response built from the stage graph"""
+
+    def test_pool_and_inline_produce_same_response(self, monkeypatch):
+        monkeypatch.setattr(v22, "V22_PIPELINE_MAX_WORKERS", 1)
+        inline = v22.generate_risk_assessment_v22(SHIPMENT)
+
+        pool = ThreadPoolExecutor(max_workers=4)
+        monkeypatch.setattr(v22, "_get_executor", lambda: pool)
+        threads = set()
+        original = v22.V22_STAGES["esg"].func
+        monkeypatch.setitem(v22.V22_STAGES, "esg", Stage(
+            "esg", lambda ctx, r: threads.add(threading.current_thread().name) or original(ctx, r)))
+        try:
+            pooled = v22.generate_risk_assessment_v22(SHIPMENT)
+        finally:
+            pool.shutdown()
+
+        assert inline["success"] and "monte_carlo_simulation" in inline
+        assert comparable(inline) == comparable(pooled)
+        assert threads and threading.current_thread().name not in threads
+
+        stages = pooled["metadata"]["pipeline"]["stages"]
+        assert set(stages) == set(v22.V22_STAGES)
+        assert all(t["duration_ms"] >= 0 for t in stages.values())
+
+    def test_unrequested_outputs_are_skipped(self):
+        response = v22.generate_risk_assessment_v22(SHIPMENT, outputs=["esg_assessment"])
+
+        assert "esg_assessment" in response
+        assert response["risk_assessment"]["market_risk"]["pressure_level"]
+        for key in ("ai_explanation", "risk_driver_tree", "shock_scenarios",
+                    "monte_carlo_simulation", "operational_intelligence", "global_freight_index"):
+            assert key not in response
+        pipeline = response["metadata"]["pipeline"]
+        assert set(pipeline["stages"]) == {"scoring", "gfi", "esg"}
+        assert "monte_carlo" in pipeline["skipped_stages"]
+
+    def test_engines_are_shared_across_requests(self):
+        assert v22.get_engines() is v22.get_engines()
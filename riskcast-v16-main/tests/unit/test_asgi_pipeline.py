@@ -0,0 +1,135 @@
+"""
+Unit tests for the fused pure-ASGI middleware pipeline
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import compute_executor
+from app.core.utils.rate_limit_backends import InProcessBackend
+from app.middleware.asgi_pipeline import ASGIPipelineMiddleware
+from app.middleware.rate_limiter import RateLimiter
+
+
+def create_app(timeout: float = 1.0, limits=None):
+    app = FastAPI()
+    limiter = RateLimiter(InProcessBackend())
+    if limits:
+        limiter.RATE_LIMITS = {**RateLimiter.RATE_LIMITS, **limits}
+
+    @app.get("/api/ping")
+    async def ping(request: Request):
+        return {
+            "request_id": request.state.request_id,
+            "has_deadline": compute_executor._remaining_request_time() is not None,
+        }
+
+    @app.get("/api/boom")
+    async def boom():
+        raise RuntimeError("kaboom")
+
+    @app.get("/api/slow")
+    async def slow():
+        await asyncio.sleep(3)
+        return {"status": "late"}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+                await asyncio.sleep(0.6)  # Total exceeds the timeout
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/results")
+    async def results():
+        return {"ok": True}
+
+    app.add_middleware(ASGIPipelineMiddleware, default_timeout=timeout, rate_limiter=limiter)
+    return app
+
+
+class TestASGIPipeline:
+    """Test the behaviours previously provided by the BaseHTTPMiddleware stack"""
+
+    def test_request_id_security_and_rate_limit_headers(self):
+        client = TestClient(create_app())
+        response = client.get("/api/ping")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert response.headers["X-Request-ID"] == body["request_id"]
+        assert body["has_deadline"] is True
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert "Content-Security-Policy" in response.headers
+        assert response.headers["X-RateLimit-Limit"] == "100"
+        assert response.headers["X-RateLimit-Remaining"] == "99"
+
+    def test_cache_headers(self):
+        client = TestClient(create_app())
+        response = client.get("/results")
+        assert response.headers["Cache-Control"] == "no-cache, no-store, must-revalidate"
+
+    def test_rate_limit_returns_429(self):
+        client = TestClient(create_app(limits={"/api/ping": (2, 60)}))
+        statuses = [client.get("/api/ping").status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        rejected = client.get("/api/ping")
+        assert rejected.json()["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+        assert "X-Request-ID" in rejected.headers
+
+    def test_unhandled_exception_becomes_standard_error(self):
+        client = TestClient(create_app(), raise_server_exceptions=False)
+        response = client.get("/api/boom")
+
+        assert response.status_code == 500
+        body = response.json()
+        assert body["success"] is False
+        assert body["meta"]["request_id"] == response.headers["X-Request-ID"]
+
+    def test_slow_request_times_out(self):
+        client = TestClient(create_app(timeout=0.3))
+        started = time.monotonic()
+        response = client.get("/api/slow")
+
+        assert response.status_code == 504
+        assert response.json()["error"]["code"] == "REQUEST_TIMEOUT"
+        assert time.monotonic() - started < 2
+
+    def test_streaming_response_is_not_buffered_or_cut_off(self):
+        app = create_app(timeout=1.0)
+        # Walk to the pipeline layer (skipping Starlette's outer error/exception layers)
+        pipeline = app.build_middleware_stack()
+        while not isinstance(pipeline, ASGIPipelineMiddleware):
+            pipeline = pipeline.app
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/api/stream", "raw_path": b"/api/stream",
+            "query_string": b"", "headers": [], "scheme": "http", "http_version": "1.1",
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80), "root_path": "", "app": app,
+        }
+        messages = []
+
+        async def receive():
+            await asyncio.sleep(10)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            messages.append((time.monotonic(), message))
+
+        started = time.monotonic()
+        asyncio.run(pipeline(scope, receive, send))
+
+        start_message = messages[0][1]
+        assert start_message["status"] == 200
+        assert any(name == b"x-request-id" for name, _ in start_message["headers"])
+
+        chunks = [(at - started, m["body"]) for at, m in messages[1:] if m.get("body")]
+        assert [body for _, body in chunks] == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n"]
+        # Chunks are forwarded as produced, and the stream outlives the 1s timeout
+        assert chunks[0][0] < 0.5
+        assert chunks[-1][0] > 1.0
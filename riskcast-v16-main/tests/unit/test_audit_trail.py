@@ -0,0 +1,284 @@
+"""
+Unit tests for AuditTrailStore indexes, cursor pagination and the durable segment log
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.audit_segment_log import AuditLogCorruptionError, AuditSegmentLog, merkle_root
+from app.models.audit_trail import AuditEntry, AuditEventType, AuditTrailStore
+
+BASE_TIME = datetime(2026, 1, 1)
+
+
+def _brute_force(store, start_date=None, end_date=None, user_id=None, organization_id=None,
+                 event_type=None, min_risk_score=None, max_risk_score=None):
+    """Reference implementation: linear scan with the original filter semantics"""
+    results = []
+    for entry in store._entries:
+        if start_date and entry.timestamp < start_date:
+            continue
+        if end_date and entry.timestamp > end_date:
+            continue
+        if user_id and entry.user_id != user_id:
+            continue
+        if organization_id and entry.organization_id != organization_id:
+            continue
+        if event_type and entry.event_type != event_type:
+            continue
+        if min_risk_score is not None and (entry.risk_score or 0) < min_risk_score:
+            continue
+        if max_risk_score is not None and (entry.risk_score or 100) > max_risk_score:
+            continue
+        results.append(entry)
+    return results
+
+
+@pytest.fixture
+def populated_store():
+    rng = random.Random(7)
+    store = AuditTrailStore()
+    event_types = list(AuditEventType)
+    for i in range(600):
+        store.append(AuditEntry(
+            timestamp=BASE_TIME + timedelta(minutes=i),
+            user_id=rng.choice(["u1", "u2", "u3", None]),
+            organization_id=rng.choice(["org_a", "org_b"]),
+            event_type=rng.choice(event_types),
+            risk_score=rng.choice([None, rng.uniform(0, 105)]),
+            request_payload={"i": i},
+        ))
+    return store
+
+
+class TestAuditTrailIndexes:
+    """Test indexed lookups match a full scan"""
+
+    def test_get_by_id_uses_hash_index(self, populated_store):
+        entry = populated_store._entries[321]
+        assert populated_store.get_by_id(entry.audit_id) is entry
+        assert populated_store.get_by_id("missing") is None
+
+    @pytest.mark.parametrize("filters", [
+        {},
+        {"user_id": "u2"},
+        {"organization_id": "org_b", "event_type": AuditEventType.FRAUD_ALERT},
+        {"start_date": BASE_TIME + timedelta(minutes=100), "end_date": BASE_TIME + timedelta(minutes=160)},
+        {"min_risk_score": 35, "max_risk_score": 62.5},
+        {"min_risk_score": 0},
+        {"max_risk_score": 100},
+        {"max_risk_score": 20, "user_id": "u1"},
+        {"start_date": BASE_TIME + timedelta(minutes=590), "min_risk_score": 90},
+    ])
+    def test_query_matches_full_scan(self, populated_store, filters):
+        expected = _brute_force(populated_store, **filters)
+        results = populated_store.query(limit=10_000, **filters)
+        assert [e.audit_id for e in results] == [e.audit_id for e in expected]
+
+    def test_cursor_pagination_covers_all_results(self, populated_store):
+        filters = {"organization_id": "org_a", "min_risk_score": 10}
+        expected = _brute_force(populated_store, **filters)
+
+        collected, cursor, pages = [], None, 0
+        while True:
+            page = populated_store.query_page(limit=25, cursor=cursor, **filters)
+            collected.extend(page["entries"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert [e.audit_id for e in collected] == [e.audit_id for e in expected]
+        assert pages == -(-len(expected) // 25)
+
+    def test_out_of_order_timestamps(self):
+        store = AuditTrailStore()
+        for minutes in [10, 30, 20, 5, 40]:
+            store.append(AuditEntry(timestamp=BASE_TIME + timedelta(minutes=minutes), request_payload={"m": minutes}))
+
+        results = store.query(start_date=BASE_TIME + timedelta(minutes=8), end_date=BASE_TIME + timedelta(minutes=35))
+        assert [e.request_payload["m"] for e in results] == [10, 30, 20]
+
+        page = store.query_page(start_date=BASE_TIME, limit=2)
+        assert [e.request_payload["m"] for e in page["entries"]] == [10, 30]
+        page = store.query_page(start_date=BASE_TIME, limit=2, cursor=page["next_cursor"])
+        assert [e.request_payload["m"] for e in page["entries"]] == [20, 5]
+
+    def test_invalid_cursor(self, populated_store):
+        with pytest.raises(ValueError):
+            populated_store.query_page(cursor="not-a-cursor")
+
+
+class TestAuditSegmentLog:
+    """Test durable segment log, recovery and incremental verification"""
+
+    def _fill(self, store, n, start=0):
+        for i in range(start, start + n):
+            store.append(AuditEntry(
+                timestamp=BASE_TIME + timedelta(minutes=i),
+                user_id=f"user_{i % 3}",
+                risk_score=float(i % 100),
+                request_payload={"i": i},
+                response_payload={"score": i},
+            ))
+
+    def _store(self, directory, **kwargs):
+        log = AuditSegmentLog(str(directory), segment_max_entries=kwargs.get("segment_max_entries", 4))
+        return AuditTrailStore(log=log)
+
+    def test_recovery_restores_chain_and_indexes(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 10)
+        last_hash = store._last_hash
+        audit_id = store._entries[7].audit_id
+        store.close()
+
+        recovered = self._store(tmp_path)
+        assert len(recovered) == 10
+        assert recovered._last_hash == last_hash
+        assert recovered.get_by_id(audit_id).request_payload == {"i": 7}
+        assert len(recovered.get_by_user("user_1")) == 3
+        assert recovered.verify_chain_integrity() == (True, [])
+
+        # Appends continue the same chain after restart
+        self._fill(recovered, 3, start=10)
+        assert recovered._entries[10].previous_hash == last_hash
+        recovered.close()
+        assert len(self._store(tmp_path)) == 13
+
+    def test_segments_sealed_with_merkle_checkpoints(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 10)
+        store.close()
+
+        checkpoints = store._log.checkpoints
+        assert [c["count"] for c in checkpoints] == [4, 4]
+        assert checkpoints[1]["first_previous_hash"] == checkpoints[0]["last_chain_hash"]
+        assert checkpoints[0]["merkle_root"] == merkle_root([e.chain_hash for e in store._entries[0:4]])
+        assert sorted(p.name for p in tmp_path.glob("*.ckpt.json")) == [
+            "segment-000001.ckpt.json", "segment-000002.ckpt.json"
+        ]
+
+    def test_torn_tail_is_truncated(self, tmp_path):
+        store = self._store(tmp_path, segment_max_entries=100)
+        self._fill(store, 5)
+        store.close()
+
+        segment = tmp_path / "segment-000001.log"
+        with open(segment, "ab") as f:
+            f.write(b"E\x00\x00\x10\x00garbage")  # Partial frame from a crash
+
+        recovered = self._store(tmp_path, segment_max_entries=100)
+        assert len(recovered) == 5
+        self._fill(recovered, 1, start=5)
+        recovered.close()
+        assert len(self._store(tmp_path, segment_max_entries=100)) == 6
+
+    def test_corrupt_sealed_segment_is_not_truncated(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 10)
+        store.close()
+
+        sealed = tmp_path / "segment-000001.log"
+        data = bytearray(sealed.read_bytes())
+        data[-3] ^= 0xFF  # Flip a payload byte in the last frame
+        sealed.write_bytes(bytes(data))
+
+        with pytest.raises(AuditLogCorruptionError):
+            self._store(tmp_path)
+        assert sealed.stat().st_size == len(data)
+
+    def test_recovery_reads_headers_not_payloads(self, tmp_path, monkeypatch):
+        store = self._store(tmp_path)
+        self._fill(store, 6)
+        store.close()
+
+        def no_decode(*args, **kwargs):
+            raise AssertionError("recover() must not decode payloads")
+
+        log = AuditSegmentLog(str(tmp_path), segment_max_entries=4)
+        monkeypatch.setattr(log, "_read_payloads", no_decode)
+        log.recover()
+        assert log.get_stats()["entries"] == 6
+        assert log.get_stats()["open_segment_entries"] == 2
+        log.close()
+
+    def test_reopened_tail_seals_with_all_its_entries(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 6)
+        store.close()
+
+        recovered = self._store(tmp_path)
+        self._fill(recovered, 2, start=6)
+        recovered.close()
+
+        checkpoint = recovered._log.checkpoints[1]
+        assert checkpoint["count"] == 4
+        assert checkpoint["merkle_root"] == merkle_root([e.chain_hash for e in recovered._entries[4:8]])
+        assert recovered.verify_incremental()[0]
+
+    def test_failed_write_does_not_advance_chain(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 2)
+        last_hash = store._last_hash
+
+        def disk_full(*args, **kwargs):
+            raise OSError("No space left on device")
+
+        store._log.append_entry = disk_full
+        with pytest.raises(OSError):
+            self._fill(store, 1, start=2)
+        del store._log.append_entry
+
+        assert store._last_hash == last_hash
+        assert len(store) == 2
+        self._fill(store, 1, start=2)
+        assert store.verify_chain_integrity() == (True, [])
+        store.close()
+
+    def test_incremental_verification(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 10)
+
+        assert store.verify_incremental() == (True, [], 10)
+        assert store.verify_incremental() == (True, [], 0)
+
+        self._fill(store, 5, start=10)
+        valid, broken, checked = store.verify_incremental()
+        assert valid and checked == 5
+
+        # Tampering inside newly appended entries is caught
+        self._fill(store, 4, start=15)
+        store._entries[16].response_hash = "0" * 64
+        valid, broken, _ = store.verify_incremental()
+        assert not valid
+        assert any(b["issue"].startswith("Hash mismatch") for b in broken)
+        store.close()
+
+    def test_anonymization_survives_restart(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 6)
+        assert store.anonymize_user("user_2") == 2
+        store.close()
+
+        recovered = self._store(tmp_path)
+        assert recovered.get_by_user("user_2") == []
+        anonymized = [e for e in recovered._entries if (e.user_id or "").startswith("ANONYMIZED_")]
+        assert len(anonymized) == 2
+        assert all(e.ip_address == "REDACTED" for e in anonymized)
+
+    def test_redaction_record_stores_keyed_hash_only(self, tmp_path):
+        store = self._store(tmp_path)
+        self._fill(store, 6)
+        store.anonymize_user("user_2")
+        store.close()
+
+        log = AuditSegmentLog(str(tmp_path))
+        log.recover()
+        _, redactions = log.read_records()
+        assert len(redactions) == 1
+        assert "user_id" not in redactions[0]
+        assert "user_2" not in json.dumps(redactions)
+        assert (tmp_path / "redaction.key").exists()
@@ -0,0 +1,209 @@
+"""
+Unit tests for the bounded in-memory result cache
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.utils import cache as cache_module
+from app.core.utils.cache import LRUTTLCache, approximate_size
+
+
+class TestLRUTTLCache:
+    """Test LRU/TTL eviction, byte budget and statistics"""
+
+    def test_get_set_and_stats(self):
+        cache = LRUTTLCache(max_entries=10, max_bytes=10**6, default_ttl=60)
+        cache.set("a", {"risk": 5.0})
+
+        assert cache.get("a") == {"risk": 5.0}
+        assert cache.get("missing") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["keys"] == 1
+        assert stats["bytes"] > 0
+
+    def test_lru_eviction_by_entry_count(self):
+        cache = LRUTTLCache(max_entries=2, max_bytes=10**6, default_ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" becomes least recently used
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_budget_evicts_and_rejects_oversize(self):
+        value = {"data": list(range(100))}
+        size = approximate_size(value)
+        cache = LRUTTLCache(max_entries=100, max_bytes=int(size * 2.5), default_ttl=60)
+
+        for i in range(5):
+            cache.set(f"k{i}", {"data": list(range(100))})
+
+        stats = cache.stats()
+        assert stats["keys"] == 2
+        assert stats["bytes"] <= cache.max_bytes
+        assert stats["evictions"] == 3
+
+        assert cache.set("huge", {"data": list(range(10_000))}) is False
+        assert "huge" not in cache
+
+    def test_ttl_expiry(self):
+        cache = LRUTTLCache(max_entries=10, max_bytes=10**6, default_ttl=60)
+        cache.set("short", "value", ttl=1)
+        cache._data["short"] = ("value", time.time() - 1, cache._data["short"][2])
+
+        assert cache.get("short") is None
+        assert cache.stats()["expirations"] == 1
+        assert cache.stats()["bytes"] == 0
+
+    def test_clear_with_prefix(self):
+        cache = LRUTTLCache(max_entries=10, max_bytes=10**6, default_ttl=60)
+        cache.set("riskcast:risk:1", 1)
+        cache.set("riskcast:risk:2", 2)
+        cache.set("other", 3)
+
+        assert cache.clear(prefix="riskcast:risk:") == 2
+        assert len(cache) == 1
+
+    def test_thread_safety(self):
+        cache = LRUTTLCache(max_entries=50, max_bytes=10**6, default_ttl=60)
+
+        def worker(n):
+            for i in range(500):
+                cache.set(f"{n}-{i % 80}", {"i": i})
+                cache.get(f"{n}-{(i * 7) % 80}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = cache.stats()
+        assert stats["keys"] <= 50
+        assert stats["bytes"] == sum(entry[2] for entry in cache._data.values())
+
+
+class TestCacheModule:
+    """Test module-level API on the memory backend"""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(cache_module, "_memory_cache", LRUTTLCache(max_entries=5))
+        monkeypatch.setattr(cache_module, "USE_REDIS", False)
+        monkeypatch.setattr(cache_module, "CACHE_ENABLED", True)
+
+    def test_get_cache_stats_reports_counters(self):
+        key = cache_module.generate_cache_key({"route": "VNSGN_USLAX", "cargo_value": 1000})
+        cache_module.set_cache(key, {"overall_risk": 4.2})
+        assert cache_module.get_cache(key) == {"overall_risk": 4.2}
+        cache_module.get_cache("riskcast:risk:missing")
+
+        stats = cache_module.get_cache_stats()
+        assert stats["backend"] == "memory"
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["keys"] == 1
+        assert "evictions" in stats and "bytes" in stats
+
+    def test_memory_cache_is_bounded(self):
+        for i in range(20):
+            cache_module.set_cache(f"riskcast:risk:{i}", {"i": i})
+
+        stats = cache_module.get_cache_stats()
+        assert stats["keys"] == 5
+        assert stats["evictions"] == 15
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical computations"""
+
+    @pytest.fixture(autouse=True)
+    def reset_flight_stats(self, monkeypatch):
+        monkeypatch.setattr(cache_module, "_flight_stats", {"leaders": 0, "coalesced": 0, "errors": 0})
+        monkeypatch.setattr(cache_module, "SINGLE_FLIGHT_ENABLED", True)
+
+    def test_threads_share_one_computation(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {"overall_risk": 6.1}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(cache_module.single_flight("k", compute)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(cache_module.single_flight("k", compute)))
+            for _ in range(4)
+        ]
+        for t in followers:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in [leader] + followers:
+            t.join()
+
+        assert len(calls) == 1
+        assert len(results) == 5
+        assert all(r is results[0] for r in results)
+
+        stats = cache_module.get_single_flight_stats()
+        assert stats["leaders"] == 1
+        assert stats["coalesced"] == 4
+        assert stats["in_flight"] == 0
+
+    def test_leader_exception_propagates_to_followers(self):
+        with pytest.raises(ZeroDivisionError):
+            cache_module.single_flight("err", lambda: 1 / 0)
+        assert cache_module.get_single_flight_stats()["errors"] == 1
+        # The failed flight is not retained
+        assert cache_module.single_flight("err", lambda: "ok") == "ok"
+
+    def test_async_callers_share_one_computation(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"risk_score": 42}
+
+        async def main():
+            return await asyncio.gather(*[
+                cache_module.single_flight_async("akey", compute) for _ in range(6)
+            ])
+
+        results = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(r == {"risk_score": 42} for r in results)
+        stats = cache_module.get_single_flight_stats()
+        assert stats["coalesced"] == 5
+        assert stats["dedup_ratio"] == pytest.approx(5 / 6, abs=1e-3)
+
+    def test_cancelled_caller_does_not_cancel_shared_work(self):
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def main():
+            first = asyncio.ensure_future(cache_module.single_flight_async("c", compute))
+            second = asyncio.ensure_future(cache_module.single_flight_async("c", compute))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(main()) == "done"
@@ -0,0 +1,146 @@
+"""
+Unit tests for the compute executor (CPU-bound engine calls off the event loop)
+"""
+import asyncio
+import operator
+import threading
+import time
+
+import pytest
+
+from app.core.compute_executor import (
+    ComputeExecutor,
+    reset_request_deadline,
+    set_request_deadline,
+)
+from app.utils.custom_exceptions import ComputeCapacityError, ComputeTimeoutError
+
+
+@pytest.fixture
+def thread_executor():
+    executor = ComputeExecutor(backend="thread", max_workers=2, max_queue_depth=0, task_timeout=5)
+    yield executor
+    executor.shutdown()
+
+
+class TestComputeExecutor:
+    """Test backend execution, capacity limits and timeouts"""
+
+    def test_thread_backend_runs_off_event_loop(self, thread_executor):
+        """Task runs on a worker thread and returns its result"""
+        loop_thread = threading.get_ident()
+
+        async def main():
+            return await thread_executor.run(lambda x: (x * 2, threading.get_ident()), 21)
+
+        value, worker_thread = asyncio.run(main())
+        assert value == 42
+        assert worker_thread != loop_thread
+
+        stats = thread_executor.get_stats()
+        assert stats["completed"] == 1
+        assert stats["in_flight"] == 0
+
+    def test_rejects_when_at_capacity(self, thread_executor):
+        """Tasks beyond workers + queue depth get ComputeCapacityError"""
+        release = threading.Event()
+
+        async def main():
+            blockers = [
+                asyncio.ensure_future(thread_executor.run(release.wait, 5))
+                for _ in range(thread_executor.capacity)
+            ]
+            await asyncio.sleep(0.05)
+            try:
+                with pytest.raises(ComputeCapacityError):
+                    await thread_executor.run(operator.add, 1, 2)
+            finally:
+                release.set()
+                await asyncio.gather(*blockers)
+
+        asyncio.run(main())
+        assert thread_executor.get_stats()["rejected"] == 1
+
+    def test_timeout_holds_slot_until_worker_finishes(self, thread_executor):
+        """Slow task raises ComputeTimeoutError; its slot is freed only when it ends"""
+        async def main():
+            with pytest.raises(ComputeTimeoutError):
+                await thread_executor.run(time.sleep, 0.3, timeout=0.05)
+
+        asyncio.run(main())
+        stats = thread_executor.get_stats()
+        assert stats["timed_out"] == 1
+        assert stats["in_flight"] == 1
+
+        deadline = time.monotonic() + 5
+        while thread_executor.get_stats()["in_flight"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert thread_executor.get_stats()["in_flight"] == 0
+
+    def test_timeout_error_without_arguments(self):
+        """ComputeTimeoutError can be raised without a timeout value"""
+        assert ComputeTimeoutError().message == "Risk engine timeout"
+        assert "0.5 seconds" in ComputeTimeoutError(timeout=0.5).message
+
+    def test_timeout_clamped_to_request_deadline(self, thread_executor):
+        """Task timeout never exceeds the remaining request deadline"""
+        async def main():
+            token = set_request_deadline(0.05)
+            try:
+                with pytest.raises(ComputeTimeoutError) as exc_info:
+                    await thread_executor.run(time.sleep, 0.5, timeout=10)
+            finally:
+                reset_request_deadline(token)
+            return exc_info.value
+
+        error = asyncio.run(main())
+        assert error.timeout <= 0.05
+
+    def test_worker_exception_propagates(self, thread_executor):
+        """Exceptions raised by the task reach the caller unchanged"""
+        async def main():
+            await thread_executor.run(int, "not-a-number")
+
+        with pytest.raises(ValueError):
+            asyncio.run(main())
+        assert thread_executor.get_stats()["failed"] == 1
+
+    def test_process_backend(self):
+        """Module-level callables run in a worker process"""
+        executor = ComputeExecutor(backend="process", max_workers=1, warm_modules=[])
+        try:
+            async def main():
+                return await executor.run(operator.mul, 6, 7, timeout=60)
+
+            assert asyncio.run(main()) == 42
+            assert executor.get_stats()["completed"] == 1
+        finally:
+            executor.shutdown()
+
+    def test_unpicklable_callable_runs_on_thread(self):
+        """Closures cannot reach a worker process and fall back to the thread pool"""
+        executor = ComputeExecutor(backend="process", max_workers=1, warm_modules=[])
+        lock = threading.Lock()
+
+        def closure():
+            with lock:
+                return threading.current_thread().name
+
+        try:
+            name = asyncio.run(executor.run(closure, timeout=10))
+            assert name.startswith("riskcast-compute")
+            assert executor._process_pool is None
+            assert executor.get_stats()["unpicklable_thread_calls"] == 1
+        finally:
+            executor.shutdown()
+
+    def test_slot_released_when_pool_cannot_start(self, thread_executor, monkeypatch):
+        """A failing pool creation does not leak the in-flight slot"""
+        def broken_pool(backend):
+            raise RuntimeError("cannot start workers")
+
+        monkeypatch.setattr(thread_executor, "_get_pool", broken_pool)
+        for _ in range(thread_executor.capacity + 1):
+            with pytest.raises(RuntimeError):
+                asyncio.run(thread_executor.run(operator.add, 1, 2))
+        assert thread_executor.get_stats()["in_flight"] == 0
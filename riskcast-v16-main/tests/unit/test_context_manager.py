@@ -0,0 +1,152 @@
+"""
+Unit tests for the AI advisor ContextManager JSONL conversation store
+"""
+import asyncio
+import json
+
+from app.ai_system_advisor import context_manager as cm_module
+from app.ai_system_advisor.context_manager import ContextManager
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+class TestContextManagerStorage:
+    """Test append-only persistence, tail reads, compaction and the LRU cache"""
+
+    def test_messages_are_appended_not_rewritten(self, tmp_path):
+        manager = ContextManager(storage_path=str(tmp_path))
+
+        async def main():
+            for i in range(5):
+                await manager.save_message("s1", "user" if i % 2 == 0 else "assistant", f"msg {i}")
+
+        asyncio.run(main())
+        records = _lines(tmp_path / "s1.jsonl")
+        assert records[0]["type"] == "header"
+        assert [r["content"] for r in records[1:]] == [f"msg {i}" for i in range(5)]
+
+        # A fresh manager (cold cache) sees the same history
+        fresh = ContextManager(storage_path=str(tmp_path))
+        history = asyncio.run(fresh.get_conversation_history("s1", limit=3))
+        assert history == [
+            {"role": "user", "content": "msg 2"},
+            {"role": "assistant", "content": "msg 3"},
+            {"role": "user", "content": "msg 4"},
+        ]
+
+    def test_tail_read_across_blocks(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cm_module, "TAIL_READ_BLOCK_SIZE", 64)
+        manager = ContextManager(storage_path=str(tmp_path))
+
+        async def main():
+            await manager.update_system_context("s2", {"page": "results"})
+            for i in range(40):
+                await manager.save_message("s2", "user", f"question number {i} " + "x" * (i % 7))
+
+        asyncio.run(main())
+        fresh = ContextManager(storage_path=str(tmp_path))
+        history = asyncio.run(fresh.get_conversation_history("s2", limit=25))
+        assert [h["content"].split(" x")[0].strip() for h in history] == [
+            f"question number {i}" for i in range(15, 40)
+        ]
+        # Tail reads do not populate the cache with a partial conversation
+        assert fresh.get_cache_stats()["sessions"] == 0
+
+        everything = asyncio.run(fresh.get_conversation_history("s2", limit=100))
+        assert len(everything) == 40
+
+    def test_context_updates_are_compacted(self, tmp_path):
+        manager = ContextManager(storage_path=str(tmp_path), compact_threshold=3)
+
+        async def main():
+            await manager.save_message("s3", "user", "hello")
+            for i in range(4):
+                await manager.update_system_context("s3", {f"k{i}": i})
+            await manager.save_message("s3", "assistant", "hi")
+
+        asyncio.run(main())
+        records = _lines(tmp_path / "s3.jsonl")
+        assert [r["type"] for r in records] == ["header", "message", "context", "message"]
+
+        fresh = ContextManager(storage_path=str(tmp_path))
+        assert asyncio.run(fresh.get_system_context("s3")) == {"k0": 0, "k1": 1, "k2": 2, "k3": 3}
+        assert len(asyncio.run(fresh.get_conversation_history("s3"))) == 2
+
+    def test_compaction_racing_an_append_does_not_duplicate(self, tmp_path):
+        manager = ContextManager(storage_path=str(tmp_path))
+
+        async def main():
+            await manager.update_system_context("s5", {"page": "chat"})  # Cached conversation
+            for i in range(10):
+                # Hold file I/O so the compaction and the append queue up together,
+                # compaction first
+                manager._io_lock.acquire()
+                try:
+                    tasks = [asyncio.create_task(manager.compact("s5"))]
+                    await asyncio.sleep(0.01)
+                    tasks.append(asyncio.create_task(manager.save_message("s5", "user", f"msg {i}")))
+                    await asyncio.sleep(0.01)
+                finally:
+                    manager._io_lock.release()
+                await asyncio.gather(*tasks)
+
+        asyncio.run(main())
+        fresh = ContextManager(storage_path=str(tmp_path))
+        history = asyncio.run(fresh.get_conversation_history("s5", limit=100))
+        assert [h["content"] for h in history] == [f"msg {i}" for i in range(10)]
+
+    def test_torn_tail_line_is_skipped(self, tmp_path):
+        manager = ContextManager(storage_path=str(tmp_path))
+        asyncio.run(manager.save_message("s4", "user", "first"))
+        with open(tmp_path / "s4.jsonl", "ab") as f:
+            f.write(b'{"type":"message","role":"us')  # Crash mid-write
+
+        asyncio.run(manager.save_message("s4", "assistant", "second"))
+        fresh = ContextManager(storage_path=str(tmp_path))
+        assert [h["content"] for h in asyncio.run(fresh.get_conversation_history("s4"))] == ["first", "second"]
+
+    def test_legacy_json_is_migrated(self, tmp_path):
+        legacy = {
+            "session_id": "old",
+            "created_at": "2026-01-01T00:00:00",
+            "updated_at": "2026-01-01T00:05:00",
+            "messages": [
+                {"role": "user", "content": "legacy q", "timestamp": "2026-01-01T00:00:00", "metadata": {}},
+                {"role": "assistant", "content": "legacy a", "timestamp": "2026-01-01T00:05:00", "metadata": {}},
+            ],
+            "context": {"lang": "vi"},
+        }
+        (tmp_path / "old.json").write_text(json.dumps(legacy, indent=2), encoding="utf-8")
+
+        manager = ContextManager(storage_path=str(tmp_path))
+        asyncio.run(manager.save_message("old", "user", "new q"))
+
+        assert not (tmp_path / "old.json").exists()
+        fresh = ContextManager(storage_path=str(tmp_path))
+        history = asyncio.run(fresh.get_conversation_history("old"))
+        assert [h["content"] for h in history] == ["legacy q", "legacy a", "new q"]
+        assert asyncio.run(fresh.get_system_context("old")) == {"lang": "vi"}
+
+    def test_cache_is_bounded_lru(self, tmp_path):
+        manager = ContextManager(storage_path=str(tmp_path), cache_size=2)
+
+        async def main():
+            for session in ["a", "b", "c"]:
+                await manager.update_system_context(session, {"s": session})
+            await manager.get_system_context("b")
+
+        asyncio.run(main())
+        assert list(manager._cache) == ["c", "b"]
+        assert manager.get_cache_stats()["evictions"] == 1
+        # Evicted sessions reload from disk
+        assert asyncio.run(manager.get_system_context("a")) == {"s": "a"}
+
+    def test_clear_conversation(self, tmp_path):
+        manager = ContextManager(storage_path=str(tmp_path))
+        asyncio.run(manager.save_message("s5", "user", "bye"))
+        asyncio.run(manager.clear_conversation("s5"))
+
+        assert not (tmp_path / "s5.jsonl").exists()
+        assert asyncio.run(manager.get_conversation_history("s5")) == []
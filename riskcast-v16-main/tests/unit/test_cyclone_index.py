@@ -0,0 +1,165 @@
+"""
+Unit tests for the cyclone spatial index and vectorized haversine
+"""
+import asyncio
+import math
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.models.insurance import ParametricTrigger
+from app.services.parametric_engine import (
+    CyclonePolicyIndex,
+    ParametricTriggerEvaluator,
+    haversine_km,
+)
+from app.services.parametric_monitoring import ParametricMonitor
+
+
+def make_trigger(lat, lon, radius_km=100.0, threshold=120.0):
+    return ParametricTrigger(
+        product_id="cyclone_parametric",
+        trigger_type="natcat",
+        location={"coordinates": {"lat": lat, "lon": lon}, "radius_km": radius_km},
+        metric="max_wind_kph",
+        threshold=threshold,
+        data_source="jtwc",
+    )
+
+
+def make_track(points):
+    return {
+        "storm_id": "WP012026",
+        "forecast_track": [{"lat": lat, "lon": lon, "wind_kph": wind} for lat, lon, wind in points],
+    }
+
+
+class TestHaversine:
+    """Test the broadcasting great-circle distance"""
+
+    def test_matches_scalar_implementation(self):
+        rng = np.random.default_rng(11)
+        lat1, lat2 = rng.uniform(-89, 89, (2, 200))
+        lon1, lon2 = rng.uniform(-180, 180, (2, 200))
+
+        expected = [
+            ParametricTriggerEvaluator._calculate_distance({"lat": a, "lon": b}, {"lat": c, "lon": d})
+            for a, b, c, d in zip(lat1, lon1, lat2, lon2)
+        ]
+        np.testing.assert_allclose(haversine_km(lat1, lon1, lat2, lon2), expected, rtol=1e-9)
+
+    def test_broadcasts_one_center_against_a_track(self):
+        distances = haversine_km(0.0, 0.0, [0.0, 0.0, 90.0], [0.0, 180.0, 0.0])
+        np.testing.assert_allclose(distances, [0.0, math.pi * 6371.0, math.pi / 2 * 6371.0])
+
+
+class TestCyclonePolicyIndex:
+    """Test single-pass track matching against all policies"""
+
+    def test_matches_per_policy_evaluation(self):
+        rng = np.random.default_rng(5)
+        index = CyclonePolicyIndex()
+        triggers = {}
+        for i in range(400):
+            trigger = make_trigger(
+                rng.uniform(5, 30), rng.uniform(100, 130),
+                radius_km=rng.uniform(20, 300), threshold=rng.uniform(80, 200),
+            )
+            triggers[f"P{i}"] = trigger
+            index.add(f"P{i}", trigger)
+        track = make_track(
+            zip(np.linspace(8, 28, 40), np.linspace(128, 104, 40), rng.uniform(60, 220, 40))
+        )
+
+        exposures = {e.policy_number: e for e in index.evaluate_track(track)}
+
+        assert 0 < len(exposures) < len(triggers)
+        for number, trigger in triggers.items():
+            expected = ParametricTriggerEvaluator.evaluate_cyclone_trigger(trigger, track)
+            if expected.reason == "Cyclone did not enter coverage area":
+                assert number not in exposures
+                continue
+            actual = exposures[number].evaluation
+            assert actual.triggered == expected.triggered
+            assert actual.payout_amount == expected.payout_amount
+            if not expected.triggered:
+                assert actual.reason == expected.reason
+
+    def test_dateline_and_pole_neighbours(self):
+        index = CyclonePolicyIndex()
+        index.add("FIJI", make_trigger(-17.0, 179.9, radius_km=50))
+        index.add("POLE", make_trigger(89.9, 0.0, radius_km=50))
+        track = make_track([(-17.0, -179.8, 150.0), (89.9, 170.0, 130.0)])
+
+        exposures = {e.policy_number: e for e in index.evaluate_track(track)}
+
+        assert set(exposures) == {"FIJI", "POLE"}
+        assert exposures["FIJI"].max_wind_kph == 150.0
+        assert exposures["POLE"].triggered
+
+    def test_max_wind_only_counts_points_inside_radius(self):
+        index = CyclonePolicyIndex()
+        index.add("SMALL", make_trigger(10.0, 110.0, radius_km=50, threshold=150))
+        index.add("LARGE", make_trigger(10.0, 110.0, radius_km=500, threshold=150))
+        track = make_track([(10.1, 110.0, 100.0), (12.0, 110.0, 200.0)])  # Second point ~220 km away
+
+        exposures = {e.policy_number: e for e in index.evaluate_track(track)}
+
+        assert exposures["SMALL"].max_wind_kph == 100.0
+        assert not exposures["SMALL"].triggered
+        assert exposures["LARGE"].max_wind_kph == 200.0
+        assert exposures["LARGE"].triggered
+
+    def test_add_remove_and_missing_coordinates(self):
+        index = CyclonePolicyIndex()
+        assert index.evaluate_track(make_track([(10.0, 110.0, 200.0)])) == []
+
+        index.add("A", make_trigger(10.0, 110.0))
+        assert index.add("B", ParametricTrigger(
+            product_id="cyclone_parametric", trigger_type="natcat", location={"port_code": "VNSGN"},
+            metric="max_wind_kph", threshold=120.0, data_source="jtwc",
+        )) is False
+        assert len(index) == 1
+        assert [e.policy_number for e in index.evaluate_track(make_track([(10.0, 110.0, 200.0)]))] == ["A"]
+
+        index.remove("A")
+        assert index.evaluate_track(make_track([(10.0, 110.0, 200.0)])) == []
+
+
+class RecordingMonitor(ParametricMonitor):
+    """Monitor that records claims instead of filing them"""
+
+    def __init__(self):
+        super().__init__()
+        self.claims = []
+
+    async def _process_automatic_claim(self, policy, evaluation):
+        self.claims.append(policy.policy_number)
+
+
+class TestMonitorCycloneTrack:
+    """Test the monitor's single-pass cyclone evaluation"""
+
+    def test_triggers_exposed_policies_once(self):
+        monitor = RecordingMonitor()
+        for number, lat, expires_in_days in [("HIT", 10.0, 30), ("MISS", 40.0, 30), ("OLD", 10.0, -1)]:
+            monitor.register_policy(SimpleNamespace(
+                policy_number=number,
+                trigger=make_trigger(lat, 110.0),
+                monitoring_enabled=True,
+                expiry_date=datetime.now() + timedelta(days=expires_in_days),
+            ))
+        track = make_track([(10.0, 110.0, 180.0)])
+
+        results = asyncio.run(monitor.evaluate_cyclone_track(track))
+
+        assert list(results) == ["HIT"]
+        assert results["HIT"].payout_amount == pytest.approx(25000.0)
+        assert monitor.claims == ["HIT"]
+        assert "OLD" not in monitor.cyclone_index
+
+        # Triggered policies are not paid twice
+        assert asyncio.run(monitor.evaluate_cyclone_track(track)) == {}
+        assert monitor.claims == ["HIT"]
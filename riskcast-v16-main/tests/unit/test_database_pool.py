@@ -0,0 +1,41 @@
+"""
+Unit tests for MySQL connection pool configuration and statistics
+"""
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.config import database
+
+
+class TestDatabasePool:
+    """Test pooled engine configuration and pool statistics"""
+
+    def test_engine_uses_queue_pool(self):
+        assert isinstance(database.engine.pool, QueuePool)
+        assert database.engine.pool.size() == database.DB_POOL_SIZE
+
+    def test_pool_stats_structure(self):
+        stats = database.get_pool_stats()
+
+        assert stats["config"]["pooling"] is True
+        assert stats["config"]["pool_size"] == database.DB_POOL_SIZE
+        assert stats["sync"]["pool_class"] == "QueuePool"
+        for key in ("size", "checked_in", "checked_out", "overflow", "connects", "checkouts"):
+            assert key in stats["sync"]
+
+    def test_connections_are_reused(self):
+        """Pooled engine opens one physical connection for repeated checkouts"""
+        sqlite_engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=2)
+        database._track_pool_events(sqlite_engine, "test")
+        try:
+            for _ in range(5):
+                with sqlite_engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+
+            counters = database._pool_counters["test"]
+            assert counters["checkouts"] == 5
+            assert counters["checkins"] == 5
+            assert counters["connects"] == 1
+        finally:
+            sqlite_engine.dispose()
+            database._pool_counters.pop("test", None)
@@ -0,0 +1,104 @@
+"""
+Unit tests for the vectorized, memoized FAHP solver
+"""
+import numpy as np
+import pytest
+
+from app.core.engine_v2 import fahp
+from app.core.engine_v2.fahp import FAHPSolver, FuzzyTriangular
+
+
+def reference_fuzzy_weights(matrix):
+    """Cell-by-cell geometric mean over FuzzyTriangular objects"""
+    solver = FAHPSolver()
+    n = matrix.shape[0]
+    means = []
+    for i in range(n):
+        gm = FuzzyTriangular(1.0, 1.0, 1.0)
+        for j in range(n):
+            gm = gm * solver._crisp_to_fuzzy(matrix[i, j])
+        means.append(FuzzyTriangular(gm.l ** (1 / n), gm.m ** (1 / n), gm.u ** (1 / n)))
+    sum_l, sum_m, sum_u = (sum(getattr(gm, a) for gm in means) for a in "lmu")
+    return np.array([[gm.l / sum_u, gm.m / sum_m, gm.u / sum_l] for gm in means])
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    fahp.clear_fahp_cache()
+    yield
+    fahp.clear_fahp_cache()
+
+
+class TestVectorizedFAHP:
+    """Test the (n, n, 3) array implementation"""
+
+    def test_matches_per_cell_reference(self):
+        rng = np.random.default_rng(7)
+        for _ in range(20):
+            context = dict(zip(FAHPSolver.RISK_FACTORS, rng.random(6)))
+            solver = FAHPSolver()
+            weights = solver.solve(risk_context=context)
+
+            expected = reference_fuzzy_weights(solver.comparison_matrix)
+            actual = np.array([[w.l, w.m, w.u] for w in solver.fuzzy_weights])
+            np.testing.assert_allclose(actual, expected, rtol=1e-12)
+            assert sum(weights.values()) == pytest.approx(1.0)
+
+    def test_fuzzify_matrix_shape_and_ties(self):
+        matrix = np.array([[1.0, 1.5, 9.0], [1 / 1.5, 1.0, 4.4], [1 / 9, 1 / 4.4, 1.0]])
+        fuzzy = fahp.fuzzify_matrix(matrix)
+
+        assert fuzzy.shape == (3, 3, 3)
+        assert fuzzy[0, 1].tolist() == [1, 1, 1]  # 1.5 is equidistant: lower scale wins
+        assert fuzzy[0, 2].tolist() == [8, 9, 9]
+        assert fuzzy[1, 2].tolist() == [3, 4, 5]
+
+    def test_manual_comparisons_not_cached(self):
+        solver = FAHPSolver()
+        weights = solver.solve(comparisons={"delay": {"port": 5, "climate": 3}})
+
+        assert max(weights, key=weights.get) == "delay"
+        assert solver.consistency_ratio is not None
+        assert fahp.get_fahp_cache_info()["size"] == 0
+
+
+class TestFAHPMemo:
+    """Test the risk-context LRU memo"""
+
+    def test_exact_context_matches_uncached_solve(self):
+        rng = np.random.default_rng(11)
+        for _ in range(20):
+            values = rng.random(6)
+            weights = FAHPSolver().solve(risk_context=dict(zip(FAHPSolver.RISK_FACTORS, values)))
+            expected = fahp.solve_comparison_matrix(fahp.context_comparison_matrix(values))
+            assert list(weights.values()) == expected.crisp_weights.tolist()
+
+    def test_nearby_contexts_share_a_solution(self, monkeypatch):
+        monkeypatch.setattr(fahp, "FAHP_CONTEXT_QUANTUM", 0.01)
+        solver = FAHPSolver()
+        first = solver.solve(risk_context={"delay": 0.7331, "port": 0.6, "carrier": 0.2})
+        first_cr = solver.consistency_ratio
+        second = FAHPSolver().solve(risk_context={"delay": 0.7329, "port": 0.6, "carrier": 0.2})
+
+        assert first == second
+        info = fahp.get_fahp_cache_info()
+        assert (info["hits"], info["misses"]) == (1, 1)
+
+        # Consistency ratio is served from the cache too
+        other = FAHPSolver()
+        other.solve(risk_context={"delay": 0.733, "port": 0.6, "carrier": 0.2})
+        assert other.consistency_ratio == first_cr
+
+    def test_returned_weights_are_independent_copies(self):
+        context = {"delay": 0.5, "port": 0.4}
+        weights = FAHPSolver().solve(risk_context=context)
+        weights["delay"] = 99.0
+
+        again = FAHPSolver().solve(risk_context=context)
+        assert again["delay"] != 99.0
+        assert not fahp._solve_context(fahp.quantize_context(context)).crisp_weights.flags.writeable
+
+    def test_empty_context_gives_equal_weights(self):
+        weights = FAHPSolver().solve()
+        assert all(w == pytest.approx(1 / 6) for w in weights.values())
+        assert FAHPSolver().solve(risk_context={}) == weights
@@ -5,12 +5,15 @@ Verify that gaming and fraud signals are properly detected.
 """
 
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from app.services.fraud_detection import (
     FraudDetector,
     SignalType,
     SignalSeverity,
     RecommendedAction,
+    UserBehaviorIndex,
+    UserBehaviorWindow,
     analyze_request_for_fraud
 )
 
@@ -254,6 +257,101 @@ class TestFraudDetector:
         assert isinstance(result['fraud_score'], float)
 
 
+class TestUserBehaviorIndex:
+    """Tests for the rolling per-user behavior index."""
+    
+    REQUEST = {
+        'cargo_type': 'standard',
+        'cargo_value': 50000,
+        'carrier': 'MAERSK',
+        'route': 'VN_US',
+        'transport_mode': 'sea',
+    }
+    
+    def test_window_tracks_rolling_stats(self):
+        window = UserBehaviorWindow(capacity=5)
+        for i, score in enumerate([10, 20, 45, 45, 45, 45, 45]):
+            window.record(score, 1000.0 + i * 3600)
+        
+        stats = window.stats()
+        assert stats.count == 5
+        assert stats.mean_score == pytest.approx(45.0)  # 10 and 20 evicted
+        assert stats.all_identical
+        assert not stats.burst_detected
+    
+    def test_burst_detected_and_ages_out(self):
+        window = UserBehaviorWindow(capacity=12)
+        for i in range(10):
+            window.record(50, 1000.0 + i * 5)  # 10 requests in 45s
+        assert window.stats().burst_detected
+        
+        for i in range(12):
+            window.record(50, 5000.0 + i * 600)
+        assert not window.stats().burst_detected
+    
+    def test_burst_detected_with_undated_history(self):
+        base = datetime(2026, 1, 1)
+        history = [{'risk_score': 30}] + [
+            {'risk_score': 50, 'timestamp': (base + timedelta(seconds=i)).isoformat()}
+            for i in range(12)
+        ]
+        
+        stats = UserBehaviorWindow.from_history(history).stats()
+        assert stats.count == 13
+        assert stats.burst_detected
+        
+        sparse = [{'risk_score': 30}] + [
+            {'risk_score': 50, 'timestamp': (base + timedelta(hours=i)).isoformat()}
+            for i in range(12)
+        ]
+        assert not UserBehaviorWindow.from_history(sparse).stats().burst_detected
+    
+    def test_index_feeds_history_checks(self):
+        index = UserBehaviorIndex(window=20)
+        detector = FraudDetector(behavior_index=index)
+        for i in range(12):
+            index.record('user-1', 45, timestamp=1000.0 + i)
+        
+        result = detector.analyze_request(self.REQUEST, user_id='user-1')
+        types = {s.signal_type for s in result.signals}
+        assert SignalType.USER_BEHAVIOR in types
+        assert SignalType.SYSTEMATIC_PROBING in types
+        
+        # Unknown users and anonymous requests skip the history checks
+        for user_id in ('user-2', None):
+            result = detector.analyze_request(self.REQUEST, user_id=user_id)
+            assert SignalType.SYSTEMATIC_PROBING not in {s.signal_type for s in result.signals}
+    
+    def test_index_evicts_least_recently_active_users(self):
+        index = UserBehaviorIndex(window=5, max_users=2)
+        index.record('a', 10)
+        index.record('b', 20)
+        index.record('a', 30)
+        index.record('c', 40)
+        
+        assert len(index) == 2
+        assert index.get_stats('b') is None
+        assert index.get_stats('a').count == 2
+    
+    def test_shared_detector_is_thread_safe(self):
+        detector = FraudDetector(behavior_index=UserBehaviorIndex())
+        clean = dict(self.REQUEST, hazmat_class='none', special_handling='none',
+                     previous_incidents='0', insurance_history='clean')
+        dirty = {'transport_mode': 'air', 'container': '40ft', 'cargo_type': 'electronics', 'cargo_value': 50}
+        
+        def run(i):
+            request = dirty if i % 2 else clean
+            return i % 2, len(detector.analyze_request(request).signals)
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            counts = {}
+            for kind, n in pool.map(run, range(200)):
+                counts.setdefault(kind, set()).add(n)
+        
+        assert counts[0] == {0}
+        assert len(counts[1]) == 1 and counts[1].pop() >= 3
+
+
 class TestMissingDataPenalty:
     """Tests for missing data penalty calculation."""
     
@@ -362,5 +460,52 @@ class TestProvenance:
         assert 'retroactive' in result.get('flag', '')
 
 
+class TestBehaviorPrincipal:
+    """Tests for keying the behavior index on the authenticated identity."""
+    
+    @staticmethod
+    def _request(headers=None, user_id=None):
+        from starlette.requests import Request
+        
+        scope = {
+            'type': 'http',
+            'method': 'POST',
+            'path': '/',
+            'headers': [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        }
+        request = Request(scope)
+        if user_id is not None:
+            request.state.user_id = user_id
+        return request
+    
+    def _principal(self, request):
+        import asyncio
+        from app.api.v2.enterprise_routes import _behavior_principal
+        return asyncio.run(_behavior_principal(request))
+    
+    def test_unauthenticated_header_is_ignored(self):
+        assert self._principal(self._request({'X-User-ID': 'victim'})) is None
+    
+    def test_authenticated_user_is_used(self):
+        request = self._request({'X-User-ID': 'victim'}, user_id='alice')
+        assert self._principal(request) == 'user:alice'
+    
+    def test_api_key_identity(self, monkeypatch):
+        from fastapi import HTTPException
+        from app.core import security
+        
+        class Key:
+            id = 42
+        
+        async def fake_verify(x_api_key, request=None):
+            if x_api_key != 'rsk_valid':
+                raise HTTPException(status_code=401)
+            return Key()
+        
+        monkeypatch.setattr(security, 'verify_api_key', fake_verify)
+        assert self._principal(self._request({'X-API-Key': 'rsk_valid'})) == 'api_key:42'
+        assert self._principal(self._request({'X-API-Key': 'rsk_forged', 'X-User-ID': 'victim'})) is None
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
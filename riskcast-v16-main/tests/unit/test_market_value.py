@@ -464,6 +464,79 @@ class TestPortfolioPremium:
         with pytest.raises(ValueError):
             InsurancePremiumCalculator.calculate_portfolio_premium([])
 
+    def test_vectorized_book_matches_single_premiums(self):
+        """Test columnar pricing gives the same results as calculate_premium."""
+        shipments = [
+            {'cargo_value': 800, 'transport_mode': 'AIR', 'risk_score': 10, 'cargo_type': 'textiles'},
+            {'cargo_value': 600000, 'transport_mode': 'ocean', 'risk_score': 30,
+             'additional_factors': {'hazmat': True, 'preferred_shipper': True, 'claims_history_factor': 1.2}},
+            {'cargo_value': 123456.78, 'transport_mode': 'barge', 'risk_score': 69.99, 'cargo_type': 'unknown'},
+            {'cargo_value': 2000000, 'transport_mode': 'rail', 'risk_score': 85,
+             'additional_factors': {'peak_season': True, 'new_route': True}},
+            {'cargo_value': 50000, 'transport_mode': 'road', 'risk_score': 100, 'cargo_type': 'hazmat'},
+        ]
+        book = InsurancePremiumCalculator.price_book(shipments)
+
+        for i, shipment in enumerate(shipments):
+            expected = InsurancePremiumCalculator.calculate_premium(
+                cargo_value=shipment['cargo_value'],
+                transport_mode=shipment['transport_mode'],
+                risk_score=shipment['risk_score'],
+                cargo_type=shipment.get('cargo_type', 'general'),
+                additional_factors=shipment.get('additional_factors')
+            ).to_dict()
+            row = book.row(i)
+            assert row.pop('shipment_id') == f'shipment_{i + 1}'
+            assert row == expected
+
+        assert book.risk_class_counts() == {
+            'class_a': 1, 'class_b': 1, 'class_c': 1, 'class_d': 0, 'class_e': 2
+        }
+
+    def test_vectorized_tables_follow_scalar_tables(self):
+        """Test price_book agrees with calculate_premium at every class boundary and factor."""
+        boundaries = InsurancePremiumCalculator.RISK_CLASS_BOUNDARIES.values()
+        scores = sorted({edge + delta for bounds in boundaries for edge in bounds for delta in (-0.01, 0.0)})
+        factors = list(InsurancePremiumCalculator.ADDITIONAL_FACTOR_MULTIPLIERS)
+        shipments = [
+            {'cargo_value': 250000, 'transport_mode': 'ocean', 'risk_score': score,
+             'additional_factors': {factors[i % len(factors)]: True}}
+            for i, score in enumerate(scores)
+        ] + [
+            {'cargo_value': 250000, 'transport_mode': 'air', 'risk_score': 40,
+             'additional_factors': dict.fromkeys(factors, True)}
+        ]
+        book = InsurancePremiumCalculator.price_book(shipments)
+
+        for i, shipment in enumerate(shipments):
+            expected = InsurancePremiumCalculator.calculate_premium(
+                cargo_value=shipment['cargo_value'],
+                transport_mode=shipment['transport_mode'],
+                risk_score=shipment['risk_score'],
+                additional_factors=shipment['additional_factors']
+            )
+            assert book.premium_usd[i] == expected.premium_usd
+            assert book.row(i)['risk_class'] == expected.risk_class
+
+    def test_individual_shipments_paginated(self):
+        """Test only the requested page of individual results is returned."""
+        shipments = [
+            {'shipment_id': f'S{i}', 'cargo_value': 100000 + i, 'transport_mode': 'ocean', 'risk_score': i % 100}
+            for i in range(250)
+        ]
+        full = InsurancePremiumCalculator.calculate_portfolio_premium(shipments)
+        page = InsurancePremiumCalculator.calculate_portfolio_premium(shipments, offset=200, limit=100)
+        summary = InsurancePremiumCalculator.calculate_portfolio_premium(shipments, include_shipments=False)
+
+        assert len(full.individual_shipments) == 250
+        assert page.total_premium_after_discount == full.total_premium_after_discount
+        assert [s['shipment_id'] for s in page.individual_shipments] == [f'S{i}' for i in range(200, 250)]
+        assert page.to_dict()['individual_shipments_page'] == {
+            'offset': 200, 'limit': 100, 'returned': 50, 'total': 250, 'next_offset': None
+        }
+        assert summary.individual_shipments == []
+        assert summary.risk_distribution == full.risk_distribution
+
 
 class TestSavingsEstimation:
     """Tests for savings estimation functionality."""
@@ -0,0 +1,231 @@
+"""
+Unit tests for MemorySystemMySQL bulk / write-behind persistence
+
+Runs against an in-memory SQLite database standing in for MySQL.
+"""
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import memory_mysql
+from app.models import Base
+from app.models.risk_analysis import RiskAnalysis
+from app.models.shipment import ShipmentDB
+
+
+@pytest.fixture
+def sqlite_session(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    # pysqlite needs explicit BEGIN for SAVEPOINT support
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(engine, tables=[ShipmentDB.__table__, RiskAnalysis.__table__])
+    factory = sessionmaker(bind=engine, autoflush=False)
+
+    @contextmanager
+    def get_session():
+        db = factory()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    monkeypatch.setattr(memory_mysql, "get_session", get_session)
+    yield factory
+    engine.dispose()
+
+
+def _record(i, **overrides):
+    record = {
+        "shipment_data": {"route": f"VNSGN_USLAX_{i}", "pol": "VNSGN", "pod": "USLAX", "cargo_value": 1000 + i},
+        "risk_analysis": {"risk_score": 40 + i, "risk_level": "MEDIUM"},
+    }
+    record.update(overrides)
+    return record
+
+
+class TestSaveShipmentsBulk:
+    """Test chunked bulk inserts and per-row failure reporting"""
+
+    def test_bulk_insert_in_chunks(self, sqlite_session):
+        memory = memory_mysql.MemorySystemMySQL()
+        result = memory.save_shipments_bulk([_record(i) for i in range(7)], chunk_size=3)
+
+        assert result["saved"] == 7
+        assert result["failed"] == []
+        assert all(result["shipment_ids"])
+
+        db = sqlite_session()
+        assert db.query(ShipmentDB).count() == 7
+        assert db.query(RiskAnalysis).count() == 7
+        saved = db.query(RiskAnalysis).filter(RiskAnalysis.shipment_id == result["shipment_ids"][3]).one()
+        assert saved.risk_score == 43
+        db.close()
+
+    def test_failed_row_reported_without_losing_chunk(self, sqlite_session):
+        memory = memory_mysql.MemorySystemMySQL()
+        records = [_record(i) for i in range(4)]
+        records[2]["shipment_id"] = records[1]["shipment_id"] = "DUPLICATE"  # unique constraint
+
+        result = memory.save_shipments_bulk(records, chunk_size=10)
+
+        assert result["saved"] == 3
+        assert [f["index"] for f in result["failed"]] == [2]
+        assert result["shipment_ids"][2] is None
+
+        db = sqlite_session()
+        # The failed record's analysis row was rolled back together with its shipment
+        assert db.query(ShipmentDB).count() == 3
+        assert db.query(RiskAnalysis).count() == 3
+        db.close()
+
+    def test_malformed_record_fails_individually(self, sqlite_session):
+        memory = memory_mysql.MemorySystemMySQL()
+        records = [_record(0), {"shipment_data": "not-a-dict", "risk_analysis": {}}]
+
+        result = memory.save_shipments_bulk(records)
+
+        assert result["saved"] == 1
+        assert result["failed"][0]["index"] == 1
+
+
+    def test_ids_reported_only_after_replay_commits(self, sqlite_session, monkeypatch):
+        memory = memory_mysql.MemorySystemMySQL()
+        records = [_record(i) for i in range(3)]
+        records[2]["shipment_id"] = records[1]["shipment_id"] = "DUPLICATE"
+        real_get_session = memory_mysql.get_session
+        sessions = []
+
+        @contextmanager
+        def failing_replay_commit():
+            sessions.append(None)
+            with real_get_session() as db:
+                yield db
+                if len(sessions) == 2:  # The row-by-row replay session
+                    raise RuntimeError("commit failed")
+
+        monkeypatch.setattr(memory_mysql, "get_session", failing_replay_commit)
+        result = memory.save_shipments_bulk(records, chunk_size=10)
+
+        assert result["saved"] == 0
+        assert result["shipment_ids"] == [None, None, None]
+        assert sorted(f["index"] for f in result["failed"]) == [0, 1, 2]
+
+
+class TestWriteBehindQueue:
+    """Test size/time triggered flushing"""
+
+    def test_flushes_on_batch_size(self, sqlite_session):
+        memory = memory_mysql.MemorySystemMySQL()
+        queue = memory_mysql.ShipmentWriteBehindQueue(memory, max_batch=3, flush_interval=30)
+        try:
+            ids = [queue.enqueue(r["shipment_data"], r["risk_analysis"]) for r in map(_record, range(3))]
+            for _ in range(100):
+                if queue.get_stats()["flushed"] == 3:
+                    break
+                time.sleep(0.02)
+
+            assert queue.get_stats()["flushed"] == 3
+            db = sqlite_session()
+            assert {s.shipment_id for s in db.query(ShipmentDB).all()} == set(ids)
+            db.close()
+        finally:
+            queue.close()
+
+    def test_close_flushes_pending_and_reports_failures(self, sqlite_session):
+        failures = []
+        memory = memory_mysql.MemorySystemMySQL()
+        queue = memory_mysql.ShipmentWriteBehindQueue(
+            memory, max_batch=100, flush_interval=30, on_failure=failures.extend
+        )
+        queue.enqueue({"route": "A"}, {"risk_score": 10})
+        queue.enqueue("bad-payload", {})
+        queue.close()
+
+        stats = queue.get_stats()
+        assert stats["flushed"] == 1
+        assert stats["failed"] == 1
+        assert stats["pending"] == 0
+        assert len(failures) == 1
+
+    def test_shutdown_hook_flushes_started_queues(self, sqlite_session):
+        memory = memory_mysql.MemorySystemMySQL()
+        shipment_id = memory.save_shipment_deferred({"route": "A"}, {"risk_score": 10})
+
+        memory_mysql.close_write_behind_queues()
+
+        assert memory.write_behind.get_stats()["flushed"] == 1
+        assert memory.write_behind not in memory_mysql._write_behind_queues
+        db = sqlite_session()
+        assert [s.shipment_id for s in db.query(ShipmentDB).all()] == [shipment_id]
+        db.close()
+
+    def test_enqueue_after_close_is_rejected(self, sqlite_session):
+        memory = memory_mysql.MemorySystemMySQL()
+        queue = memory_mysql.ShipmentWriteBehindQueue(memory, max_batch=1, max_pending=1, flush_interval=30)
+        queue.close()
+
+        with pytest.raises(memory_mysql.WriteBehindClosedError):
+            queue.enqueue({"route": "A"}, {"risk_score": 10})
+        assert queue.get_stats()["pending"] == 0
+
+    def test_close_releases_blocked_producers(self, sqlite_session):
+        import threading
+
+        memory = memory_mysql.MemorySystemMySQL()
+        queue = memory_mysql.ShipmentWriteBehindQueue(memory, max_batch=1, max_pending=1, flush_interval=30)
+        with queue._cond:
+            queue._pending.append({"shipment_id": "FULL", "shipment_data": {}, "risk_analysis": {},
+                                   "summary": "", "queued_at": ""})
+        errors = []
+
+        def produce():
+            try:
+                queue.enqueue({"route": "B"}, {"risk_score": 10})
+            except memory_mysql.WriteBehindClosedError as e:
+                errors.append(e)
+
+        with queue._flush_lock:  # Keep the worker from draining the queue
+            producer = threading.Thread(target=produce)
+            producer.start()
+            time.sleep(0.05)
+            with queue._cond:
+                queue._closed = True
+                queue._cond.notify_all()
+            producer.join(timeout=2)
+        queue.close(flush=False)
+
+        assert not producer.is_alive()
+        assert len(errors) == 1
+
+    def test_deferred_save_readable_before_flush(self, sqlite_session):
+        memory = memory_mysql.MemorySystemMySQL()
+        memory._write_behind = memory_mysql.ShipmentWriteBehindQueue(memory, max_batch=100, flush_interval=30)
+        shipment_id = memory.save_shipment_deferred({"route": "A"}, {"risk_score": 10}, "summary")
+
+        shipment = memory.get_shipment(shipment_id)
+        assert shipment["shipment_data"] == {"route": "A"}
+        assert shipment["summary"] == "summary"
+
+        memory.write_behind.close()
+        assert memory.write_behind.find(shipment_id) is None
+        # A closed queue falls back to a direct save
+        direct_id = memory.save_shipment_deferred({"route": "B"}, {"risk_score": 20})
+        db = sqlite_session()
+        assert {s.shipment_id for s in db.query(ShipmentDB).all()} == {shipment_id, direct_id}
+        db.close()
@@ -135,3 +135,44 @@ class TestMonteCarloDeterminism:
         assert seed1 == seed2 == seed3
         assert isinstance(seed1, int)
         assert 0 <= seed1 < 2**31  # Valid numpy seed range
+    
+    def test_concurrent_simulations_are_deterministic(self):
+        """
+        Test that overlapping simulations in a thread pool do not share
+        random state (each call draws from its own Generator).
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        cargo = {'insurance_value': 100000}
+        layer_scores = {
+            'carrier_performance': 50,
+            'port_congestion': 40,
+            'weather_climate': 35,
+            'documentation_complexity': 40,
+            'market_volatility': 40,
+            'cargo_sensitivity': 40
+        }
+        transports = [{'transit_time': t} for t in (10, 14, 21, 30)]
+        
+        def run(transport):
+            engine = MonteCarloEngineV22(n_runs=5000)
+            return engine.run_simulation(transport, cargo, layer_scores)['loss_stats']['expected_loss']
+        
+        serial = [run(t) for t in transports]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            parallel = list(pool.map(run, transports * 3))
+        
+        assert parallel == serial * 3
+    
+    def test_simulation_does_not_touch_global_rng(self):
+        """
+        Test that run_simulation leaves the global np.random state alone.
+        """
+        np.random.seed(123)
+        expected = np.random.random()
+        
+        np.random.seed(123)
+        engine = MonteCarloEngineV22(n_runs=1000, random_seed=42)
+        engine.run_simulation({'transit_time': 14}, {'insurance_value': 100000}, {})
+        
+        assert np.random.random() == expected
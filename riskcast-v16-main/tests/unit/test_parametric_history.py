@@ -0,0 +1,120 @@
+"""
+Unit tests for the columnar parametric history store and curve-based pricing
+"""
+import numpy as np
+import pytest
+
+from app.models.insurance import ParametricTrigger, PayoutStructure
+from app.services.parametric_engine import ParametricPricingEngine
+from app.services.parametric_history import ExceedanceCurve, HistoricalSeriesStore
+
+
+def brute_force(values, threshold, cap=None):
+    above = [v for v in values if v > threshold]
+    excess = [min(v - threshold, cap) if cap is not None else v - threshold for v in above]
+    return len(above), sum(excess), (np.mean(above) if above else 0.0), (np.std(above) if above else 0.0)
+
+
+def make_trigger(trigger_type, threshold, payout_structure=None):
+    trigger = ParametricTrigger(
+        product_id="test",
+        trigger_type=trigger_type,
+        location={"port_code": "CNSHA"},
+        metric="metric",
+        threshold=threshold,
+        data_source="test",
+    )
+    trigger.payout_structure = payout_structure
+    return trigger
+
+
+class TestExceedanceCurve:
+    """Test O(log n) exceedance queries against brute force"""
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(2)
+        values = np.round(rng.gamma(2.0, 60.0, 500), 1).tolist()
+        curve = ExceedanceCurve.from_values(values)
+        thresholds = np.array([0.0, 50.0, values[3], 150.0, 400.0, 5000.0])
+
+        counts = curve.count_above(thresholds)
+        excess = curve.excess_sum(thresholds)
+        capped = curve.excess_sum(thresholds, cap=25.0)
+        mean, std = curve.tail_moments(thresholds)
+        for i, t in enumerate(thresholds):
+            count, total, tail_mean, tail_std = brute_force(values, t)
+            assert counts[i] == count
+            assert excess[i] == pytest.approx(total, abs=1e-6)
+            assert capped[i] == pytest.approx(brute_force(values, t, cap=25.0)[1], abs=1e-6)
+            assert mean[i] == pytest.approx(tail_mean, abs=1e-9)
+            assert std[i] == pytest.approx(tail_std, abs=1e-6)
+
+    def test_empty_series(self):
+        curve = ExceedanceCurve.from_values([])
+        assert float(curve.burn_rate(10.0)) == 0.0
+        assert float(curve.average_excess(10.0)) == 0.0
+
+
+class TestHistoricalSeriesStore:
+    """Test keyed storage and memory-mapped persistence"""
+
+    def test_persisted_series_is_memory_mapped(self, tmp_path):
+        HistoricalSeriesStore(str(tmp_path)).put("CN/SHA", "rainfall_mm", [50, 160, 200, 90])
+
+        store = HistoricalSeriesStore(str(tmp_path))
+        curve = store.get("CN/SHA", "rainfall_mm")
+
+        assert isinstance(curve.values, np.memmap)
+        assert curve.values.tolist() == [50, 90, 160, 200]
+        assert int(curve.count_above(150)) == 2
+        assert store.get("CN/SHA", "dwell_days") is None
+
+    def test_sanitized_keys_do_not_collide(self, tmp_path):
+        HistoricalSeriesStore(str(tmp_path)).put("a/b", "rainfall_mm", [1, 2])
+        HistoricalSeriesStore(str(tmp_path)).put("a_b", "rainfall_mm", [3, 4, 5])
+
+        store = HistoricalSeriesStore(str(tmp_path))
+        assert store.get("a/b", "rainfall_mm").values.tolist() == [1, 2]
+        assert store.get("a_b", "rainfall_mm").values.tolist() == [3, 4, 5]
+
+    def test_in_memory_store(self):
+        store = HistoricalSeriesStore()
+        store.put("USLAX", "dwell_days", [8, 20])
+        assert len(store.get("USLAX", "dwell_days")) == 2
+        store.clear()
+        assert store.get("USLAX", "dwell_days") is None
+
+
+class TestCurvePricing:
+    """Test that pricing from curves matches pricing from records"""
+
+    def test_rainfall_records_and_curve_agree(self):
+        rainfall = [50, 80, 120, 140, 160, 180, 200, 100, 90, 110]
+        trigger = make_trigger("weather", 150.0, PayoutStructure(type="per_mm_excess", payout_per_unit=50.0))
+
+        from_records = ParametricPricingEngine.price_rainfall_parametric(
+            trigger, [{"rainfall_mm": r} for r in rainfall], 100000
+        )
+        from_curve = ParametricPricingEngine.price_rainfall_parametric(
+            trigger, ExceedanceCurve.from_values(rainfall), 100000
+        )
+
+        assert from_records.burn_rate == 0.3
+        assert from_records.expected_payout == pytest.approx(0.3 * 30 * 50)
+        assert from_curve.premium == pytest.approx(from_records.premium)
+
+    def test_sweep_matches_single_quotes(self):
+        dwell = [8, 10, 12, 15, 18, 20, 22, 25, 8, 10, 60]
+        curve = ExceedanceCurve.from_values(dwell)
+        thresholds = np.arange(5.0, 30.0, 2.5)
+
+        sweep = ParametricPricingEngine.port_congestion_pricing_curve(curve, thresholds, 1000.0, max_days=20)
+
+        assert sweep["premium"].shape == thresholds.shape
+        assert np.all(np.diff(sweep["exceedance_probability"]) <= 0)
+        payout = PayoutStructure(type="per_day_excess", payout_per_unit=1000.0, maximum_days=20)
+        for i, t in enumerate(thresholds):
+            quote = ParametricPricingEngine.price_port_congestion_parametric(
+                make_trigger("port_congestion", float(t), payout), [{"dwell_days": d} for d in dwell], 100000
+            )
+            assert sweep["premium"][i] == pytest.approx(quote.premium)
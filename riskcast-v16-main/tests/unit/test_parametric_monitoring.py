@@ -0,0 +1,181 @@
+"""
+Unit tests for the grouped, concurrent parametric monitoring scheduler
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.models.insurance import ParametricTrigger
+from app.services.parametric_engine import TriggerEvaluation
+from app.services.parametric_monitoring import ParametricMonitor
+
+
+def make_policy(number, port="VNSGN", trigger_type="weather", expires_in_days=30):
+    trigger = ParametricTrigger(
+        product_id="weather_delay_parametric",
+        trigger_type=trigger_type,
+        location={"port_code": port},
+        metric="cumulative_rainfall_mm",
+        threshold=150.0,
+        data_source="tomorrow_io",
+    )
+    return SimpleNamespace(
+        policy_number=number,
+        trigger=trigger,
+        monitoring_enabled=True,
+        expiry_date=datetime.now() + timedelta(days=expires_in_days),
+    )
+
+
+class FakeSourceMonitor(ParametricMonitor):
+    """Monitor with an instrumented data source"""
+
+    def __init__(self, fetch_delay=0.05, failing_ports=(), **kwargs):
+        super().__init__(**kwargs)
+        self.fetch_delay = fetch_delay
+        self.failing_ports = set(failing_ports)
+        self.fetches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.claims = []
+
+    async def _fetch_trigger_data(self, trigger):
+        port = trigger.location["port_code"]
+        self.fetches.append((port, time.monotonic()))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.fetch_delay)
+            if port in self.failing_ports:
+                raise ConnectionError(f"{port} feed unavailable")
+            return {"cumulative_rainfall_mm": 200.0 if port == "FLOOD" else 100.0}
+        finally:
+            self.in_flight -= 1
+
+    async def _process_automatic_claim(self, policy, evaluation):
+        self.claims.append(policy.policy_number)
+
+    def _evaluate_trigger(self, trigger, current_data):
+        rainfall = current_data["cumulative_rainfall_mm"]
+        if rainfall > trigger.threshold:
+            return TriggerEvaluation(triggered=True, payout_amount=(rainfall - trigger.threshold) * 50)
+        return TriggerEvaluation(triggered=False, reason="below threshold")
+
+
+def register(monitor, policies):
+    for policy in policies:
+        monitor.register_policy(policy)
+
+
+class TestGroupedChecks:
+    """Test per-source batching and concurrency"""
+
+    def test_one_fetch_per_source_for_all_policies(self):
+        monitor = FakeSourceMonitor(fetch_delay=0.05)
+        register(monitor, [make_policy(f"P{i}", port=("VNSGN", "SGSIN", "CNSHA")[i % 3]) for i in range(300)])
+
+        started = time.monotonic()
+        results = asyncio.run(monitor.check_all_policies())
+        elapsed = time.monotonic() - started
+
+        assert len(results) == 300
+        assert sorted(port for port, _ in monitor.fetches) == ["CNSHA", "SGSIN", "VNSGN"]
+        assert elapsed < 0.5  # Sources fetched concurrently, not 300 sequential fetches
+        stats = monitor.get_monitoring_stats()["last_cycle"]
+        assert stats["policies_checked"] == 300
+        assert stats["sources_fetched"] == 3
+
+    def test_concurrency_bounded_by_semaphore(self):
+        monitor = FakeSourceMonitor(fetch_delay=0.02, max_concurrency=2)
+        register(monitor, [make_policy(f"P{i}", port=f"PORT{i}") for i in range(8)])
+
+        asyncio.run(monitor.check_all_policies())
+
+        assert len(monitor.fetches) == 8
+        assert monitor.max_in_flight == 2
+
+    def test_fetches_staggered_over_window(self):
+        monitor = FakeSourceMonitor(fetch_delay=0.0)
+        register(monitor, [make_policy(f"P{i}", port=f"PORT{i}") for i in range(4)])
+
+        asyncio.run(monitor.check_all_policies(stagger_seconds=0.3))
+
+        starts = sorted(at for _, at in monitor.fetches)
+        assert starts[-1] - starts[0] >= 0.2
+
+    def test_triggered_and_expired_policies(self):
+        monitor = FakeSourceMonitor(fetch_delay=0.0)
+        register(monitor, [
+            make_policy("WET-1", port="FLOOD"),
+            make_policy("WET-2", port="FLOOD"),
+            make_policy("DRY", port="VNSGN"),
+            make_policy("OLD", port="VNSGN", expires_in_days=-1),
+        ])
+
+        results = asyncio.run(monitor.check_all_policies())
+
+        assert sorted(monitor.claims) == ["WET-1", "WET-2"]
+        assert results["WET-1"].payout_amount == 2500.0
+        assert "OLD" not in monitor.active_policies
+
+        # Triggered policies are not re-checked (and not paid twice)
+        second = asyncio.run(monitor.check_all_policies())
+        assert list(second) == ["DRY"]
+        assert len(monitor.claims) == 2
+
+
+class TestSourceBackoff:
+    """Test per-source exponential backoff"""
+
+    def test_failing_source_backed_off_without_blocking_others(self):
+        monitor = FakeSourceMonitor(fetch_delay=0.0, failing_ports={"BROKEN"})
+        register(monitor, [make_policy("A", port="BROKEN"), make_policy("B", port="VNSGN")])
+
+        first = asyncio.run(monitor.check_all_policies())
+        second = asyncio.run(monitor.check_all_policies())
+
+        assert list(first) == list(second) == ["B"]
+        assert [port for port, _ in monitor.fetches].count("BROKEN") == 1
+        stats = monitor.get_monitoring_stats()
+        assert stats["last_cycle"]["sources_backed_off"] == 1
+        backed_off = stats["sources_backed_off"][0]
+        assert backed_off["consecutive_failures"] == 1
+        assert 0 < backed_off["retry_in_seconds"] <= 30
+
+        # Once the backoff expires, a successful fetch resets the source
+        monitor.failing_ports.clear()
+        for state in monitor.source_states.values():
+            state.retry_at = 0.0
+        third = asyncio.run(monitor.check_all_policies())
+        assert sorted(third) == ["A", "B"]
+        assert monitor.get_monitoring_stats()["sources_backed_off"] == []
+
+    def test_backoff_grows_exponentially(self):
+        monitor = FakeSourceMonitor(fetch_delay=0.0, failing_ports={"BROKEN"})
+        register(monitor, [make_policy("A", port="BROKEN")])
+
+        delays = []
+        for _ in range(3):
+            asyncio.run(monitor.check_all_policies())
+            state = next(iter(monitor.source_states.values()))
+            delays.append(state.retry_at - time.monotonic())
+            state.retry_at = 0.0
+
+        assert delays[0] < delays[1] < delays[2]
+        assert delays[2] > 3 * delays[0]
+
+    def test_ad_hoc_check_bypasses_backoff_without_recording_a_cycle(self):
+        monitor = FakeSourceMonitor(fetch_delay=0.0, failing_ports={"BROKEN"})
+        register(monitor, [make_policy("A", port="BROKEN"), make_policy("B", port="VNSGN")])
+
+        asyncio.run(monitor.check_all_policies())
+        last_cycle = dict(monitor.get_monitoring_stats()["last_cycle"])
+
+        monitor.failing_ports.clear()
+        results = asyncio.run(monitor.check_policies(["A", "B"], ad_hoc=True))
+
+        assert sorted(results) == ["A", "B"]
+        assert [port for port, _ in monitor.fetches].count("BROKEN") == 2
+        assert monitor.get_monitoring_stats()["last_cycle"] == last_cycle
+        assert monitor.get_monitoring_stats()["sources_backed_off"] == []
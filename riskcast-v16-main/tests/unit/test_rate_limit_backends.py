@@ -0,0 +1,171 @@
+"""
+Unit tests for GCRA rate limiting and its backends
+"""
+import multiprocessing
+import sys
+
+import pytest
+
+from app.core.utils import rate_limit_backends as rl
+from app.core.utils.rate_limiter import RateLimiter as APIRateLimiter
+from app.middleware.advanced_rate_limit import AdvancedRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rl.time, "time", fake)
+    return fake
+
+
+def _shared_worker(path, slots, hits, queue):
+    backend = rl.SharedMemoryBackend(path=path, slots=slots)
+    allowed = sum(backend.hit("client", 20, 60).allowed for _ in range(hits))
+    backend.close()
+    queue.put(allowed)
+
+
+class TestGCRA:
+    """Test token bucket semantics"""
+
+    def test_burst_then_steady_refill(self, clock):
+        backend = rl.InProcessBackend()
+        results = [backend.hit("k", 5, 60) for _ in range(6)]
+
+        assert [r.allowed for r in results] == [True] * 5 + [False]
+        assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+        assert results[-1].retry_after == pytest.approx(12.0)  # One token per 60/5 seconds
+
+        clock.now += 12
+        assert backend.hit("k", 5, 60).allowed
+        assert not backend.hit("k", 5, 60).allowed
+
+        clock.now += 60
+        assert backend.peek("k", 5, 60).remaining == 5
+
+    def test_peek_does_not_consume(self, clock):
+        backend = rl.InProcessBackend()
+        for _ in range(3):
+            assert backend.peek("k", 1, 60).allowed
+        assert backend.hit("k", 1, 60).allowed
+        assert not backend.peek("k", 1, 60).allowed
+        assert backend.get_stats()["keys"] == 1
+
+
+class TestInProcessBackend:
+    """Test bounded key storage"""
+
+    def test_keys_bounded_by_lru(self, clock):
+        backend = rl.InProcessBackend(max_keys=3)
+        for key in ("a", "b", "c"):
+            backend.hit(key, 10, 60)
+        backend.hit("a", 10, 60)  # Touch "a" so "b" is least recently used
+        backend.hit("d", 10, 60)
+
+        assert len(backend) == 3
+        assert backend.get_stats()["evictions"] == 1
+        assert backend.peek("a", 10, 60).remaining == 8
+        assert backend.peek("b", 10, 60).remaining == 10  # Evicted: full bucket again
+
+
+@pytest.mark.skipif(not rl.FCNTL_AVAILABLE, reason="shared-memory backend needs fcntl")
+class TestSharedMemoryBackend:
+    """Test the mmap'd table shared across workers"""
+
+    def test_state_shared_between_instances(self, tmp_path, clock):
+        path = str(tmp_path / "rl.bin")
+        first = rl.SharedMemoryBackend(path=path, slots=64)
+        second = rl.SharedMemoryBackend(path=path, slots=64)
+
+        assert first.hit("client", 2, 60).allowed
+        assert second.hit("client", 2, 60).allowed
+        assert not first.hit("client", 2, 60).allowed
+        assert second.get_stats()["active_keys"] == 1
+
+        second.reset("client")
+        assert first.hit("client", 2, 60).allowed
+        first.close()
+        second.close()
+
+    def test_full_table_reuses_soonest_expiring_slot(self, tmp_path, clock):
+        backend = rl.SharedMemoryBackend(path=str(tmp_path / "rl.bin"), slots=16)
+        for i in range(16):
+            backend.hit(f"key-{i}", 1, 60 + i)
+        assert backend.hit("newcomer", 1, 60).allowed
+        assert backend.get_stats()["replacements"] == 1
+        assert backend.get_stats()["active_keys"] == 16
+        backend.close()
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="fork start method")
+    def test_limit_enforced_across_processes(self, tmp_path):
+        path = str(tmp_path / "rl.bin")
+        rl.SharedMemoryBackend(path=path, slots=64).close()
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        workers = [ctx.Process(target=_shared_worker, args=(path, 64, 15, queue)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        assert sum(queue.get(timeout=5) for _ in workers) == 20
+
+
+class TestRedisBackend:
+    """Test script plumbing and fallback (no Redis server here)"""
+
+    class FakeRedis:
+        def __init__(self, reply=None, error=None):
+            self.reply, self.error, self.calls = reply, error, []
+
+        def register_script(self, source):
+            assert "redis.call('TIME')" in source
+
+            def script(keys, args):
+                self.calls.append((keys, args))
+                if self.error:
+                    raise self.error
+                return self.reply
+            return script
+
+    def test_script_reply_parsed(self):
+        client = self.FakeRedis(reply=[0, 0, 1500, 60000])
+        result = rl.RedisBackend(client=client).hit("k", 10, 60)
+
+        assert client.calls == [(["riskcast:rl:k"], [10, 60000, 1])]
+        assert not result.allowed
+        assert result.retry_after == pytest.approx(1.5)
+
+    def test_errors_fall_back_to_local_limits(self, clock):
+        backend = rl.RedisBackend(client=self.FakeRedis(error=ConnectionError("down")))
+        assert [backend.hit("k", 2, 60).allowed for _ in range(3)] == [True, True, False]
+        assert backend.get_stats()["errors"] == 3
+
+
+class TestLimiterIntegration:
+    """Test the limiters built on the backends"""
+
+    def test_api_limiter_keeps_tuple_api(self, clock):
+        limiter = APIRateLimiter(backend=rl.InProcessBackend())
+        assert limiter.is_allowed("1.2.3.4", limit=2) == (True, 1, 30)
+        limiter.is_allowed("1.2.3.4", limit=2)
+        allowed, remaining, reset_in = limiter.is_allowed("1.2.3.4", limit=2)
+        assert (allowed, remaining, reset_in) == (False, 0, 30)
+        # A different limit uses its own bucket
+        assert limiter.is_allowed("1.2.3.4", limit=10)[0]
+
+    def test_advanced_limiter_usage_stats(self, clock):
+        limiter = AdvancedRateLimiter(app=None, backend=rl.InProcessBackend())
+        for _ in range(3):
+            limiter._check_rate_limit("ip:1.2.3.4", "/api/v2/state", 60, 60)
+
+        stats = limiter.get_usage_stats("ip:1.2.3.4")
+        assert stats == {"/api/v2/state": {"used": 3, "limit": 60, "remaining": 57}}
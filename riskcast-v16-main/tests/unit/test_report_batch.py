@@ -0,0 +1,117 @@
+"""
+Unit tests for batch report rendering jobs
+"""
+import io
+import os
+import time
+import zipfile
+
+import pytest
+
+pytest.importorskip("reportlab")
+pytest.importorskip("PIL")
+
+from app.core.report.batch import ReportBatchService, assessment_report_data
+
+
+REPORT = {
+    "risk_score": 62.5, "risk_level": "Medium", "confidence": 0.82,
+    "profile": {}, "matrix": {"quadrant": 2}, "factors": {"weather": 0.5},
+    "drivers": ["Congestion at USLAX"],
+    "recommendations": ["Book an alternative carrier immediately", "Consider long-term contracts"],
+    "timeline": [], "network": {}, "scenario_comparisons": [], "charts": {},
+    "route": "VNSGN -> USLAX",
+}
+
+
+def wait_for(service, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = service.get_job(job_id)
+        if job.done:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = ReportBatchService(output_dir=str(tmp_path), workers=2, backend="thread")
+    yield service
+    service.shutdown()
+
+
+class TestAssessmentReportData:
+    """Test mapping stored assessments to the report layout"""
+
+    def test_persona_response_is_mapped(self):
+        data = assessment_report_data(
+            {
+                "persona": "executive",
+                "summary": {"overall_risk": 71.2, "risk_level": "high", "confidence": 85},
+                "key_drivers": [{"factor": "Port congestion"}, "Weather"],
+                "action_items": [{"action": "Reroute via SGSIN"}],
+            },
+            {"pol": "VNSGN", "pod": "USLAX"},
+        )
+
+        assert data["risk_score"] == 71.2
+        assert data["risk_level"] == "high"
+        assert data["confidence"] == pytest.approx(0.85)
+        assert data["drivers"] == ["Port congestion", "Weather"]
+        assert data["recommendations"] == ["Reroute via SGSIN"]
+        assert data["route"] == "VNSGN → USLAX"
+
+
+class TestReportBatchService:
+    """Test batch jobs, progress and archive output"""
+
+    def test_pdf_batch_writes_one_archive(self, service):
+        reports = {f"A/{i}": dict(REPORT, risk_score=float(i)) for i in range(5)}
+        job = service.submit(reports, fmt="pdf")
+        job = wait_for(service, job.job_id)
+
+        status = job.to_dict()
+        assert status["status"] == "completed"
+        assert (status["completed"], status["failed"], status["progress"]) == (5, 0, 1.0)
+        with zipfile.ZipFile(job.output_path) as archive:
+            names = sorted(archive.namelist())
+            assert names == [f"A_{i}.pdf" for i in range(5)]
+            assert archive.read(names[0]).startswith(b"%PDF")
+
+    def test_failed_reports_are_reported_per_assessment(self, service):
+        job = service.submit({"good": REPORT, "bad": dict(REPORT, risk_score="n/a")}, fmt="pdf")
+        job = wait_for(service, job.job_id)
+
+        assert job.status == "completed"
+        assert (job.completed, job.failed) == (1, 1)
+        assert set(job.errors) == {"bad"}
+
+    def test_excel_batch_writes_one_sheet_per_assessment(self, service):
+        openpyxl = pytest.importorskip("openpyxl")
+        job = service.submit({"A-1": REPORT, "A-2": dict(REPORT, risk_level="High")}, fmt="xlsx")
+        job = wait_for(service, job.job_id)
+
+        assert job.status == "completed"
+        workbook = openpyxl.load_workbook(io.BytesIO(open(job.output_path, "rb").read()))
+        assert workbook.sheetnames == ["Summary", "A-1", "A-2"]
+        rows = list(workbook["Summary"].iter_rows(min_row=2, values_only=True))
+        assert [row[0] for row in rows] == ["A-1", "A-2"]
+
+    def test_pruned_jobs_remove_their_output(self, service, monkeypatch):
+        from app.core.report import batch
+
+        monkeypatch.setattr(batch, "REPORT_BATCH_MAX_JOBS", 1)
+        first = wait_for(service, service.submit({"A-1": REPORT}, fmt="pdf").job_id)
+        assert os.path.exists(first.output_path)
+
+        second = wait_for(service, service.submit({"A-2": REPORT}, fmt="pdf").job_id)
+        assert service.get_job(first.job_id) is None
+        assert not os.path.exists(first.output_path)
+        assert os.path.exists(second.output_path)
+
+    def test_invalid_requests_rejected(self, service):
+        with pytest.raises(ValueError):
+            service.submit({"A-1": REPORT}, fmt="docx")
+        with pytest.raises(ValueError):
+            service.submit({}, fmt="pdf")
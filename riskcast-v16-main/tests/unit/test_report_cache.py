@@ -0,0 +1,92 @@
+"""
+Unit tests for shared PDF layouts, chart image cache and report cache
+"""
+import base64
+import io
+
+import pytest
+
+pytest.importorskip("reportlab")
+Image = pytest.importorskip("PIL.Image")
+
+from app.core.report import image_exporter, pdf_builder
+from app.core.report.image_exporter import ImageExporter
+from app.core.report.pdf_builder import get_pdf_builder, iter_pdf_chunks, report_cache_key
+from app.core.report.pdf_layouts import get_pdf_layouts
+
+
+def make_chart(color=(0, 128, 255, 200), size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, color).save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+REPORT = {
+    "risk_score": 62.5, "risk_level": "Medium", "confidence": 0.82,
+    "profile": {"explanation": ["Port congestion is elevated."]},
+    "matrix": {"probability": "medium", "severity": "high", "quadrant": 2, "description": "Watch"},
+    "factors": {"port_congestion": 0.8, "weather": 0.5},
+    "drivers": ["Congestion at USLAX"],
+    "recommendations": ["Book immediate alternative"],
+    "timeline": [], "network": {}, "scenario_comparisons": [],
+    "charts": {"radar": make_chart(), "drivers_bar": make_chart()},
+    "route": "VNSGN -> USLAX",
+}
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    image_exporter.clear_image_cache()
+    pdf_builder.clear_report_cache()
+    yield
+    image_exporter.clear_image_cache()
+    pdf_builder.clear_report_cache()
+
+
+class TestChartImageCache:
+    """Test content-addressed chart processing"""
+
+    def test_same_chart_processed_once_per_size(self):
+        chart = make_chart()
+        first = ImageExporter.process_chart_image(chart, 600, 400)
+        again = ImageExporter.process_chart_image(chart.split(",", 1)[1], 600, 400)
+        other_size = ImageExporter.process_chart_image(chart, 600, 300)
+
+        assert first is again
+        assert Image.open(io.BytesIO(first)).size == (600, 400)
+        assert Image.open(io.BytesIO(other_size)).size == (450, 300)
+        info = image_exporter.get_image_cache_info()
+        assert (info["hits"], info["misses"]) == (1, 2)
+
+    def test_invalid_image_is_cached_as_none(self):
+        assert ImageExporter.process_chart_image("bm90IGFuIGltYWdl") is None
+        assert ImageExporter.process_chart_image("bm90IGFuIGltYWdl") is None
+        assert image_exporter.get_image_cache_info()["hits"] == 1
+
+
+class TestReportCache:
+    """Test whole-report caching and shared builder state"""
+
+    def test_identical_reports_rendered_once(self):
+        builder = get_pdf_builder()
+        first = builder.generate_report_bytes(REPORT)
+        second = builder.generate_report_bytes(dict(REPORT))
+
+        assert first.startswith(b"%PDF") and first is second
+        assert pdf_builder.get_report_cache_info()["hits"] == 1
+        assert report_cache_key(REPORT) != report_cache_key(dict(REPORT, risk_score=63.0))
+
+    def test_shared_styles_not_mutated_by_reports(self):
+        layouts = get_pdf_layouts()
+        color = layouts.styles["RiskScore"].textColor
+        get_pdf_builder().generate_report_bytes(dict(REPORT, risk_score=95.0), use_cache=False)
+
+        assert get_pdf_builder().layouts is layouts
+        assert layouts.styles["RiskScore"].textColor == color
+
+    def test_chunks_reassemble_to_the_report(self):
+        pdf_bytes = get_pdf_builder().generate_report_bytes(REPORT)
+        chunks = list(iter_pdf_chunks(pdf_bytes, chunk_size=1000))
+
+        assert b"".join(chunks) == pdf_bytes
+        assert all(len(chunk) == 1000 for chunk in chunks[:-1])
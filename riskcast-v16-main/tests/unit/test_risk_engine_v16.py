@@ -8,7 +8,14 @@ CRITICAL: These tests verify the main risk calculation pipeline:
 - Deterministic outputs
 """
 import pytest
-from app.core.engine.risk_engine_v16 import calculate_enterprise_risk
+import numpy as np
+from app.core.engine.risk_engine_v16 import (
+    calculate_enterprise_risk,
+    calculate_enterprise_risk_batch,
+    DelayEstimator,
+    EnterpriseRiskEngineV16,
+    FinancialRiskCalculator,
+)
 
 
 class TestCalculateEnterpriseRisk:
@@ -172,3 +179,121 @@ class TestCalculateEnterpriseRisk:
         # (Allow some variance due to different calculation paths)
         assert risk_high >= risk_low - 2.0, \
             f"High risk {risk_high} should be >= low risk {risk_low}"
+
+
+class TestCalculateRiskBatch:
+    """Test suite for the batched multi-shipment Monte Carlo path"""
+    
+    @staticmethod
+    def _shipment(cargo_value: float, weather_risk: float) -> dict:
+        return {
+            'transport_mode': 'sea',
+            'cargo_type': 'standard',
+            'route': 'vn_us',
+            'container_match': 8.0,
+            'packaging_quality': 7.0,
+            'priority': 5.0,
+            'transit_time': 30.0,
+            'cargo_value': cargo_value,
+            'shipment_value': cargo_value,
+            'weather_risk': weather_risk,
+            'port_risk': 5.0,
+            'carrier_rating': 3.5,
+        }
+    
+    def test_batch_matches_single_structure(self):
+        """Batch results keep input order and the calculate_risk response shape"""
+        shipments = [self._shipment(20000.0 * (i + 1), float(i + 2)) for i in range(5)]
+        engine = EnterpriseRiskEngineV16(mc_iterations=10000)
+        
+        results = engine.calculate_risk_batch(shipments, chunk_size=2)
+        single = engine.calculate_risk(shipments[0])
+        
+        assert len(results) == 5
+        assert set(results[0].keys()) == set(single.keys())
+        for result in results:
+            assert 0.0 <= result['overall_risk'] <= 10.0
+        
+        # Expected loss scales with cargo value
+        losses = [r['financial_distribution']['expected_loss_usd'] for r in results]
+        assert losses == sorted(losses)
+        
+        # Same shipment, same seeded stream: identical to the single path
+        assert results[0]['random_seed'] == single['random_seed']
+        assert results[0]['overall_risk'] == pytest.approx(single['overall_risk'], rel=1e-9)
+    
+    def test_batch_iteration_override_does_not_leak_into_cache(self):
+        """Batch results are cached under their effective iteration count"""
+        from app.core.utils.cache import clear_cache
+        
+        clear_cache()
+        shipment = self._shipment(31337.0, 4.0)
+        try:
+            batch = calculate_enterprise_risk_batch([dict(shipment)], mc_iterations=2000)
+            single = calculate_enterprise_risk(dict(shipment))
+            overridden = calculate_enterprise_risk({**shipment, 'mc_iterations': 2000})
+        finally:
+            clear_cache()
+        
+        assert batch[0]['iterations_used'] == 2000
+        assert single['iterations_used'] == EnterpriseRiskEngineV16().iterations_used
+        assert overridden['iterations_used'] == 2000
+    
+    def test_batch_honours_per_shipment_iterations(self):
+        """A shipment's own mc_iterations wins over the batch default"""
+        from app.core.utils.cache import clear_cache
+        
+        clear_cache()
+        try:
+            results = calculate_enterprise_risk_batch([
+                {**self._shipment(10000.0, 3.0), 'mc_iterations': 3000},
+                self._shipment(20000.0, 3.0),
+            ], mc_iterations=2000)
+        finally:
+            clear_cache()
+        
+        assert [r['iterations_used'] for r in results] == [3000, 2000]
+    
+    def test_batch_metrics_match_single_metrics(self):
+        """Vectorized metric helpers agree with the per-shipment versions"""
+        rng = np.random.default_rng(7)
+        distributions = np.clip(rng.normal(5.0, 1.5, size=(3, 5000)), 0.0, 10.0)
+        values = np.array([10000.0, 50000.0, 250000.0])
+        
+        metrics = FinancialRiskCalculator.calculate_all_metrics_batch(distributions)
+        financial = FinancialRiskCalculator.calculate_financial_distribution_batch(distributions, values)
+        delays = DelayEstimator.estimate_delay_distribution_batch(distributions)
+        
+        for i in range(3):
+            expected_metrics = FinancialRiskCalculator.calculate_all_metrics(distributions[i])
+            expected_financial = FinancialRiskCalculator.calculate_financial_distribution(
+                distributions[i], values[i]
+            )
+            expected_delay = DelayEstimator.estimate_delay_distribution(distributions[i])
+            
+            for key, value in expected_metrics.items():
+                assert metrics[i][key] == pytest.approx(value, rel=1e-9, abs=1e-12)
+            for key in ('expected_loss_usd', 'var_95_usd', 'cvar_95_usd', 'cvar_99_usd', 'max_loss_usd'):
+                assert financial[i][key] == pytest.approx(expected_financial[key], rel=1e-9)
+            for key, value in expected_delay.items():
+                assert delays[i][key] == pytest.approx(value, rel=1e-9)
+    
+    def test_vectorized_delay_days_matches_scalar(self):
+        """estimate_delay_days_vectorized follows the scalar piecewise model"""
+        scores = np.linspace(0.0, 10.0, 41)
+        vectorized = DelayEstimator.estimate_delay_days_vectorized(scores)
+        scalar = [DelayEstimator.estimate_delay_days(s) for s in scores]
+        assert np.allclose(vectorized, scalar)
+    
+    def test_seeded_engine_is_deterministic_across_threads(self):
+        """Concurrent calculations keep same input → same output"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        shipments = [self._shipment(50000.0, float(w)) for w in (2, 5, 8)]
+        engine = EnterpriseRiskEngineV16(mc_iterations=10000)
+        serial = [engine.calculate_risk(s)['overall_risk'] for s in shipments]
+        
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            parallel = list(pool.map(lambda s: engine.calculate_risk(s)['overall_risk'], shipments * 2))
+        
+        assert parallel == serial * 2
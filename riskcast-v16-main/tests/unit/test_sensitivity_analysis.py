@@ -0,0 +1,97 @@
+"""
+Unit tests for batched sensitivity analysis (common random numbers)
+"""
+import numpy as np
+import pytest
+
+from app.services.sensitivity_analysis import SensitivityAnalyzer
+
+
+BASELINE = {'cargo_value': 50000, 'transit_time': 30, 'weather_risk': 50}
+PARAMETERS = ['cargo_value', 'transit_time', 'weather_risk']
+
+
+def linear_score(shipment):
+    return shipment['cargo_value'] / 10000 + shipment['transit_time'] / 2 + shipment['weather_risk'] / 2
+
+
+class RecordingBatchCalculator:
+    """Batch calculator with seeded noise: same seed -> same noise for every shipment"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, shipments, random_seed):
+        self.calls.append((len(shipments), random_seed))
+        noise = np.random.default_rng(random_seed).normal(0, 5)
+        return [{'risk_score': linear_score(s) + noise} for s in shipments]
+
+
+class TestBatchedTornado:
+    """Test the single-batch tornado analysis"""
+
+    def test_all_perturbations_scored_in_one_call(self):
+        batch = RecordingBatchCalculator()
+        analyzer = SensitivityAnalyzer(risk_calculator_func=lambda s: {'risk_score': 0}, batch_calculator_func=batch)
+
+        result = analyzer.run_tornado_analysis(BASELINE, parameters=PARAMETERS)
+
+        assert len(batch.calls) == 1
+        assert batch.calls[0][0] == 2 * len(PARAMETERS) + 1
+        # Common random numbers: the shared noise cancels out of every delta
+        by_param = {s.parameter: s for s in result.sensitivities}
+        assert by_param['weather_risk'].high_delta == pytest.approx(5.0)
+        assert by_param['transit_time'].low_delta == pytest.approx(-3.0)
+        assert result.most_sensitive == 'weather_risk'
+
+    def test_common_seed_derived_from_baseline(self):
+        batch = RecordingBatchCalculator()
+        analyzer = SensitivityAnalyzer(risk_calculator_func=lambda s: {'risk_score': 0}, batch_calculator_func=batch)
+
+        analyzer.run_tornado_analysis(BASELINE, parameters=PARAMETERS)
+        analyzer.run_tornado_analysis(dict(BASELINE), parameters=PARAMETERS)
+        analyzer.run_tornado_analysis({**BASELINE, 'cargo_value': 60000}, parameters=PARAMETERS)
+
+        seeds = [seed for _, seed in batch.calls]
+        assert seeds[0] == seeds[1] != seeds[2]
+
+    def test_falls_back_to_worker_pool(self):
+        scored = []
+
+        def scalar(shipment):
+            scored.append(shipment['weather_risk'])
+            if shipment['transit_time'] > 30:
+                raise RuntimeError("engine failure")
+            return {'risk_score': linear_score(shipment)}
+
+        def broken_batch(shipments, random_seed):
+            raise RuntimeError("batch unavailable")
+
+        analyzer = SensitivityAnalyzer(risk_calculator_func=scalar, batch_calculator_func=broken_batch, max_workers=4)
+        result = analyzer.run_tornado_analysis(BASELINE, parameters=PARAMETERS)
+
+        assert len(scored) == 7
+        # transit_time's high variant failed: that parameter is skipped
+        assert [s.parameter for s in result.sensitivities] == ['weather_risk', 'cargo_value']
+        assert BASELINE == {'cargo_value': 50000, 'transit_time': 30, 'weather_risk': 50}
+
+
+class TestVectorizedThresholds:
+    """Test bisection over all targets at once"""
+
+    def test_thresholds_found_with_one_batch_per_iteration(self):
+        batch_sizes = []
+
+        def batch(shipments, random_seed):
+            batch_sizes.append(len(shipments))
+            return [{'risk_score': s['weather_risk']} for s in shipments]
+
+        analyzer = SensitivityAnalyzer(risk_calculator_func=lambda s: {'risk_score': 0}, batch_calculator_func=batch)
+        thresholds = analyzer.find_threshold_values(BASELINE, 'weather_risk', [25, 50, 75, 150])
+
+        assert thresholds[50] == pytest.approx(50.0)
+        assert abs(thresholds[25] - 25) < 1
+        assert abs(thresholds[75] - 75) < 1
+        assert thresholds[150] is None  # Beyond the parameter range
+        assert len(batch_sizes) <= 20
+        assert batch_sizes[0] == 1  # All targets share the first midpoint
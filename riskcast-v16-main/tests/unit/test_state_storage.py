@@ -0,0 +1,93 @@
+"""
+Unit tests for the file-based state store and its manifest index
+"""
+import json
+import sqlite3
+import time
+
+import pytest
+
+from app.core import state_storage
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_storage, "USE_MYSQL", False)
+    monkeypatch.setattr(state_storage, "STATE_STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(state_storage, "_manifest", None)
+    return tmp_path
+
+
+class TestFileStateStorage:
+    """Test atomic saves and manifest-backed listing"""
+
+    def test_save_preserves_created_at_without_reading_file(self, storage_dir, monkeypatch):
+        assert state_storage.save_state_file_based("S1", {"v": 1})
+        created_at = state_storage.load_state_file_based("S1")["created_at"]
+
+        def no_reads(shipment_id):
+            raise AssertionError("save must not re-read the state file")
+
+        monkeypatch.setattr(state_storage, "load_state_file_based", no_reads)
+        time.sleep(0.002)
+        assert state_storage.save_state_file_based("S1", {"v": 2})
+
+        data = json.loads((storage_dir / "S1.json").read_text(encoding="utf-8"))
+        assert data["state"] == {"v": 2}
+        assert data["created_at"] == created_at
+        assert data["updated_at"] > created_at
+        assert sorted(p.name for p in storage_dir.glob("*.json")) == ["S1.json"]
+
+    def test_list_is_paginated_newest_first(self, storage_dir):
+        for i in range(5):
+            state_storage.save_state_file_based(f"S{i}", {"v": i})
+            time.sleep(0.002)
+        state_storage.save_state_file_based("S0", {"v": 10})
+
+        first_page = state_storage.list_shipments(limit=2)
+        second_page = state_storage.list_shipments(limit=2, offset=2)
+
+        assert [s["shipment_id"] for s in first_page] == ["S0", "S4"]
+        assert [s["shipment_id"] for s in second_page] == ["S3", "S2"]
+        assert set(first_page[0]) == {"shipment_id", "created_at", "updated_at"}
+        assert state_storage.count_shipments() == 5
+
+    def test_manifest_rebuilt_from_existing_files(self, storage_dir):
+        (storage_dir / "OLD.json").write_text(json.dumps({
+            "shipment_id": "OLD", "state": {},
+            "created_at": "2025-01-01T00:00:00Z", "updated_at": "2025-01-02T00:00:00Z"
+        }), encoding="utf-8")
+
+        assert state_storage.list_shipments() == [{
+            "shipment_id": "OLD",
+            "updated_at": "2025-01-02T00:00:00Z",
+            "created_at": "2025-01-01T00:00:00Z"
+        }]
+
+        state_storage.save_state_file_based("OLD", {"v": 1})
+        assert state_storage.load_state_file_based("OLD")["created_at"] == "2025-01-01T00:00:00Z"
+
+    def test_failed_index_update_still_saves_and_lists(self, storage_dir):
+        manifest = state_storage.get_state_manifest()
+
+        def locked(*args, **kwargs):
+            raise sqlite3.OperationalError("database is locked")
+
+        manifest.upsert = locked
+        try:
+            assert state_storage.save_state_file_based("S1", {"v": 1})
+        finally:
+            del manifest.upsert
+
+        assert (storage_dir / "S1.json").exists()
+        assert [s["shipment_id"] for s in state_storage.list_shipments()] == ["S1"]
+
+    def test_manifest_missing_files_is_rebuilt_on_start(self, storage_dir):
+        state_storage.save_state_file_based("S1", {"v": 1})
+        (storage_dir / "S2.json").write_text(json.dumps({
+            "shipment_id": "S2", "state": {},
+            "created_at": "2025-01-01T00:00:00Z", "updated_at": "2025-01-01T00:00:00Z"
+        }), encoding="utf-8")
+
+        state_storage._manifest = None
+        assert state_storage.count_shipments() == 2
@@ -0,0 +1,78 @@
+"""
+Unit tests for batched TOPSIS ranking
+"""
+import numpy as np
+import pytest
+
+from app.core.engine_v2.topsis import TOPSISSolver, competition_ranks, rank_alternatives
+
+
+CRITERIA = ["cost", "transit_days", "reliability"]
+DIRECTIONS = ["minimize", "minimize", "maximize"]
+WEIGHTS = [0.5, 0.2, 0.3]
+
+
+class TestRankAlternatives:
+    """Test the vectorized entry point"""
+
+    def test_dominant_alternative_ranks_first(self):
+        lanes = np.array([
+            [1200, 30, 0.80],
+            [900, 25, 0.95],   # Cheaper, faster and more reliable
+            [1500, 35, 0.70],  # Worst on every criterion
+        ])
+        ranking = rank_alternatives(lanes, WEIGHTS, DIRECTIONS)
+
+        assert ranking.ranks.tolist() == [2, 1, 3]
+        assert ranking.closeness[1] == pytest.approx(1.0)
+        assert ranking.closeness[2] == pytest.approx(0.0)
+        assert ranking.top(2).tolist() == [1, 0]
+
+    def test_batch_matches_per_matrix_solver(self):
+        rng = np.random.default_rng(3)
+        batch = rng.random((40, 12, 3)) * [1000, 40, 1]
+        ranking = rank_alternatives(batch, WEIGHTS, DIRECTIONS)
+
+        assert ranking.closeness.shape == ranking.ranks.shape == (40, 12)
+        weights = dict(zip(CRITERIA, WEIGHTS))
+        directions = dict(zip(CRITERIA, DIRECTIONS))
+        for b in (0, 17, 39):
+            results = TOPSISSolver().rank(
+                [dict(zip(CRITERIA, row)) for row in batch[b]], CRITERIA, weights, directions
+            )
+            np.testing.assert_allclose(ranking.closeness[b], [r.closeness_coefficient for r in results])
+            assert ranking.ranks[b].tolist() == [r.ranking for r in results]
+
+    def test_mask_excludes_padding_rows(self):
+        real = np.array([[1200, 30, 0.80], [900, 25, 0.95]])
+        padded = np.vstack([real, [[0, 0, 99.0]]])[None]  # Padding row would dominate reliability
+        ranking = rank_alternatives(padded, WEIGHTS, DIRECTIONS, mask=[[True, True, False]])
+        expected = rank_alternatives(real, WEIGHTS, DIRECTIONS)
+
+        np.testing.assert_allclose(ranking.closeness[0, :2], expected.closeness)
+        assert ranking.ranks[0].tolist() == [2, 1, 0]
+        assert np.isnan(ranking.closeness[0, 2])
+        assert ranking.top(3)[0].tolist() == [1, 0, 2]
+
+    def test_ties_share_the_better_rank(self):
+        assert competition_ranks(np.array([0.5, 0.9, 0.5, 0.1])).tolist() == [2, 1, 2, 4]
+        assert competition_ranks(np.array([[0.2, 0.2], [0.3, 0.1]])).tolist() == [[1, 1], [1, 2]]
+
+    def test_invalid_directions_rejected(self):
+        with pytest.raises(ValueError):
+            rank_alternatives(np.ones((3, 3)), directions=["maximize"])
+
+
+class TestTOPSISSolver:
+    """Test the dict-based solver on top of the vectorized core"""
+
+    def test_single_alternative_solve(self):
+        result = TOPSISSolver().solve(
+            alternatives=[{"delay": 0.4, "port": 0.6}],
+            criteria=["delay", "port"],
+            weights={"delay": 0.5, "port": 0.5},
+            criteria_directions={"delay": "minimize", "port": "minimize"},
+        )
+        assert result.ranking == 1
+        assert result.closeness_coefficient == 0.0
+        assert set(result.normalized_scores) == {"delay", "port"}